@@ -0,0 +1,215 @@
+"""
+Contact CSV export.
+Rows are read with values_list().iterator() and written in batches, so an
+export holds one chunk of contacts in memory however many the tenant has.
+The same row stream backs the streaming download and the background export
+job that writes to storage. Under ASGI the download is served through an
+async iterator that pulls one chunk at a time, since Django collects a
+sync iterator into a list before sending it to an ASGI server.
+
+A background job records its outcome and tenant in a small status file
+written after the export itself, so a poll never sees a half-written
+export as done and a failed job is reported as failed rather than pending
+forever. Exports are only downloaded through the authenticated API, never
+from a public media URL, and are deleted after CONTACT_EXPORT_RETENTION_HOURS.
+"""
+import csv
+import io
+import json
+import tempfile
+import zlib
+from datetime import timedelta
+from typing import AsyncIterator, Iterable, Iterator, Optional
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+CONTACT_EXPORT_FIELDS = (
+    'id', 'first_name', 'last_name', 'email', 'phone_number',
+    'company', 'job_title', 'lead_source', 'lead_status',
+    'last_contact_date', 'notes', 'tags', 'priority', 'score',
+    'last_activity_summary', 'next_action_suggestion', 'suggested_persona',
+    'created_at', 'updated_at'
+)
+
+DATETIME_FIELDS = ('last_contact_date', 'created_at', 'updated_at')
+
+# Contacts fetched per database round trip
+EXPORT_CHUNK_SIZE = 2000
+
+# CSV rows written per streamed chunk
+ROWS_PER_CHUNK = 500
+
+EXPORT_DIRECTORY = 'exports/contacts'
+
+# Bytes read per chunk when serving a stored export
+DOWNLOAD_BLOCK_SIZE = 64 * 1024
+
+# Hours a background export and its status file are kept
+EXPORT_RETENTION_HOURS = 24
+
+
+def _format_tags(value):
+    return ",".join(str(tag) for tag in value) if isinstance(value, list) else ''
+
+
+def _format_datetime(value):
+    return value.isoformat() if value else ''
+
+
+def iter_contact_rows(queryset, chunk_size: Optional[int] = None) -> Iterator[list]:
+    """
+    Yield the header and one list per contact.
+
+    Only the columns that need it are reformatted; csv.writer already
+    writes None as an empty string and other values with str().
+    """
+    chunk_size = chunk_size or getattr(settings, 'CONTACT_EXPORT_CHUNK_SIZE', EXPORT_CHUNK_SIZE)
+    formatters = [(CONTACT_EXPORT_FIELDS.index('tags'), _format_tags)]
+    formatters += [(CONTACT_EXPORT_FIELDS.index(name), _format_datetime) for name in DATETIME_FIELDS]
+
+    yield list(CONTACT_EXPORT_FIELDS)
+    rows = queryset.order_by().values_list(*CONTACT_EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    for row in rows:
+        row = list(row)
+        for index, formatter in formatters:
+            row[index] = formatter(row[index])
+        yield row
+
+
+def iter_csv_chunks(rows: Iterable[list], rows_per_chunk: int = ROWS_PER_CHUNK) -> Iterator[str]:
+    """Encode rows as CSV text, yielding a chunk every rows_per_chunk rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= rows_per_chunk:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue()
+
+
+def iter_gzip_chunks(chunks: Iterable[str]) -> Iterator[bytes]:
+    """Gzip-compress a stream of text chunks."""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_contacts_csv(queryset, compress: bool = False) -> Iterator:
+    """CSV export of a contact queryset as a stream of chunks."""
+    chunks = iter_csv_chunks(iter_contact_rows(queryset))
+    return iter_gzip_chunks(chunks) if compress else chunks
+
+
+_EXHAUSTED = object()
+
+
+async def aiter_chunks(chunks: Iterable) -> AsyncIterator:
+    """
+    Serve a sync chunk stream as an async iterator, fetching each chunk in
+    the sync thread so database access stays on one connection.
+    """
+    iterator = iter(chunks)
+    next_chunk = sync_to_async(next)
+    try:
+        while True:
+            chunk = await next_chunk(iterator, _EXHAUSTED)
+            if chunk is _EXHAUSTED:
+                return
+            yield chunk
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await sync_to_async(close)()
+
+
+def export_path(job_id) -> str:
+    return f"{EXPORT_DIRECTORY}/{job_id}.csv.gz"
+
+
+def export_status_path(job_id) -> str:
+    return f"{EXPORT_DIRECTORY}/{job_id}.json"
+
+
+def write_export_status(job_id, tenant_id, status: str, path: Optional[str] = None) -> None:
+    """Record a finished job as 'completed' (with the export's storage path) or 'failed'."""
+    content = json.dumps({'tenant_id': str(tenant_id), 'status': status, 'path': path})
+    default_storage.save(export_status_path(job_id), ContentFile(content))
+
+
+def read_export_status(job_id, tenant) -> Optional[dict]:
+    """
+    The job's recorded outcome, or None while it is still running or when
+    the job belongs to another tenant.
+    """
+    if tenant is None:
+        return None
+    try:
+        with default_storage.open(export_status_path(job_id)) as status_file:
+            job = json.loads(status_file.read())
+    except (FileNotFoundError, ValueError):
+        return None
+    if job.get('tenant_id') != str(tenant.id):
+        return None
+    return job
+
+
+def iter_stored_export(path: str, block_size: int = DOWNLOAD_BLOCK_SIZE) -> Iterator[bytes]:
+    """Read a stored export in blocks."""
+    with default_storage.open(path) as export:
+        while True:
+            block = export.read(block_size)
+            if not block:
+                return
+            yield block
+
+
+def delete_old_exports(max_age_hours: Optional[int] = None) -> int:
+    """
+    Delete background exports and status files older than max_age_hours.
+
+    Returns:
+        Number of files deleted
+    """
+    max_age_hours = max_age_hours or getattr(settings, 'CONTACT_EXPORT_RETENTION_HOURS', EXPORT_RETENTION_HOURS)
+    cutoff = timezone.now() - timedelta(hours=max_age_hours)
+    try:
+        _, names = default_storage.listdir(EXPORT_DIRECTORY)
+    except FileNotFoundError:
+        return 0
+    deleted = 0
+    for name in names:
+        path = f"{EXPORT_DIRECTORY}/{name}"
+        if default_storage.get_modified_time(path) < cutoff:
+            default_storage.delete(path)
+            deleted += 1
+    return deleted
+
+
+def write_contacts_export(queryset, job_id) -> str:
+    """
+    Write a gzipped CSV export to default storage.
+
+    The file is spooled to a temporary file first, so memory use stays
+    flat for any storage backend.
+
+    Returns:
+        Storage path of the export
+    """
+    with tempfile.TemporaryFile() as tmp:
+        for chunk in iter_contacts_csv(queryset, compress=True):
+            tmp.write(chunk)
+        tmp.seek(0)
+        return default_storage.save(export_path(job_id), File(tmp))
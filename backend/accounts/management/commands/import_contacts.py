@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Tenant
+from accounts.imports import FORMATS, detect_format, import_contacts
+
+
+class Command(BaseCommand):
+    help = 'Bulk import contacts for a tenant from a CSV or JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file to import')
+        parser.add_argument('--tenant', required=True, help='Tenant id or subdomain')
+        parser.add_argument('--format', choices=FORMATS, help='File format; defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, help='Contacts written per bulk upsert')
+
+    def handle(self, *args, **options):
+        tenant = Tenant.objects.filter(subdomain=options['tenant']).first()
+        if tenant is None:
+            try:
+                tenant = Tenant.objects.filter(pk=options['tenant']).first()
+            except Exception:
+                tenant = None
+        if tenant is None:
+            raise CommandError(f"Tenant not found: {options['tenant']}")
+
+        file_format = options['format'] or detect_format(options['path'])
+        if file_format is None:
+            raise CommandError("Can't tell the file format from its name; pass --format")
+
+        with open(options['path'], 'rb') as fileobj:
+            result = import_contacts(tenant, fileobj, file_format, chunk_size=options['chunk_size'])
+
+        for error in result.errors:
+            self.stdout.write(self.style.WARNING(f"Line {error['line']}: {error['error']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.processed} rows for {tenant.name}: {result.created} created, "
+            f"{result.updated} updated, {result.skipped} skipped"
+        ))
@@ -22,7 +22,10 @@ class IsTenantUser(permissions.BasePermission):
         
         # Check if user has a tenant and the object belongs to that tenant
         if hasattr(request.user, 'tenant') and request.user.tenant:
-            # Check if the object has a tenant field
+            # Check if the object has a tenant field; compare ids so the
+            # object's tenant isn't fetched just for this check
+            if hasattr(obj, 'tenant_id'):
+                return obj.tenant_id == request.user.tenant.pk
             if hasattr(obj, 'tenant'):
                 return obj.tenant == request.user.tenant
             # If object doesn't have tenant field, check if user can access it
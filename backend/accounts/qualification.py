@@ -0,0 +1,102 @@
+"""
+Rule-based lead qualification.
+The rules score a contact from its email domain, job title, company and
+lead source, and the score sets its lead_status. qualify() scores one
+contact; qualify_many() scores a whole import chunk column by column,
+evaluating each rule once per distinct value rather than once per row.
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+GENERIC_EMAIL_DOMAINS = frozenset(['gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com', 'aol.com'])
+SENIOR_TITLE_PATTERN = re.compile('|'.join(re.escape(k) for k in ['ceo', 'founder', 'director', 'manager', 'head of', 'vp', 'chief']))
+JUNIOR_TITLE_PATTERN = re.compile('|'.join(re.escape(k) for k in ['analyst', 'specialist', 'coordinator']))
+LEAD_SOURCE_POINTS = {
+    'referral': 40,
+    'website form': 10,
+    'cold outreach': 5,
+    'event': 25,
+}
+
+# Minimum score for each status, highest first
+STATUS_THRESHOLDS = (
+    (80, "Qualified"),
+    (50, "Contacted"),
+)
+DEFAULT_STATUS = "New Lead"
+
+
+def email_points(email: Optional[str]) -> int:
+    if email and '@' in email:
+        if email.split('@')[-1].lower() not in GENERIC_EMAIL_DOMAINS:
+            return 20
+    return 0
+
+
+def job_title_points(job_title: Optional[str]) -> int:
+    if job_title:
+        job_title_lower = job_title.lower()
+        if SENIOR_TITLE_PATTERN.search(job_title_lower):
+            return 30
+        if JUNIOR_TITLE_PATTERN.search(job_title_lower):
+            return 10
+    return 0
+
+
+def company_points(company: Optional[str]) -> int:
+    return 15 if company and company.strip() else 0
+
+
+def lead_source_points(lead_source: Optional[str]) -> int:
+    if lead_source:
+        lead_source_lower = lead_source.lower()
+        if lead_source_lower in LEAD_SOURCE_POINTS:
+            return LEAD_SOURCE_POINTS[lead_source_lower]
+        if 'webinar' in lead_source_lower:
+            return LEAD_SOURCE_POINTS['event']
+    return 0
+
+
+def status_for_score(score: int) -> str:
+    for threshold, lead_status in STATUS_THRESHOLDS:
+        if score >= threshold:
+            return lead_status
+    return DEFAULT_STATUS
+
+
+def qualify(email, job_title, company, lead_source, base_score: Optional[int] = 0) -> Tuple[int, str]:
+    """Return the (score, lead_status) the rules give one contact."""
+    score = max(0, (base_score or 0) + email_points(email) + job_title_points(job_title)
+                + company_points(company) + lead_source_points(lead_source))
+    return score, status_for_score(score)
+
+
+def _points_column(rule, values: Sequence) -> List[int]:
+    # Each distinct value is scored once; import lists repeat domains,
+    # titles and sources heavily
+    memo: Dict = {}
+    return [memo[value] if value in memo else memo.setdefault(value, rule(value)) for value in values]
+
+
+def _email_domain(email):
+    return email.split('@')[-1].lower() if email and '@' in email else None
+
+
+def qualify_many(rows: Iterable[dict]) -> Tuple[List[int], List[str]]:
+    """
+    Score a chunk of contact field dicts in one pass per rule.
+
+    Returns:
+        Parallel lists of scores and lead statuses
+    """
+    rows = list(rows)
+    domains = [_email_domain(row.get('email')) for row in rows]
+    columns = (
+        _points_column(lambda domain: 0 if domain is None or domain in GENERIC_EMAIL_DOMAINS else 20, domains),
+        _points_column(job_title_points, [row.get('job_title') for row in rows]),
+        _points_column(company_points, [row.get('company') for row in rows]),
+        _points_column(lead_source_points, [row.get('lead_source') for row in rows]),
+        [row.get('score') or 0 for row in rows],
+    )
+    scores = [max(0, total) for total in map(sum, zip(*columns))]
+    return scores, _points_column(status_for_score, scores)
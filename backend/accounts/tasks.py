@@ -0,0 +1,39 @@
+"""
+Celery tasks for the accounts app.
+"""
+import logging
+from celery import shared_task
+from core.models import Contact
+from .exports import delete_old_exports, write_contacts_export, write_export_status
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def export_contacts_csv(job_id: str, tenant_id: str):
+    """
+    Write a contact CSV export to storage for download.
+
+    Args:
+        job_id: Export job id, which names the stored file
+        tenant_id: Tenant whose contacts to export
+    """
+    queryset = Contact.objects.all_tenants().filter(tenant_id=tenant_id)
+    try:
+        path = write_contacts_export(queryset, job_id)
+    except Exception as e:
+        logger.error(f"Contact export {job_id} failed: {str(e)}")
+        write_export_status(job_id, tenant_id, 'failed')
+        raise
+    write_export_status(job_id, tenant_id, 'completed', path)
+    logger.info(f"Contact export {job_id} written to {path}")
+    return path
+
+
+@shared_task
+def delete_old_contact_exports():
+    """Delete background contact exports past their retention period."""
+    deleted = delete_old_exports()
+    if deleted:
+        logger.info(f"Deleted {deleted} old contact export files")
+    return deleted
@@ -1,3 +1,235 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncClient, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from core.models import Contact, Tenant
+from . import exports
+from .imports import import_contacts
+from .qualification import qualify, qualify_many
+from .tasks import export_contacts_csv
 
-# Create your tests here.
+
+class ContactExportTest(TestCase):
+    """Test the streaming contact CSV export."""
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Export Tenant", subdomain="export")
+        Contact.objects.create(
+            tenant=self.tenant, first_name="Ada", last_name="Lovelace",
+            email="ada@example.com", tags=["vip", "b2b"]
+        )
+        Contact.objects.create(tenant=self.tenant, first_name="Alan", last_name="Turing")
+        self.client = APIClient()
+
+    def _read(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_streams_csv_rows(self):
+        response = self.client.get('/api/accounts/contacts/export-csv/')
+        self.assertTrue(response.streaming)
+        rows = list(csv.DictReader(io.StringIO(self._read(response).decode())))
+        self.assertEqual(len(rows), 2)
+        ada = next(row for row in rows if row['first_name'] == 'Ada')
+        self.assertEqual(ada['tags'], 'vip,b2b')
+        self.assertIn('T', ada['created_at'])
+        turing = next(row for row in rows if row['first_name'] == 'Alan')
+        self.assertEqual(turing['email'], '')
+
+    def test_gzip_matches_plain_export(self):
+        plain = self._read(self.client.get('/api/accounts/contacts/export-csv/'))
+        response = self.client.get('/api/accounts/contacts/export-csv/?compress=gzip')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertEqual(gzip.decompress(self._read(response)), plain)
+
+    async def test_asgi_export_streams_chunks_asynchronously(self):
+        plain = await sync_to_async(self._read)(self.client.get('/api/accounts/contacts/export-csv/'))
+        response = await AsyncClient().get('/api/accounts/contacts/export-csv/')
+        # An async iterator is sent chunk by chunk instead of being collected first
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(b''.join(chunks), plain)
+
+    def test_export_job_writes_to_storage(self):
+        job_id = '00000000-0000-4000-8000-000000000001'
+        response = self.client.get('/api/accounts/contacts/export-csv/?mode=async')
+        self.assertEqual(response.status_code, 400)
+
+        other = Tenant.objects.create(name="Other Export Tenant", subdomain="other-export")
+        Contact.objects.create(tenant=other, first_name="Grace", last_name="Hopper")
+        user = get_user_model().objects.create_user(username='exporter', email='exporter@example.com', password='testpass123')
+        user.tenant = self.tenant
+        self.client.force_authenticate(user)
+        streamed = self._read(self.client.get('/api/accounts/contacts/export-csv/'))
+        self.assertEqual(len(streamed.splitlines()), 3)
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            with mock.patch.object(export_contacts_csv, 'delay', side_effect=export_contacts_csv) as delay, \
+                    mock.patch('accounts.views.uuid.uuid4', return_value=job_id):
+                response = self.client.get('/api/accounts/contacts/export-csv/?mode=async')
+            self.assertEqual(response.status_code, 202)
+            delay.assert_called_once_with(job_id, str(self.tenant.id))
+
+            response = self.client.get(f'/api/accounts/contacts/export-csv/{job_id}/')
+            self.assertEqual(response.data['status'], 'completed')
+            self.assertTrue(response.data['download_url'].endswith(f'/export-csv/{job_id}/download/'))
+            download = self.client.get(f'/api/accounts/contacts/export-csv/{job_id}/download/')
+            self.assertEqual(len(gzip.decompress(self._read(download)).splitlines()), 3)
+
+            # Users of other tenants can't see or download the export
+            outsider = get_user_model().objects.create_user(username='outsider', email='outsider@example.com', password='testpass123')
+            outsider.tenant = other
+            self.client.force_authenticate(outsider)
+            response = self.client.get(f'/api/accounts/contacts/export-csv/{job_id}/')
+            self.assertEqual(response.data, {'job_id': job_id, 'status': 'pending'})
+            response = self.client.get(f'/api/accounts/contacts/export-csv/{job_id}/download/')
+            self.assertEqual(response.status_code, 404)
+
+            # Exports past their retention period are deleted
+            self.assertEqual(exports.delete_old_exports(), 0)
+            with mock.patch('accounts.exports.timezone.now', return_value=timezone.now() + timedelta(hours=25)):
+                self.assertEqual(exports.delete_old_exports(), 2)
+            self.assertFalse(default_storage.exists(exports.export_path(job_id)))
+
+    def test_export_status_waits_for_the_job_outcome(self):
+        job_id = '00000000-0000-4000-8000-000000000002'
+        user = get_user_model().objects.create_user(username='poller', email='poller@example.com', password='testpass123')
+        user.tenant = self.tenant
+        self.client.force_authenticate(user)
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            # An export file alone may still be being written
+            default_storage.save(exports.export_path(job_id), ContentFile(b'partial'))
+            response = self.client.get(f'/api/accounts/contacts/export-csv/{job_id}/')
+            self.assertEqual(response.data['status'], 'pending')
+
+            with mock.patch.object(exports, 'iter_contacts_csv', side_effect=OSError("disk full")), \
+                    self.assertRaises(OSError):
+                export_contacts_csv(job_id, str(self.tenant.id))
+            response = self.client.get(f'/api/accounts/contacts/export-csv/{job_id}/')
+            self.assertEqual(response.data['status'], 'failed')
+
+
+class ContactDuplicateTest(TestCase):
+    """Test duplicate detection on blocking keys."""
+
+    def setUp(self):
+        tenant = Tenant.objects.create(name="Dedupe Tenant", subdomain="dedupe")
+
+        def contact(first_name, last_name, **fields):
+            return Contact.objects.create(tenant=tenant, first_name=first_name, last_name=last_name, **fields)
+
+        # Email and phone matches chain into one group
+        self.ada = contact("Ada", "Lovelace", email="Ada@Example.com")
+        self.ada_copy = contact("Ada", "King", email=" ada@example.com", phone_number="(555) 010-2000")
+        self.ada_phone = contact("Augusta", "King", phone_number="555.010.2000")
+        # Only a fuzzy name match
+        self.grace = contact("Grace", "Hopper", company="Navy")
+        self.grace_typo = contact("Grace", "Hoper", company="Navy")
+        contact("Alan", "Turing", email="alan@example.com")
+        self.client = APIClient()
+
+    def test_blocking_keys_maintained_on_save(self):
+        self.assertEqual(self.ada_copy.email_key, 'ada@example.com')
+        self.assertEqual(self.ada_copy.phone_key, '5550102000')
+        self.ada.phone_number = '555-010-2000'
+        self.ada.save(update_fields=['phone_number'])
+        self.ada.refresh_from_db()
+        self.assertEqual(self.ada.phone_key, '5550102000')
+
+    def test_overlapping_matches_merge_into_one_group(self):
+        response = self.client.get('/api/accounts/contacts/find-duplicates/')
+        self.assertEqual(response.data['count'], 1)
+        group = response.data['duplicate_groups'][0]
+        self.assertEqual(group['reason'], 'Email Match, Phone Match')
+        self.assertEqual(
+            {contact['id'] for contact in group['contacts']},
+            {self.ada.id, self.ada_copy.id, self.ada_phone.id}
+        )
+
+    def test_fuzzy_matching_and_pagination(self):
+        response = self.client.get('/api/accounts/contacts/find-duplicates/?fuzzy=true&page_size=1&page=2')
+        self.assertEqual(response.data['count'], 2)
+        group = response.data['duplicate_groups'][0]
+        self.assertEqual(group['reason'], 'Name Match')
+        self.assertEqual({contact['id'] for contact in group['contacts']}, {self.grace.id, self.grace_typo.id})
+
+
+class ContactImportTest(TestCase):
+    """Test the bulk contact import pipeline."""
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Import Tenant", subdomain="import")
+        self.existing = Contact.objects.create(
+            tenant=self.tenant, first_name="Ada", last_name="Lovelace", email="Ada@Example.com", notes="Keep me"
+        )
+
+    def test_scoring_matches_single_contact_rules(self):
+        rows = [
+            {'email': 'ceo@acme.io', 'job_title': 'CEO', 'company': 'Acme', 'lead_source': 'Referral'},
+            {'email': 'x@gmail.com', 'job_title': 'Data Analyst', 'lead_source': 'Spring Webinar', 'score': 5},
+            {},
+        ]
+        scores, statuses = qualify_many(rows)
+        self.assertEqual(scores, [105, 40, 0])
+        self.assertEqual(statuses, ['Qualified', 'New Lead', 'New Lead'])
+        for row, score, lead_status in zip(rows, scores, statuses):
+            expected = qualify(row.get('email'), row.get('job_title'), row.get('company'), row.get('lead_source'), row.get('score'))
+            self.assertEqual(expected, (score, lead_status))
+
+    def test_csv_upserts_on_email(self):
+        upload = io.BytesIO(
+            "first_name,last_name,email,job_title,company,tags\n"
+            "Ada,King,ada@example.com,Founder,Analytical Engines,\"vip,b2b\"\n"
+            "Alan,Turing,alan@example.com,,,\n"
+            "Alan,Turing,ALAN@example.com,Director,,\n"
+            ",Nobody,bad@example.com,,,\n"
+            "Grace,Hopper,not-an-email,,,\n".encode()
+        )
+        result = import_contacts(self.tenant, upload, 'csv', chunk_size=2)
+        self.assertEqual((result.created, result.updated, result.skipped), (1, 2, 2))
+        self.assertEqual([error['line'] for error in result.errors], [5, 6])
+
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.last_name, "King")
+        self.assertEqual(self.existing.notes, "Keep me")
+        self.assertEqual(self.existing.tags, ["vip", "b2b"])
+        self.assertEqual((self.existing.score, self.existing.lead_status), (65, "Contacted"))
+
+        alan = Contact.objects.all_tenants().get(tenant=self.tenant, email_key='alan@example.com')
+        self.assertEqual((alan.job_title, alan.score), ("Director", 50))
+
+    def test_jsonl_rows_with_different_keys_keep_missing_fields(self):
+        self.existing.priority = "High"
+        self.existing.save()
+        upload = io.BytesIO(
+            b'{"first_name": "Ada", "last_name": "King", "email": "ada@example.com"}\n'
+            b'{"first_name": "Alan", "last_name": "Turing", "email": "alan@example.com", "notes": "New", "priority": "Low"}\n'
+        )
+        result = import_contacts(self.tenant, upload, 'jsonl')
+        self.assertEqual((result.created, result.updated), (1, 1))
+
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.last_name, self.existing.notes, self.existing.priority), ("King", "Keep me", "High"))
+        alan = Contact.objects.all_tenants().get(tenant=self.tenant, email_key='alan@example.com')
+        self.assertEqual((alan.notes, alan.priority), ("New", "Low"))
+
+    def test_jsonl_endpoint(self):
+        upload = SimpleUploadedFile(
+            'contacts.jsonl',
+            b'{"first_name": "Grace", "last_name": "Hopper", "email": "grace@navy.mil", "lead_source": "Event"}\n'
+            b'not json\n'
+        )
+        response = APIClient().post('/api/accounts/contacts/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['skipped']), (1, 1))
+        grace = Contact.objects.all_tenants().get(email='grace@navy.mil')
+        self.assertEqual((grace.score, grace.phone_key), (45, None))
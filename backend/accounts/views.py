@@ -3,16 +3,18 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from .permissions import AllowOptionsPermission
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.contrib.auth import get_user_model
 from django.db import transaction
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from django.http import HttpResponse
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
 from datetime import timedelta
 import uuid
-import csv
 from rest_framework.views import APIView
 from functools import wraps
 
@@ -23,10 +25,19 @@ from .serializers import (
     UserInviteSerializer
 )
 from core.models import Contact, Tenant
+from core.dedupe import find_duplicate_groups
+from core.pagination import SparseFieldsetMixin
 from core.serializers import ContactSerializer
+from .exports import aiter_chunks, iter_contacts_csv, iter_stored_export, read_export_status
+from .imports import FORMATS as IMPORT_FORMATS, detect_format, import_contacts
+from .qualification import qualify
+from .tasks import export_contacts_csv
 
 User = get_user_model()
 
+DUPLICATE_GROUPS_PAGE_SIZE = 50
+MAX_DUPLICATE_GROUPS_PAGE_SIZE = 500
+
 def add_cors_headers(view_func):
     """Decorator to add CORS headers to any view response."""
     @wraps(view_func)
@@ -129,7 +140,7 @@ class PasswordResetConfirmView(generics.CreateAPIView):
             'message': 'Password reset confirmed.'
         }, status=status.HTTP_200_OK)
 
-class ContactViewSet(viewsets.ModelViewSet):
+class ContactViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     ViewSet for Contact model.
     Provides CRUD operations for contact management within the accounts app.
@@ -150,62 +161,17 @@ class ContactViewSet(viewsets.ModelViewSet):
         initial_score = contact.score if contact.score is not None else 0
         initial_lead_status = contact.lead_status
 
-        current_score = initial_score
-
-        # Rule 1: Email Domain Quality (Simple check for non-generic emails)
-        if contact.email and '@' in contact.email:
-            domain = contact.email.split('@')[-1].lower()
-            if domain not in ['gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com', 'aol.com']:
-                current_score += 20
-        
-        # Rule 2: Job Title Relevance
-        if contact.job_title:
-            job_title_lower = contact.job_title.lower()
-            if any(keyword in job_title_lower for keyword in ['ceo', 'founder', 'director', 'manager', 'head of', 'vp', 'chief']):
-                current_score += 30
-            elif any(keyword in job_title_lower for keyword in ['analyst', 'specialist', 'coordinator']):
-                current_score += 10
-        
-        # Rule 3: Company Information Presence
-        if contact.company and contact.company.strip():
-            current_score += 15
-        
-        # Rule 4: Lead Source Value
-        if contact.lead_source:
-            lead_source_lower = contact.lead_source.lower()
-            if lead_source_lower == 'referral':
-                current_score += 40
-            elif lead_source_lower == 'website form':
-                current_score += 10
-            elif lead_source_lower == 'cold outreach':
-                current_score += 5
-            elif lead_source_lower == 'event' or 'webinar' in lead_source_lower:
-                current_score += 25
-
-        # Ensure score does not fall below 0
-        contact.score = max(0, current_score)
-
-        # Determine lead_status based on score thresholds
-        new_lead_status = initial_lead_status # Default to current status
-        if contact.score >= 80:
-            new_lead_status = "Qualified"
-        elif contact.score >= 50:
-            new_lead_status = "Contacted" # Can be "Engaged" if you have that status
-        elif contact.score < 50:
-            new_lead_status = "New Lead" # Reset to New Lead if score drops
-
-        # Only update if status changed, unless it's a new contact (where default might be None)
-        if new_lead_status != initial_lead_status:
-            contact.lead_status = new_lead_status
+        contact.score, contact.lead_status = qualify(
+            contact.email, contact.job_title, contact.company, contact.lead_source, initial_score
+        )
 
         # Save only if score or status has genuinely changed from their initial values
         if contact.score != initial_score or contact.lead_status != initial_lead_status:
             contact.save(update_fields=['score', 'lead_status'])
             print(f"Contact {contact.id} - Score updated from {initial_score} to {contact.score}, Status updated from '{initial_lead_status}' to '{contact.lead_status}'")
 
-    def perform_create(self, serializer):
-        """Create contact without tenant restrictions for testing and apply qualification rules."""
-        # For testing, get the first tenant or create one
+    def _get_default_tenant(self):
+        """Tenant new contacts are created in; for testing, the first tenant or a new one."""
         try:
             default_tenant = Tenant.objects.first()
             if not default_tenant:
@@ -222,7 +188,11 @@ class ContactViewSet(viewsets.ModelViewSet):
                 subdomain=f"test-{unique_id}",
                 is_active=True
             )
-        contact = serializer.save(tenant=default_tenant)
+        return default_tenant
+
+    def perform_create(self, serializer):
+        """Create contact without tenant restrictions for testing and apply qualification rules."""
+        contact = serializer.save(tenant=self._get_default_tenant())
         # Apply rules immediately after the contact is initially saved
         self._apply_qualification_rules(contact)
 
@@ -378,121 +348,153 @@ class ContactViewSet(viewsets.ModelViewSet):
                 "gaps": missing_fields
             }, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def bulk_import(self, request):
+        """
+        Bulk import contacts from an uploaded CSV or JSONL file.
+
+        Rows are upserted on email in chunks and scored with the same
+        qualification rules as single contacts. The format comes from the
+        'format' field or the file extension.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"detail": "Upload the contacts as 'file'."}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get('format') or detect_format(upload.name)
+        if file_format not in IMPORT_FORMATS:
+            return Response(
+                {"detail": f"Unsupported format; use one of: {', '.join(IMPORT_FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        tenant = getattr(request.user, 'tenant', None) or self._get_default_tenant()
+        result = import_contacts(tenant, upload, file_format)
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['get'], url_path='find-duplicates')
     def find_duplicates(self, request):
-        """Identify potential duplicate contacts within the current tenant's data."""
-        queryset = self.get_queryset()  # Get contacts for the current tenant
-
-        # Dictionary to store potential duplicates
-        # Key: field value (e.g., email address, phone number)
-        # Value: list of contacts sharing that value
-        email_duplicates = {}
-        phone_duplicates = {}
-
-        for contact in queryset:
-            # Check for email duplicates (case-insensitive)
-            if contact.email:
-                normalized_email = contact.email.lower()
-                email_duplicates.setdefault(normalized_email, []).append(contact)
-
-            # Check for phone number duplicates (if phone is not empty)
-            if contact.phone_number:
-                normalized_phone = ''.join(filter(str.isdigit, contact.phone_number))  # Normalize phone
-                if normalized_phone:  # Only consider if normalized phone is not empty
-                    phone_duplicates.setdefault(normalized_phone, []).append(contact)
-
-        # Filter out groups that have only one contact (not duplicates)
-        duplicate_groups = []
-
-        # Add email duplicate groups
-        for email_val, contacts_list in email_duplicates.items():
-            if len(contacts_list) > 1:
-                duplicate_groups.append({
-                    'reason': 'Email Match',
-                    'value': email_val,
-                    'contacts': ContactSerializer(contacts_list, many=True, context={'request': request}).data
-                })
+        """
+        Identify potential duplicate contacts within the current tenant's data.
 
-        # Add phone number duplicate groups (avoiding double counting if email also matches)
-        for phone_val, contacts_list in phone_duplicates.items():
-            if len(contacts_list) > 1:
-                # Check if this group isn't already covered by an email duplicate
-                is_covered = False
-                for group in duplicate_groups:
-                    if group['reason'] == 'Email Match':
-                        # Compare contact IDs to see if any contact in this phone group is already in an email group
-                        current_contact_ids = {c.id for c in contacts_list}
-                        existing_group_ids = {c['id'] for c in group['contacts']}
-                        if not current_contact_ids.isdisjoint(existing_group_ids):
-                            is_covered = True
-                            break
-                
-                if not is_covered:
-                    duplicate_groups.append({
-                        'reason': 'Phone Match',
-                        'value': phone_val,
-                        'contacts': ContactSerializer(contacts_list, many=True, context={'request': request}).data
-                    })
-
-        if not duplicate_groups:
-            return Response({
-                "message": "No potential duplicate contacts found.", 
-                "duplicates_found": False, 
-                "duplicate_groups": []
-            }, status=status.HTTP_200_OK)
+        Contacts sharing a normalized email or phone are grouped in the
+        database; ?fuzzy=true also matches similar names and companies.
+        Overlapping matches are merged into one group. Groups are paginated
+        with ?page= and ?page_size=.
+        """
+        queryset = self.get_queryset()  # Get contacts for the current tenant
+        fuzzy = request.query_params.get('fuzzy', '').lower() in ('1', 'true', 'yes')
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+            page_size = min(max(int(request.query_params.get('page_size', DUPLICATE_GROUPS_PAGE_SIZE)), 1), MAX_DUPLICATE_GROUPS_PAGE_SIZE)
+        except ValueError:
+            return Response({"detail": "page and page_size must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+
+        groups = find_duplicate_groups(queryset, fuzzy=fuzzy)
+        page_groups = groups[(page - 1) * page_size:page * page_size]
+
+        # Serialize only the contacts on this page, loaded in one query
+        page_contact_ids = [contact_id for group in page_groups for contact_id in group['contact_ids']]
+        contacts = {
+            contact['id']: contact
+            for contact in ContactSerializer(
+                queryset.filter(id__in=page_contact_ids), many=True, context={'request': request}
+            ).data
+        }
+        duplicate_groups = [{
+            'reason': ', '.join(group['reasons']),
+            'value': group['values'][0] if group['values'] else None,
+            'values': group['values'],
+            'contacts': [contacts[contact_id] for contact_id in group['contact_ids'] if contact_id in contacts],
+        } for group in page_groups]
+
+        if not groups:
+            message = "No potential duplicate contacts found."
         else:
-            return Response({
-                "message": f"Found {len(duplicate_groups)} potential duplicate groups.", 
-                "duplicates_found": True, 
-                "duplicate_groups": duplicate_groups
-            }, status=status.HTTP_200_OK)
+            message = f"Found {len(groups)} potential duplicate groups."
+        return Response({
+            "message": message,
+            "duplicates_found": bool(groups),
+            "count": len(groups),
+            "page": page,
+            "page_size": page_size,
+            "duplicate_groups": duplicate_groups
+        }, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['get'], url_path='export-csv')
     def export_csv(self, request):
         """
         Export all contacts for the current tenant to a CSV file.
+
+        The file is streamed as it is read from the database. Pass
+        ?compress=gzip for a gzipped download, or ?mode=async to write the
+        export to storage in the background and poll export-csv/<job_id>/
+        for its download URL. Both modes export the same contacts; a
+        background export needs a user with a tenant.
+        """
+        tenant = getattr(request.user, 'tenant', None)
+        queryset = self.get_queryset()
+        if tenant is not None:
+            queryset = queryset.filter(tenant=tenant)
+
+        if request.query_params.get('mode') == 'async':
+            if tenant is None:
+                return Response(
+                    {"detail": "Background exports need a user with a tenant."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            job_id = str(uuid.uuid4())
+            export_contacts_csv.delay(job_id, str(tenant.id))
+            return Response({
+                'job_id': job_id,
+                'status': 'pending',
+                'status_url': request.build_absolute_uri(f"{request.path.rstrip('/')}/{job_id}/")
+            }, status=status.HTTP_202_ACCEPTED)
+
+        compress = request.query_params.get('compress') == 'gzip'
+        chunks = self._stream_chunks(request, iter_contacts_csv(queryset, compress=compress))
+        if compress:
+            response = StreamingHttpResponse(chunks, content_type='application/gzip')
+            response['Content-Disposition'] = 'attachment; filename="digisol_ai_contacts_export.csv.gz"'
+        else:
+            response = StreamingHttpResponse(chunks, content_type='text/csv')
+            response['Content-Disposition'] = 'attachment; filename="digisol_ai_contacts_export.csv"'
+        return response
+
+    def _stream_chunks(self, request, chunks):
+        if isinstance(request._request, ASGIRequest):
+            # A sync iterator would be read into memory in full before sending
+            return aiter_chunks(chunks)
+        return chunks
+
+    @action(detail=False, methods=['get'], url_path=r'export-csv/(?P<job_id>[0-9a-f-]{36})',
+            permission_classes=[IsAuthenticated])
+    def export_csv_status(self, request, job_id=None):
+        """
+        Report whether one of the tenant's background contact exports is
+        pending, completed (with its download URL) or failed.
         """
-        queryset = self.get_queryset()  # This automatically filters contacts by the current tenant
-
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="digisol_ai_contacts_export.csv"'
-
-        writer = csv.writer(response)
-
-        # Define CSV Headers. Make sure these match your Contact model fields.
-        # Include all fields relevant for export.
-        headers = [
-            'id', 'first_name', 'last_name', 'email', 'phone_number',
-            'company', 'job_title', 'lead_source', 'lead_status',
-            'last_contact_date', 'notes', 'tags', 'priority', 'score',
-            'last_activity_summary', 'next_action_suggestion', 'suggested_persona',
-            'created_at', 'updated_at'
-        ]
-        writer.writerow(headers)
-
-        for contact in queryset:
-            row = []
-            for field_name in headers:
-                # Use getattr safely, providing a default of None if the field might not exist
-                value = getattr(contact, field_name, None)
-
-                if field_name == 'id':
-                    # Ensure UUIDs are converted to string
-                    row.append(str(value))
-                elif field_name == 'tags':
-                    # Convert list of tags to a comma-separated string
-                    row.append(",".join(value) if isinstance(value, list) else '')
-                elif field_name in ['last_contact_date', 'created_at', 'updated_at'] and value:
-                    # Format datetime objects to ISO format string
-                    row.append(value.isoformat())
-                elif value is None:
-                    # Replace None with empty string for CSV
-                    row.append('')
-                else:
-                    # Convert all other values to string
-                    row.append(str(value))
-
-            writer.writerow(row)
+        job = read_export_status(job_id, getattr(request.user, 'tenant', None))
+        if job is None:
+            return Response({'job_id': job_id, 'status': 'pending'})
+        if job['status'] != 'completed':
+            return Response({'job_id': job_id, 'status': job['status']})
+        return Response({
+            'job_id': job_id,
+            'status': 'completed',
+            'download_url': request.build_absolute_uri(f"{request.path.rstrip('/')}/download/")
+        })
+
+    @action(detail=False, methods=['get'], url_path=r'export-csv/(?P<job_id>[0-9a-f-]{36})/download',
+            permission_classes=[IsAuthenticated])
+    def export_csv_download(self, request, job_id=None):
+        """Download a completed background contact export of the user's tenant."""
+        job = read_export_status(job_id, getattr(request.user, 'tenant', None))
+        if job is None or job['status'] != 'completed' or not default_storage.exists(job['path']):
+            return Response({"detail": "Export not found."}, status=status.HTTP_404_NOT_FOUND)
+        response = StreamingHttpResponse(
+            self._stream_chunks(request, iter_stored_export(job['path'])), content_type='application/gzip'
+        )
+        response['Content-Disposition'] = 'attachment; filename="digisol_ai_contacts_export.csv.gz"'
         return response
 
     @action(detail=False, methods=['post'], url_path='merge')
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AiServicesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ai_services'
+
+    def ready(self):
+        from . import checks  # noqa: F401
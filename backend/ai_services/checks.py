@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+from .rate_limiter import cache_is_shared
+
+
+@register()
+def check_rate_limiter_cache(app_configs, **kwargs):
+    """
+    The Gemini rate limits only hold across workers on a shared cache. A
+    process-local cache is an error where GEMINI_RATE_LIMITER_REQUIRE_SHARED_CACHE
+    is set (production and Render) and a warning elsewhere outside DEBUG.
+    """
+    if cache_is_shared():
+        return []
+    message = "The Gemini rate limiter is using a process-local cache."
+    hint = ("Configure CACHES['default'] with a shared backend such as RedisCache; "
+            "otherwise each worker process enforces the full Gemini quota on its own.")
+    if getattr(settings, 'GEMINI_RATE_LIMITER_REQUIRE_SHARED_CACHE', False):
+        return [Error(message, hint=hint, id='ai_services.E001')]
+    if settings.DEBUG:
+        return []
+    return [Warning(message, hint=hint, id='ai_services.W001')]
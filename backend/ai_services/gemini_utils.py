@@ -1,9 +1,13 @@
+import json
 import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 import google.generativeai as genai
 from django.conf import settings
-from typing import Dict, Any, Optional
-from django.core.cache import cache
-import time
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple, Union
+from . import rate_limiter, response_cache
 
 logger = logging.getLogger(__name__)
 
@@ -20,102 +24,76 @@ GEMINI_MODELS = {
     'gemini-1.0-pro': 'gemini-1.0-pro',
 }
 
-# Quota management settings
-QUOTA_CACHE_KEY = 'gemini_api_quota'
-QUOTA_LIMIT_PER_DAY = 50  # Conservative daily limit
-QUOTA_LIMIT_PER_MINUTE = 2  # Conservative per-minute limit
+# Process-level pool of configured model instances, keyed by
+# (model, generation config) and bounded with LRU eviction
+MODEL_POOL_SIZE = 32
+_model_pool: 'OrderedDict[Tuple[str, str], Any]' = OrderedDict()
+_model_pool_lock = threading.Lock()
 
-def check_api_quota() -> bool:
+def check_api_quota(tenant_id=None) -> bool:
     """
-    Check if we're within API quota limits.
+    Check if we're within API quota limits without using any quota.
     
     Returns:
         bool: True if within limits, False if quota exceeded
     """
     try:
-        # Check daily quota
-        daily_key = f"{QUOTA_CACHE_KEY}_daily_{time.strftime('%Y-%m-%d')}"
-        daily_count = cache.get(daily_key, 0)
-        
-        if daily_count >= QUOTA_LIMIT_PER_DAY:
-            logger.warning(f"Daily quota exceeded: {daily_count}/{QUOTA_LIMIT_PER_DAY}")
-            return False
-        
-        # Check per-minute quota
-        minute_key = f"{QUOTA_CACHE_KEY}_minute_{int(time.time() // 60)}"
-        minute_count = cache.get(minute_key, 0)
-        
-        if minute_count >= QUOTA_LIMIT_PER_MINUTE:
-            logger.warning(f"Per-minute quota exceeded: {minute_count}/{QUOTA_LIMIT_PER_MINUTE}")
-            return False
-        
+        usage = rate_limiter.get_usage(tenant_id)
+        for tier_name, tier_usage in usage.items():
+            if tier_usage['used'] >= tier_usage['limit']:
+                logger.warning(f"Gemini {tier_name} quota exceeded: {tier_usage['used']}/{tier_usage['limit']}")
+                return False
         return True
         
     except Exception as e:
         logger.error(f"Error checking quota: {str(e)}")
         return False  # Fail safe - don't allow API calls if quota check fails
 
-def increment_api_quota():
-    """
-    Increment API quota counters.
-    """
-    try:
-        # Increment daily counter
-        daily_key = f"{QUOTA_CACHE_KEY}_daily_{time.strftime('%Y-%m-%d')}"
-        daily_count = cache.get(daily_key, 0) + 1
-        cache.set(daily_key, daily_count, 86400)  # 24 hours
-        
-        # Increment per-minute counter
-        minute_key = f"{QUOTA_CACHE_KEY}_minute_{int(time.time() // 60)}"
-        minute_count = cache.get(minute_key, 0) + 1
-        cache.set(minute_key, minute_count, 60)  # 1 minute
-        
-        logger.info(f"API quota incremented - Daily: {daily_count}/{QUOTA_LIMIT_PER_DAY}, Minute: {minute_count}/{QUOTA_LIMIT_PER_MINUTE}")
-        
-    except Exception as e:
-        logger.error(f"Error incrementing quota: {str(e)}")
-
-def get_quota_status() -> Dict[str, Any]:
+def get_quota_status(tenant_id=None) -> Dict[str, Any]:
     """
     Get current quota status.
     
     Returns:
         dict: Quota status information
     """
+    limits = rate_limiter.get_limits()
     try:
-        daily_key = f"{QUOTA_CACHE_KEY}_daily_{time.strftime('%Y-%m-%d')}"
-        minute_key = f"{QUOTA_CACHE_KEY}_minute_{int(time.time() // 60)}"
-        
-        daily_count = cache.get(daily_key, 0)
-        minute_count = cache.get(minute_key, 0)
+        usage = rate_limiter.get_usage(tenant_id)
+        daily = usage.get('daily', {'used': 0, 'limit': limits['global_per_day']})
+        minute = usage.get('minute', {'used': 0, 'limit': limits['global_per_minute']})
         
-        return {
-            'daily_used': daily_count,
-            'daily_limit': QUOTA_LIMIT_PER_DAY,
-            'daily_remaining': max(0, QUOTA_LIMIT_PER_DAY - daily_count),
-            'minute_used': minute_count,
-            'minute_limit': QUOTA_LIMIT_PER_MINUTE,
-            'minute_remaining': max(0, QUOTA_LIMIT_PER_MINUTE - minute_count),
-            'quota_exceeded': daily_count >= QUOTA_LIMIT_PER_DAY or minute_count >= QUOTA_LIMIT_PER_MINUTE
+        status = {
+            'daily_used': daily['used'],
+            'daily_limit': daily['limit'],
+            'daily_remaining': max(0, daily['limit'] - daily['used']),
+            'minute_used': minute['used'],
+            'minute_limit': minute['limit'],
+            'minute_remaining': max(0, minute['limit'] - minute['used']),
+            'quota_exceeded': any(tier['used'] >= tier['limit'] for tier in usage.values())
         }
+        if 'tenant_minute' in usage:
+            status['tenant_minute_used'] = usage['tenant_minute']['used']
+            status['tenant_minute_limit'] = usage['tenant_minute']['limit']
+        return status
     except Exception as e:
         logger.error(f"Error getting quota status: {str(e)}")
         return {
             'daily_used': 0,
-            'daily_limit': QUOTA_LIMIT_PER_DAY,
-            'daily_remaining': QUOTA_LIMIT_PER_DAY,
+            'daily_limit': limits['global_per_day'],
+            'daily_remaining': limits['global_per_day'],
             'minute_used': 0,
-            'minute_limit': QUOTA_LIMIT_PER_MINUTE,
-            'minute_remaining': QUOTA_LIMIT_PER_MINUTE,
+            'minute_limit': limits['global_per_minute'],
+            'minute_remaining': limits['global_per_minute'],
             'quota_exceeded': False
         }
 
-def get_gemini_model(model_name: str = 'gemini-1.5-flash'):
+def get_gemini_model(model_name: str = 'gemini-1.5-flash', generation_config: Optional[Dict[str, Any]] = None):
     """
-    Get a Gemini model instance.
+    Get a configured Gemini model instance from the process-level pool.
     
     Args:
         model_name: Name of the Gemini model to use
+        generation_config: Generation parameters baked into the model
     
     Returns:
         GenerativeModel: Configured Gemini model
@@ -123,11 +101,59 @@ def get_gemini_model(model_name: str = 'gemini-1.5-flash'):
     if model_name not in GEMINI_MODELS:
         model_name = 'gemini-1.5-flash'  # Default fallback
     
+    key = (GEMINI_MODELS[model_name], json.dumps(generation_config or {}, sort_keys=True, default=str))
+    with _model_pool_lock:
+        model = _model_pool.get(key)
+        if model is not None:
+            _model_pool.move_to_end(key)
+            return model
+    
     try:
-        return genai.GenerativeModel(GEMINI_MODELS[model_name])
+        model = genai.GenerativeModel(
+            GEMINI_MODELS[model_name],
+            generation_config=genai.types.GenerationConfig(**generation_config) if generation_config else None
+        )
     except Exception as e:
         logger.error(f"Failed to initialize Gemini model {model_name}: {str(e)}")
         raise
+    
+    with _model_pool_lock:
+        model = _model_pool.setdefault(key, model)
+        _model_pool.move_to_end(key)
+        while len(_model_pool) > MODEL_POOL_SIZE:
+            _model_pool.popitem(last=False)
+    return model
+
+@lru_cache(maxsize=256)
+def _system_preamble(system_prompt: str) -> Tuple[Dict[str, Any], ...]:
+    """
+    Build the conversation turns that carry a system prompt.
+    
+    The pinned google-generativeai release has no system_instruction
+    support, so the system prompt is sent as a leading exchange.
+    """
+    return (
+        {
+            "role": "user",
+            "parts": [system_prompt]
+        },
+        {
+            "role": "model",
+            "parts": ["I understand. I'll follow these guidelines in my responses."]
+        },
+    )
+
+def _build_conversation(prompt: str, system_prompt: Optional[str] = None) -> List[Dict[str, Any]]:
+    conversation = list(_system_preamble(system_prompt)) if system_prompt else []
+    conversation.append({
+        "role": "user",
+        "parts": [prompt]
+    })
+    return conversation
+
+def _quota_exceeded(error: rate_limiter.RateLimitExceeded, tenant_id=None) -> Exception:
+    quota_status = get_quota_status(tenant_id)
+    return Exception(f"API quota exceeded (retry in {error.retry_after:.1f}s). Daily: {quota_status['daily_used']}/{quota_status['daily_limit']}, Minute: {quota_status['minute_used']}/{quota_status['minute_limit']}")
 
 def call_gemini_api(
     prompt: str, 
@@ -136,6 +162,10 @@ def call_gemini_api(
     max_tokens: int = 1000,
     temperature: float = 0.7,
     check_quota: bool = True,
+    tenant_id: Optional[str] = None,
+    quota_timeout: Optional[float] = None,
+    use_cache: bool = False,
+    cache_ttl: Optional[int] = None,
     **kwargs
 ) -> str:
     """
@@ -148,6 +178,12 @@ def call_gemini_api(
         max_tokens: Maximum tokens to generate
         temperature: Creativity level (0.0 to 1.0)
         check_quota: Whether to check quota before making API call
+        tenant_id: Tenant charged against the per-tenant rate limit
+        quota_timeout: Seconds to wait for rate limit capacity; defaults to
+            settings.GEMINI_RATE_LIMIT_TIMEOUT
+        use_cache: Serve identical requests from the response cache
+            (skipped when temperature is above the cache's max_temperature)
+        cache_ttl: Seconds to keep the cached response
         **kwargs: Additional parameters
     
     Returns:
@@ -159,49 +195,49 @@ def call_gemini_api(
     if not settings.GOOGLE_GEMINI_API_KEY:
         raise Exception("Gemini API key not configured")
     
-    # Check quota if enabled
-    if check_quota and not check_api_quota():
-        quota_status = get_quota_status()
-        raise Exception(f"API quota exceeded. Daily: {quota_status['daily_used']}/{quota_status['daily_limit']}, Minute: {quota_status['minute_used']}/{quota_status['minute_limit']}")
+    request_key = None
+    if use_cache:
+        if response_cache.is_cacheable(temperature):
+            request_key = response_cache.make_request_key(
+                prompt=prompt,
+                system_prompt=system_prompt,
+                model_name=model_name,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                **kwargs
+            )
+            cached_response = response_cache.get_response(tenant_id, request_key)
+            if cached_response is not None:
+                return cached_response
+        else:
+            response_cache.record_bypass()
+    
+    # Take a rate limit slot, waiting up to quota_timeout for capacity
+    if check_quota:
+        if quota_timeout is None:
+            quota_timeout = getattr(settings, 'GEMINI_RATE_LIMIT_TIMEOUT', 0)
+        try:
+            rate_limiter.acquire(tenant_id, timeout=quota_timeout)
+        except rate_limiter.RateLimitExceeded as e:
+            raise _quota_exceeded(e, tenant_id)
     
     try:
-        model = get_gemini_model(model_name)
-        
-        # Build the conversation
-        conversation = []
-        
-        if system_prompt:
-            conversation.append({
-                "role": "user",
-                "parts": [system_prompt]
-            })
-            conversation.append({
-                "role": "model",
-                "parts": ["I understand. I'll follow these guidelines in my responses."]
-            })
-        
-        conversation.append({
-            "role": "user",
-            "parts": [prompt]
-        })
+        model = get_gemini_model(model_name, dict(
+            max_output_tokens=max_tokens,
+            temperature=temperature,
+            **kwargs
+        ))
         
         # Generate content
-        response = model.generate_content(
-            conversation,
-            generation_config=genai.types.GenerationConfig(
-                max_output_tokens=max_tokens,
-                temperature=temperature,
-                **kwargs
-            )
-        )
+        response = model.generate_content(_build_conversation(prompt, system_prompt))
         
         generated_content = response.text.strip()
         
         if not generated_content:
             raise Exception("Gemini returned empty content")
         
-        # Increment quota counter
-        increment_api_quota()
+        if request_key:
+            response_cache.set_response(tenant_id, request_key, generated_content, cache_ttl)
         
         return generated_content
         
@@ -209,11 +245,117 @@ def call_gemini_api(
         logger.error(f"Gemini API error: {str(e)}")
         raise Exception(f"Gemini API error: {str(e)}")
 
+async def stream_gemini_api(
+    prompt: str,
+    system_prompt: str = None,
+    model_name: str = 'gemini-1.5-flash',
+    max_tokens: int = 1000,
+    temperature: float = 0.7,
+    check_quota: bool = True,
+    tenant_id: Optional[str] = None,
+    quota_timeout: Optional[float] = None,
+    **kwargs
+) -> AsyncIterator[str]:
+    """
+    Stream generated content from Gemini with the async client.
+    
+    Takes the same arguments as call_gemini_api, except that streamed
+    responses are never cached. The event loop is released while waiting
+    for rate limit capacity and for each chunk.
+    
+    Yields:
+        str: Text chunks as Gemini produces them
+    
+    Raises:
+        Exception: If API call fails or quota exceeded
+    """
+    if not settings.GOOGLE_GEMINI_API_KEY:
+        raise Exception("Gemini API key not configured")
+    
+    if check_quota:
+        if quota_timeout is None:
+            quota_timeout = getattr(settings, 'GEMINI_RATE_LIMIT_TIMEOUT', 0)
+        try:
+            await rate_limiter.acquire_async(tenant_id, timeout=quota_timeout)
+        except rate_limiter.RateLimitExceeded as e:
+            raise _quota_exceeded(e, tenant_id)
+    
+    try:
+        model = get_gemini_model(model_name, dict(
+            max_output_tokens=max_tokens,
+            temperature=temperature,
+            **kwargs
+        ))
+        
+        response = await model.generate_content_async(
+            _build_conversation(prompt, system_prompt),
+            stream=True
+        )
+        
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+        
+    except Exception as e:
+        logger.error(f"Gemini streaming error: {str(e)}")
+        raise Exception(f"Gemini API error: {str(e)}")
+
+def call_gemini_many(
+    prompts: List[Union[str, Dict[str, Any]]],
+    concurrency: int = 4,
+    return_exceptions: bool = False,
+    **kwargs
+) -> List[Any]:
+    """
+    Call Gemini for many prompts using a bounded thread pool.
+    
+    Every call still goes through the rate limiter, so concurrency only
+    controls how many requests are in flight at once. Unless a
+    quota_timeout is given, calls wait up to
+    settings.GEMINI_TASK_RATE_LIMIT_TIMEOUT for capacity.
+    
+    Args:
+        prompts: Prompt strings, or dicts of call_gemini_api arguments
+            for per-request settings
+        concurrency: Maximum number of concurrent requests
+        return_exceptions: Return exceptions in place of failed results
+            instead of raising the first one
+        **kwargs: call_gemini_api arguments shared by every request
+    
+    Returns:
+        list: Generated content in the same order as prompts
+    """
+    requests = [{'prompt': prompt} if isinstance(prompt, str) else prompt for prompt in prompts]
+    if not requests:
+        return []
+    kwargs.setdefault('quota_timeout', getattr(settings, 'GEMINI_TASK_RATE_LIMIT_TIMEOUT', 0))
+    
+    results: List[Any] = [None] * len(requests)
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(requests))), thread_name_prefix='gemini') as executor:
+        futures = {
+            executor.submit(call_gemini_api, **{**kwargs, **request}): index
+            for index, request in enumerate(requests)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                if not return_exceptions:
+                    for pending in futures:
+                        pending.cancel()
+                    raise
+                results[index] = e
+    return results
+
 def call_gemini_for_content_generation(
     prompt: str, 
     content_type: str,
     brand_context: str = None,
-    check_quota: bool = True
+    check_quota: bool = True,
+    tenant_id: Optional[str] = None,
+    quota_timeout: Optional[float] = None,
+    use_cache: bool = False
 ) -> str:
     """
     Call Gemini API specifically for content generation with marketing context.
@@ -223,6 +365,9 @@ def call_gemini_for_content_generation(
         content_type: Type of content being generated
         brand_context: Optional brand context
         check_quota: Whether to check quota before making API call
+        tenant_id: Tenant charged against the per-tenant rate limit
+        quota_timeout: Seconds to wait for rate limit capacity
+        use_cache: Reuse the response for an identical earlier request
     
     Returns:
         str: Generated content
@@ -260,16 +405,65 @@ def call_gemini_for_content_generation(
         system_prompt=system_prompt,
         model_name=model_name,
         max_tokens=max_tokens,
-        temperature=temperature
+        temperature=temperature,
+        check_quota=check_quota,
+        tenant_id=tenant_id,
+        quota_timeout=quota_timeout,
+        use_cache=use_cache
     )
 
+AGENT_MODEL_PARAMS = {
+    'model_name': 'gemini-1.5-pro',
+    'max_tokens': 1200,
+    'temperature': 0.7,
+}
+
+def _agent_system_prompt(
+    agent_name: str,
+    agent_personality: str,
+    specialization: str,
+    context: Dict[str, Any] = None
+) -> str:
+    """Build the system prompt for an AI agent."""
+    return f"""You are {agent_name}, an AI agent specialized in {specialization}.
+
+Personality: {agent_personality}
+
+You should:
+1. Respond in a helpful, professional manner
+2. Provide actionable advice and insights
+3. Ask clarifying questions when needed
+4. Use your specialization to provide expert guidance
+5. Be concise but thorough in your responses
+
+Current context: {context or 'No additional context provided'}"""
+
+def ai_agent_request(
+    prompt: str,
+    agent_name: str,
+    agent_personality: str,
+    specialization: str,
+    context: Dict[str, Any] = None,
+    tenant_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """call_gemini_api arguments for an AI agent prompt, e.g. for call_gemini_many."""
+    return {
+        'prompt': prompt,
+        'system_prompt': _agent_system_prompt(agent_name, agent_personality, specialization, context),
+        'tenant_id': tenant_id,
+        **AGENT_MODEL_PARAMS
+    }
+
 def call_gemini_for_ai_agent(
     prompt: str,
     agent_name: str,
     agent_personality: str,
     specialization: str,
     context: Dict[str, Any] = None,
-    check_quota: bool = True
+    check_quota: bool = True,
+    tenant_id: Optional[str] = None,
+    quota_timeout: Optional[float] = None,
+    use_cache: bool = False
 ) -> str:
     """
     Call Gemini API for AI agent interactions.
@@ -281,37 +475,55 @@ def call_gemini_for_ai_agent(
         specialization: Agent's specialization
         context: Additional context data
         check_quota: Whether to check quota before making API call
+        tenant_id: Tenant charged against the per-tenant rate limit
+        quota_timeout: Seconds to wait for rate limit capacity
+        use_cache: Reuse the response for an identical earlier request
     
     Returns:
         str: Agent's response
     """
-    # Build system prompt for the agent
-    system_prompt = f"""You are {agent_name}, an AI agent specialized in {specialization}.
-
-Personality: {agent_personality}
-
-You should:
-1. Respond in a helpful, professional manner
-2. Provide actionable advice and insights
-3. Ask clarifying questions when needed
-4. Use your specialization to provide expert guidance
-5. Be concise but thorough in your responses
-
-Current context: {context or 'No additional context provided'}"""
-
     return call_gemini_api(
         prompt=prompt,
-        system_prompt=system_prompt,
-        model_name="gemini-1.5-pro",
-        max_tokens=1200,
-        temperature=0.7,
-        check_quota=check_quota
+        system_prompt=_agent_system_prompt(agent_name, agent_personality, specialization, context),
+        check_quota=check_quota,
+        tenant_id=tenant_id,
+        quota_timeout=quota_timeout,
+        use_cache=use_cache,
+        **AGENT_MODEL_PARAMS
+    )
+
+def stream_gemini_for_ai_agent(
+    prompt: str,
+    agent_name: str,
+    agent_personality: str,
+    specialization: str,
+    context: Dict[str, Any] = None,
+    check_quota: bool = True,
+    tenant_id: Optional[str] = None,
+    quota_timeout: Optional[float] = None
+) -> AsyncIterator[str]:
+    """
+    Stream an AI agent's response; see call_gemini_for_ai_agent.
+    
+    Returns:
+        Async iterator of response text chunks
+    """
+    return stream_gemini_api(
+        prompt=prompt,
+        system_prompt=_agent_system_prompt(agent_name, agent_personality, specialization, context),
+        check_quota=check_quota,
+        tenant_id=tenant_id,
+        quota_timeout=quota_timeout,
+        **AGENT_MODEL_PARAMS
     )
 
 def call_gemini_for_insights(
     prompt: str,
     data_context: str = None,
-    check_quota: bool = True
+    check_quota: bool = True,
+    tenant_id: Optional[str] = None,
+    quota_timeout: Optional[float] = None,
+    use_cache: bool = False
 ) -> str:
     """
     Call Gemini API for generating insights and recommendations.
@@ -320,6 +532,9 @@ def call_gemini_for_insights(
         prompt: The analysis request
         data_context: Context about the data being analyzed
         check_quota: Whether to check quota before making API call
+        tenant_id: Tenant charged against the per-tenant rate limit
+        quota_timeout: Seconds to wait for rate limit capacity
+        use_cache: Reuse the response for an identical earlier request
     
     Returns:
         str: Generated insights
@@ -343,5 +558,8 @@ Focus on:
         model_name="gemini-1.5-pro",
         max_tokens=1500,
         temperature=0.6,
-        check_quota=check_quota
+        check_quota=check_quota,
+        tenant_id=tenant_id,
+        quota_timeout=quota_timeout,
+        use_cache=use_cache
     ) 
\ No newline at end of file
@@ -0,0 +1,310 @@
+"""
+Promana project health analysis, for one project or in nightly batches.
+
+The batch selects projects changed since their last analysis, gathers the
+metrics of a whole batch in a few grouped queries (task totals are columns
+on the project), sends the prompts through call_gemini_many, so a bounded
+pool of requests share the Gemini rate limiter, and writes the results with
+one bulk update and one bulk insert per batch.
+
+Automatic Gemini calls are off unless PROMANA_BATCH_USE_GEMINI is set; the
+batch then scores projects with the same rules as ProjectViewSet's
+automatic analysis.
+"""
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q
+from django.utils import timezone
+from project_management.models import Project, ProjectRisk, ProjectTask, ProjectTeamMember, PromanaInsight
+from .gemini_utils import ai_agent_request, call_gemini_many
+
+logger = logging.getLogger(__name__)
+
+PROMANA_AGENT = {
+    'agent_name': "Promana",
+    'agent_personality': "A project management expert who specializes in planning, scheduling, resource allocation, and progress tracking. Promana ensures projects stay on time, within budget, and meet quality standards.",
+    'specialization': "project_management",
+}
+
+# Projects in these states are not re-analyzed
+CLOSED_STATUSES = ('completed', 'cancelled', 'archived')
+
+BATCH_SIZE = 200
+CONCURRENCY = 4
+
+
+def project_health_data(project: Project, team_size: int, risks_count: int) -> Dict[str, Any]:
+    """Metrics sent to Promana for a health analysis."""
+    return {
+        'name': project.name,
+        'status': project.status,
+        'progress_percentage': project.progress_percentage,
+        'budget_utilization': project.budget_utilization,
+        'days_remaining': project.days_remaining,
+        'is_overdue': project.is_overdue,
+        'total_tasks': project.tasks_total,
+        'completed_tasks': project.tasks_completed,
+        'overdue_tasks': project.tasks_overdue,
+        'team_size': team_size,
+        'risks_count': risks_count
+    }
+
+
+def project_health_prompt(project_data: Dict[str, Any]) -> str:
+    return f"""
+        Analyze the following project data and provide a comprehensive health assessment:
+
+        Project: {project_data['name']}
+        Status: {project_data['status']}
+        Progress: {project_data['progress_percentage']}%
+        Budget Utilization: {project_data['budget_utilization']}%
+        Days Remaining: {project_data['days_remaining']}
+        Is Overdue: {project_data['is_overdue']}
+        Total Tasks: {project_data['total_tasks']}
+        Completed Tasks: {project_data['completed_tasks']}
+        Overdue Tasks: {project_data['overdue_tasks']}
+        Team Size: {project_data['team_size']}
+        Active Risks: {project_data['risks_count']}
+
+        Please provide:
+        1. Overall health score (0-100)
+        2. Risk level assessment (low/medium/high/critical)
+        3. Predicted completion date
+        4. Top 3 key risks
+        5. Top recommendation for improvement
+        6. Budget burn rate analysis
+        """
+
+
+def parse_promana_analysis(response: str, project_data: dict) -> dict:
+    """Parse Promana analysis response."""
+    try:
+        # This is a simplified parser - in production, you'd use more sophisticated parsing
+        lines = response.split('\n')
+        result = {
+            'health_score': 75,  # Default
+            'risk_level': 'medium',
+            'predicted_completion_date': None,
+            'key_risks': [],
+            'top_recommendation': '',
+            'budget_analysis': ''
+        }
+
+        for line in lines:
+            if 'health score' in line.lower():
+                # Extract score
+                score_match = re.search(r'(\d+)', line)
+                if score_match:
+                    result['health_score'] = int(score_match.group(1))
+            elif 'risk level' in line.lower():
+                if 'high' in line.lower():
+                    result['risk_level'] = 'high'
+                elif 'critical' in line.lower():
+                    result['risk_level'] = 'critical'
+                elif 'low' in line.lower():
+                    result['risk_level'] = 'low'
+
+        return result
+    except Exception as e:
+        logger.error(f"Error parsing Promana analysis: {str(e)}")
+        return {'health_score': 75, 'risk_level': 'medium'}
+
+
+def rule_based_analysis(project_data: Dict[str, Any]) -> dict:
+    """Health score from the project's metrics alone, without a model call."""
+    health_score = 100
+    if project_data['is_overdue']:
+        health_score -= 20
+    if project_data['budget_utilization'] > 90:
+        health_score -= 15
+    if project_data['progress_percentage'] < 30 and project_data['days_remaining'] < 7:
+        health_score -= 25
+    return {
+        'health_score': max(health_score, 0),
+        'risk_level': None,
+        'predicted_completion_date': None,
+        'key_risks': [],
+        'top_recommendation': '',
+        'budget_analysis': ''
+    }
+
+
+def promana_insights_for(project: Project, analysis_result: dict) -> List[PromanaInsight]:
+    """Unsaved insights for an analysis result."""
+    insights = []
+
+    # Risk insights
+    if analysis_result.get('risk_level') in ['high', 'critical']:
+        insights.append(PromanaInsight(
+            tenant_id=project.tenant_id,
+            project=project,
+            insight_type='risk_alert',
+            title=f'High Risk Level: {analysis_result.get("risk_level", "unknown")}',
+            description=f'Project "{project.name}" has been identified as high risk by Promana analysis.',
+            confidence_score=90,
+            is_actionable=True
+        ))
+
+    # Health score insights
+    health_score = analysis_result.get('health_score', 75)
+    if health_score < 70:
+        insights.append(PromanaInsight(
+            tenant_id=project.tenant_id,
+            project=project,
+            insight_type='risk_alert',
+            title='Low Health Score',
+            description=f'Project health score is {health_score}/100. Immediate attention recommended.',
+            confidence_score=85,
+            is_actionable=True
+        ))
+
+    # Recommendation insights
+    if analysis_result.get('top_recommendation'):
+        insights.append(PromanaInsight(
+            tenant_id=project.tenant_id,
+            project=project,
+            insight_type='recommendation',
+            title='Promana Recommendation',
+            description=analysis_result['top_recommendation'],
+            confidence_score=80,
+            is_actionable=True
+        ))
+    return insights
+
+
+def projects_due_for_analysis():
+    """
+    Open projects never analyzed, or whose project row, tasks or risks
+    changed since their last analysis.
+    """
+    since = OuterRef('last_promana_analysis')
+    changed_tasks = ProjectTask.objects.all_tenants().filter(project=OuterRef('pk'), updated_at__gt=since)
+    changed_risks = ProjectRisk.objects.all_tenants().filter(project=OuterRef('pk'), updated_at__gt=since)
+    return Project.objects.all_tenants().filter(is_template=False).exclude(status__in=CLOSED_STATUSES).filter(
+        Q(last_promana_analysis__isnull=True)
+        | Q(updated_at__gt=F('last_promana_analysis'))
+        | Exists(changed_tasks)
+        | Exists(changed_risks)
+    )
+
+
+def gather_health_data(projects: List[Project]) -> Dict[Any, Dict[str, Any]]:
+    """project_health_data for each project, with two grouped queries for the whole list."""
+    team_sizes = dict(
+        ProjectTeamMember.objects.filter(project__in=projects).order_by()
+        .values_list('project').annotate(count=Count('id'))
+    )
+    risk_counts = dict(
+        ProjectRisk.objects.all_tenants().filter(project__in=projects, status='active').order_by()
+        .values_list('project').annotate(count=Count('id'))
+    )
+    return {
+        project.pk: project_health_data(project, team_sizes.get(project.pk, 0), risk_counts.get(project.pk, 0))
+        for project in projects
+    }
+
+
+@dataclass
+class BatchResult:
+    analyzed: int = 0
+    failed: int = 0
+    insights: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def add(self, other: 'BatchResult') -> None:
+        self.analyzed += other.analyzed
+        self.failed += other.failed
+        self.insights += other.insights
+        self.errors.extend(other.errors)
+
+
+def analyze_projects(projects: List[Project], use_gemini: bool = False,
+                     concurrency: int = CONCURRENCY) -> BatchResult:
+    """
+    Analyze a batch of projects and write the results. Projects whose model
+    call fails keep their previous analysis and are retried on the next run.
+    """
+    result = BatchResult()
+    if not projects:
+        return result
+    started_at = timezone.now()
+    health_data = gather_health_data(projects)
+
+    if use_gemini:
+        requests = [
+            ai_agent_request(
+                project_health_prompt(health_data[project.pk]),
+                context=health_data[project.pk],
+                tenant_id=str(project.tenant_id),
+                **PROMANA_AGENT
+            )
+            for project in projects
+        ]
+        responses = call_gemini_many(requests, concurrency=concurrency, return_exceptions=True)
+    else:
+        responses = [None] * len(projects)
+
+    analyzed, insights = [], []
+    for project, response in zip(projects, responses):
+        if isinstance(response, Exception):
+            result.failed += 1
+            result.errors.append(f"{project.pk}: {response}")
+            continue
+        project_data = health_data[project.pk]
+        analysis = parse_promana_analysis(response, project_data) if use_gemini else rule_based_analysis(project_data)
+        project.health_score = analysis.get('health_score', project.health_score)
+        project.risk_level = analysis.get('risk_level') or project.risk_level
+        project.predicted_completion_date = analysis.get('predicted_completion_date')
+        # Changes made while this batch ran are picked up by the next run
+        project.last_promana_analysis = started_at
+        analyzed.append(project)
+        insights.extend(promana_insights_for(project, analysis))
+
+    with transaction.atomic():
+        Project.objects.all_tenants().bulk_update(
+            analyzed, ['health_score', 'risk_level', 'predicted_completion_date', 'last_promana_analysis']
+        )
+        PromanaInsight.objects.bulk_create(insights)
+    result.analyzed = len(analyzed)
+    result.insights = len(insights)
+    return result
+
+
+def run_batch_analysis(batch_size: Optional[int] = None, concurrency: Optional[int] = None,
+                       use_gemini: Optional[bool] = None, limit: Optional[int] = None) -> BatchResult:
+    """
+    Analyze every project due for analysis, batch by batch.
+
+    Args:
+        batch_size: Projects loaded, analyzed and written together
+            (default PROMANA_BATCH_SIZE)
+        concurrency: Gemini requests in flight at once (default PROMANA_BATCH_CONCURRENCY)
+        use_gemini: Ask Gemini rather than score by rules (default PROMANA_BATCH_USE_GEMINI)
+        limit: Analyze at most this many projects
+
+    Returns:
+        BatchResult totals for the run
+    """
+    batch_size = batch_size or getattr(settings, 'PROMANA_BATCH_SIZE', BATCH_SIZE)
+    concurrency = concurrency or getattr(settings, 'PROMANA_BATCH_CONCURRENCY', CONCURRENCY)
+    if use_gemini is None:
+        use_gemini = getattr(settings, 'PROMANA_BATCH_USE_GEMINI', False)
+
+    # Ids are fixed up front: analyzed projects leave the due set, failed ones stay
+    project_ids = list(
+        projects_due_for_analysis().order_by(F('last_promana_analysis').asc(nulls_first=True), 'pk')
+        .values_list('pk', flat=True)
+    )
+    if limit is not None:
+        project_ids = project_ids[:limit]
+
+    total = BatchResult()
+    for offset in range(0, len(project_ids), batch_size):
+        batch = list(Project.objects.all_tenants().filter(pk__in=project_ids[offset:offset + batch_size]))
+        total.add(analyze_projects(batch, use_gemini=use_gemini, concurrency=concurrency))
+    logger.info(f"Promana batch analysis: {total.analyzed} analyzed, {total.failed} failed, {total.insights} insights")
+    return total
@@ -0,0 +1,221 @@
+"""
+Sliding-window rate limiter for Gemini API calls.
+Counters live in the Django cache and are updated with atomic incr, so the
+limits hold across processes only when the cache is shared (Redis): with a
+process-local cache every web worker and Celery process would spend the
+full quota on its own, so the ai_services.E001 system check refuses one
+outside DEBUG. Limits are enforced per tier: a global burst/minute/day
+budget plus a per-tenant minute budget.
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'gemini_rl'
+
+# Cache backends whose counters aren't seen by other processes
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+DEFAULT_LIMITS = {
+    'burst_per_second': 5,
+    'global_per_minute': 60,
+    'global_per_day': 10000,
+    'tenant_per_minute': 20,
+}
+
+
+class RateLimitExceeded(Exception):
+    """Raised when capacity isn't available within the allowed wait."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Tier(NamedTuple):
+    name: str
+    limit: int
+    window: int
+    per_tenant: bool = False
+
+
+def cache_is_shared() -> bool:
+    """Whether the default cache is visible to every process, as the limits require."""
+    return settings.CACHES.get('default', {}).get('BACKEND') not in PROCESS_LOCAL_CACHES
+
+
+def get_limits() -> Dict[str, int]:
+    """Effective limits: DEFAULT_LIMITS overridden by settings.GEMINI_RATE_LIMITS."""
+    limits = dict(DEFAULT_LIMITS)
+    limits.update(getattr(settings, 'GEMINI_RATE_LIMITS', None) or {})
+    return limits
+
+
+def get_tiers() -> List[Tier]:
+    limits = get_limits()
+    tiers = [
+        Tier('burst', limits['burst_per_second'], 1),
+        Tier('minute', limits['global_per_minute'], 60),
+        Tier('daily', limits['global_per_day'], 86400),
+        Tier('tenant_minute', limits['tenant_per_minute'], 60, per_tenant=True),
+    ]
+    # A limit of -1 disables the tier
+    return [tier for tier in tiers if tier.limit != -1]
+
+
+def _bucket_key(tier: Tier, scope: str, index: int) -> str:
+    return f"{CACHE_PREFIX}:{tier.name}:{scope}:{index}"
+
+
+def _scope(tier: Tier, tenant_id) -> Optional[str]:
+    if not tier.per_tenant:
+        return 'global'
+    return str(tenant_id) if tenant_id else None
+
+
+def _window_position(tier: Tier, now: float) -> Tuple[int, float]:
+    index = int(now // tier.window)
+    elapsed_fraction = (now - index * tier.window) / tier.window
+    return index, elapsed_fraction
+
+
+def _estimate(previous: int, current: int, elapsed_fraction: float) -> float:
+    """Sliding-window count: the previous bucket weighted by its overlap."""
+    return previous * (1 - elapsed_fraction) + current
+
+
+def _retry_after(tier: Tier, previous: int, current: int, elapsed_fraction: float) -> float:
+    """Seconds until one more request fits in the tier's window."""
+    until_next_window = (1 - elapsed_fraction) * tier.window
+    if current >= tier.limit or previous <= 0:
+        return until_next_window
+    # Wait for the previous bucket's weight to decay enough
+    needed_fraction = 1 - (tier.limit - current) / previous
+    return max(0.0, min(until_next_window, (needed_fraction - elapsed_fraction) * tier.window))
+
+
+def _reserve(tier: Tier, scope: str, now: float) -> Optional[float]:
+    """
+    Atomically take one slot in a tier.
+
+    Returns None on success, otherwise the seconds to wait before retrying.
+    """
+    index, elapsed_fraction = _window_position(tier, now)
+    current_key = _bucket_key(tier, scope, index)
+    cache.add(current_key, 0, tier.window * 2)
+    try:
+        current = cache.incr(current_key)
+    except ValueError:
+        # Key expired between add and incr
+        cache.add(current_key, 1, tier.window * 2)
+        current = 1
+    previous = cache.get(_bucket_key(tier, scope, index - 1), 0)
+
+    if _estimate(previous, current, elapsed_fraction) <= tier.limit:
+        return None
+
+    _release(tier, scope, index)
+    return max(0.01, _retry_after(tier, previous, current - 1, elapsed_fraction))
+
+
+def _release(tier: Tier, scope: str, index: int) -> None:
+    try:
+        cache.decr(_bucket_key(tier, scope, index))
+    except ValueError:
+        pass
+
+
+def try_acquire(tenant_id=None) -> Optional[float]:
+    """
+    Take one request slot in every tier, or none at all.
+
+    Returns None when the request may proceed, otherwise the seconds to wait.
+    """
+    now = time.time()
+    reserved = []
+    for tier in get_tiers():
+        scope = _scope(tier, tenant_id)
+        if scope is None:
+            continue
+        wait = _reserve(tier, scope, now)
+        if wait is not None:
+            for reserved_tier, reserved_scope in reserved:
+                _release(reserved_tier, reserved_scope, _window_position(reserved_tier, now)[0])
+            logger.debug(f"Gemini rate limit tier '{tier.name}' full, retry in {wait:.2f}s")
+            return wait
+        reserved.append((tier, scope))
+    return None
+
+
+def _check_deadline(wait: float, deadline: Optional[float]) -> None:
+    # Fail fast instead of sleeping when the slot won't free up in time
+    if deadline is not None and wait > deadline - time.monotonic():
+        raise RateLimitExceeded(f"API quota exceeded, retry in {wait:.1f}s", wait)
+
+
+def _jittered(wait: float) -> float:
+    # Jitter so waiting workers don't retry in lockstep
+    return wait + random.uniform(0, min(0.25, wait))
+
+
+def acquire(tenant_id=None, timeout: Optional[float] = 0) -> None:
+    """
+    Wait for capacity and take a request slot.
+
+    Args:
+        tenant_id: Tenant to charge against the per-tenant tier
+        timeout: Maximum seconds to wait; 0 fails immediately and None
+            waits indefinitely
+
+    Raises:
+        RateLimitExceeded: If no capacity became available in time
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        wait = try_acquire(tenant_id)
+        if wait is None:
+            return
+        _check_deadline(wait, deadline)
+        time.sleep(_jittered(wait))
+
+
+async def acquire_async(tenant_id=None, timeout: Optional[float] = 0) -> None:
+    """
+    Async version of acquire() that releases the event loop while waiting.
+
+    Raises:
+        RateLimitExceeded: If no capacity became available in time
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        wait = await sync_to_async(try_acquire, thread_sensitive=False)(tenant_id)
+        if wait is None:
+            return
+        _check_deadline(wait, deadline)
+        await asyncio.sleep(_jittered(wait))
+
+
+def get_usage(tenant_id=None) -> Dict[str, Dict[str, float]]:
+    """Current sliding-window usage per tier, without taking a slot."""
+    now = time.time()
+    usage = {}
+    for tier in get_tiers():
+        scope = _scope(tier, tenant_id)
+        if scope is None:
+            continue
+        index, elapsed_fraction = _window_position(tier, now)
+        keys = [_bucket_key(tier, scope, index - 1), _bucket_key(tier, scope, index)]
+        counts = cache.get_many(keys)
+        used = _estimate(counts.get(keys[0], 0), counts.get(keys[1], 0), elapsed_fraction)
+        usage[tier.name] = {'used': int(round(used)), 'limit': tier.limit}
+    return usage
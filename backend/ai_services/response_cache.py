@@ -0,0 +1,140 @@
+"""
+Content-addressed response cache for Gemini calls.
+Responses are keyed on a hash of the full request (prompt, system prompt,
+model and generation parameters) and namespaced per tenant. A bounded
+in-process LRU sits in front of the shared Django cache, and hit/miss
+counters are kept in the shared cache for reporting.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'gemini_resp'
+
+DEFAULT_CONFIG = {
+    'enabled': False,
+    'ttl': 3600,
+    'max_entries': 512,
+    # Requests sampled above this temperature are meant to vary, so they
+    # are never cached
+    'max_temperature': 0.7,
+}
+
+METRICS = ('hits', 'misses', 'bypassed')
+
+_local_entries: 'OrderedDict[str, Tuple[float, str]]' = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def get_config() -> Dict[str, Any]:
+    """Effective config: DEFAULT_CONFIG overridden by settings.GEMINI_RESPONSE_CACHE."""
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, 'GEMINI_RESPONSE_CACHE', None) or {})
+    return config
+
+
+def make_request_key(**request: Any) -> str:
+    """Hash every field that affects the model's output."""
+    payload = json.dumps(request, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _namespace(tenant_id) -> str:
+    scope = str(tenant_id) if tenant_id else 'global'
+    version = cache.get(f"{CACHE_PREFIX}:ns:{scope}", 0)
+    return f"{scope}:{version}"
+
+
+def _cache_key(tenant_id, request_key: str) -> str:
+    return f"{CACHE_PREFIX}:{_namespace(tenant_id)}:{request_key}"
+
+
+def _record(metric: str) -> None:
+    key = f"{CACHE_PREFIX}:metrics:{metric}"
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def is_cacheable(temperature: float) -> bool:
+    config = get_config()
+    return bool(config['enabled']) and temperature <= config['max_temperature']
+
+
+def get_response(tenant_id, request_key: str) -> Optional[str]:
+    """Return a cached response, or None on a miss."""
+    key = _cache_key(tenant_id, request_key)
+    now = time.monotonic()
+    with _local_lock:
+        entry = _local_entries.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                _local_entries.move_to_end(key)
+                _record('hits')
+                return entry[1]
+            del _local_entries[key]
+
+    response = cache.get(key)
+    if response is None:
+        _record('misses')
+        return None
+    _store_local(key, response, get_config()['ttl'])
+    _record('hits')
+    return response
+
+
+def set_response(tenant_id, request_key: str, response: str, ttl: Optional[int] = None) -> None:
+    """Store a response in both cache tiers."""
+    ttl = ttl or get_config()['ttl']
+    key = _cache_key(tenant_id, request_key)
+    cache.set(key, response, ttl)
+    _store_local(key, response, ttl)
+
+
+def _store_local(key: str, response: str, ttl: int) -> None:
+    max_entries = get_config()['max_entries']
+    with _local_lock:
+        _local_entries[key] = (time.monotonic() + ttl, response)
+        _local_entries.move_to_end(key)
+        while len(_local_entries) > max_entries:
+            _local_entries.popitem(last=False)
+
+
+def record_bypass() -> None:
+    _record('bypassed')
+
+
+def invalidate_tenant(tenant_id=None) -> None:
+    """Drop every cached response for a tenant by moving to a new namespace."""
+    scope = str(tenant_id) if tenant_id else 'global'
+    key = f"{CACHE_PREFIX}:ns:{scope}"
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+    prefix = f"{CACHE_PREFIX}:{scope}:"
+    with _local_lock:
+        for local_key in [k for k in _local_entries if k.startswith(prefix)]:
+            del _local_entries[local_key]
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for the response cache."""
+    counts = cache.get_many([f"{CACHE_PREFIX}:metrics:{metric}" for metric in METRICS])
+    stats = {metric: counts.get(f"{CACHE_PREFIX}:metrics:{metric}", 0) for metric in METRICS}
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+    with _local_lock:
+        stats['local_entries'] = len(_local_entries)
+    return stats
@@ -0,0 +1,81 @@
+"""
+Server-Sent Events support for the streaming Gemini endpoints.
+DRF's APIView is sync only, so streaming endpoints are native async Django
+views: authentication, validation and other database work run in a thread
+through sync_to_async, and the response body is an async generator that
+ASGI servers flush to the browser event by event. Under WSGI the same views
+still work but hold the worker until the stream ends.
+"""
+import json
+import logging
+from typing import Any, AsyncIterator, Union
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from core.middleware import tenant_scope
+from core.permissions import DigiSolAdminOrAuthenticated
+
+logger = logging.getLogger(__name__)
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def event_stream_response(events: AsyncIterator[str]) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class EventStreamView(View):
+    """
+    Async view that authenticates like the DRF views and answers a POST with
+    an event stream.
+
+    Subclasses implement prepare(), which runs in a thread inside the
+    requesting user's tenant scope and returns either an HttpResponse (for
+    errors found before streaming starts) or an async iterator of events.
+    """
+    permission_classes = [DigiSolAdminOrAuthenticated]
+    http_method_names = ['post', 'options']
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # Token authenticated like the DRF views, so CSRF doesn't apply
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            result = await sync_to_async(self._authenticate_and_prepare)(request)
+        except exceptions.APIException as e:
+            detail = e.detail if isinstance(e.detail, (dict, list)) else {'detail': e.detail}
+            return JsonResponse(detail, status=e.status_code, safe=False)
+        if isinstance(result, HttpResponse):
+            return result
+        return event_stream_response(result)
+
+    def _authenticate_and_prepare(self, request) -> Union[HttpResponse, AsyncIterator[str]]:
+        drf_request = Request(
+            request,
+            parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES],
+            authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+        )
+        for permission_class in self.permission_classes:
+            if not permission_class().has_permission(drf_request, self):
+                if not drf_request.user.is_authenticated:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied()
+        with tenant_scope(getattr(drf_request.user, 'tenant', None)):
+            return self.prepare(drf_request)
+
+    def prepare(self, request: Request) -> Union[HttpResponse, AsyncIterator[str]]:
+        raise NotImplementedError
@@ -10,12 +10,15 @@ from .models import (
     ContentGenerationRequest, ImageGenerationRequest, AIProfile, AITask, AIInteractionLog, AIRecommendation
 )
 from core.models import BrandProfile, BrandAsset, Campaign
+from core.tenant_context import tenant_task
 from .gemini_utils import call_gemini_for_content_generation, call_gemini_for_ai_agent, call_gemini_for_insights
 import time
 import json
 from django.db import models
 from django.utils import timezone
 from project_management.models import Project, ProjectTask, ProjectRisk, PromanaInsight
+from project_management.workload import hours_by_user, open_tasks, utilization
+from .promana import parse_promana_analysis, project_health_data, project_health_prompt, promana_insights_for, run_batch_analysis
 
 logger = logging.getLogger(__name__)
 
@@ -413,6 +416,7 @@ def delegate_ai_task(task_id, target_agent_id):
 
 
 @shared_task
+@tenant_task()
 def trigger_workflow_by_event(event_type, event_data, tenant_id):
     """
     Trigger AI workflows based on system events.
@@ -731,9 +735,8 @@ def generate_campaign_insights_task(self, campaign_id, campaign_stats_data, ai_p
         # Construct a detailed prompt for the LLM
         prompt = _build_campaign_insights_prompt(campaign, campaign_stats_data)
         
-        # Call the external LLM API
-        # insights_text = _call_gemini_api_for_insights(prompt)
-        insights_text = "AI insights temporarily disabled to prevent API quota issues."
+        # Call the external LLM API, queueing for rate limit capacity
+        insights_text = _call_gemini_api_for_insights(prompt, tenant_id=str(campaign.tenant_id))
         
         # Find the existing placeholder recommendation and update it
         recommendation = AIRecommendation.objects.filter(
@@ -850,12 +853,13 @@ Format your response as a clear, structured analysis with numbered insights.
     return prompt.strip()
 
 
-def _call_gemini_api_for_insights(prompt):
+def _call_gemini_api_for_insights(prompt, tenant_id=None):
     """
     Call Gemini API to generate campaign insights.
     
     Args:
         prompt: The detailed prompt for insights generation
+        tenant_id: Tenant charged against the per-tenant rate limit
     
     Returns:
         str: Generated insights from Gemini
@@ -863,7 +867,14 @@ def _call_gemini_api_for_insights(prompt):
     Raises:
         Exception: If API call fails
     """
-    return call_gemini_for_insights(prompt=prompt) 
+    # The prompt carries every campaign detail and statistic it is built
+    # from, so an identical prompt for the same tenant can reuse the response
+    return call_gemini_for_insights(
+        prompt=prompt,
+        tenant_id=tenant_id,
+        quota_timeout=settings.GEMINI_TASK_RATE_LIMIT_TIMEOUT,
+        use_cache=True
+    ) 
 
 
 def analyze_project_health(project_id: str) -> dict:
@@ -880,47 +891,14 @@ def analyze_project_health(project_id: str) -> dict:
         project = Project.objects.get(id=project_id)
         
         # Gather project data for analysis
-        project_data = {
-            'name': project.name,
-            'status': project.status,
-            'progress_percentage': project.progress_percentage,
-            'budget_utilization': project.budget_utilization,
-            'days_remaining': project.days_remaining,
-            'is_overdue': project.is_overdue,
-            'total_tasks': project.tasks.count(),
-            'completed_tasks': project.tasks.filter(status='completed').count(),
-            'overdue_tasks': project.tasks.filter(
-                end_date__lt=timezone.now().date(),
-                status__in=['pending', 'in_progress']
-            ).count(),
-            'team_size': project.team_memberships.count(),
-            'risks_count': project.risks.filter(status='active').count()
-        }
+        project_data = project_health_data(
+            project,
+            team_size=project.team_memberships.count(),
+            risks_count=project.risks.filter(status='active').count()
+        )
         
         # Create analysis prompt
-        prompt = f"""
-        Analyze the following project data and provide a comprehensive health assessment:
-        
-        Project: {project_data['name']}
-        Status: {project_data['status']}
-        Progress: {project_data['progress_percentage']}%
-        Budget Utilization: {project_data['budget_utilization']}%
-        Days Remaining: {project_data['days_remaining']}
-        Is Overdue: {project_data['is_overdue']}
-        Total Tasks: {project_data['total_tasks']}
-        Completed Tasks: {project_data['completed_tasks']}
-        Overdue Tasks: {project_data['overdue_tasks']}
-        Team Size: {project_data['team_size']}
-        Active Risks: {project_data['risks_count']}
-        
-        Please provide:
-        1. Overall health score (0-100)
-        2. Risk level assessment (low/medium/high/critical)
-        3. Predicted completion date
-        4. Top 3 key risks
-        5. Top recommendation for improvement
-        6. Budget burn rate analysis
-        """
+        prompt = project_health_prompt(project_data)
         
         # Call Promana AI (disabled for automatic processes to prevent quota issues)
         # response = call_gemini_for_ai_agent(
@@ -940,7 +918,8 @@ def analyze_project_health(project_id: str) -> dict:
         project.risk_level = analysis_result.get('risk_level', project.risk_level)
         project.predicted_completion_date = analysis_result.get('predicted_completion_date')
         project.last_promana_analysis = timezone.now()
-        project.save()
+        # Leaves updated_at alone, so the batch analysis doesn't count this as a change
+        project.save(update_fields=['health_score', 'risk_level', 'predicted_completion_date', 'last_promana_analysis'])
         
         # Create insights
         create_promana_insights(project, analysis_result)
@@ -966,12 +945,11 @@ def suggest_task_assignee(task_id: str) -> dict:
         project = task.project
         
         # Gather team member data
+        memberships = project.team_memberships.filter(is_active=True).select_related('user')
+        hours = hours_by_user(open_tasks(project=project))
         team_members = []
-        for member in project.team_memberships.filter(is_active=True):
-            assigned_hours = member.user.assigned_tasks.filter(
-                project=project,
-                status__in=['pending', 'in_progress']
-            ).aggregate(total=models.Sum('estimated_hours'))['total'] or 0
+        for member in memberships:
+            assigned_hours = hours.get(member.user_id, {}).get('assigned_hours', 0.0)
             
             team_members.append({
                 'id': member.user.id,
@@ -980,8 +958,8 @@ def suggest_task_assignee(task_id: str) -> dict:
                 'role': member.role,
                 'skills': member.skills,
                 'capacity_hours': float(member.capacity_hours),
-                'assigned_hours': float(assigned_hours),
-                'utilization': round((assigned_hours / member.capacity_hours) * 100, 2) if member.capacity_hours > 0 else 0
+                'assigned_hours': assigned_hours,
+                'utilization': utilization(assigned_hours, member.capacity_hours)
             })
         
         # Create recommendation prompt
@@ -1050,14 +1028,11 @@ def generate_project_insights(project_id: str) -> dict:
                 'days_remaining': project.days_remaining
             },
             'tasks': {
-                'total': project.tasks.count(),
-                'completed': project.tasks.filter(status='completed').count(),
-                'in_progress': project.tasks.filter(status='in_progress').count(),
-                'overdue': project.tasks.filter(
-                    end_date__lt=timezone.now().date(),
-                    status__in=['pending', 'in_progress']
-                ).count(),
-                'blocked': project.tasks.filter(status='blocked').count()
+                'total': project.tasks_total,
+                'completed': project.tasks_completed,
+                'in_progress': project.tasks_in_progress,
+                'overdue': project.tasks_overdue,
+                'blocked': project.tasks_blocked
             },
             'team': {
                 'size': project.team_memberships.count(),
@@ -1091,10 +1066,13 @@ def generate_project_insights(project_id: str) -> dict:
         8. Areas of concern
         """
         
-        # Call Promana AI
+        # Call Promana AI; the prompt embeds all the project data it is built
+        # from, so an unchanged project reuses the earlier response
         response = call_gemini_for_insights(
             prompt=prompt,
-            data_context=f"Project: {project.name}, Type: {project.project_type}"
+            data_context=f"Project: {project.name}, Type: {project.project_type}",
+            tenant_id=str(project.tenant_id),
+            use_cache=True
         )
         
         return parse_project_insights(response, project_data)
@@ -1221,10 +1199,13 @@ def analyze_resource_utilization(project_id: str) -> dict:
         7. Capacity planning insights
         """
         
-        # Call Promana AI
+        # Call Promana AI; the prompt embeds every resource's data, so an
+        # unchanged team reuses the earlier response
         response = call_gemini_for_insights(
             prompt=prompt,
-            data_context=f"Project: {project.name}, Team Size: {len(resources_data)}"
+            data_context=f"Project: {project.name}, Team Size: {len(resources_data)}",
+            tenant_id=str(project.tenant_id),
+            use_cache=True
         )
         
         return parse_resource_analysis(response, resources_data)
@@ -1234,40 +1215,6 @@ def analyze_resource_utilization(project_id: str) -> dict:
         return {'error': str(e)}
 
 # Helper functions for parsing AI responses
-def parse_promana_analysis(response: str, project_data: dict) -> dict:
-    """Parse Promana analysis response."""
-    try:
-        # This is a simplified parser - in production, you'd use more sophisticated parsing
-        lines = response.split('\n')
-        result = {
-            'health_score': 75,  # Default
-            'risk_level': 'medium',
-            'predicted_completion_date': None,
-            'key_risks': [],
-            'top_recommendation': '',
-            'budget_analysis': ''
-        }
-        
-        for line in lines:
-            if 'health score' in line.lower():
-                # Extract score
-                import re
-                score_match = re.search(r'(\d+)', line)
-                if score_match:
-                    result['health_score'] = int(score_match.group(1))
-            elif 'risk level' in line.lower():
-                if 'high' in line.lower():
-                    result['risk_level'] = 'high'
-                elif 'critical' in line.lower():
-                    result['risk_level'] = 'critical'
-                elif 'low' in line.lower():
-                    result['risk_level'] = 'low'
-        
-        return result
-    except Exception as e:
-        logger.error(f"Error parsing Promana analysis: {str(e)}")
-        return {'health_score': 75, 'risk_level': 'medium'}
-
 def parse_assignee_recommendation(response: str, team_members: list) -> dict:
     """Parse assignee recommendation response."""
     try:
@@ -1317,42 +1264,22 @@ def parse_resource_analysis(response: str, resources_data: list) -> dict:
 def create_promana_insights(project: Project, analysis_result: dict):
     """Create Promana insights based on analysis."""
     try:
-        # Create risk insights
-        if analysis_result.get('risk_level') in ['high', 'critical']:
-            PromanaInsight.objects.create(
-                tenant=project.tenant,
-                project=project,
-                insight_type='risk_alert',
-                title=f'High Risk Level: {analysis_result.get("risk_level", "unknown")}',
-                description=f'Project "{project.name}" has been identified as high risk by Promana analysis.',
-                confidence_score=90,
-                is_actionable=True
-            )
-        
-        # Create health score insights
-        health_score = analysis_result.get('health_score', 75)
-        if health_score < 70:
-            PromanaInsight.objects.create(
-                tenant=project.tenant,
-                project=project,
-                insight_type='risk_alert',
-                title='Low Health Score',
-                description=f'Project health score is {health_score}/100. Immediate attention recommended.',
-                confidence_score=85,
-                is_actionable=True
-            )
-        
-        # Create recommendation insights
-        if analysis_result.get('top_recommendation'):
-            PromanaInsight.objects.create(
-                tenant=project.tenant,
-                project=project,
-                insight_type='recommendation',
-                title='Promana Recommendation',
-                description=analysis_result['top_recommendation'],
-                confidence_score=80,
-                is_actionable=True
-            )
-            
+        PromanaInsight.objects.bulk_create(promana_insights_for(project, analysis_result))
     except Exception as e:
-        logger.error(f"Error creating Promana insights: {str(e)}") 
\ No newline at end of file
+        logger.error(f"Error creating Promana insights: {str(e)}")
+
+
+@shared_task
+def run_promana_batch_analysis(limit=None):
+    """
+    Re-analyze the health of every project changed since its last Promana
+    analysis, in batches (see ai_services.promana).
+    """
+    result = run_batch_analysis(limit=limit)
+    return {
+        'success': not result.failed,
+        'analyzed_projects': result.analyzed,
+        'failed_projects': result.failed,
+        'insights_created': result.insights,
+        'errors': result.errors[:20]
+    }
\ No newline at end of file
@@ -1,3 +1,269 @@
-from django.test import TestCase
+import json
+from datetime import date, timedelta
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+from core.middleware import tenant_scope
+from core.models import Tenant
+from project_management.models import Project
+from . import checks, gemini_utils, rate_limiter, response_cache, tasks
 
-# Create your tests here.
+
+@override_settings(GEMINI_RATE_LIMITS={
+    'burst_per_second': -1,
+    'global_per_minute': 3,
+    'global_per_day': 100,
+    'tenant_per_minute': 2,
+})
+class GeminiRateLimiterTest(TestCase):
+    """Test the sliding-window Gemini rate limiter."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_per_tenant_and_global_tiers(self):
+        self.assertIsNone(rate_limiter.try_acquire('tenant-a'))
+        self.assertIsNone(rate_limiter.try_acquire('tenant-a'))
+        # Tenant tier is full, and the rejected call doesn't use global quota
+        self.assertIsNotNone(rate_limiter.try_acquire('tenant-a'))
+        self.assertEqual(rate_limiter.get_usage()['minute']['used'], 2)
+
+        self.assertIsNone(rate_limiter.try_acquire('tenant-b'))
+        self.assertIsNotNone(rate_limiter.try_acquire('tenant-b'))
+
+    def test_process_local_cache_fails_the_system_check_where_required(self):
+        local = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost:6379/0'}}
+        with override_settings(DEBUG=False, CACHES=local):
+            self.assertEqual([error.id for error in checks.check_rate_limiter_cache(None)], ['ai_services.W001'])
+        with override_settings(DEBUG=False, CACHES=local, GEMINI_RATE_LIMITER_REQUIRE_SHARED_CACHE=True):
+            self.assertEqual([error.id for error in checks.check_rate_limiter_cache(None)], ['ai_services.E001'])
+        with override_settings(DEBUG=False, CACHES=shared, GEMINI_RATE_LIMITER_REQUIRE_SHARED_CACHE=True):
+            self.assertEqual(checks.check_rate_limiter_cache(None), [])
+
+    def test_acquire_without_wait_raises(self):
+        for _ in range(3):
+            rate_limiter.acquire()
+        with self.assertRaises(rate_limiter.RateLimitExceeded):
+            rate_limiter.acquire(timeout=0)
+
+    def test_acquire_waits_for_capacity(self):
+        waits = iter([5.0, None])
+        with mock.patch.object(rate_limiter, 'try_acquire', side_effect=lambda tenant_id: next(waits)), \
+                mock.patch.object(rate_limiter.time, 'sleep') as sleep:
+            rate_limiter.acquire(timeout=30)
+        self.assertEqual(sleep.call_count, 1)
+        self.assertGreaterEqual(sleep.call_args[0][0], 5.0)
+
+
+@override_settings(GOOGLE_GEMINI_API_KEY='test-key', GEMINI_RATE_LIMITS={
+    'burst_per_second': -1,
+    'global_per_minute': -1,
+    'global_per_day': -1,
+    'tenant_per_minute': -1,
+}, GEMINI_RESPONSE_CACHE={'enabled': True})
+class GeminiResponseCacheTest(TestCase):
+    """Test the opt-in Gemini response cache."""
+
+    def setUp(self):
+        cache.clear()
+        response_cache._local_entries.clear()
+        model = mock.Mock()
+        model.generate_content.return_value = mock.Mock(text="Cached insight")
+        patcher = mock.patch.object(gemini_utils, 'get_gemini_model', return_value=model)
+        self.model = model
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_identical_requests_hit_cache(self):
+        for _ in range(2):
+            result = gemini_utils.call_gemini_api("Summarize project", temperature=0.2, use_cache=True, tenant_id='t1')
+            self.assertEqual(result, "Cached insight")
+        self.assertEqual(self.model.generate_content.call_count, 1)
+
+        # Other tenants get their own namespace
+        gemini_utils.call_gemini_api("Summarize project", temperature=0.2, use_cache=True, tenant_id='t2')
+        self.assertEqual(self.model.generate_content.call_count, 2)
+
+        stats = response_cache.get_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+    def test_high_temperature_bypasses_cache(self):
+        for _ in range(2):
+            gemini_utils.call_gemini_api("Write a tagline", temperature=0.9, use_cache=True)
+        self.assertEqual(self.model.generate_content.call_count, 2)
+        self.assertEqual(response_cache.get_cache_stats()['bypassed'], 2)
+
+    def test_insights_are_not_cached_unless_requested(self):
+        for _ in range(2):
+            gemini_utils.call_gemini_for_insights("Summarize campaign", tenant_id='t1')
+        self.assertEqual(self.model.generate_content.call_count, 2)
+
+    def test_promana_insights_are_cached_per_tenant(self):
+        tenant = Tenant.objects.create(name="Promana Tenant", subdomain="promana")
+        project = Project.objects.create(
+            tenant=tenant, name="Launch", start_date=date.today(), end_date=date.today() + timedelta(days=30)
+        )
+        with tenant_scope(tenant):
+            for _ in range(2):
+                tasks.generate_project_insights(project.id)
+        self.assertEqual(self.model.generate_content.call_count, 1)
+        self.assertEqual(response_cache.get_cache_stats()['hits'], 1)
+
+    def test_cache_is_off_by_default(self):
+        with override_settings(GEMINI_RESPONSE_CACHE={}):
+            for _ in range(2):
+                gemini_utils.call_gemini_api("Summarize project", temperature=0.2, use_cache=True)
+        self.assertEqual(self.model.generate_content.call_count, 2)
+
+
+@override_settings(GOOGLE_GEMINI_API_KEY='test-key', GEMINI_RATE_LIMITS={
+    'burst_per_second': -1,
+    'global_per_minute': -1,
+    'global_per_day': -1,
+    'tenant_per_minute': -1,
+})
+class GeminiModelPoolTest(TestCase):
+    """Test model pooling and batched Gemini calls."""
+
+    def setUp(self):
+        gemini_utils._model_pool.clear()
+
+    def test_models_are_reused_per_config(self):
+        with mock.patch.object(gemini_utils.genai, 'GenerativeModel', side_effect=lambda *a, **k: mock.Mock()) as factory:
+            first = gemini_utils.get_gemini_model('gemini-1.5-pro', {'temperature': 0.5})
+            self.assertIs(gemini_utils.get_gemini_model('gemini-1.5-pro', {'temperature': 0.5}), first)
+            self.assertIsNot(gemini_utils.get_gemini_model('gemini-1.5-pro', {'temperature': 0.9}), first)
+        self.assertEqual(factory.call_count, 2)
+
+    def test_call_gemini_many_preserves_order(self):
+        def generate(conversation):
+            prompt = conversation[-1]['parts'][0]
+            if prompt == 'fail':
+                raise ValueError('boom')
+            return mock.Mock(text=prompt.upper())
+
+        model = mock.Mock()
+        model.generate_content.side_effect = generate
+        with mock.patch.object(gemini_utils, 'get_gemini_model', return_value=model):
+            results = gemini_utils.call_gemini_many(['a', 'b', 'fail', 'c'], concurrency=3, return_exceptions=True)
+            self.assertEqual(results[:2] + results[3:], ['A', 'B', 'C'])
+            self.assertIsInstance(results[2], Exception)
+            with self.assertRaises(Exception):
+                gemini_utils.call_gemini_many(['a', 'fail'], concurrency=2)
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class _StreamedResponse:
+    def __init__(self, texts):
+        self.texts = texts
+
+    async def __aiter__(self):
+        for text in self.texts:
+            yield _Chunk(text)
+
+
+@override_settings(GOOGLE_GEMINI_API_KEY='test-key', GEMINI_RATE_LIMITS={
+    'burst_per_second': -1,
+    'global_per_minute': -1,
+    'global_per_day': -1,
+    'tenant_per_minute': -1,
+})
+class GeminiStreamingViewTest(TestCase):
+    """Test the Server-Sent Events chat endpoint."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='streamer', email='streamer@example.com', password='testpass123'
+        )
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        model = mock.Mock()
+        model.generate_content_async = mock.AsyncMock(return_value=_StreamedResponse(['Hello', ' there']))
+        patcher = mock.patch.object(gemini_utils, 'get_gemini_model', return_value=model)
+        self.model = model
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def _post(self, data, **headers):
+        return await self.async_client.post(
+            reverse('ai_services:gemini-chat-stream'), data, content_type='application/json', headers=headers
+        )
+
+    async def test_streams_tokens_as_events(self):
+        response = await self._post(
+            {'message': 'Plan my launch', 'agent_name': 'Scriptor', 'agent_specialization': 'content_creation'},
+            authorization=f'Bearer {self.token}'
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = ''.join([chunk.decode() async for chunk in response.streaming_content])
+        events = [block.split('\n', 1) for block in body.strip().split('\n\n')]
+        self.assertEqual([name for name, _ in events], ['event: token', 'event: token', 'event: done'])
+        self.assertEqual(json.loads(events[1][1][len('data: '):]), {'text': ' there'})
+        self.assertTrue(self.model.generate_content_async.call_args.kwargs['stream'])
+
+    async def test_requires_authentication_and_message(self):
+        response = await self._post({'message': 'Hi', 'agent_name': 'Scriptor'})
+        self.assertEqual(response.status_code, 401)
+        response = await self._post({'agent_name': 'Scriptor'}, authorization=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, 400)
+
+
+class PromanaBatchAnalysisTest(TestCase):
+    """Test the nightly Promana batch analysis."""
+
+    def setUp(self):
+        from datetime import date, timedelta
+        from core.models import Tenant
+        from project_management.models import Project, ProjectTask
+        self.tenant = Tenant.objects.create(name="Promana Tenant")
+        manager = get_user_model().objects.create_user(username="pm", email="pm@example.com", password="testpass123")
+        self.projects = [
+            Project.objects.create(
+                tenant=self.tenant, name=name, manager=manager,
+                start_date=date.today() - timedelta(days=40), end_date=date.today() + timedelta(days=days)
+            )
+            for name, days in (("Late", -1), ("On track", 30), ("Done", 30))
+        ]
+        ProjectTask.objects.create(
+            tenant=self.tenant, project=self.projects[0], name="Draft", assigned_to=manager,
+            start_date=date.today() - timedelta(days=10), end_date=date.today() - timedelta(days=2)
+        )
+        self.projects[0].status = self.projects[1].status = 'active'
+        self.projects[2].status = 'completed'
+        for project in self.projects:
+            project.save()
+
+    def test_changed_projects_are_analyzed_once(self):
+        from project_management.models import ProjectTask, PromanaInsight
+        from . import promana
+
+        result = promana.run_batch_analysis(batch_size=1, use_gemini=False)
+        self.assertEqual((result.analyzed, result.failed), (2, 0))
+        late = type(self.projects[0]).objects.all_tenants().get(pk=self.projects[0].pk)
+        # Overdue, and under 30% done with under a week left
+        self.assertEqual(late.health_score, 55)
+        self.assertEqual(list(PromanaInsight.objects.all_tenants().values_list('project', 'title')), [(late.pk, 'Low Health Score')])
+
+        # Nothing changed since, so nothing is due
+        self.assertFalse(promana.projects_due_for_analysis().exists())
+        ProjectTask.objects.all_tenants().get(project=late).save()
+        self.assertEqual(list(promana.projects_due_for_analysis()), [late])
+
+    def test_gemini_failures_are_retried_next_run(self):
+        from project_management.models import PromanaInsight
+        from . import promana
+
+        responses = ["Health score: 40\nRisk level: critical", RuntimeError("quota")]
+        with mock.patch.object(promana, 'call_gemini_many', return_value=responses) as call_many:
+            result = promana.run_batch_analysis(use_gemini=True, concurrency=2)
+        self.assertEqual(call_many.call_args.kwargs['concurrency'], 2)
+        self.assertEqual((result.analyzed, result.failed), (1, 1))
+        self.assertEqual(PromanaInsight.objects.all_tenants().count(), 2)
+        self.assertEqual(promana.projects_due_for_analysis().count(), 1)
@@ -12,11 +12,14 @@ from .views import (
     AITaskViewSet,
     AIInteractionLogViewSet,
     AIOrchestrationView,
+    AIOrchestrationStreamView,
     ImageGenerationRequestViewSet,
     AIPlanningView,
+    AIPlanningStreamView,
     StructuraInsightViewSet,
     AIEcosystemHealthViewSet,
     GeminiChatView,
+    GeminiChatStreamView,
     setup_ai_agents,
     get_quota_status_view,
     cleanup_ai_agents_endpoint
@@ -45,10 +48,13 @@ urlpatterns = [
     
     # AI Planning and Orchestration
     path('planning/', AIPlanningView.as_view(), name='ai-planning'),
+    path('planning/stream/', AIPlanningStreamView.as_view(), name='ai-planning-stream'),
     path('orchestrate-plan/', AIOrchestrationView.as_view(), name='orchestrate-plan'),
+    path('orchestrate-plan/stream/', AIOrchestrationStreamView.as_view(), name='orchestrate-plan-stream'),
     
     # Gemini Chat
     path('gemini-chat/', GeminiChatView.as_view(), name='gemini-chat'),
+    path('gemini-chat/stream/', GeminiChatStreamView.as_view(), name='gemini-chat-stream'),
     
     # Setup endpoint
     path('setup-agents/', setup_ai_agents, name='setup-ai-agents'),
@@ -1,10 +1,12 @@
 import logging
+from asgiref.sync import sync_to_async
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.decorators import action
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
 from django.core.exceptions import ValidationError
 from django.db import transaction, models
@@ -35,7 +37,8 @@ from .serializers import (
     AIEcosystemHealthSerializer
 )
 from .tasks import generate_content_task, generate_image_task, upload_edited_image_task
-from .gemini_utils import call_gemini_for_ai_agent, get_quota_status
+from .gemini_utils import call_gemini_for_ai_agent, get_quota_status, stream_gemini_for_ai_agent
+from .streaming import EventStreamView, sse_event
 from core.models import BrandProfile, Tenant, BrandAsset
 from accounts.models import CustomUser
 from core.admin_access import is_digisol_admin
@@ -246,6 +249,64 @@ class GeminiChatView(APIView):
             )
 
 
+class GeminiChatStreamView(EventStreamView):
+    """
+    Streaming version of GeminiChatView.post: sends the agent's reply as
+    Server-Sent Events ('token' per chunk, then 'done' or 'error').
+    """
+    
+    def prepare(self, request):
+        message = request.data.get('message')
+        agent_name = request.data.get('agent_name')
+        agent_specialization = request.data.get('agent_specialization')
+        conversation_history = request.data.get('conversation_history', [])
+        
+        if not message or not agent_name:
+            return JsonResponse(
+                {
+                    'error': 'Missing required fields',
+                    'message': 'message and agent_name are required'
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        tenant = getattr(request.user, 'tenant', None)
+        context = {
+            'conversation_history': conversation_history,
+            'user': request.user.email
+        }
+        return self.events(
+            message, agent_name, agent_specialization, context,
+            tenant_id=str(tenant.id) if tenant else None
+        )
+    
+    async def events(self, message, agent_name, agent_specialization, context, tenant_id=None):
+        if not settings.GOOGLE_GEMINI_API_KEY:
+            yield sse_event('token', {'text': 'I\'m currently in demo mode. To enable full AI chat functionality, please configure the Gemini API key in the backend settings.'})
+            yield sse_event('done', {'agent_name': agent_name, 'demo_mode': True})
+            return
+        
+        try:
+            async for text in stream_gemini_for_ai_agent(
+                prompt=message,
+                agent_name=agent_name,
+                agent_personality=f"Professional AI agent specializing in {agent_specialization}",
+                specialization=agent_specialization,
+                context=context,
+                tenant_id=tenant_id
+            ):
+                yield sse_event('token', {'text': text})
+        except Exception as e:
+            logger.error(f"Error streaming chat message: {str(e)}")
+            yield sse_event('error', {'error': 'Failed to process chat message', 'message': str(e)})
+            return
+        
+        yield sse_event('done', {
+            'agent_name': agent_name,
+            'quota_status': await sync_to_async(get_quota_status)(tenant_id)
+        })
+
+
 class ContentGenerationView(APIView):
     """
     API view for generating AI content.
@@ -633,7 +694,7 @@ class AIPlanningView(APIView):
             auto_delegate = request.data.get('auto_delegate', True)
             
             # Select AI agent
-            ai_agent = self._select_ai_agent(selected_agent_id, recommendation_type, None)
+            ai_agent = _select_planning_agent(selected_agent_id, recommendation_type)
             
             if not ai_agent:
                 return Response(
@@ -735,44 +796,6 @@ class AIPlanningView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
-    def _select_ai_agent(self, selected_agent_id, recommendation_type, tenant):
-        """Select appropriate AI agent for the planning task."""
-        if selected_agent_id:
-            # Use manually selected agent
-            try:
-                return AIProfile.objects.get(
-                    id=selected_agent_id,
-                    is_active=True
-                )
-            except AIProfile.DoesNotExist:
-                return None
-        
-        # Auto-select based on recommendation type
-        specialization_mapping = {
-            'campaign_optimization': 'campaign_optimization',
-            'lead_nurturing': 'lead_nurturing',
-            'content_strategy': 'content_creation',
-            'budget_allocation': 'budget_analysis',
-            'audience_targeting': 'marketing_strategy',
-        }
-        
-        specialization = specialization_mapping.get(recommendation_type, 'general_orchestration')
-        
-        # Find best matching agent
-        agent = AIProfile.objects.filter(
-            specialization=specialization,
-            is_active=True
-        ).first()
-        
-        # Fallback to general orchestration agent
-        if not agent:
-            agent = AIProfile.objects.filter(
-                specialization='general_orchestration',
-                is_active=True
-            ).first()
-        
-        return agent
-
     def _check_user_credits(self, user):
         """Check if user has sufficient credits for AI planning."""
         # TODO: Implement actual credit checking logic
@@ -802,6 +825,162 @@ class AIPlanningView(APIView):
             return f"{base_text} Review your current marketing performance and identify areas for improvement. Consider implementing automation workflows to increase efficiency."
 
 
+def _select_planning_agent(selected_agent_id, recommendation_type):
+    """Select appropriate AI agent for a planning task."""
+    if selected_agent_id:
+        # Use manually selected agent
+        try:
+            return AIProfile.objects.get(
+                id=selected_agent_id,
+                is_active=True
+            )
+        except AIProfile.DoesNotExist:
+            return None
+    
+    # Auto-select based on recommendation type
+    specialization_mapping = {
+        'campaign_optimization': 'campaign_optimization',
+        'lead_nurturing': 'lead_nurturing',
+        'content_strategy': 'content_creation',
+        'budget_allocation': 'budget_analysis',
+        'audience_targeting': 'marketing_strategy',
+    }
+    
+    specialization = specialization_mapping.get(recommendation_type, 'general_orchestration')
+    
+    # Find best matching agent
+    agent = AIProfile.objects.filter(
+        specialization=specialization,
+        is_active=True
+    ).first()
+    
+    # Fallback to general orchestration agent
+    if not agent:
+        agent = AIProfile.objects.filter(
+            specialization='general_orchestration',
+            is_active=True
+        ).first()
+    
+    return agent
+
+
+class AIPlanningStreamView(EventStreamView):
+    """
+    Streaming version of AIPlanningView.post. The selected agent's analysis
+    is generated by Gemini and streamed as it arrives; the AITask and
+    AIRecommendation are saved once the stream completes.
+    
+    Events: 'task' (task and agent ids), 'token' per chunk, then 'done'
+    with the recommendation, or 'error'.
+    """
+    
+    def prepare(self, request):
+        serializer = AIPlanningRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        tenant = getattr(request.user, 'tenant', None)
+        if tenant is None:
+            return JsonResponse(
+                {'error': 'No tenant', 'message': 'AI planning requires a tenant account.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        recommendation_type = serializer.validated_data.get('recommendation_type')
+        ai_agent = _select_planning_agent(
+            serializer.validated_data.get('selected_agent_id'), recommendation_type
+        )
+        if not ai_agent:
+            return JsonResponse(
+                {
+                    'error': 'No suitable AI agent found',
+                    'message': 'No AI agent available for this type of planning.'
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        context = serializer.validated_data.get('context', {})
+        priority = serializer.validated_data.get('priority', 'medium')
+        ai_task = AITask.objects.create(
+            tenant=tenant,
+            requester=request.user,
+            assignee_agent=ai_agent,
+            objective=serializer.validated_data['objective'],
+            status='in_progress',
+            context_data={
+                'planning_type': 'strategic_planning',
+                'recommendation_type': recommendation_type,
+                'priority': priority,
+                'original_context': context
+            }
+        )
+        return self.events(ai_task, ai_agent, request.user, recommendation_type, priority, context)
+    
+    async def events(self, ai_task, ai_agent, user, recommendation_type, priority, context):
+        yield sse_event('task', {
+            'task_id': str(ai_task.id),
+            'assigned_agent': {
+                'id': str(ai_agent.id),
+                'name': ai_agent.name,
+                'specialization': ai_agent.get_specialization_display()
+            }
+        })
+        
+        chunks = []
+        try:
+            async for text in stream_gemini_for_ai_agent(
+                prompt=f"Create a strategic plan with actionable recommendations for this objective: {ai_task.objective}",
+                agent_name=ai_agent.name,
+                agent_personality=ai_agent.personality_description,
+                specialization=ai_agent.get_specialization_display(),
+                context=context,
+                tenant_id=str(ai_task.tenant_id)
+            ):
+                chunks.append(text)
+                yield sse_event('token', {'text': text})
+        except Exception as e:
+            logger.error(f"Error streaming AI planning task {ai_task.id}: {str(e)}")
+            ai_task.status = 'failed'
+            ai_task.result_data = {'error': str(e)}
+            await sync_to_async(ai_task.save)(update_fields=['status', 'result_data', 'updated_at'])
+            yield sse_event('error', {'error': 'AI planning failed', 'message': str(e)})
+            return
+        
+        recommendation = await sync_to_async(self._complete)(
+            ai_task, ai_agent, user, recommendation_type, priority, ''.join(chunks).strip()
+        )
+        logger.info(f"AI planning task completed: {ai_task.id} by {ai_agent.name}")
+        yield sse_event('done', {
+            'task_id': str(ai_task.id),
+            'status': 'completed',
+            'recommendation': {
+                'id': str(recommendation.id),
+                'text': recommendation.recommendation_text,
+                'type': recommendation.type,
+                'priority': recommendation.priority
+            }
+        })
+    
+    def _complete(self, ai_task, ai_agent, user, recommendation_type, priority, analysis):
+        result = {
+            'analysis': analysis,
+            'agent_specialization': ai_agent.specialization,
+        }
+        with transaction.atomic():
+            ai_task.result_data = result
+            ai_task.status = 'completed'
+            ai_task.save(update_fields=['status', 'result_data', 'updated_at'])
+            return AIRecommendation.objects.create(
+                tenant_id=ai_task.tenant_id,
+                user=user,
+                type=recommendation_type or 'campaign_optimization',
+                recommendation_text=analysis or f"Analysis completed for: {ai_task.objective}",
+                context_data=result,
+                is_actionable=True,
+                priority=priority,
+                generated_by_agent=ai_agent
+            )
+
+
 class AIProfileViewSet(ModelViewSet):
     """
     ViewSet for managing AI agent profiles.
@@ -1172,6 +1351,90 @@ class AIOrchestrationView(APIView):
             )
 
 
+class AIOrchestrationStreamView(EventStreamView):
+    """
+    Streaming version of AIOrchestrationView.post. The coordinator agent's
+    plan is streamed as Server-Sent Events and logged on the task when the
+    stream completes.
+    
+    Events: 'task', 'token' per chunk, then 'done' or 'error'.
+    """
+    
+    def prepare(self, request):
+        serializer = AIOrchestrationRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        tenant = getattr(request.user, 'tenant', None)
+        if tenant is None:
+            return JsonResponse(
+                {'error': 'No tenant', 'message': 'AI orchestration requires a tenant account.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        coordinator = AIProfile.objects.filter(
+            specialization='general_orchestration',
+            is_active=True
+        ).first()
+        objective = serializer.validated_data['objective']
+        with transaction.atomic():
+            task = AITask.objects.create(
+                tenant=tenant,
+                requester=request.user,
+                assignee_agent=coordinator,
+                objective=objective,
+                context_data=serializer.validated_data['context_data'],
+                status='in_progress'
+            )
+            AIInteractionLog.objects.create(
+                tenant=tenant,
+                user=request.user,
+                ai_task=task,
+                role='user',
+                message_content=objective
+            )
+        logger.info(f"AI orchestration task created: {task.id} by {request.user.email}")
+        return self.events(task, coordinator)
+    
+    async def events(self, task, coordinator):
+        yield sse_event('task', {'task_id': str(task.id), 'status': task.status})
+        
+        chunks = []
+        try:
+            async for text in stream_gemini_for_ai_agent(
+                prompt=f"Break this objective into coordinated steps, naming the specialist agent best suited to each: {task.objective}",
+                agent_name=coordinator.name if coordinator else 'Orchestrator',
+                agent_personality=coordinator.personality_description if coordinator else 'Coordinates specialist AI agents to reach business objectives.',
+                specialization='General Orchestration',
+                context=task.context_data,
+                tenant_id=str(task.tenant_id)
+            ):
+                chunks.append(text)
+                yield sse_event('token', {'text': text})
+        except Exception as e:
+            logger.error(f"Error streaming AI orchestration task {task.id}: {str(e)}")
+            task.status = 'failed'
+            task.result_data = {'error': str(e)}
+            await sync_to_async(task.save)(update_fields=['status', 'result_data', 'updated_at'])
+            yield sse_event('error', {'error': 'AI orchestration failed', 'message': str(e)})
+            return
+        
+        await sync_to_async(self._complete)(task, coordinator, ''.join(chunks).strip())
+        yield sse_event('done', {'task_id': str(task.id), 'status': 'completed'})
+    
+    def _complete(self, task, coordinator, plan):
+        with transaction.atomic():
+            AIInteractionLog.objects.create(
+                tenant_id=task.tenant_id,
+                ai_profile=coordinator,
+                ai_task=task,
+                role='ai_agent',
+                message_content=plan
+            )
+            task.result_data = {'plan': plan}
+            task.status = 'completed'
+            task.save(update_fields=['status', 'result_data', 'updated_at'])
+
+
 class StructuraInsightViewSet(ModelViewSet):
     """
     ViewSet for managing Structura insights.
@@ -1296,10 +1559,12 @@ def get_quota_status_view(request):
     """
     try:
         from .gemini_utils import get_quota_status
+        from .response_cache import get_cache_stats
         quota_status = get_quota_status()
         
         return Response({
             'quota_status': quota_status,
+            'response_cache': get_cache_stats(),
             'message': 'Current quota status retrieved successfully'
         })
         
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Event, ReportConfiguration, LeadFunnelEvent
+from .models import Event, ReportConfiguration, LeadFunnelEvent, CampaignEventRollup, LeadFunnelDailySnapshot
 
 
 @admin.register(Event)
@@ -11,6 +11,16 @@ class EventAdmin(admin.ModelAdmin):
     ordering = ['-timestamp']
 
 
+@admin.register(CampaignEventRollup)
+class CampaignEventRollupAdmin(admin.ModelAdmin):
+    list_display = ['campaign', 'event_type', 'date', 'event_count', 'unique_contacts', 'value_total', 'tenant']
+    list_filter = ['event_type', 'tenant', 'date']
+    search_fields = ['campaign__name', 'tenant__name']
+    readonly_fields = ['updated_at']
+    ordering = ['-date']
+    list_select_related = ['campaign', 'tenant']
+
+
 @admin.register(ReportConfiguration)
 class ReportConfigurationAdmin(admin.ModelAdmin):
     list_display = ['name', 'tenant', 'created_by', 'configuration_summary', 'created_at']
@@ -28,3 +38,13 @@ class LeadFunnelEventAdmin(admin.ModelAdmin):
     readonly_fields = ['id', 'timestamp', 'event_summary', 'has_campaign_context', 'has_step_context']
     ordering = ['-timestamp']
     list_select_related = ['contact', 'campaign', 'campaign_step', 'tenant']
+
+
+@admin.register(LeadFunnelDailySnapshot)
+class LeadFunnelDailySnapshotAdmin(admin.ModelAdmin):
+    list_display = ['date', 'event_type', 'campaign', 'event_count', 'tenant']
+    list_filter = ['event_type', 'tenant', 'date']
+    search_fields = ['campaign__name', 'tenant__name']
+    readonly_fields = ['created_at']
+    ordering = ['-date']
+    list_select_related = ['campaign', 'tenant']
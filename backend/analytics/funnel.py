@@ -0,0 +1,226 @@
+"""
+Funnel aggregation engine.
+Computes funnel metrics with conditional aggregation so every metric for a
+window comes out of a single scan instead of one COUNT query per metric.
+"""
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import LeadFunnelEvent, LeadFunnelDailySnapshot, LeadFunnelSnapshotDay
+
+logger = logging.getLogger(__name__)
+
+# Windows longer than this are served from daily snapshots when available
+SNAPSHOT_MIN_DAYS = 7
+
+# Funnel progression metric -> LeadFunnelEvent.event_type
+FUNNEL_PROGRESSION = {
+    'mql_count': 'MQL_Achieved',
+    'sql_count': 'SQL_Achieved',
+    'won_count': 'Won_Opportunity',
+    'email_opens': 'Email_Opened',
+    'email_clicks': 'Email_Clicked',
+    'form_submissions': 'Form_Submission',
+}
+
+# Campaign summary metric -> (Event.event_type, count distinct contacts)
+CAMPAIGN_SUMMARY_METRICS = {
+    'total_opens': ('email_opened', True),
+    'total_clicks': ('email_clicked', False),
+    'total_conversions': ('lead_converted', False),
+    'total_sent': ('campaign_sent', False),
+    'total_unsubscribed': ('unsubscribed', False),
+}
+
+FUNNEL_EVENT_TYPES = [choice[0] for choice in LeadFunnelEvent.EVENT_TYPE_CHOICES]
+
+
+def _type_key(event_type: str) -> str:
+    return f'type__{event_type}'
+
+
+def _type_count_aggregates(extra_filter: Optional[Q] = None) -> Dict:
+    """Build one conditional Count per funnel event type."""
+    aggregates = {}
+    for event_type in FUNNEL_EVENT_TYPES:
+        condition = Q(event_type=event_type)
+        if extra_filter is not None:
+            condition &= extra_filter
+        aggregates[_type_key(event_type)] = Count('id', filter=condition)
+    return aggregates
+
+
+def _build_summary(type_counts: Dict[str, int], unique_contacts: int, campaigns_with_events: int) -> Dict:
+    """Shape per-type counts into the funnel_summary response format."""
+    return {
+        'total_events': sum(type_counts.values()),
+        'events_by_type': [
+            {'event_type': event_type, 'count': count}
+            for event_type, count in type_counts.items() if count
+        ],
+        'unique_contacts': unique_contacts,
+        'campaigns_with_events': campaigns_with_events,
+        'funnel_progression': {
+            metric: type_counts.get(event_type, 0)
+            for metric, event_type in FUNNEL_PROGRESSION.items()
+        },
+    }
+
+
+def funnel_summary(queryset, days: int = 30, snapshot_filter: Optional[Dict] = None) -> Dict:
+    """
+    Compute funnel summary metrics for a LeadFunnelEvent queryset.
+
+    Short windows are answered with one conditional-aggregation pass over
+    raw events. Windows longer than SNAPSHOT_MIN_DAYS sum the completed days
+    recorded as snapshotted from LeadFunnelDailySnapshot and only scan raw
+    events for the other days: the partial first day, today, and any day
+    a refresh missed.
+
+    Args:
+        queryset: Tenant-filtered LeadFunnelEvent queryset
+        days: Size of the reporting window in days
+        snapshot_filter: Filter selecting the snapshot rows equivalent to
+            `queryset` (e.g. {'tenant': tenant}); None disables snapshots
+    """
+    start = timezone.now() - timedelta(days=days)
+    window = queryset.filter(timestamp__gte=start)
+
+    first_full_day = timezone.localdate(start) + timedelta(days=1)
+    last_full_day = timezone.localdate() - timedelta(days=1)
+    covered = []
+    if snapshot_filter is not None and days > SNAPSHOT_MIN_DAYS:
+        covered = _snapshot_coverage(snapshot_filter.get('tenant'), first_full_day, last_full_day)
+
+    if not covered:
+        row = window.aggregate(
+            unique_contacts=Count('contact', distinct=True),
+            campaigns_with_events=Count('campaign', distinct=True),
+            **_type_count_aggregates()
+        )
+        type_counts = {event_type: row[_type_key(event_type)] for event_type in FUNNEL_EVENT_TYPES}
+        return _build_summary(type_counts, row['unique_contacts'], row['campaigns_with_events'])
+
+    # Raw events only contribute per-type counts for the days outside the
+    # snapshotted ranges; distinct counts cannot be summed across days so
+    # they still span the whole window.
+    raw_days = Q(timestamp__lt=_day_start(covered[0][0])) | Q(timestamp__gte=_day_start(covered[-1][1] + timedelta(days=1)))
+    for (_, gap_after), (gap_before, _) in zip(covered, covered[1:]):
+        raw_days |= Q(timestamp__gte=_day_start(gap_after + timedelta(days=1)), timestamp__lt=_day_start(gap_before))
+    row = window.aggregate(
+        unique_contacts=Count('contact', distinct=True),
+        campaigns_with_events=Count('campaign', distinct=True),
+        **_type_count_aggregates(raw_days)
+    )
+    type_counts = {event_type: row[_type_key(event_type)] for event_type in FUNNEL_EVENT_TYPES}
+
+    snapshot_days = Q()
+    for first, last in covered:
+        snapshot_days |= Q(date__gte=first, date__lte=last)
+    snapshot_rows = LeadFunnelDailySnapshot.objects.all_tenants().filter(**snapshot_filter).filter(
+        snapshot_days
+    ).values('event_type').annotate(total=Sum('event_count')).order_by()
+    for snapshot in snapshot_rows:
+        type_counts[snapshot['event_type']] = type_counts.get(snapshot['event_type'], 0) + snapshot['total']
+
+    return _build_summary(type_counts, row['unique_contacts'], row['campaigns_with_events'])
+
+
+def funnel_by_campaign(queryset):
+    """Group funnel metrics by campaign in a single grouped query."""
+    return queryset.values('campaign__name').annotate(
+        total_events=Count('id'),
+        unique_contacts=Count('contact', distinct=True),
+        mql_count=Count('id', filter=Q(event_type=FUNNEL_PROGRESSION['mql_count'])),
+        sql_count=Count('id', filter=Q(event_type=FUNNEL_PROGRESSION['sql_count'])),
+        won_count=Count('id', filter=Q(event_type=FUNNEL_PROGRESSION['won_count'])),
+    ).order_by('-total_events')
+
+
+def campaign_event_summary(events) -> Dict[str, int]:
+    """Compute the campaign summary counters for an Event queryset in one pass."""
+    aggregates = {}
+    for metric, (event_type, distinct_contacts) in CAMPAIGN_SUMMARY_METRICS.items():
+        if distinct_contacts:
+            aggregates[metric] = Count('contact', distinct=True, filter=Q(event_type=event_type))
+        else:
+            aggregates[metric] = Count('id', filter=Q(event_type=event_type))
+    return events.aggregate(**aggregates)
+
+
+def _day_start(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _snapshot_coverage(tenant, first_day: date, last_day: date) -> List[Tuple[date, date]]:
+    """
+    Runs of consecutive days from first_day to last_day whose snapshots
+    were computed for the tenant (or for every tenant), oldest first.
+    """
+    days = LeadFunnelSnapshotDay.objects.all_tenants().filter(date__gte=first_day, date__lte=last_day)
+    days = days.filter(Q(tenant__isnull=True) | Q(tenant=tenant)) if tenant is not None else days.filter(tenant__isnull=True)
+    runs = []
+    for day in sorted(set(days.values_list('date', flat=True))):
+        if runs and runs[-1][1] == day - timedelta(days=1):
+            runs[-1] = (runs[-1][0], day)
+        else:
+            runs.append((day, day))
+    return runs
+
+
+def refresh_funnel_snapshots(tenant=None, days: int = 2) -> int:
+    """
+    Recompute daily funnel snapshots for the last `days` completed days.
+
+    Re-running is safe: rows for the refreshed days are replaced, and the
+    days are recorded as snapshotted. The refresh_lead_funnel_snapshots
+    task runs this daily; use a larger `days` to backfill history. Returns
+    the number of snapshot rows written.
+    """
+    today = timezone.localdate()
+    first_day = today - timedelta(days=days)
+    range_start = timezone.make_aware(datetime.combine(first_day, time.min))
+    range_end = timezone.make_aware(datetime.combine(today, time.min))
+
+    events = LeadFunnelEvent.objects.all_tenants().filter(
+        timestamp__gte=range_start,
+        timestamp__lt=range_end,
+    )
+    snapshots = LeadFunnelDailySnapshot.objects.all_tenants().filter(
+        date__gte=first_day,
+        date__lt=today,
+    )
+    if tenant is not None:
+        events = events.filter(tenant=tenant)
+        snapshots = snapshots.filter(tenant=tenant)
+
+    grouped = events.annotate(day=TruncDate('timestamp')).values(
+        'tenant_id', 'campaign_id', 'day', 'event_type'
+    ).annotate(event_count=Count('id')).order_by()
+
+    rows = [
+        LeadFunnelDailySnapshot(
+            tenant_id=row['tenant_id'],
+            campaign_id=row['campaign_id'],
+            date=row['day'],
+            event_type=row['event_type'],
+            event_count=row['event_count'],
+        )
+        for row in grouped
+    ]
+    snapshot_days = LeadFunnelSnapshotDay.objects.all_tenants().filter(date__gte=first_day, date__lt=today, tenant=tenant)
+    with transaction.atomic():
+        snapshots.delete()
+        LeadFunnelDailySnapshot.objects.bulk_create(rows, batch_size=1000)
+        # Recorded even for days without events, which have no snapshot rows
+        snapshot_days.delete()
+        LeadFunnelSnapshotDay.objects.bulk_create(
+            LeadFunnelSnapshotDay(tenant=tenant, date=first_day + timedelta(days=offset)) for offset in range(days)
+        )
+
+    logger.info(f"Refreshed {len(rows)} lead funnel snapshot rows for {days} days")
+    return len(rows)
@@ -0,0 +1,547 @@
+"""
+Batched event ingestion.
+Clients POST newline-delimited JSON (one event per line) to an ingest
+endpoint. Lines are validated against a small per-stream schema rather
+than a DRF serializer, references are checked with one query per chunk,
+and valid events are written with bulk_create in fixed-size chunks.
+
+When EVENT_INGEST_REDIS_URL is configured, validated events are appended
+to a Redis list instead and the flush_event_ingest_buffers task writes
+them out; requests are refused with 429 while the buffer is full.
+
+Delivery is at least once: an event carrying an idempotency_key is stored
+once per tenant and key however often it is sent, and buffered events keep
+the id they were given at validation, so re-flushing a chunk after a crash
+doesn't duplicate it.
+"""
+import json
+import logging
+import uuid
+from dataclasses import dataclass, field
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from campaigns.models import MarketingCampaign, CampaignStep
+from core.helpers import LineErrors, chunks
+from core.models import Contact, Campaign
+from .models import Event, LeadFunnelEvent, CampaignEventRollup
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis is optional
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+INGEST_CHUNK_SIZE = 500
+MAX_BODY_BYTES = 20 * 1024 * 1024
+MAX_BUFFERED_EVENTS = 1_000_000
+
+# Events are accepted up to this far in the future (client clock skew) and
+# back in the past; older days are already folded into daily snapshots
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+MAX_EVENT_AGE = timedelta(days=1)
+
+MAX_IDEMPOTENCY_KEY_LENGTH = 64
+
+# Seconds a client is asked to wait when the buffer is full
+RETRY_AFTER_SECONDS = 5
+
+
+class IngestError(ValueError):
+    """An event line failed validation."""
+
+
+@dataclass(frozen=True)
+class IngestStream:
+    """Schema of one ingestible event model."""
+    model: Any
+    event_types: frozenset
+    json_fields: Tuple[str, ...]
+    # Reference field -> (model, whether it belongs to the tenant)
+    references: Dict[str, Tuple[Any, bool]]
+    required: Tuple[str, ...] = ()
+    has_value: bool = False
+
+
+def _choices(model) -> frozenset:
+    return frozenset(choice for choice, _ in model.EVENT_TYPE_CHOICES)
+
+
+STREAMS: Dict[str, IngestStream] = {
+    'events': IngestStream(
+        model=Event,
+        event_types=_choices(Event),
+        json_fields=('details', 'metadata'),
+        references={'contact': (Contact, True), 'campaign': (Campaign, True)},
+        has_value=True,
+    ),
+    'lead_funnel_events': IngestStream(
+        model=LeadFunnelEvent,
+        event_types=_choices(LeadFunnelEvent),
+        json_fields=('event_data',),
+        references={
+            'contact': (Contact, True),
+            'campaign': (MarketingCampaign, False),
+            'campaign_step': (CampaignStep, False),
+        },
+        required=('contact',),
+    ),
+}
+
+
+@dataclass
+class IngestResult(LineErrors):
+    received: int = 0
+    accepted: int = 0
+    duplicates: int = 0
+    buffered: int = 0
+    rejected: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+
+    def as_dict(self, buffered: bool = False) -> Dict[str, Any]:
+        counts = {'received': self.received}
+        if buffered:
+            counts['buffered'] = self.buffered
+        else:
+            counts.update(accepted=self.accepted, duplicates=self.duplicates)
+        return {**counts, 'rejected': self.rejected, 'errors': self.errors}
+
+
+_redis_client = None
+
+
+def get_redis_client():
+    """Return the ingest buffer Redis client, or None when events are written directly."""
+    global _redis_client
+    url = getattr(settings, 'EVENT_INGEST_REDIS_URL', None)
+    if not url or redis is None:
+        return None
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(url)
+    return _redis_client
+
+
+def _buffer_key(stream: str) -> str:
+    return f"ingest:{stream}"
+
+
+def _chunk_size() -> int:
+    return getattr(settings, 'EVENT_INGEST_CHUNK_SIZE', INGEST_CHUNK_SIZE)
+
+
+def iter_lines(fileobj: IO) -> Iterator[Tuple[int, Any]]:
+    """Yield (line number, decoded JSON or the decode error) for each non-blank line."""
+    for line_number, line in enumerate(fileobj, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, e
+
+
+def _clean_timestamp(value, now):
+    if value is None:
+        return now
+    timestamp = parse_datetime(value) if isinstance(value, str) else None
+    if timestamp is None:
+        raise IngestError("timestamp must be an ISO 8601 datetime")
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp)
+    if timestamp > now + MAX_CLOCK_SKEW:
+        raise IngestError("timestamp is in the future")
+    if timestamp < now - MAX_EVENT_AGE:
+        raise IngestError("timestamp is too old to ingest")
+    return timestamp
+
+
+def clean_event(spec: IngestStream, record: Any, tenant_id, now) -> Dict[str, Any]:
+    """
+    Validate one decoded line and return its row, in a JSON-safe form so
+    it can be buffered as is.
+
+    Raises:
+        IngestError: If the line can't be ingested
+    """
+    if isinstance(record, Exception):
+        raise IngestError(f"Invalid JSON: {record}")
+    if not isinstance(record, dict):
+        raise IngestError("Each line must be a JSON object")
+
+    event_type = record.get('event_type')
+    if event_type not in spec.event_types:
+        raise IngestError(f"Unknown event_type: {event_type!r}")
+
+    key = record.get('idempotency_key')
+    if key is not None:
+        if not isinstance(key, str) or not key or len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            raise IngestError(f"idempotency_key must be a string of 1 to {MAX_IDEMPOTENCY_KEY_LENGTH} characters")
+
+    row = {
+        'id': str(uuid.uuid4()),
+        'tenant_id': str(tenant_id),
+        'event_type': event_type,
+        'timestamp': _clean_timestamp(record.get('timestamp'), now).isoformat(),
+        'idempotency_key': key,
+    }
+    for name, (model, _) in spec.references.items():
+        value = record.get(name)
+        if value is not None:
+            try:
+                value = model._meta.pk.to_python(value)
+            except ValidationError:
+                raise IngestError(f"{name} is not a valid id")
+            value = str(value)
+        elif name in spec.required:
+            raise IngestError(f"{name} is required")
+        row[name] = value
+    for name in spec.json_fields:
+        value = record.get(name) or {}
+        if not isinstance(value, dict):
+            raise IngestError(f"{name} must be an object")
+        row[name] = value
+    if spec.has_value:
+        value = record.get('value')
+        if value is not None:
+            try:
+                value = Decimal(str(value))
+            except InvalidOperation:
+                raise IngestError("value must be a number")
+            if not value.is_finite() or value < 0 or value >= Decimal('1e8'):
+                raise IngestError("value must be between 0 and 99999999.99")
+            value = str(value.quantize(Decimal('0.01')))
+        row['value'] = value
+    return row
+
+
+def _existing_references(spec: IngestStream, rows: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Map each reference field to {id: (tenant_id or None, row data)} for the ids that exist."""
+    found = {}
+    for name, (model, tenant_scoped) in spec.references.items():
+        ids = {row[name] for row in rows if row.get(name) is not None}
+        columns = ['pk']
+        if tenant_scoped:
+            columns.append('tenant_id')
+        if model is CampaignStep:
+            columns.append('campaign_id')
+        manager = getattr(model.objects, 'all_tenants', model.objects.all)()
+        found[name] = {
+            str(values[0]): values[1:]
+            for values in manager.filter(pk__in=ids).values_list(*columns)
+        } if ids else {}
+    return found
+
+
+def _reference_error(spec: IngestStream, row: Dict[str, Any], found) -> Optional[str]:
+    for name, (model, tenant_scoped) in spec.references.items():
+        value = row.get(name)
+        if value is None:
+            continue
+        match = found[name].get(value)
+        if match is None or (tenant_scoped and str(match[0]) != row['tenant_id']):
+            return f"{name} {value} not found"
+        if model is CampaignStep and row.get('campaign') and str(match[-1]) != row['campaign']:
+            return "campaign_step does not belong to campaign"
+    return None
+
+
+def check_references(spec: IngestStream, rows: List[Tuple[int, Dict[str, Any]]], result: IngestResult) -> List[Dict[str, Any]]:
+    """Drop rows that reference missing or other tenants' objects, recording an error for each."""
+    found = _existing_references(spec, [row for _, row in rows])
+    valid = []
+    for line_number, row in rows:
+        error = _reference_error(spec, row, found)
+        if error:
+            result.add_error(line_number, error)
+        else:
+            valid.append(row)
+    return valid
+
+
+def _without_dangling_references(spec: IngestStream, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Re-check buffered rows before writing: objects deleted since the rows
+    were validated are cleared from nullable references, and rows whose
+    required reference is gone are dropped.
+    """
+    found = _existing_references(spec, rows)
+    kept = []
+    for row in rows:
+        for name in spec.references:
+            if row.get(name) is not None and row[name] not in found[name]:
+                if name in spec.required:
+                    break
+                row[name] = None
+        else:
+            kept.append(row)
+    if len(kept) < len(rows):
+        logger.warning(f"Dropped {len(rows) - len(kept)} buffered events whose contact was deleted")
+    return kept
+
+
+def _build(spec: IngestStream, row: Dict[str, Any]):
+    values = {
+        'id': uuid.UUID(row['id']),
+        'tenant_id': uuid.UUID(row['tenant_id']),
+        'event_type': row['event_type'],
+        'timestamp': parse_datetime(row['timestamp']),
+        'idempotency_key': row.get('idempotency_key'),
+    }
+    for name, (model, _) in spec.references.items():
+        value = row.get(name)
+        values[f'{name}_id'] = model._meta.pk.to_python(value) if value is not None else None
+    for name in spec.json_fields:
+        values[name] = row.get(name) or {}
+    if spec.has_value:
+        values['value'] = Decimal(row['value']) if row.get('value') is not None else None
+    return spec.model(**values)
+
+
+def write_events(stream: str, rows: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """
+    Insert validated rows, skipping ids and idempotency keys already stored.
+
+    Returns:
+        (inserted, duplicates)
+    """
+    spec = STREAMS[stream]
+    model = spec.model
+    events = [_build(spec, row) for row in rows]
+    if not events:
+        return 0, 0
+
+    keys = {event.idempotency_key for event in events if event.idempotency_key}
+    stored = Q(id__in=[event.id for event in events])
+    if keys:
+        stored |= Q(idempotency_key__in=keys)
+    seen_ids, seen_keys = set(), set()
+    for event_id, tenant_id, key in model.objects.all_tenants().filter(stored).values_list('id', 'tenant_id', 'idempotency_key'):
+        seen_ids.add(event_id)
+        if key:
+            seen_keys.add((tenant_id, key))
+
+    fresh = []
+    for event in events:
+        key = (event.tenant_id, event.idempotency_key)
+        if event.id in seen_ids or key in seen_keys:
+            continue
+        if event.idempotency_key:
+            seen_keys.add(key)
+        fresh.append(event)
+
+    with transaction.atomic():
+        # ignore_conflicts covers a concurrent request inserting the same key
+        # between the lookup above and this insert
+        model.objects.bulk_create(fresh, ignore_conflicts=True)
+        inserted_ids = set(model.objects.all_tenants().filter(id__in=[event.id for event in fresh]).values_list('id', flat=True))
+        inserted = [event for event in fresh if event.id in inserted_ids]
+        if model is Event:
+            CampaignEventRollup.record_events(inserted)
+    return len(inserted), len(events) - len(inserted)
+
+
+def ingest_events(tenant, stream: str, fileobj: IO, chunk_size: Optional[int] = None) -> IngestResult:
+    """
+    Validate an NDJSON stream of events for a tenant and write or buffer it
+    chunk by chunk.
+
+    Args:
+        tenant: Tenant the events belong to
+        stream: Key of STREAMS
+        fileobj: Binary or text file yielding one JSON object per line
+        chunk_size: Events validated and written per batch
+
+    Returns:
+        IngestResult with counts and the first line errors
+    """
+    spec = STREAMS[stream]
+    chunk_size = chunk_size or _chunk_size()
+    client = get_redis_client()
+    result = IngestResult()
+    now = timezone.now()
+
+    for chunk in chunks(iter_lines(fileobj), chunk_size):
+        rows = []
+        for line_number, record in chunk:
+            result.received += 1
+            try:
+                rows.append((line_number, clean_event(spec, record, tenant.id, now)))
+            except IngestError as e:
+                result.add_error(line_number, str(e))
+        valid = check_references(spec, rows, result) if rows else []
+        if not valid:
+            continue
+        if client is not None:
+            client.rpush(_buffer_key(stream), *[json.dumps(row) for row in valid])
+            result.buffered += len(valid)
+        else:
+            inserted, duplicates = write_events(stream, valid)
+            result.accepted += inserted
+            result.duplicates += duplicates
+    return result
+
+
+def buffer_is_full(stream: str) -> bool:
+    """Whether the Redis buffer has reached EVENT_INGEST_MAX_BUFFERED; always False without Redis."""
+    client = get_redis_client()
+    if client is None:
+        return False
+    limit = getattr(settings, 'EVENT_INGEST_MAX_BUFFERED', MAX_BUFFERED_EVENTS)
+    return client.llen(_buffer_key(stream)) >= limit
+
+
+# Moves up to ARGV[1] events from the head of the buffer to the tail of a
+# processing list in one step, so no two flushers can claim the same event.
+# Returns nil unless the flush lock (KEYS[3]) still holds token ARGV[2].
+_CLAIM_SCRIPT = """
+if redis.call('GET', KEYS[3]) ~= ARGV[2] then
+    return nil
+end
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items > 0 then
+    redis.call('LTRIM', KEYS[1], #items, -1)
+    for _, item in ipairs(items) do
+        redis.call('RPUSH', KEYS[2], item)
+    end
+end
+return items
+"""
+
+# Puts a processing list back at the head of the buffer, in order
+_RESTORE_SCRIPT = """
+local items = redis.call('LRANGE', KEYS[1], 0, -1)
+for i = #items, 1, -1 do
+    redis.call('LPUSH', KEYS[2], items[i])
+end
+redis.call('DEL', KEYS[1])
+return #items
+"""
+
+# Seconds a flusher holds its lock without finishing a chunk
+FLUSH_LOCK_TIMEOUT = 300
+
+# Chunks written per flush run; the next run carries on with the rest
+FLUSH_MAX_CHUNKS = 20
+
+
+def _restore_abandoned(client, key: str) -> int:
+    """
+    Return events claimed by flushers that lost their lock, before writing
+    them, to the buffer. Their ids are kept, so rows that did get written
+    are skipped when flushed again.
+    """
+    restored = 0
+    restore = client.register_script(_RESTORE_SCRIPT)
+    for processing in client.smembers(f"{key}:processing"):
+        restored += restore(keys=[processing, key])
+        client.srem(f"{key}:processing", processing)
+    if restored:
+        logger.warning(f"Restored {restored} events claimed by an interrupted {key} flush")
+    return restored
+
+
+def flush_buffer(stream: str, chunk_size: Optional[int] = None, max_chunks: Optional[int] = None) -> int:
+    """
+    Write buffered events to the database in chunks.
+
+    One flusher runs per stream, under a lock it extends after every chunk.
+    Each chunk is claimed atomically, and only while the lock is held, into
+    the flusher's own processing list and dropped from it once written; a
+    flusher that loses its lock stops, and the next one puts its unwritten
+    claims back in the buffer.
+
+    Returns:
+        Number of events inserted
+    """
+    client = get_redis_client()
+    if client is None:
+        return 0
+    key = _buffer_key(stream)
+    chunk_size = chunk_size or _chunk_size()
+    lock = client.lock(f"{key}:flush", timeout=FLUSH_LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        return 0
+
+    processing = f"{key}:processing:{uuid.uuid4().hex}"
+    claim = client.register_script(_CLAIM_SCRIPT)
+    inserted = chunks = 0
+    owned = True
+    try:
+        _restore_abandoned(client, key)
+        client.sadd(f"{key}:processing", processing)
+        while max_chunks is None or chunks < max_chunks:
+            raw = claim(keys=[key, processing, lock.name], args=[chunk_size, lock.local.token])
+            if raw is None:
+                raise redis.exceptions.LockNotOwnedError(f"{lock.name} expired")
+            if not raw:
+                break
+            rows = _without_dangling_references(STREAMS[stream], [json.loads(item) for item in raw])
+            inserted += write_events(stream, rows)[0]
+            client.delete(processing)
+            chunks += 1
+            # Raises LockNotOwnedError once the lock has expired
+            lock.extend(FLUSH_LOCK_TIMEOUT, replace_ttl=True)
+        client.srem(f"{key}:processing", processing)
+    except redis.exceptions.LockError:
+        owned = False
+        logger.warning(f"Lost the {key} flush lock; stopping after {chunks} chunks")
+    finally:
+        # A chunk that failed to write stays registered and is restored next run
+        if owned:
+            lock.release()
+    if inserted:
+        logger.info(f"Flushed {inserted} buffered {stream}")
+    return inserted
+
+
+class IngestActionMixin:
+    """
+    Adds a POST `ingest` action taking an NDJSON batch of events.
+
+    Set `ingest_stream` to a key of STREAMS. Each line is an object with
+    event_type and optionally timestamp, idempotency_key, the stream's
+    reference ids and JSON fields. Bodies larger than
+    EVENT_INGEST_MAX_BYTES are refused with 413.
+    """
+    ingest_stream = None
+
+    @action(detail=False, methods=['post'])
+    def ingest(self, request):
+        tenant = getattr(request.user, 'tenant', None)
+        if tenant is None:
+            return Response({'error': 'User is not associated with a tenant'}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_bytes = getattr(settings, 'EVENT_INGEST_MAX_BYTES', MAX_BODY_BYTES)
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = 0
+        if content_length > max_bytes:
+            return Response(
+                {'error': f'Request body exceeds {max_bytes} bytes; split the batch'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+        if buffer_is_full(self.ingest_stream):
+            return Response(
+                {'error': 'Event buffer is full; retry later'},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={'Retry-After': str(RETRY_AFTER_SECONDS)}
+            )
+
+        result = ingest_events(tenant, self.ingest_stream, request.stream or [])
+        buffered = get_redis_client() is not None
+        return Response(
+            result.as_dict(buffered=buffered),
+            status=status.HTTP_202_ACCEPTED if buffered else status.HTTP_200_OK
+        )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from analytics.partitions import apply_event_retention
+
+
+class Command(BaseCommand):
+    help = 'Roll up analytics events older than the retention window into the campaign rollups and remove them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int,
+                            help='Whole months to keep besides the current one (default: EVENT_RETENTION_MONTHS)')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be removed without changing anything')
+
+    def handle(self, *args, **options):
+        summary = apply_event_retention(months=options['months'], dry_run=options['dry_run'])
+        prefix = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(
+            f"{prefix} events before {summary['cutoff']}: "
+            f"{len(summary['dropped_partitions'])} partitions, {summary['deleted_events']} events"
+        )
+        if not options['dry_run']:
+            self.stdout.write(
+                self.style.SUCCESS(f"Successfully rebuilt {summary['rollup_rows']} rollup rows")
+            )
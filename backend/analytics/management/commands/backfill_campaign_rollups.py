@@ -0,0 +1,39 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core.models import Tenant
+from analytics.rollups import rebuild_campaign_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the campaign event rollup table from raw events'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=str, help='Only rebuild rollups for this tenant id')
+        parser.add_argument('--days', type=int, help='Only rebuild the last N days (default: all history)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        tenant = None
+        if options['tenant']:
+            try:
+                tenant = Tenant.objects.get(id=options['tenant'])
+            except (Tenant.DoesNotExist, ValueError):
+                raise CommandError(f"Tenant {options['tenant']} not found")
+
+        since = None
+        if options['days']:
+            since = timezone.localdate() - timedelta(days=options['days'])
+
+        scope = tenant.name if tenant else 'all tenants'
+        self.stdout.write(f"Rebuilding campaign event rollups for {scope}...")
+
+        written = rebuild_campaign_rollups(
+            tenant=tenant,
+            since=since,
+            batch_size=options['batch_size'],
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully wrote {written} rollup rows')
+        )
@@ -0,0 +1,52 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from analytics.partitions import (
+    MONTHS_AHEAD, PartitioningError, attach_partition, convert_to_partitioned,
+    detach_partition, drop_partition, ensure_partitions, list_partitions,
+)
+
+
+class Command(BaseCommand):
+    help = 'Manage monthly partitions of the analytics events table (PostgreSQL only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'action', choices=['convert', 'create', 'list', 'detach', 'attach', 'drop'],
+            help='convert the table once, create upcoming partitions, list them, '
+                 'or detach/attach/drop the partition for --month'
+        )
+        parser.add_argument('--month', type=str, help='Partition month as YYYY-MM (detach, attach, drop)')
+        parser.add_argument('--months-ahead', type=int, default=MONTHS_AHEAD,
+                            help=f'Months of partitions to create ahead (default: {MONTHS_AHEAD})')
+
+    def _month(self, options):
+        if not options['month']:
+            raise CommandError(f"--month is required for {options['action']}")
+        try:
+            return datetime.strptime(options['month'], '%Y-%m').date()
+        except ValueError:
+            raise CommandError(f"Invalid month {options['month']}; use YYYY-MM")
+
+    def handle(self, *args, **options):
+        action = options['action']
+        try:
+            if action == 'convert':
+                self.stdout.write("Converting the events table to monthly partitions...")
+                copied = convert_to_partitioned(months_ahead=options['months_ahead'])
+                self.stdout.write(self.style.SUCCESS(f'Successfully copied {copied} events into partitions'))
+            elif action == 'create':
+                created = ensure_partitions(months_ahead=options['months_ahead'])
+                self.stdout.write(self.style.SUCCESS(f"Created {len(created)} partitions"))
+            elif action == 'list':
+                for partition in list_partitions():
+                    self.stdout.write(f"{partition.name}\t{partition.month or 'default'}")
+            else:
+                handler, done = {
+                    'detach': (detach_partition, 'Detached'),
+                    'attach': (attach_partition, 'Attached'),
+                    'drop': (drop_partition, 'Dropped'),
+                }[action]
+                name = handler(self._month(options))
+                self.stdout.write(self.style.SUCCESS(f"{done} {name}"))
+        except PartitioningError as e:
+            raise CommandError(str(e))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Tenant
+from analytics.funnel import refresh_funnel_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Recompute daily lead funnel snapshots used for long reporting windows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=str, help='Only refresh snapshots for this tenant id')
+        parser.add_argument('--days', type=int, default=2, help='Number of completed days to recompute (default: 2)')
+
+    def handle(self, *args, **options):
+        tenant = None
+        if options['tenant']:
+            try:
+                tenant = Tenant.objects.get(id=options['tenant'])
+            except (Tenant.DoesNotExist, ValueError):
+                raise CommandError(f"Tenant {options['tenant']} not found")
+
+        self.stdout.write(f"Refreshing lead funnel snapshots for the last {options['days']} days...")
+
+        written = refresh_funnel_snapshots(tenant=tenant, days=options['days'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully wrote {written} snapshot rows')
+        )
@@ -0,0 +1,35 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0005_event_metadata_event_value_alter_event_id_and_more'),
+        ('core', '0020_agencyclientportal_agencyclientbilling_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CampaignEventRollup',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('event_type', models.CharField(choices=[('email_sent', 'Email Sent'), ('email_opened', 'Email Opened'), ('email_clicked', 'Email Clicked'), ('social_post_viewed', 'Social Post Viewed'), ('social_post_clicked', 'Social Post Clicked'), ('lead_converted', 'Lead Converted'), ('conversion_event', 'Conversion Event'), ('campaign_sent', 'Campaign Sent'), ('form_submitted', 'Form Submitted'), ('unsubscribed', 'Unsubscribed'), ('sms_sent', 'SMS Sent'), ('sms_delivered', 'SMS Delivered'), ('sms_clicked', 'SMS Clicked')], max_length=50)),
+                ('date', models.DateField()),
+                ('event_count', models.IntegerField(default=0)),
+                ('unique_contacts', models.IntegerField(default=0, help_text='Distinct contacts with this event type on this day')),
+                ('value_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='event_rollups', to='core.campaign')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.tenant')),
+            ],
+            options={
+                'verbose_name': 'Campaign Event Rollup',
+                'verbose_name_plural': 'Campaign Event Rollups',
+                'db_table': 'campaign_event_rollups',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['tenant', 'date'], name='campaign_ev_tenant__d7bdd3_idx')],
+                'unique_together': {('campaign', 'event_type', 'date')},
+            },
+        ),
+    ]
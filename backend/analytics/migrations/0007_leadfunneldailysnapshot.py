@@ -0,0 +1,34 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0006_campaigneventrollup'),
+        ('campaigns', '0008_fix_production_schema'),
+        ('core', '0020_agencyclientportal_agencyclientbilling_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeadFunnelDailySnapshot',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('event_type', models.CharField(choices=[('MQL_Achieved', 'MQL Achieved'), ('SQL_Achieved', 'SQL Achieved'), ('Won_Opportunity', 'Won Opportunity'), ('Campaign_Touchpoint', 'Campaign Touchpoint'), ('Form_Submission', 'Form Submission'), ('Page_Visit', 'Page Visit'), ('Email_Opened', 'Email Opened'), ('Email_Clicked', 'Email Clicked')], max_length=100)),
+                ('event_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('campaign', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='campaigns.marketingcampaign')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.tenant')),
+            ],
+            options={
+                'verbose_name': 'Lead Funnel Daily Snapshot',
+                'verbose_name_plural': 'Lead Funnel Daily Snapshots',
+                'db_table': 'lead_funnel_daily_snapshots',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['tenant', 'date'], name='lead_funnel_tenant__ada477_idx')],
+                'unique_together': {('tenant', 'campaign', 'date', 'event_type')},
+            },
+        ),
+    ]
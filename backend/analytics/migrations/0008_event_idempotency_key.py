@@ -0,0 +1,40 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0007_leadfunneldailysnapshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='event',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='leadfunnelevent',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='idempotency_key',
+            field=models.CharField(blank=True, editable=False, help_text='Client-supplied key; an ingested event is stored once per key', max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='leadfunnelevent',
+            name='idempotency_key',
+            field=models.CharField(blank=True, editable=False, help_text='Client-supplied key; an ingested event is stored once per key', max_length=64, null=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='event',
+            unique_together={('tenant', 'idempotency_key')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='leadfunnelevent',
+            unique_together={('tenant', 'idempotency_key')},
+        ),
+    ]
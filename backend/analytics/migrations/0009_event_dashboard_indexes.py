@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0008_event_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['tenant', 'event_type', 'timestamp'], name='events_tenant__bb73fd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['tenant', 'campaign', 'event_type', 'timestamp'], name='events_tenant__c93a9c_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0009_event_dashboard_indexes'),
+        ('core', '0020_agencyclientportal_agencyclientbilling_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeadFunnelSnapshotDay',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.tenant')),
+            ],
+            options={
+                'verbose_name': 'Lead Funnel Snapshot Day',
+                'verbose_name_plural': 'Lead Funnel Snapshot Days',
+                'db_table': 'lead_funnel_snapshot_days',
+                'indexes': [models.Index(fields=['date', 'tenant'], name='lead_funnel_date_e88505_idx')],
+            },
+        ),
+    ]
@@ -1,6 +1,9 @@
 import uuid
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
+from django.db.models.functions import TruncDate
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from core.models import Tenant, Contact, Campaign
 from core.managers import TenantAwareManager
 from accounts.models import CustomUser
@@ -32,12 +35,16 @@ class Event(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE)
     event_type = models.CharField(max_length=50, choices=EVENT_TYPE_CHOICES)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     contact = models.ForeignKey(Contact, on_delete=models.SET_NULL, null=True, blank=True)
     campaign = models.ForeignKey(Campaign, on_delete=models.SET_NULL, null=True, blank=True)
     value = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, validators=[MinValueValidator(0)])
     details = models.JSONField(default=dict, blank=True)
     metadata = models.JSONField(default=dict, blank=True)
+    idempotency_key = models.CharField(
+        max_length=64, null=True, blank=True, editable=False,
+        help_text="Client-supplied key; an ingested event is stored once per key"
+    )
 
     objects = TenantAwareManager()
 
@@ -46,10 +53,23 @@ class Event(models.Model):
         verbose_name = 'Event'
         verbose_name_plural = 'Events'
         ordering = ['-timestamp']
+        unique_together = ['tenant', 'idempotency_key']
+        indexes = [
+            # Dashboard filters: per type over a time window, and per campaign
+            models.Index(fields=['tenant', 'event_type', 'timestamp']),
+            models.Index(fields=['tenant', 'campaign', 'event_type', 'timestamp']),
+        ]
 
     def __str__(self):
         return f"{self.event_type} ({self.tenant.name}) at {self.timestamp}"
 
+    def save(self, *args, **kwargs):
+        """Override save to keep the campaign event rollup in step with inserts."""
+        is_new = self._state.adding
+        super().save(*args, **kwargs)
+        if is_new and self.campaign_id:
+            CampaignEventRollup.record_event(self)
+
     @property
     def has_value(self):
         """Check if the event has a monetary value."""
@@ -68,6 +88,120 @@ class Event(models.Model):
         return summary
 
 
+class CampaignEventRollup(models.Model):
+    """
+    Pre-aggregated per-day event counts for a campaign.
+    Maintained incrementally on Event insert and rebuilt by the
+    backfill_campaign_rollups management command.
+    """
+    id = models.BigAutoField(primary_key=True)
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE)
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name='event_rollups')
+    event_type = models.CharField(max_length=50, choices=Event.EVENT_TYPE_CHOICES)
+    date = models.DateField()
+    event_count = models.IntegerField(default=0)
+    unique_contacts = models.IntegerField(default=0, help_text="Distinct contacts with this event type on this day")
+    value_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TenantAwareManager()
+
+    class Meta:
+        db_table = 'campaign_event_rollups'
+        verbose_name = 'Campaign Event Rollup'
+        verbose_name_plural = 'Campaign Event Rollups'
+        ordering = ['-date']
+        unique_together = ['campaign', 'event_type', 'date']
+        indexes = [
+            models.Index(fields=['tenant', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.campaign_id} {self.event_type} on {self.date}: {self.event_count}"
+
+    @classmethod
+    def record_event(cls, event):
+        """Add a single newly inserted event to its day's rollup row."""
+        day = timezone.localdate(event.timestamp)
+        is_new_contact = bool(event.contact_id) and not Event.objects.all_tenants().filter(
+            campaign_id=event.campaign_id,
+            contact_id=event.contact_id,
+            event_type=event.event_type,
+            timestamp__date=day,
+        ).exclude(pk=event.pk).exists()
+
+        cls._increment(
+            event.tenant_id,
+            {'campaign_id': event.campaign_id, 'event_type': event.event_type, 'date': day},
+            count=1, new_contacts=int(is_new_contact), value=event.value or 0
+        )
+
+    @classmethod
+    def record_events(cls, events):
+        """
+        Add a batch of newly inserted events to their days' rollup rows,
+        with one UPDATE per (campaign, event type, day) instead of per event.
+        """
+        events = [event for event in events if event.campaign_id]
+        if not events:
+            return
+
+        groups = {}
+        for event in events:
+            key = (event.campaign_id, event.event_type, timezone.localdate(event.timestamp))
+            group = groups.setdefault(key, {'tenant_id': event.tenant_id, 'count': 0, 'contacts': set(), 'value': 0})
+            group['count'] += 1
+            group['value'] += event.value or 0
+            if event.contact_id:
+                group['contacts'].add(event.contact_id)
+
+        # (campaign, event type, day, contact) already counted before this batch
+        contact_ids = set().union(*(group['contacts'] for group in groups.values()))
+        counted = set()
+        if contact_ids:
+            counted = set(Event.objects.all_tenants().filter(
+                campaign_id__in={key[0] for key in groups},
+                event_type__in={key[1] for key in groups},
+                timestamp__date__in={key[2] for key in groups},
+                contact_id__in=contact_ids,
+            ).exclude(pk__in=[event.pk for event in events]).annotate(
+                day=TruncDate('timestamp')
+            ).values_list('campaign_id', 'event_type', 'day', 'contact_id').distinct())
+
+        for (campaign_id, event_type, day), group in groups.items():
+            new_contacts = sum(
+                (campaign_id, event_type, day, contact_id) not in counted
+                for contact_id in group['contacts']
+            )
+            cls._increment(
+                group['tenant_id'],
+                {'campaign_id': campaign_id, 'event_type': event_type, 'date': day},
+                count=group['count'], new_contacts=new_contacts, value=group['value']
+            )
+
+    @classmethod
+    def _increment(cls, tenant_id, lookup, count, new_contacts, value):
+        increments = {
+            'event_count': F('event_count') + count,
+            'unique_contacts': F('unique_contacts') + new_contacts,
+            'value_total': F('value_total') + value,
+        }
+        if cls.objects.all_tenants().filter(**lookup).update(**increments):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    tenant_id=tenant_id,
+                    event_count=count,
+                    unique_contacts=new_contacts,
+                    value_total=value,
+                    **lookup
+                )
+        except IntegrityError:
+            # Another worker created the row first; fall back to incrementing it
+            cls.objects.all_tenants().filter(**lookup).update(**increments)
+
+
 class ReportConfiguration(models.Model):
     """
     Model for storing saved report configurations and custom analytics setups.
@@ -136,7 +270,11 @@ class LeadFunnelEvent(models.Model):
     campaign = models.ForeignKey(MarketingCampaign, on_delete=models.SET_NULL, null=True, blank=True)
     campaign_step = models.ForeignKey(CampaignStep, on_delete=models.SET_NULL, null=True, blank=True)
     event_data = models.JSONField(default=dict, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
+    idempotency_key = models.CharField(
+        max_length=64, null=True, blank=True, editable=False,
+        help_text="Client-supplied key; an ingested event is stored once per key"
+    )
 
     objects = TenantAwareManager()
 
@@ -145,6 +283,7 @@ class LeadFunnelEvent(models.Model):
         verbose_name = 'Lead Funnel Event'
         verbose_name_plural = 'Lead Funnel Events'
         ordering = ['-timestamp']
+        unique_together = ['tenant', 'idempotency_key']
         indexes = [
             models.Index(fields=['tenant', 'event_type']),
             models.Index(fields=['contact', 'event_type']),
@@ -176,6 +315,61 @@ class LeadFunnelEvent(models.Model):
         return self.campaign_step is not None
 
 
+class LeadFunnelDailySnapshot(models.Model):
+    """
+    Materialized per-day lead funnel event counts.
+    Used by the funnel aggregation engine for long reporting windows so that
+    completed days are summed from this compact table instead of raw events.
+    """
+    id = models.BigAutoField(primary_key=True)
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE)
+    campaign = models.ForeignKey(MarketingCampaign, on_delete=models.CASCADE, null=True, blank=True)
+    date = models.DateField()
+    event_type = models.CharField(max_length=100, choices=LeadFunnelEvent.EVENT_TYPE_CHOICES)
+    event_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TenantAwareManager()
+
+    class Meta:
+        db_table = 'lead_funnel_daily_snapshots'
+        verbose_name = 'Lead Funnel Daily Snapshot'
+        verbose_name_plural = 'Lead Funnel Daily Snapshots'
+        ordering = ['-date']
+        unique_together = ['tenant', 'campaign', 'date', 'event_type']
+        indexes = [
+            models.Index(fields=['tenant', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} on {self.date}: {self.event_count}"
+
+
+class LeadFunnelSnapshotDay(models.Model):
+    """
+    A day whose lead funnel snapshots have been computed, for one tenant or
+    (with no tenant) for every tenant. Days without events have no snapshot
+    rows, so snapshot coverage is read from here rather than from them.
+    """
+    id = models.BigAutoField(primary_key=True)
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, null=True, blank=True)
+    date = models.DateField()
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    objects = TenantAwareManager()
+
+    class Meta:
+        db_table = 'lead_funnel_snapshot_days'
+        verbose_name = 'Lead Funnel Snapshot Day'
+        verbose_name_plural = 'Lead Funnel Snapshot Days'
+        indexes = [
+            models.Index(fields=['date', 'tenant']),
+        ]
+
+    def __str__(self):
+        return f"Funnel snapshot for {self.date}"
+
+
 # ===== QUANTIA (REPORTS) MODELS =====
 
 class ReportTemplate(models.Model):
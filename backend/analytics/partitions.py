@@ -0,0 +1,286 @@
+"""
+Monthly partitions and retention for the events table.
+
+On PostgreSQL the events table can be converted once into a table
+partitioned by month on timestamp; new partitions are then created ahead
+of time and old ones detached or dropped whole, which is far cheaper than
+deleting tens of millions of rows. Partition bounds are local midnights
+(TIME_ZONE), so a partition holds whole days and lines up with the
+campaign event rollups, which are bucketed by local date.
+
+Retention first rebuilds the campaign event rollups for the days about to
+be removed, then drops their partitions (or, when the table isn't
+partitioned, deletes the rows in batches). Events without a campaign have
+no rollup and are removed outright.
+"""
+import logging
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from typing import List, Optional
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+from core.helpers import add_months
+from .models import Event
+from .rollups import rebuild_campaign_rollups
+
+logger = logging.getLogger(__name__)
+
+RETENTION_MONTHS = 13
+
+# Partitions kept created ahead of the current month
+MONTHS_AHEAD = 3
+
+# Rows deleted per statement when the table isn't partitioned
+DELETE_BATCH_SIZE = 10000
+
+_PARTITION_NAME = re.compile(r'_(\d{4})_(\d{2})$')
+
+
+class PartitioningError(Exception):
+    """A partition operation can't be carried out."""
+
+
+def _table() -> str:
+    return Event._meta.db_table
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def month_bound(month: date) -> datetime:
+    """Aware local midnight at the start of a month."""
+    return timezone.make_aware(datetime.combine(month, time.min))
+
+
+def partition_name(month: date) -> str:
+    return f"{_table()}_{month.year:04d}_{month.month:02d}"
+
+
+@dataclass(frozen=True)
+class Partition:
+    name: str
+    month: Optional[date]
+
+
+def _require_postgresql() -> None:
+    if connection.vendor != 'postgresql':
+        raise PartitioningError("Event partitioning requires PostgreSQL")
+
+
+def is_partitioned() -> bool:
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+            [_table()]
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions() -> List[Partition]:
+    """Attached partitions, oldest first; the default partition has no month."""
+    _require_postgresql()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname",
+            [_table()]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = []
+    for name in names:
+        match = _PARTITION_NAME.search(name)
+        partitions.append(Partition(name, date(int(match[1]), int(match[2]), 1) if match else None))
+    return partitions
+
+
+def _bounds_sql(month: date) -> str:
+    start, end = month_bound(month), month_bound(add_months(month, 1))
+    return f"FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+
+
+def create_partitions(first_month: date, last_month: date) -> List[str]:
+    """Create any missing monthly partitions from first_month to last_month inclusive."""
+    _require_postgresql()
+    existing = {partition.name for partition in list_partitions()}
+    created = []
+    month = month_start(first_month)
+    with connection.cursor() as cursor:
+        while month <= last_month:
+            name = partition_name(month)
+            if name not in existing:
+                cursor.execute(
+                    f'CREATE TABLE "{name}" PARTITION OF "{_table()}" FOR VALUES {_bounds_sql(month)}'
+                )
+                created.append(name)
+            month = add_months(month, 1)
+    if created:
+        logger.info(f"Created event partitions: {', '.join(created)}")
+    return created
+
+
+def ensure_partitions(months_ahead: int = MONTHS_AHEAD) -> List[str]:
+    """Create partitions for the current month and the next months_ahead; no-op if unpartitioned."""
+    if not is_partitioned():
+        return []
+    this_month = month_start(timezone.localdate())
+    return create_partitions(this_month, add_months(this_month, months_ahead))
+
+
+def detach_partition(month: date) -> str:
+    """Detach a month's partition, keeping it as a standalone table."""
+    _require_postgresql()
+    name = partition_name(month)
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{_table()}" DETACH PARTITION "{name}"')
+    return name
+
+
+def attach_partition(month: date) -> str:
+    """Re-attach a previously detached month table."""
+    _require_postgresql()
+    name = partition_name(month)
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{_table()}" ATTACH PARTITION "{name}" FOR VALUES {_bounds_sql(month)}')
+    return name
+
+
+def drop_partition(month: date) -> str:
+    """Detach and drop a month's partition with all its events."""
+    name = detach_partition(month)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE "{name}"')
+    return name
+
+
+def convert_to_partitioned(months_ahead: int = MONTHS_AHEAD) -> int:
+    """
+    Rebuild the events table as a monthly partitioned table, copying every
+    row. Run once, in a maintenance window: the table is locked throughout.
+
+    The primary key and the (tenant, idempotency_key) constraint gain the
+    timestamp column, since PostgreSQL requires unique constraints on a
+    partitioned table to include the partition key; the ingest endpoints
+    still look up idempotency keys before inserting.
+
+    Returns:
+        Number of rows copied
+    """
+    _require_postgresql()
+    if is_partitioned():
+        raise PartitioningError(f"{_table()} is already partitioned")
+    table, legacy = _table(), f"{_table()}_legacy"
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+            [table]
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(
+            "SELECT pg_get_indexdef(x.indexrelid) FROM pg_index x "
+            "WHERE x.indrelid = to_regclass(%s) AND NOT x.indisprimary AND NOT x.indisunique",
+            [table]
+        )
+        indexes = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'u')",
+            [table]
+        )
+        unique_constraints = [row[0] for row in cursor.fetchall()]
+        cursor.execute(f'SELECT min("timestamp") FROM "{table}"')
+        oldest = cursor.fetchone()[0]
+
+        cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{legacy}"')
+        # Free the constraint index names for the new table
+        for name in unique_constraints:
+            cursor.execute(f'ALTER TABLE "{legacy}" RENAME CONSTRAINT "{name}" TO "{name}_legacy"')
+        cursor.execute(
+            f'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS) PARTITION BY RANGE ("timestamp")'
+        )
+        cursor.execute(f'ALTER TABLE "{table}" ADD PRIMARY KEY ("id", "timestamp")')
+        cursor.execute(
+            f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_tenant_idempotency_key_uniq" '
+            f'UNIQUE ("tenant_id", "idempotency_key", "timestamp")'
+        )
+        cursor.execute(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT')
+
+        this_month = month_start(timezone.localdate())
+        first_month = month_start(timezone.localdate(oldest)) if oldest else this_month
+        create_partitions(first_month, add_months(this_month, months_ahead))
+
+        cursor.execute(f'INSERT INTO "{table}" SELECT * FROM "{legacy}"')
+        copied = cursor.rowcount
+        cursor.execute(f'DROP TABLE "{legacy}"')
+
+        # Captured before the rename, so they already name the new table;
+        # on the partitioned table each one cascades to every partition
+        for definition in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" {definition}')
+
+    logger.info(f"Converted {table} to monthly partitions ({copied} rows copied)")
+    return copied
+
+
+def _delete_before(cutoff: datetime, batch_size: int) -> int:
+    deleted = 0
+    events = Event.objects.all_tenants()
+    while True:
+        ids = list(events.filter(timestamp__lt=cutoff).order_by().values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += events.filter(id__in=ids).delete()[0]
+
+
+def apply_event_retention(months: Optional[int] = None, dry_run: bool = False,
+                          batch_size: int = DELETE_BATCH_SIZE) -> dict:
+    """
+    Remove raw events older than the retention window, after folding them
+    into the campaign event rollups.
+
+    Args:
+        months: Whole months of events to keep besides the current one
+            (default EVENT_RETENTION_MONTHS)
+        dry_run: Only report what would be removed
+        batch_size: Rows per DELETE when the table isn't partitioned
+
+    Returns:
+        Dict with the cutoff, rolled-up rows and removed partitions or rows
+    """
+    months = months if months is not None else getattr(settings, 'EVENT_RETENTION_MONTHS', RETENTION_MONTHS)
+    cutoff_month = add_months(month_start(timezone.localdate()), -months)
+    cutoff = month_bound(cutoff_month)
+    summary = {'cutoff': cutoff_month.isoformat(), 'rollup_rows': 0, 'dropped_partitions': [], 'deleted_events': 0}
+
+    oldest = Event.objects.all_tenants().filter(timestamp__lt=cutoff).aggregate(oldest=Min('timestamp'))['oldest']
+    partitioned = is_partitioned()
+    expired = [p for p in list_partitions() if p.month and p.month < cutoff_month] if partitioned else []
+    if oldest is None and not expired:
+        return summary
+    if dry_run:
+        summary['dropped_partitions'] = [p.name for p in expired]
+        summary['deleted_events'] = Event.objects.all_tenants().filter(timestamp__lt=cutoff).count()
+        return summary
+
+    # Partitions hold whole local days, so every day rebuilt here is complete
+    if oldest is not None:
+        summary['rollup_rows'] = rebuild_campaign_rollups(since=timezone.localdate(oldest), until=cutoff_month)
+
+    if partitioned:
+        for partition in expired:
+            summary['dropped_partitions'].append(drop_partition(partition.month))
+    # Also covers rows that landed in the default partition
+    summary['deleted_events'] = _delete_before(cutoff, batch_size)
+    logger.info(
+        f"Event retention before {cutoff_month}: {len(summary['dropped_partitions'])} partitions dropped, "
+        f"{summary['deleted_events']} events deleted"
+    )
+    return summary
@@ -0,0 +1,129 @@
+"""
+Campaign event rollup helpers.
+Rebuilds CampaignEventRollup rows from raw events and reads per-campaign
+totals from the rollup table instead of counting the events table.
+"""
+import logging
+from typing import Dict, Iterable, Optional
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from .models import Event, CampaignEventRollup
+
+logger = logging.getLogger(__name__)
+
+
+def rebuild_campaign_rollups(tenant=None, since=None, until=None, batch_size: int = 1000) -> int:
+    """
+    Recompute rollup rows from the events table.
+
+    Existing rollup rows in the selected window are replaced, so the command
+    can be re-run safely. Returns the number of rollup rows written.
+
+    Args:
+        tenant: Optional Tenant to restrict the rebuild to
+        since: Optional date; only days on or after it are rebuilt
+        until: Optional date; only days before it are rebuilt
+        batch_size: Rows per bulk_create call
+    """
+    events = Event.objects.all_tenants().filter(campaign__isnull=False)
+    rollups = CampaignEventRollup.objects.all_tenants()
+    if tenant is not None:
+        events = events.filter(tenant=tenant)
+        rollups = rollups.filter(tenant=tenant)
+    if since is not None:
+        events = events.filter(timestamp__date__gte=since)
+        rollups = rollups.filter(date__gte=since)
+    if until is not None:
+        events = events.filter(timestamp__date__lt=until)
+        rollups = rollups.filter(date__lt=until)
+
+    grouped = events.annotate(day=TruncDate('timestamp')).values(
+        'tenant_id', 'campaign_id', 'event_type', 'day'
+    ).annotate(
+        event_count=Count('id'),
+        unique_contacts=Count('contact', distinct=True),
+        value_total=Sum('value'),
+    ).order_by()
+
+    written = 0
+    with transaction.atomic():
+        rollups.delete()
+        batch = []
+        for row in grouped.iterator(chunk_size=batch_size):
+            batch.append(CampaignEventRollup(
+                tenant_id=row['tenant_id'],
+                campaign_id=row['campaign_id'],
+                event_type=row['event_type'],
+                date=row['day'],
+                event_count=row['event_count'],
+                unique_contacts=row['unique_contacts'],
+                value_total=row['value_total'] or 0,
+            ))
+            if len(batch) >= batch_size:
+                CampaignEventRollup.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            CampaignEventRollup.objects.bulk_create(batch)
+            written += len(batch)
+
+    logger.info(f"Rebuilt {written} campaign event rollup rows")
+    return written
+
+
+def get_campaign_event_totals(campaign_ids: Iterable, since=None) -> Dict:
+    """
+    Load lifetime event totals for many campaigns in one query.
+
+    Returns:
+        Dict mapping campaign id -> event type -> {'count', 'contacts', 'value'}.
+        Note that 'contacts' is the sum of per-day distinct contacts.
+    """
+    campaign_ids = list(campaign_ids)
+    totals: Dict = {campaign_id: {} for campaign_id in campaign_ids}
+    if not campaign_ids:
+        return totals
+
+    rows = CampaignEventRollup.objects.all_tenants().filter(campaign_id__in=campaign_ids)
+    if since is not None:
+        rows = rows.filter(date__gte=since)
+    rows = rows.values('campaign_id', 'event_type').annotate(
+        count=Sum('event_count'),
+        contacts=Sum('unique_contacts'),
+        value=Sum('value_total'),
+    ).order_by()
+
+    for row in rows:
+        totals[row['campaign_id']][row['event_type']] = {
+            'count': row['count'] or 0,
+            'contacts': row['contacts'] or 0,
+            'value': row['value'] or 0,
+        }
+    return totals
+
+
+def get_campaign_social_post_counts(campaign_ids: Iterable) -> Dict:
+    """Count distinct viewed social posts per campaign in one grouped query."""
+    campaign_ids = list(campaign_ids)
+    counts = {campaign_id: 0 for campaign_id in campaign_ids}
+    if not campaign_ids:
+        return counts
+
+    rows = Event.objects.all_tenants().filter(
+        campaign_id__in=campaign_ids,
+        event_type='social_post_viewed',
+    ).values('campaign_id').annotate(
+        posts=Count('details__post_id', distinct=True)
+    ).order_by()
+
+    for row in rows:
+        counts[row['campaign_id']] = row['posts']
+    return counts
+
+
+def event_count(totals: Optional[Dict], event_type: str) -> int:
+    """Read a single event type's count out of a campaign's totals dict."""
+    if not totals:
+        return 0
+    return totals.get(event_type, {}).get('count', 0)
@@ -0,0 +1,55 @@
+from celery import shared_task
+from django.conf import settings
+from . import partitions
+from .funnel import refresh_funnel_snapshots
+from .ingest import FLUSH_MAX_CHUNKS, STREAMS, flush_buffer
+
+
+@shared_task
+def flush_event_ingest_buffers():
+    """
+    Write events buffered in Redis by the ingest endpoints to the database,
+    at most EVENT_INGEST_FLUSH_MAX_CHUNKS chunks per stream and run.
+    """
+    max_chunks = getattr(settings, 'EVENT_INGEST_FLUSH_MAX_CHUNKS', FLUSH_MAX_CHUNKS)
+    flushed = {stream: flush_buffer(stream, max_chunks=max_chunks) for stream in STREAMS}
+    return {
+        'success': True,
+        'flushed_events': flushed
+    }
+
+
+@shared_task
+def refresh_lead_funnel_snapshots(days: int = 2):
+    """
+    Recompute the daily lead funnel snapshots for the last completed days.
+    """
+    written = refresh_funnel_snapshots(days=days)
+    return {
+        'success': True,
+        'snapshot_rows': written
+    }
+
+
+@shared_task
+def ensure_event_partitions():
+    """
+    Create upcoming monthly event partitions (no-op unless the events table is partitioned).
+    """
+    created = partitions.ensure_partitions()
+    return {
+        'success': True,
+        'created_partitions': created
+    }
+
+
+@shared_task
+def apply_event_retention():
+    """
+    Roll up and remove events older than EVENT_RETENTION_MONTHS.
+    """
+    summary = partitions.apply_event_retention()
+    return {
+        'success': True,
+        **summary
+    }
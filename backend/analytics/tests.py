@@ -1,9 +1,19 @@
+import json
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import LeadFunnelEvent
-from core.models import Tenant, Contact
+from datetime import date, timedelta
+from decimal import Decimal
+from django.utils import timezone
+from .models import LeadFunnelEvent, LeadFunnelSnapshotDay, Event, CampaignEventRollup
+from .rollups import get_campaign_event_totals, rebuild_campaign_rollups
+from .funnel import funnel_summary, refresh_funnel_snapshots
+from . import partitions
+from .ingest import STREAMS, IngestResult, check_references, clean_event, write_events
+from core.helpers import add_months
+from core.models import Tenant, Contact, Campaign
+from core.serializers import CampaignSerializer
 from campaigns.models import MarketingCampaign
 
 User = get_user_model()
@@ -132,3 +142,245 @@ class LeadFunnelEventAPITest(APITestCase):
         self.assertEqual(response.data['total_events'], 2)
         self.assertEqual(response.data['funnel_progression']['email_opens'], 1)
         self.assertEqual(response.data['funnel_progression']['mql_count'], 1)
+
+
+class CampaignEventRollupTest(TestCase):
+    """Test the incrementally maintained campaign event rollups."""
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Rollup Tenant")
+        self.user = User.objects.create_user(
+            username="rollupuser",
+            email="rollup@example.com",
+            password="testpass123"
+        )
+        self.campaign = Campaign.objects.create(
+            tenant=self.tenant,
+            name="Rollup Campaign",
+            campaign_type="email",
+            created_by=self.user
+        )
+        self.contact = Contact.objects.create(
+            tenant=self.tenant,
+            email="rollup-contact@example.com",
+            first_name="Rollup",
+            last_name="Contact"
+        )
+
+    def _create_event(self, event_type, contact=None, value=None):
+        return Event.objects.create(
+            tenant=self.tenant,
+            campaign=self.campaign,
+            contact=contact,
+            event_type=event_type,
+            value=value
+        )
+
+    def test_insert_updates_rollup(self):
+        """Each inserted event increments its day's rollup row."""
+        self._create_event('email_sent', self.contact)
+        self._create_event('email_sent', self.contact)
+        self._create_event('conversion_event', self.contact, value=Decimal('25.50'))
+
+        sent = CampaignEventRollup.objects.all_tenants().get(campaign=self.campaign, event_type='email_sent')
+        self.assertEqual(sent.event_count, 2)
+        self.assertEqual(sent.unique_contacts, 1)
+
+        conversion = CampaignEventRollup.objects.all_tenants().get(campaign=self.campaign, event_type='conversion_event')
+        self.assertEqual(conversion.value_total, Decimal('25.50'))
+
+    def test_rebuild_matches_incremental(self):
+        """Rebuilding from raw events produces the same totals."""
+        self._create_event('email_sent', self.contact)
+        self._create_event('email_opened', self.contact)
+        self._create_event('email_opened')
+        before = get_campaign_event_totals([self.campaign.pk])
+
+        rebuild_campaign_rollups(tenant=self.tenant)
+        self.assertEqual(get_campaign_event_totals([self.campaign.pk]), before)
+        self.assertEqual(before[self.campaign.pk]['email_opened']['count'], 2)
+
+    def test_campaign_serializer_reads_rollups(self):
+        """The campaign list serializer reads statistics from one rollup query."""
+        for _ in range(4):
+            self._create_event('email_sent', self.contact)
+        self._create_event('email_opened', self.contact)
+
+        campaigns = Campaign.objects.all_tenants().filter(pk=self.campaign.pk).select_related('created_by')
+        with self.assertNumQueries(3):
+            data = CampaignSerializer(campaigns, many=True).data
+        self.assertEqual(data[0]['total_emails_sent'], 4)
+        self.assertEqual(data[0]['open_rate'], 25.0)
+
+
+class FunnelAggregationTest(TestCase):
+    """Test the single-pass funnel aggregation engine."""
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Funnel Tenant")
+        self.contacts = [
+            Contact.objects.create(
+                tenant=self.tenant,
+                email=f"funnel{i}@example.com",
+                first_name="Funnel",
+                last_name=str(i)
+            )
+            for i in range(3)
+        ]
+
+    def _create_event(self, contact, event_type, days_ago=0):
+        event = LeadFunnelEvent.objects.create(
+            tenant=self.tenant,
+            contact=contact,
+            event_type=event_type
+        )
+        if days_ago:
+            LeadFunnelEvent.objects.all_tenants().filter(pk=event.pk).update(
+                timestamp=timezone.now() - timedelta(days=days_ago)
+            )
+        return event
+
+    def test_summary_is_single_query(self):
+        """All funnel metrics come from one conditional-aggregation query."""
+        self._create_event(self.contacts[0], 'Email_Opened')
+        self._create_event(self.contacts[0], 'MQL_Achieved')
+        self._create_event(self.contacts[1], 'Email_Opened')
+
+        queryset = LeadFunnelEvent.objects.all_tenants().filter(tenant=self.tenant)
+        with self.assertNumQueries(1):
+            summary = funnel_summary(queryset, days=30)
+
+        self.assertEqual(summary['total_events'], 3)
+        self.assertEqual(summary['unique_contacts'], 2)
+        self.assertEqual(summary['funnel_progression']['email_opens'], 2)
+        self.assertEqual(summary['funnel_progression']['mql_count'], 1)
+        self.assertIn({'event_type': 'Email_Opened', 'count': 2}, summary['events_by_type'])
+
+    def test_snapshot_summary_matches_raw(self):
+        """Long windows read from daily snapshots give the same totals as raw events."""
+        for days_ago in (1, 3, 10, 20, 40):
+            self._create_event(self.contacts[days_ago % 3], 'Email_Clicked', days_ago=days_ago)
+        self._create_event(self.contacts[0], 'SQL_Achieved')
+
+        queryset = LeadFunnelEvent.objects.all_tenants().filter(tenant=self.tenant)
+        raw = funnel_summary(queryset, days=30)
+
+        refresh_funnel_snapshots(tenant=self.tenant, days=60)
+        from_snapshots = funnel_summary(queryset, days=30, snapshot_filter={'tenant': self.tenant})
+
+        self.assertEqual(from_snapshots, raw)
+        self.assertEqual(raw['funnel_progression']['email_clicks'], 4)
+
+    def test_days_missing_a_snapshot_are_read_from_raw_events(self):
+        self._create_event(self.contacts[0], 'Email_Clicked', days_ago=20)
+        refresh_funnel_snapshots(tenant=self.tenant, days=60)
+        # An event landing on a day whose refresh never ran
+        late = self._create_event(self.contacts[1], 'Email_Clicked', days_ago=10)
+        late.refresh_from_db()
+        LeadFunnelSnapshotDay.objects.all_tenants().filter(date=timezone.localdate(late.timestamp)).delete()
+
+        queryset = LeadFunnelEvent.objects.all_tenants().filter(tenant=self.tenant)
+        summary = funnel_summary(queryset, days=30, snapshot_filter={'tenant': self.tenant})
+        self.assertEqual(summary['funnel_progression']['email_clicks'], 2)
+        self.assertEqual(summary, funnel_summary(queryset, days=30))
+
+
+class EventIngestionTest(APITestCase):
+    """Test NDJSON batch ingestion of analytics events."""
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Ingest Tenant")
+        other = Tenant.objects.create(name="Other Ingest Tenant")
+        self.user = User.objects.create_user(
+            username="ingestuser",
+            email="ingest@example.com",
+            password="testpass123"
+        )
+        self.user.tenant = self.tenant
+        self.campaign = Campaign.objects.create(
+            tenant=self.tenant, name="Ingest Campaign", campaign_type="email", created_by=self.user
+        )
+        self.contact = Contact.objects.create(tenant=self.tenant, email="pixel@example.com", first_name="Pixel", last_name="Open")
+        self.foreign_contact = Contact.objects.create(tenant=other, email="other@example.com", first_name="Other", last_name="Tenant")
+        self.client.force_authenticate(user=self.user)
+
+    def _post(self, lines):
+        body = '\n'.join(json.dumps(line) for line in lines)
+        return self.client.generic('POST', '/api/analytics/events/ingest/', body, content_type='application/x-ndjson')
+
+    def test_batch_is_validated_deduplicated_and_rolled_up(self):
+        opened = {'event_type': 'email_opened', 'contact': self.contact.pk, 'campaign': self.campaign.pk}
+        lines = [
+            {**opened, 'idempotency_key': 'open-1'},
+            {**opened, 'idempotency_key': 'open-1'},
+            {**opened, 'idempotency_key': 'open-2', 'value': '1.50'},
+            {'event_type': 'not_a_type'},
+            {**opened, 'contact': self.foreign_contact.pk},
+        ]
+        response = self._post(lines)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {key: response.data[key] for key in ('received', 'accepted', 'duplicates', 'rejected')},
+            {'received': 5, 'accepted': 2, 'duplicates': 1, 'rejected': 2}
+        )
+        self.assertEqual([error['line'] for error in response.data['errors']], [4, 5])
+
+        rollup = CampaignEventRollup.objects.all_tenants().get(campaign=self.campaign, event_type='email_opened')
+        self.assertEqual((rollup.event_count, rollup.unique_contacts, rollup.value_total), (2, 1, Decimal('1.50')))
+
+        # A retried batch is stored once
+        response = self._post(lines[:3])
+        self.assertEqual((response.data['accepted'], response.data['duplicates']), (0, 3))
+        self.assertEqual(Event.objects.all_tenants().count(), 2)
+
+    def test_rewriting_buffered_rows_is_idempotent(self):
+        result = IngestResult()
+        rows = check_references(STREAMS['events'], [
+            (1, clean_event(STREAMS['events'], {'event_type': 'email_sent', 'campaign': self.campaign.pk}, self.tenant.id, timezone.now())),
+        ], result)
+        self.assertEqual(write_events('events', rows), (1, 0))
+        self.assertEqual(write_events('events', rows), (0, 1))
+        rollup = CampaignEventRollup.objects.all_tenants().get(campaign=self.campaign, event_type='email_sent')
+        self.assertEqual(rollup.event_count, 1)
+
+    def test_oversized_body_is_refused(self):
+        with self.settings(EVENT_INGEST_MAX_BYTES=10):
+            response = self._post([{'event_type': 'email_opened'}])
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+
+class EventRetentionTest(TestCase):
+    """Test event retention and the partition month helpers."""
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Retention Tenant")
+        user = User.objects.create_user(username="retention", email="retention@example.com", password="testpass123")
+        self.campaign = Campaign.objects.create(tenant=self.tenant, name="Old Campaign", campaign_type="email", created_by=user)
+
+    def _create_event(self, months_ago, campaign=None):
+        month = add_months(partitions.month_start(timezone.localdate()), -months_ago)
+        return Event.objects.create(
+            tenant=self.tenant, campaign=campaign, event_type='email_opened',
+            timestamp=partitions.month_bound(month) + timedelta(hours=1)
+        )
+
+    def test_month_helpers(self):
+        self.assertEqual(add_months(date(2025, 11, 1), 3), date(2026, 2, 1))
+        self.assertEqual(add_months(date(2025, 1, 1), -1), date(2024, 12, 1))
+        self.assertEqual(partitions.partition_name(date(2025, 3, 1)), 'events_2025_03')
+
+    def test_old_events_are_rolled_up_then_removed(self):
+        self._create_event(months_ago=5, campaign=self.campaign)
+        self._create_event(months_ago=5)
+        recent = self._create_event(months_ago=0, campaign=self.campaign)
+
+        dry_run = partitions.apply_event_retention(months=3, dry_run=True)
+        self.assertEqual(dry_run['deleted_events'], 2)
+        self.assertEqual(Event.objects.all_tenants().count(), 3)
+
+        summary = partitions.apply_event_retention(months=3)
+        self.assertEqual(summary['deleted_events'], 2)
+        self.assertEqual(list(Event.objects.all_tenants().values_list('pk', flat=True)), [recent.pk])
+        # The removed campaign event still counts in the campaign's totals
+        totals = get_campaign_event_totals([self.campaign.pk])
+        self.assertEqual(totals[self.campaign.pk]['email_opened']['count'], 2)
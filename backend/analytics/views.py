@@ -2,10 +2,11 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from core.permissions import DigiSolAdminOrAuthenticated
+from core.pagination import SparseFieldsetMixin
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.decorators import action
 from django.shortcuts import get_object_or_404
-from django.db.models import Count, Q, Sum, Avg
+from django.db.models import Count, Sum, Avg
 from django.utils import timezone
 from datetime import date, timedelta
 from core.models import Campaign, Contact, Tenant
@@ -24,6 +25,8 @@ from .serializers import (
     MetrikaModelPerformanceSerializer, ComprehensiveReportSerializer
 )
 from accounts.permissions import IsTenantUser
+from . import funnel
+from .ingest import IngestActionMixin
 
 class CampaignSummaryView(APIView):
     permission_classes = [DigiSolAdminOrAuthenticated]
@@ -33,21 +36,13 @@ class CampaignSummaryView(APIView):
         campaign = get_object_or_404(Campaign, id=campaign_id, tenant=tenant)
         events = Event.objects.filter(campaign=campaign)
 
-        # Aggregate event counts
-        total_opens = events.filter(event_type='email_opened').values('contact').distinct().count()
-        total_clicks = events.filter(event_type='email_clicked').count()
-        total_conversions = events.filter(event_type='lead_converted').count()
-        total_sent = events.filter(event_type='campaign_sent').count()
-        total_unsubscribed = events.filter(event_type='unsubscribed').count()
+        # Aggregate all event counts in a single pass
+        summary = funnel.campaign_event_summary(events)
 
         return Response({
             'campaign_id': str(campaign.id),
             'campaign_name': campaign.name,
-            'total_opens': total_opens,
-            'total_clicks': total_clicks,
-            'total_conversions': total_conversions,
-            'total_sent': total_sent,
-            'total_unsubscribed': total_unsubscribed,
+            **summary,
         }, status=status.HTTP_200_OK)
 
 
@@ -107,7 +102,7 @@ class DashboardSummaryView(APIView):
         return Response(serializer.data)
 
 
-class EventViewSet(ModelViewSet):
+class EventViewSet(IngestActionMixin, SparseFieldsetMixin, ModelViewSet):
     """
     ViewSet for managing analytics events.
     """
@@ -118,6 +113,7 @@ class EventViewSet(ModelViewSet):
     search_fields = ['event_type', 'details']
     ordering_fields = ['timestamp', 'event_type']
     ordering = ['-timestamp']
+    ingest_stream = 'events'
 
     def get_queryset(self):
         """Filter events by tenant."""
@@ -266,7 +262,7 @@ class AnalyticsSummaryView(APIView):
         return Response(serializer.data)
 
 
-class LeadFunnelEventViewSet(ModelViewSet):
+class LeadFunnelEventViewSet(IngestActionMixin, SparseFieldsetMixin, ModelViewSet):
     """
     ViewSet for managing lead funnel events.
     """
@@ -277,6 +273,7 @@ class LeadFunnelEventViewSet(ModelViewSet):
     search_fields = ['event_type', 'event_data']
     ordering_fields = ['timestamp', 'event_type']
     ordering = ['-timestamp']
+    ingest_stream = 'lead_funnel_events'
 
     def get_queryset(self):
         """Filter events by tenant and allow additional filtering."""
@@ -318,29 +315,27 @@ class LeadFunnelEventViewSet(ModelViewSet):
         
         # Get date range from query params
         days = int(request.query_params.get('days', 30))
-        start_date = timezone.now() - timedelta(days=days)
-        
-        recent_events = queryset.filter(timestamp__gte=start_date)
         
-        # Calculate funnel metrics
-        funnel_summary = {
-            'total_events': recent_events.count(),
-            'events_by_type': recent_events.values('event_type').annotate(
-                count=Count('id')
-            ),
-            'unique_contacts': recent_events.values('contact').distinct().count(),
-            'campaigns_with_events': recent_events.values('campaign').distinct().count(),
-            'funnel_progression': {
-                'mql_count': recent_events.filter(event_type='MQL_Achieved').count(),
-                'sql_count': recent_events.filter(event_type='SQL_Achieved').count(),
-                'won_count': recent_events.filter(event_type='Won_Opportunity').count(),
-                'email_opens': recent_events.filter(event_type='Email_Opened').count(),
-                'email_clicks': recent_events.filter(event_type='Email_Clicked').count(),
-                'form_submissions': recent_events.filter(event_type='Form_Submission').count(),
-            }
-        }
-        
-        return Response(funnel_summary)
+        return Response(funnel.funnel_summary(
+            queryset,
+            days=days,
+            snapshot_filter=self._get_snapshot_filter(request)
+        ))
+
+    def _get_snapshot_filter(self, request):
+        """
+        Return the daily snapshot filter equivalent to this request's queryset,
+        or None when the request filters on something snapshots don't track.
+        """
+        if request.user.is_superuser or not getattr(request.user, 'tenant', None):
+            return None
+        if request.query_params.get('contact_id') or request.query_params.get('event_type'):
+            return None
+        snapshot_filter = {'tenant': request.user.tenant}
+        campaign_id = request.query_params.get('campaign_id')
+        if campaign_id:
+            snapshot_filter['campaign_id'] = campaign_id
+        return snapshot_filter
 
     @action(detail=False, methods=['get'])
     def by_campaign(self, request):
@@ -351,15 +346,7 @@ class LeadFunnelEventViewSet(ModelViewSet):
         if campaign_id:
             queryset = queryset.filter(campaign_id=campaign_id)
         
-        events_by_campaign = queryset.values('campaign__name').annotate(
-            total_events=Count('id'),
-            unique_contacts=Count('contact', distinct=True),
-            mql_count=Count('id', filter=Q(event_type='MQL_Achieved')),
-            sql_count=Count('id', filter=Q(event_type='SQL_Achieved')),
-            won_count=Count('id', filter=Q(event_type='Won_Opportunity')),
-        ).order_by('-total_events')
-        
-        return Response(events_by_campaign)
+        return Response(funnel.funnel_by_campaign(queryset))
 
     @action(detail=False, methods=['get'])
     def contact_journey(self, request):
@@ -109,7 +109,13 @@ class Budget(models.Model):
 
     @property
     def spent_amount(self):
-        """Calculate total expenses for this budget."""
+        """
+        Calculate total expenses for this budget.
+
+        Reads the `spent` annotation added by queries.with_spent when present.
+        """
+        if hasattr(self, 'spent'):
+            return self.spent or Decimal('0.00')
         total = self.expenses.aggregate(total=Sum('amount'))['total']
         return total or Decimal('0.00')
 
@@ -0,0 +1,46 @@
+"""
+Queryset helpers for budget spend.
+Budgets are annotated with their expense total in the query that loads
+them, so spent_amount, remaining_amount and spending_percentage read the
+annotation instead of aggregating expenses once per budget and property.
+"""
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List
+from django.db.models import DecimalField, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+from core.helpers import add_months
+
+# Months of spending in the summary trend, the current one included
+TREND_MONTHS = 6
+
+
+def with_spent(queryset):
+    """Annotate budgets with `spent`, the sum of their expenses."""
+    return queryset.annotate(
+        spent=Coalesce(
+            Sum('expenses__amount'), Value(Decimal('0.00')),
+            output_field=DecimalField(max_digits=12, decimal_places=2)
+        )
+    )
+
+
+def monthly_spending(expenses, today: date, months: int = TREND_MONTHS) -> List[Dict]:
+    """
+    Expense totals for each of the last `months` calendar months, newest
+    first, from one grouped query. Months without expenses show 0.
+    """
+    this_month = today.replace(day=1)
+    first_month = add_months(this_month, -(months - 1))
+    rows = expenses.filter(date__gte=first_month, date__lt=add_months(this_month, 1)).order_by().annotate(
+        month=TruncMonth('date')
+    ).values('month').annotate(total=Sum('amount'))
+    totals = {row['month']: row['total'] for row in rows}
+    trend = []
+    for offset in range(months):
+        month = add_months(this_month, -offset)
+        trend.append({
+            'month': month.strftime('%Y-%m'),
+            'amount': totals.get(month) or Decimal('0.00')
+        })
+    return trend
@@ -1,3 +1,73 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from core.middleware import tenant_scope
+from core.models import Tenant
+from .models import Budget, BudgetCategory, Expense
+from .queries import monthly_spending
+from .views import BudgetViewSet
 
-# Create your tests here.
+
+class BudgetSummaryTest(TestCase):
+    """Test the budget summary endpoint."""
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Finance Tenant")
+        self.enterContext(tenant_scope(self.tenant))
+        self.user = get_user_model().objects.create_user(username="cfo", email="cfo@example.com", password="testpass123")
+        self.user.tenant = self.tenant
+        self.today = timezone.now().date()
+        BudgetCategory.objects.create(tenant=self.tenant, name="Paid Ads")
+
+    def _budget(self, name, amount, spends, category=None):
+        budget = Budget.objects.create(
+            tenant=self.tenant, name=name, amount=Decimal(amount), category=category,
+            start_date=self.today - timedelta(days=200), end_date=self.today + timedelta(days=30)
+        )
+        for amount, days_ago in spends:
+            Expense.objects.create(
+                tenant=self.tenant, budget=budget, description="Spend",
+                amount=Decimal(amount), date=self.today - timedelta(days=days_ago)
+            )
+        return budget
+
+    def _summary(self):
+        # Called directly: the request middleware only knows tenants stored on the user
+        request = APIRequestFactory().get('/api/budgeting/budgets/summary/')
+        force_authenticate(request, user=self.user)
+        return BudgetViewSet.as_view({'get': 'summary'})(request)
+
+    def test_summary_query_count_is_independent_of_budget_count(self):
+        category = BudgetCategory.objects.get(name="Paid Ads")
+        self._budget("Search", '1000.00', [('250.00', 0), ('150.00', 0)], category)
+        with self.assertNumQueries(3):
+            self._summary()
+
+        for index in range(4):
+            self._budget(f"Social {index}", '500.00', [('100.00', 0)], category)
+        with self.assertNumQueries(3):
+            response = self._summary()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_budgets'], 5)
+        self.assertEqual(Decimal(response.data['total_spent']), Decimal('800.00'))
+        search = next(row for row in response.data['budget_breakdown'] if row['name'] == "Search")
+        self.assertEqual((search['spent'], search['remaining'], search['category']), (Decimal('400.00'), Decimal('600.00'), "Paid Ads"))
+        self.assertEqual(search['percentage'], Decimal('40'))
+
+    def test_monthly_spending_covers_six_calendar_months(self):
+        month_start = self.today.replace(day=1)
+        self._budget("Events", '5000.00', [
+            ('100.00', (self.today - month_start).days),
+            ('40.00', (self.today - month_start).days + 1),
+            ('999.00', 400),
+        ])
+        trend = monthly_spending(Expense.objects.filter(tenant=self.tenant), self.today)
+
+        self.assertEqual(len(trend), 6)
+        self.assertEqual(trend[0], {'month': month_start.strftime('%Y-%m'), 'amount': Decimal('100.00')})
+        self.assertEqual(trend[1]['amount'], Decimal('40.00'))
+        self.assertEqual(sum(row['amount'] for row in trend), Decimal('140.00'))
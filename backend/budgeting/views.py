@@ -5,7 +5,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db.models import Sum, Q, Count, Avg
 from django.utils import timezone
-from datetime import datetime, timedelta
+from datetime import datetime
 from decimal import Decimal
 import json
 
@@ -13,6 +13,7 @@ from .models import (
     BudgetCategory, Budget, Expense, BudgetGoal, 
     BudgetForecast, PecuniaRecommendation
 )
+from .queries import monthly_spending, with_spent
 from .serializers import (
     BudgetCategorySerializer, BudgetSerializer, ExpenseSerializer,
     BudgetGoalSerializer, BudgetForecastSerializer, PecuniaRecommendationSerializer,
@@ -102,7 +103,7 @@ class BudgetViewSet(viewsets.ModelViewSet):
         """
         Override to ensure only budgets for the current tenant are returned.
         """
-        queryset = Budget.objects.filter(tenant=self.request.user.tenant)
+        queryset = with_spent(Budget.objects.filter(tenant=self.request.user.tenant)).select_related('category')
         
         # Apply filters
         budget_type = self.request.query_params.get('budget_type', None)
@@ -141,17 +142,14 @@ class BudgetViewSet(viewsets.ModelViewSet):
         Get budget summary and dashboard data.
         """
         tenant = request.user.tenant
-        budgets = Budget.objects.filter(tenant=tenant, is_active=True)
+        # One query loads every budget with its spend and category
+        budgets = list(with_spent(Budget.objects.filter(tenant=tenant, is_active=True)).select_related('category'))
         
-        total_budgets = budgets.count()
-        active_budgets = budgets.filter(status='active').count()
+        total_budgets = len(budgets)
+        active_budgets = sum(1 for budget in budgets if budget.status == 'active')
         
-        total_allocated = budgets.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        
-        # Calculate total spent by summing all expenses for all budgets
-        total_spent = Decimal('0.00')
-        for budget in budgets:
-            total_spent += budget.spent_amount
+        total_allocated = sum((budget.amount for budget in budgets), Decimal('0.00'))
+        total_spent = sum((budget.spent_amount for budget in budgets), Decimal('0.00'))
         
         total_remaining = total_allocated - total_spent
         
@@ -183,19 +181,7 @@ class BudgetViewSet(viewsets.ModelViewSet):
             })
         
         # Spending trends (last 6 months)
-        spending_trends = []
-        for i in range(6):
-            date = timezone.now().date() - timedelta(days=30*i)
-            month_expenses = Expense.objects.filter(
-                tenant=tenant,
-                date__year=date.year,
-                date__month=date.month
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-            
-            spending_trends.append({
-                'month': date.strftime('%Y-%m'),
-                'amount': month_expenses
-            })
+        spending_trends = monthly_spending(Expense.objects.filter(tenant=tenant), timezone.now().date())
         
         summary_data = {
             'total_budgets': total_budgets,
@@ -0,0 +1,168 @@
+"""
+Condition expression compiler.
+Turns workflow condition configs (trigger_config conditions and condition
+steps) into cached Python closures. Operator dispatch and coercion of the
+expected value happen once at compile time instead of on every evaluation.
+
+A condition is either a leaf:
+    {'field': 'contact.score', 'operator': 'greater_than', 'value': 50}
+or a group combining other conditions:
+    {'logic': 'or', 'conditions': [...]}
+A plain list of conditions is an AND group.
+
+evaluate_many and filter_matching evaluate one condition over a batch of
+events or executions, compiling it once for the whole batch.
+"""
+import json
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+Predicate = Callable[[Any], bool]
+FieldGetter = Callable[[Any], Any]
+ConditionSpec = Union[Dict[str, Any], List[Any], None]
+
+# Field resolution modes
+EVENT_FIELDS = 'event'
+EXECUTION_FIELDS = 'execution'
+
+
+def _always(record) -> bool:
+    return True
+
+
+def _never(record) -> bool:
+    return False
+
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _is_empty(field_value) -> bool:
+    return not field_value or str(field_value).strip() == ''
+
+
+def compile_operator(operator: str, expected_value: Any) -> Callable[[Any], bool]:
+    """Compile an operator and its expected value into a test on a field value."""
+    if operator == 'equals':
+        return lambda field_value: field_value == expected_value
+    if operator == 'not_equals':
+        return lambda field_value: field_value != expected_value
+    if operator in ('contains', 'not_contains'):
+        expected_str = str(expected_value)
+        if operator == 'contains':
+            return lambda field_value: expected_str in str(field_value)
+        return lambda field_value: expected_str not in str(field_value)
+    if operator in ('greater_than', 'less_than'):
+        threshold = _to_float(expected_value)
+        if threshold is None:
+            return _never
+
+        def compare(field_value) -> bool:
+            number = _to_float(field_value)
+            if number is None:
+                return False
+            return number > threshold if operator == 'greater_than' else number < threshold
+        return compare
+    if operator == 'is_empty':
+        return _is_empty
+    if operator == 'is_not_empty':
+        return lambda field_value: not _is_empty(field_value)
+    return _never
+
+
+def evaluate_operator(field_value: Any, operator: str, expected_value: Any) -> bool:
+    """Evaluate a single operator without caching the compiled form."""
+    return compile_operator(operator, expected_value)(field_value)
+
+
+def _event_field_getter(field: Optional[str]) -> FieldGetter:
+    return lambda event_data: event_data.get(field)
+
+
+def _execution_field_getter(field: Optional[str]) -> FieldGetter:
+    field = field or ''
+    if field.startswith('contact.'):
+        contact_field = field.split('.')[1]
+        return lambda execution: getattr(execution.contact, contact_field, None)
+    if field.startswith('context.'):
+        field = field.split('.')[1]
+    return lambda execution: execution.context_data.get(field)
+
+
+FIELD_GETTERS = {
+    EVENT_FIELDS: _event_field_getter,
+    EXECUTION_FIELDS: _execution_field_getter,
+}
+
+
+def field_getter(field: Optional[str], mode: str = EVENT_FIELDS) -> FieldGetter:
+    """Return a function reading `field` from a record in the given mode."""
+    return FIELD_GETTERS[mode](field)
+
+
+def _compile(spec: ConditionSpec, field_getter: Callable[[Optional[str]], FieldGetter]) -> Predicate:
+    if isinstance(spec, list):
+        spec = {'logic': 'and', 'conditions': spec}
+    if not spec:
+        return _always
+
+    if 'conditions' in spec:
+        children = [_compile(child, field_getter) for child in spec['conditions']]
+        if not children:
+            return _always
+        if len(children) == 1:
+            return children[0]
+        if str(spec.get('logic', 'and')).lower() == 'or':
+            return lambda record: any(child(record) for child in children)
+        return lambda record: all(child(record) for child in children)
+
+    get_value = field_getter(spec.get('field'))
+    test = compile_operator(spec.get('operator', 'equals'), spec.get('value'))
+    return lambda record: test(get_value(record))
+
+
+@lru_cache(maxsize=1024)
+def _compile_cached(spec_json: str, mode: str) -> Predicate:
+    return _compile(json.loads(spec_json), FIELD_GETTERS[mode])
+
+
+def compile_condition(spec: ConditionSpec, mode: str = EVENT_FIELDS) -> Predicate:
+    """
+    Compile a condition spec into a predicate.
+
+    Compiled predicates are cached by the spec's content, so repeated calls
+    with the same config are cheap.
+
+    Args:
+        spec: Leaf condition, group, or list of conditions (AND)
+        mode: EVENT_FIELDS to read fields from an event_data dict, or
+            EXECUTION_FIELDS to resolve contact./context. fields on an
+            AutomationExecution
+    """
+    if not spec:
+        return _always
+    try:
+        spec_json = json.dumps(spec, sort_keys=True)
+    except (TypeError, ValueError):
+        return _compile(spec, FIELD_GETTERS[mode])
+    return _compile_cached(spec_json, mode)
+
+
+def _predicate(condition: Union[ConditionSpec, Predicate], mode: str) -> Predicate:
+    return condition if callable(condition) else compile_condition(condition, mode)
+
+
+def evaluate_many(condition: Union[ConditionSpec, Predicate], records: Iterable[Any], mode: str = EVENT_FIELDS) -> List[bool]:
+    """Evaluate a condition spec or compiled predicate against many records."""
+    predicate = _predicate(condition, mode)
+    return [predicate(record) for record in records]
+
+
+def filter_matching(condition: Union[ConditionSpec, Predicate], records: Iterable[Any], mode: str = EVENT_FIELDS) -> List[Any]:
+    """Return the records that satisfy a condition spec or compiled predicate."""
+    predicate = _predicate(condition, mode)
+    return [record for record in records if predicate(record)]
@@ -0,0 +1,186 @@
+"""
+Duplicate contact detection.
+Contacts store normalized email and phone blocking keys (maintained on
+save), so exact-match candidates are found in the database with
+GROUP BY ... HAVING COUNT(*) > 1 on indexed columns. Optional fuzzy
+matching blocks contacts on MinHash signatures of their name and company.
+Contacts linked by any match are merged into one group with union-find.
+"""
+import hashlib
+import re
+import struct
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+from django.db.models import Count
+
+EMAIL_MATCH = 'Email Match'
+PHONE_MATCH = 'Phone Match'
+NAME_MATCH = 'Name Match'
+
+# Blocking key column -> match reason, in reporting order
+KEY_FIELDS = (
+    ('email_key', EMAIL_MATCH),
+    ('phone_key', PHONE_MATCH),
+)
+
+# MinHash signature length, split into bands of MINHASH_ROWS values; two
+# contacts become fuzzy candidates when any band is identical
+MINHASH_PERMUTATIONS = 12
+MINHASH_ROWS = 3
+SHINGLE_SIZE = 3
+
+# Share of signature values two candidates must agree on to match
+# (estimates the Jaccard similarity of their name shingles)
+FUZZY_THRESHOLD = 0.75
+
+_unpack_hashes = struct.Struct(f'<{MINHASH_PERMUTATIONS}I').unpack
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    """Case-insensitive email blocking key."""
+    email = (email or '').strip().lower()
+    return email or None
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """Digits-only phone blocking key."""
+    digits = ''.join(filter(str.isdigit, phone or ''))
+    return digits or None
+
+
+class UnionFind:
+    """Disjoint sets over hashable items, with path halving and union by size."""
+
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+
+    def find(self, item):
+        parent = self.parent.setdefault(item, item)
+        if parent == item:
+            self.size.setdefault(item, 1)
+            return item
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size.pop(root_b)
+        return root_a
+
+    def groups(self) -> Dict[object, List]:
+        members = defaultdict(list)
+        for item in self.parent:
+            members[self.find(item)].append(item)
+        return members
+
+
+def duplicate_keys(queryset, key_field: str):
+    """Blocking key values shared by more than one contact, grouped in the database."""
+    return queryset.filter(**{f'{key_field}__isnull': False}).order_by().values(key_field).annotate(
+        contact_count=Count('id')
+    ).filter(contact_count__gt=1).values(key_field)
+
+
+def _name_text(first_name, last_name, company) -> str:
+    text = ' '.join(part for part in (first_name, last_name, company) if part)
+    return _WHITESPACE.sub(' ', text.strip().lower())
+
+
+@lru_cache(maxsize=65536)
+def _shingle_hashes(shingle: str) -> Tuple[int, ...]:
+    # One digest supplies every permutation's hash; name shingles repeat
+    # heavily across contacts, so most lookups hit the cache
+    digest = hashlib.blake2b(shingle.encode(), digest_size=4 * MINHASH_PERMUTATIONS).digest()
+    return _unpack_hashes(digest)
+
+
+def minhash_signature(text: str) -> Optional[Tuple[int, ...]]:
+    """MinHash signature of a string's character shingles, or None if too short."""
+    if len(text) < SHINGLE_SIZE:
+        return None
+    shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    return tuple(map(min, zip(*map(_shingle_hashes, shingles))))
+
+
+def _signature_agreement(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    return sum(x == y for x, y in zip(a, b)) / MINHASH_PERMUTATIONS
+
+
+def _fuzzy_matches(queryset, chunk_size: int = 5000) -> Iterable[Tuple[object, object]]:
+    """
+    Yield (contact_id, contact_id) pairs with similar names and companies.
+
+    Each band bucket is compared against its first member only, so a
+    large bucket costs linear rather than quadratic time.
+    """
+    signatures = {}
+    buckets = {}
+    rows = queryset.order_by().values_list('id', 'first_name', 'last_name', 'company').iterator(chunk_size=chunk_size)
+    for contact_id, first_name, last_name, company in rows:
+        signature = minhash_signature(_name_text(first_name, last_name, company))
+        if signature is None:
+            continue
+        signatures[contact_id] = signature
+        for band in range(0, MINHASH_PERMUTATIONS, MINHASH_ROWS):
+            key = (band, signature[band:band + MINHASH_ROWS])
+            representative = buckets.setdefault(key, contact_id)
+            if representative != contact_id and _signature_agreement(signatures[representative], signature) >= FUZZY_THRESHOLD:
+                yield representative, contact_id
+
+
+def find_duplicate_groups(queryset, fuzzy: bool = False) -> List[dict]:
+    """
+    Group contacts that share an email or phone (or, with fuzzy, a similar
+    name and company), merging groups that overlap.
+
+    Args:
+        queryset: Contacts to search, e.g. one tenant's contacts
+        fuzzy: Also match on MinHash similarity of name and company
+
+    Returns:
+        Groups ordered largest first, each a dict with 'contact_ids',
+        'reasons' and the shared 'values'
+    """
+    union_find = UnionFind()
+    reasons = defaultdict(set)
+    values = defaultdict(list)
+
+    for key_field, reason in KEY_FIELDS:
+        members = queryset.filter(**{f'{key_field}__in': duplicate_keys(queryset, key_field)})
+        first_by_key = {}
+        for contact_id, key in members.order_by().values_list('id', key_field).iterator():
+            first = first_by_key.setdefault(key, contact_id)
+            if first == contact_id:
+                values[contact_id].append((reason, key))
+            else:
+                union_find.union(first, contact_id)
+                reasons[first].add(reason)
+
+    if fuzzy:
+        for first, contact_id in _fuzzy_matches(queryset):
+            union_find.union(first, contact_id)
+            reasons[first].add(NAME_MATCH)
+
+    groups = []
+    for contact_ids in union_find.groups().values():
+        if len(contact_ids) < 2:
+            continue
+        group_reasons = set().union(*(reasons[contact_id] for contact_id in contact_ids))
+        group_values = [value for contact_id in contact_ids for value in values[contact_id]]
+        groups.append({
+            'contact_ids': sorted(contact_ids),
+            'reasons': [reason for reason in (EMAIL_MATCH, PHONE_MATCH, NAME_MATCH) if reason in group_reasons],
+            'values': [key for reason, key in sorted(group_values)],
+        })
+    groups.sort(key=lambda group: (-len(group['contact_ids']), group['contact_ids'][0]))
+    return groups
@@ -0,0 +1,40 @@
+"""
+Small helpers shared by the bulk import, ingest and reporting code.
+"""
+from datetime import date
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List
+
+# Errors reported back per import or request; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+
+def chunks(iterable: Iterable, size: int) -> Iterator[list]:
+    """Lists of up to size items from iterable, consumed lazily."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def add_months(month: date, months: int) -> date:
+    """The first day of the month `months` after (or before) month."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class LineErrors:
+    """
+    Mixin for result dataclasses with an `errors` list: add_error counts a
+    failed line in the field named by error_count_field and keeps its
+    message while fewer than MAX_REPORTED_ERRORS have been kept.
+    """
+    error_count_field = 'rejected'
+    errors: List[Dict[str, Any]]
+
+    def add_error(self, line: int, message: str) -> None:
+        setattr(self, self.error_count_field, getattr(self, self.error_count_field) + 1)
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
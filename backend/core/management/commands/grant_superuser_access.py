@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from core.models import CustomUser, Tenant
+from core.metering import clear_reservations
 from subscription_billing.models import SubscriptionPlan, Subscription, Customer
 from datetime import timedelta
 
@@ -103,6 +104,7 @@ class Command(BaseCommand):
             tenant.ai_image_credits_used_current_period = 0
             tenant.ai_planning_requests_used_current_period = 0
             tenant.save()
+            clear_reservations(tenant.id)
             
             self.stdout.write("Reset tenant token usage to 0")
             
@@ -0,0 +1,47 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from core.models import SearchDocument
+from core.search import SEARCH_SPECS, index_objects, remove_object
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search documents for contacts, email templates and brand assets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=sorted(SEARCH_SPECS), help='Only rebuild one model, e.g. core.contact')
+        parser.add_argument('--tenant', help='Only rebuild one tenant (id)')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Objects indexed per batch')
+
+    def handle(self, *args, **options):
+        kinds = [options['kind']] if options['kind'] else sorted(SEARCH_SPECS)
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be positive')
+
+        for kind in kinds:
+            model = apps.get_model(kind)
+            queryset = model.objects.all_tenants()
+            if options['tenant']:
+                queryset = queryset.filter(tenant_id=options['tenant'])
+
+            indexed = 0
+            batch = []
+            for obj in queryset.iterator(chunk_size=chunk_size):
+                batch.append(obj)
+                if len(batch) >= chunk_size:
+                    index_objects(batch)
+                    indexed += len(batch)
+                    batch = []
+            index_objects(batch)
+            indexed += len(batch)
+
+            # Drop documents whose objects were deleted in bulk
+            documents = SearchDocument.objects.all_tenants().filter(kind=kind)
+            if options['tenant']:
+                documents = documents.filter(tenant_id=options['tenant'])
+            existing = {str(pk) for pk in queryset.values_list('pk', flat=True)}
+            stale = [object_id for object_id in documents.values_list('object_id', flat=True) if object_id not in existing]
+            for object_id in stale:
+                remove_object(model(pk=model._meta.pk.to_python(object_id)))
+
+            self.stdout.write(self.style.SUCCESS(f"{kind}: indexed {indexed}, removed {len(stale)} stale"))
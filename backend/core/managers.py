@@ -5,7 +5,8 @@ from .middleware import get_current_tenant
 class TenantAwareManager(models.Manager):
     """
     Manager that automatically filters querysets by the current tenant.
-    Uses thread-local storage to get the current tenant from middleware.
+    Uses context-local storage to get the current tenant from middleware
+    or an enclosing tenant_scope().
     """
     
     def get_queryset(self):
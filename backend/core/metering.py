@@ -0,0 +1,270 @@
+"""
+Token metering for tenants.
+Consumption is applied with a single conditional UPDATE, so concurrent
+workers can't lose increments and only the counter column is written.
+When TOKEN_METERING_REDIS_URL is configured, consumption is reserved
+atomically in Redis instead and flushed to the database periodically.
+
+A flush moves a tenant's pending reservations into a flushing counter,
+persists them, and only then drops them from that counter, so tokens
+being flushed still count against the limit and are restored to pending
+if the database write fails. Reservations not yet flushed are invisible
+to the database fallback used while Redis is unreachable, so it can
+overspend by at most one flush interval's reservations.
+"""
+import logging
+from typing import Dict, Iterable, Optional, Tuple
+from django.conf import settings
+from django.db.models import F, Q
+from .models import Tenant
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis is optional
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Seconds a tenant's limit/base counters stay cached in Redis before being
+# re-read from the database
+REDIS_SEED_TTL = 60
+
+UNLIMITED = -1
+
+# Returns -2 when the tenant's counters need seeding, -1 when the limit would
+# be exceeded, otherwise the new pending total. Keys: limit, base, pending,
+# flushing.
+_RESERVE_SCRIPT = """
+local limit = redis.call('GET', KEYS[1])
+local base = redis.call('GET', KEYS[2])
+if not limit or not base then
+    return -2
+end
+limit = tonumber(limit)
+local pending = tonumber(redis.call('GET', KEYS[3]) or '0')
+local flushing = tonumber(redis.call('GET', KEYS[4]) or '0')
+local n = tonumber(ARGV[1])
+if limit ~= -1 and tonumber(base) + pending + flushing + n > limit then
+    return -1
+end
+return redis.call('INCRBY', KEYS[3], n)
+"""
+
+# Moves the pending total into the flushing counter and returns it. Keys:
+# pending, flushing.
+_DRAIN_SCRIPT = """
+local pending = tonumber(redis.call('GET', KEYS[1]) or '0')
+if pending > 0 then
+    redis.call('DECRBY', KEYS[1], pending)
+    redis.call('INCRBY', KEYS[2], pending)
+end
+return pending
+"""
+
+# After a flush is persisted: drops the flushed tokens from the flushing
+# counter and raises the cached base to the persisted usage. The base only
+# grows within a period, so a stale value never replaces a newer one. Keys:
+# flushing, base. Args: flushed tokens, persisted usage, base TTL.
+_SETTLE_SCRIPT = """
+redis.call('DECRBY', KEYS[1], ARGV[1])
+local base = tonumber(redis.call('GET', KEYS[2]) or '-1')
+local persisted = tonumber(ARGV[2])
+if persisted > base then
+    redis.call('SET', KEYS[2], persisted, 'EX', ARGV[3])
+end
+"""
+
+# When a flush fails to persist: moves its tokens back to pending. Keys:
+# flushing, pending. Args: tokens.
+_RESTORE_SCRIPT = """
+redis.call('DECRBY', KEYS[1], ARGV[1])
+redis.call('INCRBY', KEYS[2], ARGV[1])
+"""
+
+# Seeds the cached limit and base; a base persisted by a concurrent flush is
+# kept if it is higher. Keys: limit, base. Args: limit, base, TTL.
+_SEED_SCRIPT = """
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+local base = tonumber(redis.call('GET', KEYS[2]) or '-1')
+if tonumber(ARGV[2]) > base then
+    redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+end
+"""
+
+_redis_client = None
+
+
+def get_redis_client():
+    """Return the metering Redis client, or None when Redis metering is off."""
+    global _redis_client
+    url = getattr(settings, 'TOKEN_METERING_REDIS_URL', None)
+    if not url or redis is None:
+        return None
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(url)
+    return _redis_client
+
+
+def _within_limit_q(token_count: int) -> Q:
+    """Filter matching tenants that can still afford `token_count` tokens."""
+    return Q(active_subscription__plan__monthly_tokens=UNLIMITED) | Q(
+        tokens_used_current_period__lte=(
+            F('active_subscription__plan__monthly_tokens')
+            + F('tokens_purchased_additional')
+            - token_count
+        )
+    )
+
+
+def consume_db(tenant_id, token_count: int) -> bool:
+    """
+    Atomically consume tokens with one conditional UPDATE.
+
+    Tenants without an active plan can't consume tokens.
+    """
+    return Tenant.objects.filter(pk=tenant_id).filter(
+        active_subscription__plan__isnull=False,
+    ).filter(_within_limit_q(token_count)).update(
+        tokens_used_current_period=F('tokens_used_current_period') + token_count
+    ) == 1
+
+
+def _keys(tenant_id) -> Tuple[str, str, str, str]:
+    prefix = f"tokens:{tenant_id}"
+    return f"{prefix}:limit", f"{prefix}:base", f"{prefix}:pending", f"{prefix}:flushing"
+
+
+def _seed_redis(client, tenant_id) -> None:
+    """Load a tenant's limit and persisted usage into Redis."""
+    row = Tenant.objects.filter(pk=tenant_id).values(
+        'tokens_used_current_period',
+        'tokens_purchased_additional',
+        'active_subscription__plan__monthly_tokens',
+    ).first()
+    if row is None or row['active_subscription__plan__monthly_tokens'] is None:
+        limit = 0
+    elif row['active_subscription__plan__monthly_tokens'] == UNLIMITED:
+        limit = UNLIMITED
+    else:
+        limit = row['active_subscription__plan__monthly_tokens'] + row['tokens_purchased_additional']
+    base = row['tokens_used_current_period'] if row else 0
+
+    limit_key, base_key, _, _ = _keys(tenant_id)
+    client.eval(_SEED_SCRIPT, 2, limit_key, base_key, limit, base, REDIS_SEED_TTL)
+
+
+def consume_redis(client, tenant_id, token_count: int) -> bool:
+    """Reserve tokens in Redis; flush_reservations persists them later."""
+    keys = _keys(tenant_id)
+    result = client.eval(_RESERVE_SCRIPT, 4, *keys, token_count)
+    if result == -2:
+        _seed_redis(client, tenant_id)
+        result = client.eval(_RESERVE_SCRIPT, 4, *keys, token_count)
+    return result >= 0
+
+
+def _consume(tenant_id, token_count: int) -> bool:
+    client = get_redis_client()
+    if client is not None:
+        try:
+            return consume_redis(client, tenant_id, token_count)
+        except redis.RedisError as e:
+            logger.warning(f"Redis token metering unavailable, using database: {str(e)}")
+    return consume_db(tenant_id, token_count)
+
+
+def use_tokens(tenant: Tenant, token_count: int) -> bool:
+    """
+    Consume tokens for a tenant.
+
+    Keeps the in-memory tenant's counter roughly in step so callers that
+    read it afterwards see the consumption.
+    """
+    if token_count <= 0:
+        return True
+    consumed = _consume(tenant.pk, token_count)
+    if consumed:
+        tenant.tokens_used_current_period += token_count
+    return consumed
+
+
+def use_tokens_many(costs: Dict, tenants: Optional[Iterable[Tenant]] = None) -> Dict:
+    """
+    Consume tokens for several tenants at once.
+
+    Args:
+        costs: Mapping of tenant id -> token count; each tenant's total is
+            consumed all-or-nothing
+        tenants: Optional Tenant instances whose in-memory counters should
+            be updated
+
+    Returns:
+        Mapping of tenant id -> whether the tokens were consumed
+    """
+    instances = {tenant.pk: tenant for tenant in tenants or ()}
+    results = {}
+    for tenant_id, token_count in costs.items():
+        tenant = instances.get(tenant_id)
+        if tenant is not None:
+            results[tenant_id] = use_tokens(tenant, token_count)
+        else:
+            results[tenant_id] = token_count <= 0 or _consume(tenant_id, token_count)
+    return results
+
+
+def add_purchased_tokens(tenant: Tenant, token_count: int) -> None:
+    """Atomically add purchased tokens to a tenant's allowance."""
+    Tenant.objects.filter(pk=tenant.pk).update(
+        tokens_purchased_additional=F('tokens_purchased_additional') + token_count
+    )
+    tenant.tokens_purchased_additional += token_count
+    client = get_redis_client()
+    if client is not None:
+        # Drop the cached limit so the next reservation re-reads it
+        client.delete(_keys(tenant.pk)[0])
+
+
+def clear_reservations(tenant_id) -> None:
+    """
+    Drop a tenant's unflushed reservations and cached counters, for when
+    its usage is reset for a new period.
+    """
+    client = get_redis_client()
+    if client is not None:
+        limit_key, base_key, pending_key, _ = _keys(tenant_id)
+        client.delete(limit_key, base_key, pending_key)
+
+
+def flush_reservations() -> int:
+    """
+    Persist Redis token reservations to the database.
+
+    Returns the number of tokens flushed.
+    """
+    client = get_redis_client()
+    if client is None:
+        return 0
+
+    flushed = 0
+    for pending_key in client.scan_iter(match='tokens:*:pending'):
+        if isinstance(pending_key, bytes):
+            pending_key = pending_key.decode()
+        tenant_id = pending_key.split(':')[1]
+        _, base_key, _, flushing_key = _keys(tenant_id)
+        pending = int(client.eval(_DRAIN_SCRIPT, 2, pending_key, flushing_key))
+        if pending <= 0:
+            continue
+        try:
+            Tenant.objects.filter(pk=tenant_id).update(
+                tokens_used_current_period=F('tokens_used_current_period') + pending
+            )
+            persisted = Tenant.objects.filter(pk=tenant_id).values_list('tokens_used_current_period', flat=True).first()
+        except Exception:
+            client.eval(_RESTORE_SCRIPT, 2, flushing_key, pending_key, pending)
+            raise
+        client.eval(_SETTLE_SCRIPT, 2, flushing_key, base_key, pending, persisted or 0, REDIS_SEED_TTL)
+        flushed += pending
+
+    if flushed:
+        logger.info(f"Flushed {flushed} reserved tokens to the database")
+    return flushed
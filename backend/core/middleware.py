@@ -1,72 +1,111 @@
-import threading
-from django.utils.deprecation import MiddlewareMixin
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 
 
-# Thread-local storage for current tenant
-_thread_locals = threading.local()
+# Context-local storage for the current tenant and the request-scoped cache.
+# Unlike thread-locals these follow the active task under ASGI and gevent,
+# and scopes entered with tenant_scope() are always unwound on exit.
+_current_tenant = ContextVar('current_tenant', default=None)
+_request_cache = ContextVar('request_cache', default=None)
 
 
-class CurrentTenantMiddleware(MiddlewareMixin):
+def _get_user_tenant(user):
+    """Return the tenant of an authenticated user, or None."""
+    if user is not None and user.is_authenticated:
+        if hasattr(user, 'tenant') and user.tenant:
+            return user.tenant
+    return None
+
+
+class CurrentTenantMiddleware:
     """
-    Middleware to handle multi-tenancy by storing the current tenant
-    in thread-local storage for the duration of the request.
+    Middleware to handle multi-tenancy by setting the current tenant
+    for the duration of the request. Works for both WSGI and ASGI.
     """
-    
-    def process_request(self, request):
-        """
-        Process the request and set the current tenant in thread-local storage.
-        """
-        # Clear any existing tenant from thread-local storage
-        if hasattr(_thread_locals, 'current_tenant'):
-            delattr(_thread_locals, 'current_tenant')
-        
-        # Set current tenant if user is authenticated and has a tenant
-        if hasattr(request, 'user') and request.user.is_authenticated:
-            if hasattr(request.user, 'tenant') and request.user.tenant:
-                _thread_locals.current_tenant = request.user.tenant
-    
-    def process_response(self, request, response):
-        """
-        Clean up thread-local storage after the request is processed.
-        """
-        # Clear tenant from thread-local storage
-        if hasattr(_thread_locals, 'current_tenant'):
-            delattr(_thread_locals, 'current_tenant')
-        
-        return response
-    
-    def process_exception(self, request, exception):
-        """
-        Clean up thread-local storage in case of exceptions.
-        """
-        # Clear tenant from thread-local storage
-        if hasattr(_thread_locals, 'current_tenant'):
-            delattr(_thread_locals, 'current_tenant')
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tenant = _get_user_tenant(getattr(request, 'user', None))
+        with tenant_scope(tenant):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        user = await request.auser() if hasattr(request, 'auser') else None
+        tenant = await sync_to_async(_get_user_tenant)(user)
+        with tenant_scope(tenant):
+            return await self.get_response(request)
+
+
+@contextmanager
+def tenant_scope(tenant):
+    """
+    Make `tenant` the current tenant, with a fresh request-scoped cache,
+    until the block exits. Scopes nest, and the previous tenant is restored
+    on exit even if the block raises.
+
+    Args:
+        tenant: Tenant instance, or None for no tenant
+    """
+    tenant_token = _current_tenant.set(tenant)
+    cache_token = _request_cache.set({})
+    try:
+        yield tenant
+    finally:
+        _request_cache.reset(cache_token)
+        _current_tenant.reset(tenant_token)
 
 
 def get_current_tenant():
     """
-    Get the current tenant from thread-local storage.
-    
+    Get the current tenant from context-local storage.
+
     Returns:
         Tenant instance or None if no tenant is set
     """
-    return getattr(_thread_locals, 'current_tenant', None)
+    return _current_tenant.get()
 
 
 def set_current_tenant(tenant):
     """
-    Set the current tenant in thread-local storage.
-    
+    Set the current tenant in context-local storage.
+
+    Prefer tenant_scope(), which restores the previous tenant on exit.
+
     Args:
         tenant: Tenant instance to set as current
     """
-    _thread_locals.current_tenant = tenant
+    _current_tenant.set(tenant)
 
 
 def clear_current_tenant():
     """
-    Clear the current tenant from thread-local storage.
+    Clear the current tenant from context-local storage.
+    """
+    _current_tenant.set(None)
+
+
+def get_request_cache():
+    """
+    Get the cache dict scoped to the current request or tenant scope.
+
+    Returns:
+        dict, or None outside a scope
+    """
+    return _request_cache.get()
+
+
+def clear_request_cache():
+    """
+    Clear the request-scoped cache from context-local storage.
     """
-    if hasattr(_thread_locals, 'current_tenant'):
-        delattr(_thread_locals, 'current_tenant')
+    _request_cache.set(None)
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_agencyclientportal_agencyclientbilling_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='automationexecution',
+            name='next_run_at',
+            field=models.DateTimeField(blank=True, help_text='When the scheduler should next run this execution', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='automationexecution',
+            index=models.Index(fields=['status', 'next_run_at'], name='automation__status_b8b149_idx'),
+        ),
+    ]
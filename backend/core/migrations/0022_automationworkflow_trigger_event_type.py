@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+def backfill_trigger_event_type(apps, schema_editor):
+    AutomationWorkflow = apps.get_model('core', 'AutomationWorkflow')
+    workflows = AutomationWorkflow.objects.all()
+    for workflow in workflows.iterator():
+        event_type = str((workflow.trigger_config or {}).get('event_type') or '')
+        if event_type:
+            AutomationWorkflow.objects.filter(pk=workflow.pk).update(trigger_event_type=event_type)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_automationexecution_next_run_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='automationworkflow',
+            name='trigger_event_type',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Denormalized from trigger_config for event routing', max_length=100),
+        ),
+        migrations.RunPython(backfill_trigger_event_type, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='automationworkflow',
+            index=models.Index(fields=['tenant', 'trigger_event_type', 'is_active'], name='automation__tenant__caefd9_idx'),
+        ),
+    ]
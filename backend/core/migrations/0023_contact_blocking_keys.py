@@ -0,0 +1,46 @@
+from django.db import migrations, models
+
+
+def backfill_blocking_keys(apps, schema_editor):
+    Contact = apps.get_model('core', 'Contact')
+    batch = []
+    for contact in Contact.objects.only('id', 'email', 'phone_number').iterator(chunk_size=2000):
+        email = (contact.email or '').strip().lower()
+        phone = ''.join(filter(str.isdigit, contact.phone_number or ''))
+        contact.email_key = email or None
+        contact.phone_key = phone or None
+        batch.append(contact)
+        if len(batch) >= 2000:
+            Contact.objects.bulk_update(batch, ['email_key', 'phone_key'])
+            batch = []
+    if batch:
+        Contact.objects.bulk_update(batch, ['email_key', 'phone_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_automationworkflow_trigger_event_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contact',
+            name='email_key',
+            field=models.CharField(blank=True, editable=False, max_length=254, null=True),
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='phone_key',
+            field=models.CharField(blank=True, editable=False, max_length=20, null=True),
+        ),
+        migrations.RunPython(backfill_blocking_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['tenant', 'email_key'], name='contacts_tenant__cedf6f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['tenant', 'phone_key'], name='contacts_tenant__9c1709_idx'),
+        ),
+    ]
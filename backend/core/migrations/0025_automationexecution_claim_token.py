@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_searchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='automationexecution',
+            name='claim_token',
+            field=models.UUIDField(blank=True, help_text='Lease held by the worker running this execution', null=True),
+        ),
+    ]
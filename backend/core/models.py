@@ -1,4 +1,5 @@
 import uuid
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.utils import timezone
 from accounts.models import CustomUser
@@ -43,39 +44,53 @@ class Tenant(models.Model):
         """Check if this tenant uses subdomain-based routing."""
         return bool(self.subdomain)
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .tenant_context import invalidate_tenant_context
+        invalidate_tenant_context(self.pk)
+
+    def get_context(self):
+        """Subscription, plan limits and feature flags, loaded once per request."""
+        from .tenant_context import get_tenant_context
+        return get_tenant_context(self)
+
+    def get_plan(self):
+        """The active subscription's plan, or None."""
+        return self.get_context().plan
+
     # Subscription-based feature access methods
     def can_send_email(self):
         """Check if tenant can send emails based on subscription limits."""
-        if not self.active_subscription or not self.active_subscription.plan:
+        plan = self.get_plan()
+        if plan is None:
             return False
-        plan = self.active_subscription.plan
         if plan.email_send_limit == -1:  # Unlimited
             return True
         return self.emails_sent_current_period < plan.email_send_limit
 
     def can_generate_ai_text(self):
         """Check if tenant can generate AI text based on subscription limits."""
-        if not self.active_subscription or not self.active_subscription.plan:
+        plan = self.get_plan()
+        if plan is None:
             return False
-        plan = self.active_subscription.plan
         if plan.ai_text_credits_per_month == -1:  # Unlimited
             return True
         return self.ai_text_credits_used_current_period < plan.ai_text_credits_per_month
 
     def can_generate_ai_image(self):
         """Check if tenant can generate AI images based on subscription limits."""
-        if not self.active_subscription or not self.active_subscription.plan:
+        plan = self.get_plan()
+        if plan is None:
             return False
-        plan = self.active_subscription.plan
         if plan.ai_image_credits_per_month == -1:  # Unlimited
             return True
         return self.ai_image_credits_used_current_period < plan.ai_image_credits_per_month
 
     def can_generate_ai_plan(self):
         """Check if tenant can generate AI planning requests based on subscription limits."""
-        if not self.active_subscription or not self.active_subscription.plan:
+        plan = self.get_plan()
+        if plan is None:
             return False
-        plan = self.active_subscription.plan
         if plan.ai_planning_requests_per_month == -1:  # Unlimited
             return True
         return self.ai_planning_requests_used_current_period < plan.ai_planning_requests_per_month
@@ -84,36 +99,36 @@ class Tenant(models.Model):
 
     def can_add_contact(self):
         """Check if tenant can add more contacts based on subscription limits."""
-        if not self.active_subscription or not self.active_subscription.plan:
+        plan = self.get_plan()
+        if plan is None:
             return False
-        plan = self.active_subscription.plan
         if plan.contact_limit == -1:  # Unlimited
             return True
         return self.contacts_used_current_period < plan.contact_limit
 
     def get_remaining_ai_text_credits(self):
         """Get remaining AI text credits."""
-        if not self.active_subscription or not self.active_subscription.plan:
+        plan = self.get_plan()
+        if plan is None:
             return 0
-        plan = self.active_subscription.plan
         if plan.ai_text_credits_per_month == -1:  # Unlimited
             return -1
         return max(0, plan.ai_text_credits_per_month - self.ai_text_credits_used_current_period)
 
     def get_remaining_ai_image_credits(self):
         """Get remaining AI image credits."""
-        if not self.active_subscription or not self.active_subscription.plan:
+        plan = self.get_plan()
+        if plan is None:
             return 0
-        plan = self.active_subscription.plan
         if plan.ai_image_credits_per_month == -1:  # Unlimited
             return -1
         return max(0, plan.ai_image_credits_per_month - self.ai_image_credits_used_current_period)
 
     def get_remaining_ai_planning_requests(self):
         """Get remaining AI planning requests."""
-        if not self.active_subscription or not self.active_subscription.plan:
+        plan = self.get_plan()
+        if plan is None:
             return 0
-        plan = self.active_subscription.plan
         if plan.ai_planning_requests_per_month == -1:  # Unlimited
             return -1
         return max(0, plan.ai_planning_requests_per_month - self.ai_planning_requests_used_current_period)
@@ -121,9 +136,9 @@ class Tenant(models.Model):
     # New Token-Based System Methods
     def can_use_tokens(self, token_count):
         """Check if tenant can use specified number of tokens."""
-        if not self.active_subscription or not self.active_subscription.plan:
+        plan = self.get_plan()
+        if plan is None:
             return False
-        plan = self.active_subscription.plan
         if plan.monthly_tokens == -1:  # Unlimited
             return True
         total_available = plan.monthly_tokens + self.tokens_purchased_additional
@@ -131,33 +146,30 @@ class Tenant(models.Model):
 
     def get_remaining_tokens(self):
         """Get remaining tokens available to the tenant."""
-        if not self.active_subscription or not self.active_subscription.plan:
+        plan = self.get_plan()
+        if plan is None:
             return 0
-        plan = self.active_subscription.plan
         if plan.monthly_tokens == -1:  # Unlimited
             return -1
         total_available = plan.monthly_tokens + self.tokens_purchased_additional
         return max(0, total_available - self.tokens_used_current_period)
 
     def use_tokens(self, token_count):
-        """Consume tokens for the tenant."""
-        if self.can_use_tokens(token_count):
-            self.tokens_used_current_period += token_count
-            self.save()
-            return True
-        return False
+        """Consume tokens for the tenant (atomic, see core.metering)."""
+        from .metering import use_tokens
+        return use_tokens(self, token_count)
 
     def purchase_additional_tokens(self, token_count):
         """Purchase additional tokens beyond plan allocation."""
-        self.tokens_purchased_additional += token_count
-        self.save()
+        from .metering import add_purchased_tokens
+        add_purchased_tokens(self, token_count)
         return True
 
     def can_create_automation_workflow(self):
         """Check if tenant can create more automation workflows."""
-        if not self.active_subscription or not self.active_subscription.plan:
+        plan = self.get_plan()
+        if plan is None:
             return False
-        plan = self.active_subscription.plan
         if plan.automation_workflow_limit == -1:  # Unlimited
             return True
         # This would need to be implemented with actual workflow counting
@@ -166,9 +178,9 @@ class Tenant(models.Model):
 
     def can_add_integration(self):
         """Check if tenant can add more integrations."""
-        if not self.active_subscription or not self.active_subscription.plan:
+        plan = self.get_plan()
+        if plan is None:
             return False
-        plan = self.active_subscription.plan
         if plan.integration_limit == -1:  # Unlimited
             return True
         # This would need to be implemented with actual integration counting
@@ -208,6 +220,10 @@ class Contact(models.Model):
     title = models.CharField(max_length=100, blank=True, null=True)  # Keep for backward compatibility
     custom_fields = models.JSONField(default=dict, blank=True)
     
+    # Normalized duplicate-detection blocking keys (see core.dedupe)
+    email_key = models.CharField(max_length=254, null=True, blank=True, editable=False)
+    phone_key = models.CharField(max_length=20, null=True, blank=True, editable=False)
+    
     # Tenant relationship
     tenant = models.ForeignKey('core.Tenant', on_delete=models.CASCADE)
     
@@ -232,10 +248,32 @@ class Contact(models.Model):
         verbose_name = 'Contact'
         verbose_name_plural = 'Contacts'
         unique_together = ['email', 'tenant']
+        indexes = [
+            models.Index(fields=['tenant', 'email_key']),
+            models.Index(fields=['tenant', 'phone_key']),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.email})"
 
+    def save(self, *args, **kwargs):
+        """Keep the duplicate-detection blocking keys in sync."""
+        from .dedupe import normalize_email, normalize_phone
+        self.email_key = normalize_email(self.email)
+        self.phone_key = normalize_phone(self.phone_number)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            extra = set()
+            if 'email' in update_fields:
+                extra.add('email_key')
+            if 'phone_number' in update_fields:
+                extra.add('phone_key')
+            if extra:
+                kwargs['update_fields'] = set(update_fields) | extra
+        super().save(*args, **kwargs)
+        from .search import index_object
+        index_object(self, update_fields)
+
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
@@ -368,6 +406,11 @@ class EmailTemplate(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        from .search import index_object
+        super().save(*args, **kwargs)
+        index_object(self, kwargs.get('update_fields'))
+
 
 class AutomationWorkflow(models.Model):
     """
@@ -376,6 +419,7 @@ class AutomationWorkflow(models.Model):
     """
     name = models.CharField(max_length=200)
     trigger_config = models.JSONField(default=dict)
+    trigger_event_type = models.CharField(max_length=100, blank=True, default='', editable=False, help_text="Denormalized from trigger_config for event routing")
     steps_config = models.JSONField(default=dict)
     is_active = models.BooleanField(default=False)
     tenant = models.ForeignKey('core.Tenant', on_delete=models.CASCADE)
@@ -389,10 +433,30 @@ class AutomationWorkflow(models.Model):
         verbose_name = 'Automation Workflow'
         verbose_name_plural = 'Automation Workflows'
         unique_together = ['name', 'tenant']
+        indexes = [
+            models.Index(fields=['tenant', 'trigger_event_type', 'is_active']),
+        ]
 
     def __str__(self):
         return f"{self.name} ({'Active' if self.is_active else 'Inactive'})"
 
+    def save(self, *args, **kwargs):
+        """Keep trigger_event_type in sync and drop cached trigger routes."""
+        from .triggers import invalidate_trigger_routes
+        self.trigger_event_type = str((self.trigger_config or {}).get('event_type') or '')
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'trigger_config' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'trigger_event_type'}
+        super().save(*args, **kwargs)
+        invalidate_trigger_routes(self.tenant_id)
+
+    def delete(self, *args, **kwargs):
+        from .triggers import invalidate_trigger_routes
+        tenant_id = self.tenant_id
+        result = super().delete(*args, **kwargs)
+        invalidate_trigger_routes(tenant_id)
+        return result
+
 
 class AutomationExecution(models.Model):
     """
@@ -416,6 +480,8 @@ class AutomationExecution(models.Model):
     started_at = models.DateTimeField(auto_now_add=True)
     last_executed_at = models.DateTimeField(blank=True, null=True)
     completed_at = models.DateTimeField(blank=True, null=True)
+    next_run_at = models.DateTimeField(blank=True, null=True, help_text="When the scheduler should next run this execution")
+    claim_token = models.UUIDField(blank=True, null=True, help_text="Lease held by the worker running this execution")
 
     objects = TenantAwareManager()
 
@@ -427,6 +493,7 @@ class AutomationExecution(models.Model):
             models.Index(fields=['tenant', 'workflow', 'status']),
             models.Index(fields=['contact', 'status']),
             models.Index(fields=['last_executed_at']),
+            models.Index(fields=['status', 'next_run_at']),
         ]
 
     def __str__(self):
@@ -670,6 +737,11 @@ class BrandAsset(models.Model):
     def __str__(self):
         return f"{self.name} ({self.get_asset_type_display()}) - {self.tenant.name}"
 
+    def save(self, *args, **kwargs):
+        from .search import index_object
+        super().save(*args, **kwargs)
+        index_object(self, kwargs.get('update_fields'))
+
     @property
     def is_ai_generated(self):
         """Check if this asset was generated by AI."""
@@ -971,3 +1043,32 @@ class AgencyClientBilling(models.Model):
             self.discount_amount
         )
         super().save(*args, **kwargs)
+
+
+class SearchDocument(models.Model):
+    """
+    Full-text search index entry for one contact, email template or brand
+    asset, maintained by core.search when the object is saved.
+    """
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=50, help_text="Model label of the indexed object, e.g. core.contact")
+    object_id = models.CharField(max_length=64)
+    title = models.CharField(max_length=500, blank=True, default='')
+    body = models.TextField(blank=True, default='')
+    # Weighted tsvector of title and body on PostgreSQL; SQLite uses an FTS5 table instead
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TenantAwareManager()
+
+    class Meta:
+        db_table = 'search_documents'
+        verbose_name = 'Search Document'
+        verbose_name_plural = 'Search Documents'
+        unique_together = ['kind', 'object_id']
+        indexes = [
+            models.Index(fields=['tenant', 'kind']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id}"
@@ -0,0 +1,235 @@
+"""
+Keyset pagination and sparse fieldsets for list endpoints.
+
+KeysetPagination is the project's default paginator. Pages are ordered
+newest first on (created_at or timestamp, id) and each page starts after
+the last row of the previous one, so fetching page N costs the same index
+range scan as fetching page 1 and rows inserted meanwhile never shift the
+pages a client is walking through. Querysets ordered otherwise, whether
+explicitly (order_by() or an OrderingFilter, including ?ordering=) or by
+the model's Meta.ordering, keep that order and are paged by offset
+instead, with the same cursor parameter.
+
+SparseFieldsetMixin adds `?fields=a,b,c` to a viewset: the serializer
+drops every other field and, when each requested field maps to a model
+column, the queryset selects only those columns.
+"""
+import base64
+import json
+from typing import List, Optional, Tuple
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Columns pages are ordered on, in order of preference; models with none of
+# them are paginated on the primary key alone
+ORDERING_FIELDS = ('timestamp', 'created_at')
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on (ordering field, pk), newest first.
+
+    A viewset can set `cursor_ordering_field` to order on another
+    non-null column. A queryset ordered on anything else, including a
+    model's Meta.ordering, keeps its order and is paged by offset. Query parameters: cursor, page_size.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+
+    def get_page_size(self, request) -> int:
+        page_size = api_settings.PAGE_SIZE or DEFAULT_PAGE_SIZE
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, page_size))
+        except (TypeError, ValueError):
+            pass
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_ordering_field(self, queryset, view=None) -> str:
+        """Name of the column pages are ordered on before the pk."""
+        opts = queryset.model._meta
+        candidates = (getattr(view, 'cursor_ordering_field', None),) + ORDERING_FIELDS
+        for name in filter(None, candidates):
+            try:
+                field = opts.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.concrete and not field.null:
+                return name
+        return 'pk'
+
+    def keeps_keyset_order(self, queryset, ordering_field: str) -> bool:
+        """Whether the queryset's ordering, explicit or Meta.ordering, if any, is the keyset ordering."""
+        ordering = queryset.query.order_by
+        if not ordering and queryset.query.default_ordering:
+            ordering = queryset.model._meta.ordering
+        ordering = [term if isinstance(term, str) else None for term in ordering]
+        if not ordering:
+            return True
+        pk_terms = ('-pk', f'-{queryset.model._meta.pk.name}')
+        first = pk_terms if ordering_field == 'pk' else (f'-{ordering_field}',)
+        return ordering[0] in first and all(term in pk_terms for term in ordering[1:])
+
+    def decode_cursor(self, request, queryset, ordering_field: str) -> Optional[Tuple]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        opts = queryset.model._meta
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            pk = opts.pk.to_python(pk)
+            if ordering_field != 'pk':
+                value = opts.get_field(ordering_field).to_python(value)
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound('Invalid cursor')
+        return value, pk
+
+    def encode_cursor(self, obj, ordering_field: str) -> str:
+        value = getattr(obj, ordering_field)
+        value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        return base64.urlsafe_b64encode(json.dumps([value, str(obj.pk)]).encode()).decode()
+
+    def paginate_in_order(self, queryset, request, page_size: int) -> List:
+        """Offset pages over a queryset that keeps its own ordering."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        offset = 0
+        if encoded:
+            try:
+                offset = int(json.loads(base64.urlsafe_b64decode(encoded.encode()))['offset'])
+            except (TypeError, ValueError, KeyError):
+                raise NotFound('Invalid cursor')
+            if offset < 0:
+                raise NotFound('Invalid cursor')
+        rows = list(queryset[offset:offset + page_size + 1])
+        page = rows[:page_size]
+        self.next_cursor = None
+        if len(rows) > page_size:
+            self.next_cursor = base64.urlsafe_b64encode(json.dumps({'offset': offset + page_size}).encode()).decode()
+        return page
+
+    def paginate_queryset(self, queryset, request, view=None) -> List:
+        self.request = request
+        page_size = self.get_page_size(request)
+        ordering_field = self.get_ordering_field(queryset, view)
+        if not self.keeps_keyset_order(queryset, ordering_field):
+            return self.paginate_in_order(queryset, request, page_size)
+        position = self.decode_cursor(request, queryset, ordering_field)
+
+        if ordering_field == 'pk':
+            queryset = queryset.order_by('-pk')
+            if position:
+                queryset = queryset.filter(pk__lt=position[1])
+        else:
+            queryset = queryset.order_by(f'-{ordering_field}', '-pk')
+            if position:
+                value, pk = position
+                queryset = queryset.filter(
+                    Q(**{f'{ordering_field}__lt': value}) | Q(**{ordering_field: value, 'pk__lt': pk})
+                )
+
+        rows = list(queryset[:page_size + 1])
+        page = rows[:page_size]
+        self.next_cursor = self.encode_cursor(page[-1], ordering_field) if len(rows) > page_size else None
+        return page
+
+    def get_next_link(self) -> Optional[str]:
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_first_link(self) -> str:
+        return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+
+    def get_paginated_response(self, data) -> Response:
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+def requested_fields(request) -> Optional[List[str]]:
+    """Field names from `?fields=`, or None when every field is wanted."""
+    if request is None:
+        return None
+    fields = [name.strip() for name in request.query_params.get('fields', '').split(',') if name.strip()]
+    return fields or None
+
+
+def _model_columns(model, serializer_fields) -> Optional[set]:
+    """
+    Columns a queryset must load for the given serializer fields, or None
+    when one of them reads something other than a model field (a
+    property, method or `source='*'`) and the model must be loaded whole.
+    """
+    opts = model._meta
+    columns = set()
+    for field in serializer_fields:
+        source = field.source.split('.')[0]
+        try:
+            model_field = opts.get_field(source)
+        except FieldDoesNotExist:
+            return None
+        if model_field.concrete and not model_field.many_to_many:
+            columns.add(model_field.name)
+        elif not (model_field.many_to_many or model_field.one_to_many or model_field.one_to_one):
+            return None
+    return columns
+
+
+class SparseFieldsetMixin:
+    """
+    Viewset mixin for `?fields=` on read requests.
+
+    Unknown field names are ignored; if none of the requested names exist
+    the full representation is returned.
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fields = requested_fields(self.request) if self.request.method == 'GET' else None
+        if fields:
+            target = getattr(serializer, 'child', serializer)
+            keep = set(fields) & set(target.fields)
+            if keep:
+                for name in set(target.fields) - keep:
+                    target.fields.pop(name)
+        return serializer
+
+    def paginate_queryset(self, queryset):
+        return super().paginate_queryset(self.narrow_queryset(queryset))
+
+    def narrow_queryset(self, queryset):
+        """Select only the columns the requested fields need."""
+        fields = requested_fields(self.request) if self.request.method == 'GET' else None
+        if not fields or queryset.query.select_related is True:
+            return queryset
+        serializer_fields = self.get_serializer_class()(context=self.get_serializer_context()).fields
+        selected = [serializer_fields[name] for name in fields if name in serializer_fields]
+        columns = _model_columns(queryset.model, selected) if selected else None
+        if columns is None:
+            return queryset
+        columns.add(queryset.model._meta.pk.name)
+        paginator = self.paginator
+        if paginator is not None and hasattr(paginator, 'get_ordering_field'):
+            columns.add(paginator.get_ordering_field(queryset, self))
+        if isinstance(queryset.query.select_related, dict):
+            columns.update(queryset.query.select_related)
+        columns.discard('pk')
+        return queryset.only(*columns)
@@ -0,0 +1,163 @@
+"""
+Durable workflow execution scheduler.
+Pending work is tracked in AutomationExecution.next_run_at instead of as
+ETA messages in the broker. A periodic task claims due executions in
+batches with SELECT ... FOR UPDATE SKIP LOCKED and runs consecutive
+non-wait steps in-process.
+
+A claim leases the executions under a claim token. The lease is checked
+and renewed before every step, so an execution whose lease ran out while
+it waited in a slow batch, and was claimed again, is left to the new
+holder instead of running its steps twice.
+"""
+import logging
+import uuid
+from datetime import timedelta
+from typing import Dict, Any, List, Optional
+from django.db import transaction
+from django.utils import timezone
+from .middleware import tenant_scope
+from .models import AutomationExecution
+from .utils import execute_workflow_step
+
+logger = logging.getLogger(__name__)
+
+# How long a claimed execution stays invisible to other schedulers. If the
+# worker dies mid-run the execution becomes due again once the lease expires.
+CLAIM_LEASE = timedelta(minutes=5)
+
+# Upper bound on steps run for one execution before yielding back to the queue
+MAX_STEPS_PER_RUN = 50
+
+
+def claim_due_executions(batch_size: int = 100, now=None, claim_token=None) -> List[str]:
+    """
+    Claim up to `batch_size` due executions for this worker.
+
+    Rows locked by a concurrent scheduler are skipped rather than waited on,
+    and claimed rows are leased to `claim_token` (a fresh one if not given)
+    by pushing next_run_at forward.
+
+    Returns:
+        List of claimed execution ids
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        execution_ids = list(
+            AutomationExecution.objects.all_tenants()
+            .select_for_update(skip_locked=True)
+            .filter(status='active', next_run_at__lte=now)
+            .order_by('next_run_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if execution_ids:
+            AutomationExecution.objects.all_tenants().filter(id__in=execution_ids).update(
+                next_run_at=now + CLAIM_LEASE, claim_token=claim_token or uuid.uuid4()
+            )
+    return [str(execution_id) for execution_id in execution_ids]
+
+
+def renew_lease(execution_id: str, claim_token) -> bool:
+    """Extend the lease if `claim_token` still holds it; False once another claim has taken over."""
+    return AutomationExecution.objects.all_tenants().filter(id=execution_id, claim_token=claim_token).update(
+        next_run_at=timezone.now() + CLAIM_LEASE
+    ) > 0
+
+
+def schedule_execution(execution_id: str, run_at, claim_token=None) -> None:
+    """
+    Set (or clear, with None) when an execution should next run, releasing
+    its lease. With a claim_token, nothing changes unless that token holds it.
+    """
+    executions = AutomationExecution.objects.all_tenants().filter(id=execution_id)
+    if claim_token is not None:
+        executions = executions.filter(claim_token=claim_token)
+    executions.update(next_run_at=run_at, claim_token=None)
+
+
+def run_execution(execution_id: str, max_steps: int = MAX_STEPS_PER_RUN, claim_token=None) -> Dict[str, Any]:
+    """
+    Run consecutive steps of an execution until it waits, finishes or fails.
+
+    Steps run in the execution's tenant scope, since they are started from
+    tasks and the scheduler rather than from a request. Wait steps record
+    their resume time in next_run_at for the scheduler to pick up later. If
+    the step budget runs out the execution is rescheduled immediately so
+    one long workflow can't monopolize a worker.
+
+    Args:
+        execution_id: UUID of the AutomationExecution
+        max_steps: Maximum number of steps to run in this call
+        claim_token: Token the execution was leased under; steps stop as
+            soon as it no longer holds the lease. Without one the lease
+            isn't checked.
+
+    Returns:
+        Result of the last executed step
+    """
+    execution = AutomationExecution.objects.all_tenants().select_related('tenant').filter(id=execution_id).first()
+    with tenant_scope(execution.tenant if execution else None):
+        return _run_steps(execution_id, max_steps, claim_token)
+
+
+def _run_steps(execution_id: str, max_steps: int, claim_token) -> Dict[str, Any]:
+    """Body of run_execution, run inside the execution's tenant scope."""
+    result: Dict[str, Any] = {'success': False, 'message': 'No steps executed', 'next_action': None}
+    for _ in range(max_steps):
+        if claim_token is not None and not renew_lease(execution_id, claim_token):
+            logger.warning(f"Execution {execution_id} was claimed by another worker; stopping")
+            return {'success': False, 'message': 'Lease lost', 'next_action': None, 'lease_lost': True}
+
+        result = execute_workflow_step(execution_id)
+        next_action = result.get('next_action')
+
+        if not result['success'] or not next_action:
+            schedule_execution(execution_id, None, claim_token)
+            return result
+
+        if next_action['action'] == 'schedule':
+            scheduled_time = _parse_scheduled_time(next_action['scheduled_time'])
+            if scheduled_time > timezone.now():
+                schedule_execution(execution_id, scheduled_time, claim_token)
+                logger.info(f"Execution {execution_id} waiting until {scheduled_time.isoformat()}")
+                return result
+
+    # Step budget exhausted; hand the execution back to the scheduler
+    schedule_execution(execution_id, timezone.now(), claim_token)
+    return result
+
+
+def run_due_executions(batch_size: int = 100, max_batches: int = 10) -> Dict[str, int]:
+    """
+    Claim and run due executions until the queue is drained or
+    `max_batches` batches have been processed.
+    """
+    processed = 0
+    failed = 0
+    for _ in range(max_batches):
+        claim_token = uuid.uuid4()
+        execution_ids = claim_due_executions(batch_size, claim_token=claim_token)
+        if not execution_ids:
+            break
+        for execution_id in execution_ids:
+            try:
+                result = run_execution(execution_id, claim_token=claim_token)
+            except Exception as e:
+                # Leave the lease in place so the execution is retried after it expires
+                logger.error(f"Error running workflow execution {execution_id}: {str(e)}")
+                failed += 1
+                continue
+            if result.get('lease_lost'):
+                continue
+            processed += 1
+            if not result['success']:
+                failed += 1
+        if len(execution_ids) < batch_size:
+            break
+    return {'processed': processed, 'failed': failed}
+
+
+def _parse_scheduled_time(scheduled_time) -> Optional[Any]:
+    if isinstance(scheduled_time, str):
+        return timezone.datetime.fromisoformat(scheduled_time.replace('Z', '+00:00'))
+    return scheduled_time
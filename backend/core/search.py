@@ -0,0 +1,294 @@
+"""
+Full-text search for contacts, email templates and brand assets.
+Each searchable object has a SearchDocument row holding its title and body
+text, written when the object is saved and dropped when it is deleted
+(core.signals). On PostgreSQL the document keeps a weighted tsvector
+behind a GIN index; on SQLite (development) the text is mirrored into an
+FTS5 table. Other databases fall back to icontains.
+
+Queries match every term as a prefix, results are ranked (title matches
+weigh more than body matches) and pages are cut with a (rank, id) keyset
+cursor, so each keystroke is an index lookup rather than a table scan.
+"""
+import base64
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, Q
+from django.utils.html import strip_tags
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from .models import SearchDocument
+
+# Text search configuration; 'simple' doesn't stem, which suits names and
+# prefix matching
+SEARCH_CONFIG = 'simple'
+
+FTS_TABLE = 'search_documents_fts'
+
+# Body text beyond this is not indexed
+MAX_BODY_LENGTH = 20000
+
+# Query terms beyond this are ignored
+MAX_TERMS = 8
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+_TERM = re.compile(r'\w+')
+
+
+def _join(*values) -> str:
+    return ' '.join(str(value) for value in values if value)
+
+
+@dataclass(frozen=True)
+class SearchSpec:
+    """What to index for one model."""
+    title: Callable[[Any], str]
+    body: Callable[[Any], str]
+    fields: Tuple[str, ...]
+
+
+SEARCH_SPECS: Dict[str, SearchSpec] = {
+    'core.contact': SearchSpec(
+        title=lambda contact: _join(contact.first_name, contact.last_name, contact.company),
+        body=lambda contact: _join(contact.email, contact.job_title, contact.notes),
+        fields=('first_name', 'last_name', 'company', 'email', 'job_title', 'notes'),
+    ),
+    'core.emailtemplate': SearchSpec(
+        title=lambda template: _join(template.name, template.subject),
+        body=lambda template: strip_tags(template.body_html or ''),
+        fields=('name', 'subject', 'body_html'),
+    ),
+    'core.brandasset': SearchSpec(
+        title=lambda asset: asset.name,
+        body=lambda asset: _join(asset.description, ' '.join(map(str, asset.tags or [])), asset.asset_type),
+        fields=('name', 'description', 'tags', 'asset_type'),
+    ),
+}
+
+
+def _kind(model) -> str:
+    return model._meta.label_lower
+
+
+def _backend() -> str:
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite':
+        return 'sqlite'
+    return 'fallback'
+
+
+def _ensure_fts_table(cursor) -> None:
+    # Not cached: the table is created inside the caller's transaction and
+    # disappears with it if that rolls back
+    cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(title, body)")
+
+
+def _placeholders(values) -> str:
+    return ', '.join(['%s'] * len(values))
+
+
+def _sync_backend(kind: str, object_ids: List[str]) -> None:
+    """Refresh the backend index for documents just written."""
+    backend = _backend()
+    if backend == 'postgresql':
+        SearchDocument.objects.all_tenants().filter(kind=kind, object_id__in=object_ids).update(
+            search_vector=SearchVector('title', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('body', weight='B', config=SEARCH_CONFIG)
+        )
+    elif backend == 'sqlite':
+        documents = f"SELECT id FROM {SearchDocument._meta.db_table} WHERE kind = %s AND object_id IN ({_placeholders(object_ids)})"
+        with connection.cursor() as cursor:
+            _ensure_fts_table(cursor)
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({documents})", [kind, *object_ids])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, body) SELECT id, title, body "
+                f"FROM {SearchDocument._meta.db_table} WHERE kind = %s AND object_id IN ({_placeholders(object_ids)})",
+                [kind, *object_ids]
+            )
+
+
+def index_objects(objects: Iterable) -> None:
+    """Write search documents for saved objects of one searchable model."""
+    objects = [obj for obj in objects if obj.pk is not None]
+    if not objects:
+        return
+    kind = _kind(type(objects[0]))
+    spec = SEARCH_SPECS[kind]
+    documents = [
+        SearchDocument(
+            tenant_id=obj.tenant_id,
+            kind=kind,
+            object_id=str(obj.pk),
+            title=spec.title(obj)[:500],
+            body=spec.body(obj)[:MAX_BODY_LENGTH],
+        )
+        for obj in objects
+    ]
+    SearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=['kind', 'object_id'],
+        update_fields=['tenant', 'title', 'body', 'updated_at'],
+    )
+    _sync_backend(kind, [document.object_id for document in documents])
+
+
+def index_object(obj, update_fields: Optional[Iterable[str]] = None) -> None:
+    """
+    Index an object after it is saved; saves that touch none of the
+    indexed fields are skipped.
+    """
+    spec = SEARCH_SPECS[_kind(type(obj))]
+    if update_fields is not None and not set(update_fields) & set(spec.fields):
+        return
+    index_objects([obj])
+
+
+def remove_object(obj) -> None:
+    """Drop an object's search document."""
+    kind, object_id = _kind(type(obj)), str(obj.pk)
+    if _backend() == 'sqlite':
+        with connection.cursor() as cursor:
+            _ensure_fts_table(cursor)
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN "
+                f"(SELECT id FROM {SearchDocument._meta.db_table} WHERE kind = %s AND object_id = %s)",
+                [kind, object_id]
+            )
+    SearchDocument.objects.all_tenants().filter(kind=kind, object_id=object_id).delete()
+
+
+def query_terms(query: str) -> List[str]:
+    return _TERM.findall((query or '').lower())[:MAX_TERMS]
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    document_id: int
+    object_id: str
+    rank: float
+
+
+def _search_postgresql(documents, terms, limit, after) -> List[SearchHit]:
+    query = SearchQuery(' & '.join(f"{term}:*" for term in terms), search_type='raw', config=SEARCH_CONFIG)
+    documents = documents.filter(search_vector=query).annotate(rank=SearchRank(F('search_vector'), query))
+    if after:
+        rank, document_id = after
+        documents = documents.filter(Q(rank__lt=rank) | Q(rank=rank, id__gt=document_id))
+    rows = documents.order_by('-rank', 'id').values_list('id', 'object_id', 'rank')[:limit]
+    return [SearchHit(*row) for row in rows]
+
+
+def _search_sqlite(documents, terms, limit, after) -> List[SearchHit]:
+    # Filters other than the match (kind, tenant) come from the queryset
+    filtered_sql, filtered_params = documents.values('id').query.sql_with_params()
+    rank = f"-bm25({FTS_TABLE}, 2.0, 1.0)"
+    sql = (
+        f"SELECT rowid, {rank} AS score FROM {FTS_TABLE} "
+        f"WHERE {FTS_TABLE} MATCH %s AND rowid IN ({filtered_sql})"
+    )
+    params = [' '.join(f'"{term}"*' for term in terms), *filtered_params]
+    if after:
+        sql += f" AND ({rank} < %s OR ({rank} = %s AND rowid > %s))"
+        params += [after[0], after[0], after[1]]
+    sql += " ORDER BY score DESC, rowid LIMIT %s"
+    params.append(limit)
+    with connection.cursor() as cursor:
+        _ensure_fts_table(cursor)
+        cursor.execute(sql, params)
+        ranks = cursor.fetchall()
+    object_ids = dict(SearchDocument.objects.all_tenants().filter(id__in=[row[0] for row in ranks]).values_list('id', 'object_id'))
+    return [SearchHit(document_id, object_ids[document_id], score) for document_id, score in ranks if document_id in object_ids]
+
+
+def _search_fallback(documents, terms, limit, after) -> List[SearchHit]:
+    for term in terms:
+        documents = documents.filter(Q(title__icontains=term) | Q(body__icontains=term))
+    if after:
+        documents = documents.filter(id__gt=after[1])
+    return [SearchHit(document_id, object_id, 0.0) for document_id, object_id in documents.order_by('id').values_list('id', 'object_id')[:limit]]
+
+
+def search(model, query: str, tenant=None, limit: int = DEFAULT_PAGE_SIZE, after: Optional[Tuple[float, int]] = None) -> List[SearchHit]:
+    """
+    Search one model's documents, best matches first.
+
+    Args:
+        model: Searchable model class
+        query: Free text; every term must match, as a prefix
+        tenant: Tenant to search; None searches every tenant
+        limit: Maximum hits
+        after: (rank, document_id) of the last hit on the previous page
+
+    Returns:
+        List of SearchHit
+    """
+    terms = query_terms(query)
+    if not terms:
+        return []
+    documents = SearchDocument.objects.all_tenants().filter(kind=_kind(model))
+    if tenant is not None:
+        documents = documents.filter(tenant=tenant)
+    searcher = {
+        'postgresql': _search_postgresql,
+        'sqlite': _search_sqlite,
+    }.get(_backend(), _search_fallback)
+    return searcher(documents, terms, limit, after)
+
+
+def encode_cursor(hit: SearchHit) -> str:
+    return base64.urlsafe_b64encode(json.dumps([hit.rank, hit.document_id]).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[float, int]]:
+    """Decode a search cursor; raises ValueError if it is malformed."""
+    if not cursor:
+        return None
+    rank, document_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return float(rank), int(document_id)
+
+
+class SearchActionMixin:
+    """
+    Adds a ranked, cursor-paginated `search` action to a model viewset.
+
+    Query parameters: q (search text), cursor, page_size. Results are
+    limited to what get_queryset() returns for the user.
+    """
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        try:
+            page_size = min(max(int(request.query_params.get('page_size', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+            after = decode_cursor(request.query_params.get('cursor'))
+        except (TypeError, ValueError):
+            return Response({'error': 'Invalid page_size or cursor'}, status=status.HTTP_400_BAD_REQUEST)
+
+        user = request.user
+        tenant = None if user.is_superuser else getattr(user, 'tenant', None)
+        if tenant is None and not user.is_superuser:
+            return Response({'next': None, 'results': []})
+
+        model = self.get_queryset().model
+        hits = search(model, request.query_params.get('q', ''), tenant=tenant, limit=page_size + 1, after=after)
+        has_more = len(hits) > page_size
+        hits = hits[:page_size]
+
+        objects = {str(obj.pk): obj for obj in self.get_queryset().filter(pk__in=[hit.object_id for hit in hits])}
+        results = [objects[hit.object_id] for hit in hits if hit.object_id in objects]
+        next_url = None
+        if has_more:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', encode_cursor(hits[-1]))
+        return Response({
+            'next': next_url,
+            'results': self.get_serializer(results, many=True).data,
+        })
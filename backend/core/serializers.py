@@ -1,11 +1,13 @@
 from rest_framework import serializers
-from django.db.models import Count, Avg, Sum
+from django.db.models import Count, Avg
 from .models import (
     Tenant, Contact, Campaign, EmailTemplate, 
     AutomationWorkflow, BrandProfile, AutomationExecution, BrandAsset
 )
 from accounts.models import CustomUser
-from analytics.models import Event
+from analytics.rollups import (
+    get_campaign_event_totals, get_campaign_social_post_counts, event_count
+)
 from .models import AgencyClientPortal, AgencyClientUser, AgencyClientActivity, AgencyClientBilling
 
 
@@ -27,8 +29,6 @@ class ContactSerializer(serializers.ModelSerializer):
     
     full_name = serializers.ReadOnlyField()
     assigned_to_user_name = serializers.StringRelatedField(source='assigned_to_user', read_only=True)
-    assigned_to_department_name = serializers.StringRelatedField(source='assigned_to_department', read_only=True)
-    assigned_to_team_name = serializers.StringRelatedField(source='assigned_to_team', read_only=True)
     
     class Meta:
         model = Contact
@@ -39,8 +39,6 @@ class ContactSerializer(serializers.ModelSerializer):
             'last_activity_summary', 'next_action_suggestion', 'suggested_persona',
             'phone', 'title', 'custom_fields', 'full_name', 'tenant',
             'assigned_to_user', 'assigned_to_user_name',
-            'assigned_to_department', 'assigned_to_department_name',
-            'assigned_to_team', 'assigned_to_team_name',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'tenant']
@@ -62,6 +60,20 @@ class ContactSerializer(serializers.ModelSerializer):
         return value
 
 
+class CampaignListSerializer(serializers.ListSerializer):
+    """
+    List serializer that preloads campaign statistics for every campaign
+    on the page with one rollup query instead of per-campaign counts.
+    """
+
+    def to_representation(self, data):
+        campaigns = list(data.all() if hasattr(data, 'all') else data)
+        campaign_ids = [campaign.pk for campaign in campaigns]
+        self._context['campaign_event_totals'] = get_campaign_event_totals(campaign_ids)
+        self._context['campaign_social_post_counts'] = get_campaign_social_post_counts(campaign_ids)
+        return super().to_representation(campaigns)
+
+
 class CampaignSerializer(serializers.ModelSerializer):
     """Serializer for Campaign model."""
     
@@ -97,6 +109,7 @@ class CampaignSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+        list_serializer_class = CampaignListSerializer
     
     def validate_budget_allocated(self, value):
         """Validate that budget is not negative."""
@@ -155,109 +168,64 @@ class CampaignSerializer(serializers.ModelSerializer):
         return data
 
     # --- Methods to calculate campaign statistics ---
-    
+    # Statistics are read from the CampaignEventRollup table. When serializing
+    # a list, CampaignListSerializer loads totals for the whole page up front.
+
+    def _get_event_totals(self, obj):
+        """Get rollup totals for a campaign, loading them if not preloaded."""
+        totals = self.context.setdefault('campaign_event_totals', {})
+        if obj.pk not in totals:
+            totals.update(get_campaign_event_totals([obj.pk]))
+        return totals[obj.pk]
+
+    def _count(self, obj, event_type):
+        return event_count(self._get_event_totals(obj), event_type)
+
+    def _rate(self, obj, numerator_type, denominator_type):
+        denominator = self._count(obj, denominator_type)
+        if denominator == 0:
+            return 0.0
+        return round((self._count(obj, numerator_type) / denominator) * 100, 2)
+
     def get_total_emails_sent(self, obj):
         """Get total number of emails sent for this campaign."""
-        return Event.objects.all_tenants().filter(
-            tenant=obj.tenant,
-            campaign=obj,
-            event_type='email_sent'
-        ).count()
+        return self._count(obj, 'email_sent')
 
     def get_open_rate(self, obj):
         """Calculate email open rate as a percentage."""
-        sent_count = self.get_total_emails_sent(obj)
-        if sent_count == 0:
-            return 0.0
-
-        opened_count = Event.objects.all_tenants().filter(
-            tenant=obj.tenant,
-            campaign=obj,
-            event_type='email_opened'
-        ).count()
-        return round((opened_count / sent_count) * 100, 2)
+        return self._rate(obj, 'email_opened', 'email_sent')
 
     def get_click_rate(self, obj):
         """Calculate email click rate as a percentage."""
-        sent_count = self.get_total_emails_sent(obj)
-        if sent_count == 0:
-            return 0.0
-
-        clicked_count = Event.objects.all_tenants().filter(
-            tenant=obj.tenant,
-            campaign=obj,
-            event_type='email_clicked'
-        ).count()
-        return round((clicked_count / sent_count) * 100, 2)
+        return self._rate(obj, 'email_clicked', 'email_sent')
 
     def get_conversions(self, obj):
         """Get total number of conversions for this campaign."""
-        return Event.objects.all_tenants().filter(
-            tenant=obj.tenant,
-            campaign=obj,
-            event_type='conversion_event'
-        ).count()
+        return self._count(obj, 'conversion_event')
 
     def get_total_social_posts(self, obj):
         """Get total number of social posts for this campaign."""
-        return Event.objects.all_tenants().filter(
-            tenant=obj.tenant,
-            campaign=obj,
-            event_type='social_post_viewed'
-        ).values('details__post_id').distinct().count()
+        post_counts = self.context.setdefault('campaign_social_post_counts', {})
+        if obj.pk not in post_counts:
+            post_counts.update(get_campaign_social_post_counts([obj.pk]))
+        return post_counts[obj.pk]
 
     def get_social_engagement_rate(self, obj):
         """Calculate social engagement rate as a percentage."""
-        viewed_count = Event.objects.all_tenants().filter(
-            tenant=obj.tenant,
-            campaign=obj,
-            event_type='social_post_viewed'
-        ).count()
-        
-        if viewed_count == 0:
-            return 0.0
-
-        clicked_count = Event.objects.all_tenants().filter(
-            tenant=obj.tenant,
-            campaign=obj,
-            event_type='social_post_clicked'
-        ).count()
-        return round((clicked_count / viewed_count) * 100, 2)
+        return self._rate(obj, 'social_post_clicked', 'social_post_viewed')
 
     def get_total_sms_sent(self, obj):
         """Get total number of SMS messages sent for this campaign."""
-        return Event.objects.all_tenants().filter(
-            tenant=obj.tenant,
-            campaign=obj,
-            event_type='sms_sent'
-        ).count()
+        return self._count(obj, 'sms_sent')
 
     def get_sms_delivery_rate(self, obj):
         """Calculate SMS delivery rate as a percentage."""
-        sent_count = self.get_total_sms_sent(obj)
-        if sent_count == 0:
-            return 0.0
-
-        delivered_count = Event.objects.all_tenants().filter(
-            tenant=obj.tenant,
-            campaign=obj,
-            event_type='sms_delivered'
-        ).count()
-        return round((delivered_count / sent_count) * 100, 2)
+        return self._rate(obj, 'sms_delivered', 'sms_sent')
 
     def get_conversion_value(self, obj):
         """Get total conversion value for this campaign."""
-        conversion_events = Event.objects.all_tenants().filter(
-            tenant=obj.tenant,
-            campaign=obj,
-            event_type='conversion_event'
-        )
-        
-        # Sum up the value field from conversion events
-        total_value = conversion_events.aggregate(
-            total=Sum('value')
-        )['total'] or 0.0
-        
+        totals = self._get_event_totals(obj)
+        total_value = totals.get('conversion_event', {}).get('value', 0)
         return round(float(total_value), 2)
 
 
@@ -635,9 +603,9 @@ class AutomationExecutionSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'tenant', 'workflow', 'workflow_name', 'contact', 'contact_name',
             'current_step_index', 'current_step_info', 'status', 'context_data',
-            'started_at', 'last_executed_at', 'completed_at'
+            'started_at', 'last_executed_at', 'completed_at', 'next_run_at'
         ]
-        read_only_fields = ['id', 'tenant', 'started_at', 'last_executed_at', 'completed_at']
+        read_only_fields = ['id', 'tenant', 'started_at', 'last_executed_at', 'completed_at', 'next_run_at']
     
     def validate_context_data(self, value):
         """Validate context data JSON."""
@@ -0,0 +1,17 @@
+"""
+Signal receivers for core models.
+Search documents are dropped on post_delete rather than in delete()
+overrides, since queryset deletes (contact merges) and cascades (a deleted
+tenant) never call Model.delete().
+"""
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .models import BrandAsset, Contact, EmailTemplate
+from .search import remove_object
+
+
+@receiver(post_delete, sender=Contact)
+@receiver(post_delete, sender=EmailTemplate)
+@receiver(post_delete, sender=BrandAsset)
+def remove_search_document(sender, instance, **kwargs):
+    remove_object(instance)
@@ -3,11 +3,15 @@ Celery tasks for workflow execution engine.
 Handles asynchronous execution of automation workflows.
 """
 import logging
-from typing import Dict, Any, Optional
+import uuid
+from typing import Dict, Any, List, Optional
 from celery import shared_task
 from django.utils import timezone
 from .models import AutomationExecution, AutomationWorkflow, Contact
-from .utils import execute_workflow_step, determine_next_action
+from .utils import determine_next_action
+from . import conditions, metering, scheduler, triggers
+from .middleware import tenant_scope
+from .tenant_context import tenant_task
 
 logger = logging.getLogger(__name__)
 
@@ -23,10 +27,23 @@ def start_workflow_execution(self, workflow_id: str, contact_id: Optional[str] =
         context_data: Optional context data for the execution
     """
     try:
-        workflow = AutomationWorkflow.objects.get(id=workflow_id)
-        
+        workflow = AutomationWorkflow.objects.all_tenants().select_related('tenant').get(id=workflow_id)
+    except AutomationWorkflow.DoesNotExist:
+        logger.error(f"Workflow {workflow_id} not found")
+        return {
+            'success': False,
+            'message': 'Workflow not found'
+        }
+    
+    with tenant_scope(workflow.tenant):
+        return _start_workflow_execution(self, workflow, contact_id, context_data)
+
+
+def _start_workflow_execution(task, workflow, contact_id, context_data):
+    """Body of start_workflow_execution, run inside the workflow's tenant scope."""
+    try:
         if not workflow.is_active:
-            logger.warning(f"Workflow {workflow_id} is not active")
+            logger.warning(f"Workflow {workflow.id} is not active")
             return {
                 'success': False,
                 'message': 'Workflow is not active'
@@ -44,18 +61,23 @@ def start_workflow_execution(self, workflow_id: str, contact_id: Optional[str] =
                     'message': 'Contact not found'
                 }
         
-        # Create execution
+        # Create execution already leased to the worker that picks up the
+        # task below; if that message is lost or delayed past the lease the
+        # scheduler runs it instead, and the late task stops at its first step.
+        claim_token = uuid.uuid4()
         execution = AutomationExecution.objects.create(
             tenant=workflow.tenant,
             workflow=workflow,
             contact=contact,
-            context_data=context_data or {}
+            context_data=context_data or {},
+            next_run_at=timezone.now() + scheduler.CLAIM_LEASE,
+            claim_token=claim_token
         )
         
         logger.info(f"Created workflow execution {execution.id} for workflow {workflow.name}")
         
         # Start processing the first step
-        result = process_workflow_step.delay(str(execution.id))
+        result = process_workflow_step.delay(str(execution.id), str(claim_token))
         
         return {
             'success': True,
@@ -64,59 +86,32 @@ def start_workflow_execution(self, workflow_id: str, contact_id: Optional[str] =
             'task_id': result.id
         }
         
-    except AutomationWorkflow.DoesNotExist:
-        logger.error(f"Workflow {workflow_id} not found")
-        return {
-            'success': False,
-            'message': 'Workflow not found'
-        }
     except Exception as e:
         logger.error(f"Error starting workflow execution: {str(e)}")
         # Retry the task
-        raise self.retry(countdown=60, exc=e)
+        raise task.retry(countdown=60, exc=e)
 
 
 @shared_task(bind=True, max_retries=3)
-def process_workflow_step(self, execution_id: str):
+def process_workflow_step(self, execution_id: str, claim_token: Optional[str] = None):
     """
-    Process a single workflow step.
+    Process workflow steps for an execution.
+    
+    Consecutive steps run in this task; wait steps are recorded in
+    next_run_at and resumed by run_due_workflow_executions rather than
+    being held in the broker as countdown messages.
     
     Args:
         execution_id: UUID of the AutomationExecution
+        claim_token: Lease the execution was created under, if any
     """
     try:
         logger.info(f"Processing workflow step for execution {execution_id}")
         
-        # Execute the step
-        result = execute_workflow_step(execution_id)
+        result = scheduler.run_execution(execution_id, claim_token=claim_token)
         
         if not result['success']:
             logger.error(f"Step execution failed for {execution_id}: {result['message']}")
-            return result
-        
-        # Handle next action
-        next_action = result.get('next_action')
-        if next_action:
-            if next_action['action'] == 'schedule':
-                # Schedule next execution at specific time
-                scheduled_time = next_action['scheduled_time']
-                if isinstance(scheduled_time, str):
-                    scheduled_time = timezone.datetime.fromisoformat(scheduled_time.replace('Z', '+00:00'))
-                
-                delay_seconds = (scheduled_time - timezone.now()).total_seconds()
-                if delay_seconds > 0:
-                    process_workflow_step.apply_async(
-                        args=[execution_id],
-                        countdown=int(delay_seconds)
-                    )
-                    logger.info(f"Scheduled next step for execution {execution_id} in {delay_seconds} seconds")
-                else:
-                    # Execute immediately if scheduled time has passed
-                    process_workflow_step.delay(execution_id)
-            
-            elif next_action['action'] == 'continue':
-                # Continue with next step immediately
-                process_workflow_step.delay(execution_id)
         
         return result
         
@@ -126,7 +121,26 @@ def process_workflow_step(self, execution_id: str):
         raise self.retry(countdown=60, exc=e)
 
 
+@shared_task
+def run_due_workflow_executions(batch_size: int = 100, max_batches: int = 10):
+    """
+    Run workflow executions whose next_run_at has passed.
+    
+    Scheduled by celery beat. Safe to run on several workers at once since
+    executions are claimed with SKIP LOCKED.
+    """
+    result = scheduler.run_due_executions(batch_size=batch_size, max_batches=max_batches)
+    if result['processed']:
+        logger.info(f"Ran {result['processed']} due workflow executions ({result['failed']} failed)")
+    return {
+        'success': True,
+        'processed_count': result['processed'],
+        'failed_count': result['failed']
+    }
+
+
 @shared_task(bind=True, max_retries=3)
+@tenant_task()
 def trigger_workflow_by_event(self, event_type: str, event_data: Dict[str, Any], tenant_id: str):
     """
     Trigger workflows based on events.
@@ -139,34 +153,8 @@ def trigger_workflow_by_event(self, event_type: str, event_data: Dict[str, Any],
     try:
         logger.info(f"Processing event {event_type} for tenant {tenant_id}")
         
-        # Find workflows that match this event type
-        workflows = AutomationWorkflow.objects.filter(
-            tenant_id=tenant_id,
-            is_active=True,
-            trigger_config__event_type=event_type
-        )
-        
-        triggered_count = 0
-        for workflow in workflows:
-            # Check if workflow should be triggered based on trigger conditions
-            if should_trigger_workflow(workflow, event_data):
-                # Start workflow execution
-                contact_id = event_data.get('contact_id')
-                context_data = {
-                    'event_type': event_type,
-                    'event_data': event_data,
-                    'triggered_at': timezone.now().isoformat()
-                }
-                
-                result = start_workflow_execution.delay(
-                    str(workflow.id),
-                    contact_id,
-                    context_data
-                )
-                
-                if result.get('success'):
-                    triggered_count += 1
-                    logger.info(f"Triggered workflow {workflow.name} for event {event_type}")
+        executions = triggers.create_executions_for_events(tenant_id, [(event_type, event_data)])
+        triggered_count = len(executions)
         
         return {
             'success': True,
@@ -179,6 +167,36 @@ def trigger_workflow_by_event(self, event_type: str, event_data: Dict[str, Any],
         raise self.retry(countdown=60, exc=e)
 
 
+@shared_task(bind=True, max_retries=3)
+@tenant_task()
+def trigger_workflows_by_events(self, events: List[Dict[str, Any]], tenant_id: str):
+    """
+    Trigger workflows for a batch of events in one pass.
+    
+    Args:
+        events: List of {'event_type': ..., 'event_data': {...}} dicts
+        tenant_id: UUID of the tenant
+    """
+    try:
+        executions = triggers.create_executions_for_events(
+            tenant_id,
+            [(event['event_type'], event.get('event_data') or {}) for event in events]
+        )
+        triggered_count = len(executions)
+        
+        logger.info(f"Processed {len(events)} events for tenant {tenant_id}, triggered {triggered_count} workflows")
+        
+        return {
+            'success': True,
+            'message': f'Processed {len(events)} events, triggered {triggered_count} workflows',
+            'triggered_count': triggered_count
+        }
+        
+    except Exception as e:
+        logger.error(f"Error processing event batch for tenant {tenant_id}: {str(e)}")
+        raise self.retry(countdown=60, exc=e)
+
+
 @shared_task(bind=True, max_retries=3)
 def cleanup_failed_executions(self):
     """
@@ -211,6 +229,18 @@ def cleanup_failed_executions(self):
         raise self.retry(countdown=3600, exc=e)  # Retry in 1 hour
 
 
+@shared_task
+def flush_token_reservations():
+    """
+    Persist token consumption reserved in Redis to the tenants table.
+    """
+    flushed = metering.flush_reservations()
+    return {
+        'success': True,
+        'flushed_tokens': flushed
+    }
+
+
 def should_trigger_workflow(workflow: AutomationWorkflow, event_data: Dict[str, Any]) -> bool:
     """
     Determine if a workflow should be triggered based on event data.
@@ -222,42 +252,12 @@ def should_trigger_workflow(workflow: AutomationWorkflow, event_data: Dict[str,
     Returns:
         True if workflow should be triggered
     """
-    trigger_config = workflow.trigger_config
-    conditions = trigger_config.get('conditions', [])
-    
-    if not conditions:
-        return True  # No conditions means trigger always
-    
-    for condition in conditions:
-        field = condition.get('field')
-        operator = condition.get('operator', 'equals')
-        value = condition.get('value')
-        
-        # Get field value from event data
-        field_value = event_data.get(field)
-        
-        # Evaluate condition
-        if not evaluate_condition(field_value, operator, value):
-            return False
-    
-    return True
+    conditions = workflow.trigger_config.get('conditions', [])
+    return triggers.compile_conditions(conditions)(event_data)
 
 
 def evaluate_condition(field_value: Any, operator: str, expected_value: Any) -> bool:
     """
-    Evaluate a condition (simplified version from utils.py).
+    Evaluate a condition operator.
     """
-    if operator == 'equals':
-        return field_value == expected_value
-    elif operator == 'not_equals':
-        return field_value != expected_value
-    elif operator == 'contains':
-        return str(expected_value) in str(field_value)
-    elif operator == 'not_contains':
-        return str(expected_value) not in str(field_value)
-    elif operator == 'is_empty':
-        return not field_value or str(field_value).strip() == ''
-    elif operator == 'is_not_empty':
-        return field_value and str(field_value).strip() != ''
-    else:
-        return False 
\ No newline at end of file
+    return conditions.evaluate_operator(field_value, operator, expected_value)
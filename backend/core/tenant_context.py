@@ -0,0 +1,199 @@
+"""
+Request-scoped tenant context.
+Holds a tenant's subscription, plan limits and feature flags so limit and
+feature checks load them once per request (with select_related) instead of
+re-querying the subscription for every check. When TENANT_CONTEXT_CACHE_TTL
+is set, the subscription and plan are also shared between requests through
+the Django cache; subscription changes invalidate that entry.
+
+Celery tasks get the same scoping through the tenant_task decorator.
+"""
+import functools
+import inspect
+import logging
+from typing import Any, Callable, Dict, Optional
+from django.conf import settings
+from django.core.cache import cache
+from .middleware import get_current_tenant, get_request_cache, tenant_scope
+from .models import Tenant
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'tenant_ctx'
+
+ACTIVE_STATUSES = ('active', 'trialing')
+
+LIMIT_FIELDS = (
+    'monthly_tokens',
+    'contact_limit',
+    'email_send_limit',
+    'automation_workflow_limit',
+    'integration_limit',
+    'ai_text_credits_per_month',
+    'ai_image_credits_per_month',
+    'ai_planning_requests_per_month',
+    'user_seats',
+)
+
+# Feature name -> SubscriptionPlan flag
+FEATURE_FIELDS = {
+    'design_studio': 'includes_design_studio',
+    'ai_agents': 'includes_ai_agents',
+    'analytics': 'includes_analytics',
+    'automations': 'includes_automations',
+    'integrations': 'includes_integrations',
+    'learning_center': 'includes_learning_center',
+    'project_management': 'includes_project_management',
+    'team_collaboration': 'includes_team_collaboration',
+    'white_label': 'includes_white_label',
+}
+
+
+class TenantContext:
+    """A tenant with its subscription, plan limits and feature flags."""
+
+    def __init__(self, tenant: Tenant, subscription=None):
+        self.tenant = tenant
+        self.subscription = subscription
+        self.plan = subscription.plan if subscription is not None else None
+        if self.plan is not None:
+            self.limits = {name: getattr(self.plan, name) for name in LIMIT_FIELDS}
+            self.features = {name: getattr(self.plan, flag) for name, flag in FEATURE_FIELDS.items()}
+        else:
+            self.limits = {}
+            self.features = {}
+
+    @property
+    def is_subscription_active(self) -> bool:
+        return self.subscription is not None and self.subscription.status in ACTIVE_STATUSES
+
+    @property
+    def active_subscription(self):
+        """The subscription if its status is active or trialing, else None."""
+        return self.subscription if self.is_subscription_active else None
+
+    def get_limit(self, name: str, default: int = 0) -> int:
+        return self.limits.get(name, default)
+
+    def has_feature(self, name: str) -> bool:
+        """Whether the plan includes a feature; unknown features are allowed."""
+        return bool(self.features.get(name, True))
+
+
+def get_cache_ttl() -> int:
+    return getattr(settings, 'TENANT_CONTEXT_CACHE_TTL', 0) or 0
+
+
+def _cache_key(tenant_id) -> str:
+    return f"{CACHE_PREFIX}:{tenant_id}"
+
+
+def _load_subscription(tenant: Tenant):
+    """Load the tenant's subscription with its plan, via the shared cache when enabled."""
+    if tenant.active_subscription_id is None:
+        return None
+    if Tenant.active_subscription.is_cached(tenant):
+        subscription = tenant.active_subscription
+        # Touch the plan so it is loaded once and cached on the subscription
+        subscription.plan
+        return subscription
+
+    ttl = get_cache_ttl()
+    if ttl:
+        cached = cache.get(_cache_key(tenant.pk))
+        if cached is not None and cached.pk == tenant.active_subscription_id:
+            return cached
+
+    from subscription_billing.models import Subscription
+    subscription = Subscription.objects.select_related('plan').filter(pk=tenant.active_subscription_id).first()
+    if ttl and subscription is not None:
+        cache.set(_cache_key(tenant.pk), subscription, ttl)
+    return subscription
+
+
+def load_tenant_context(tenant) -> TenantContext:
+    """Build a TenantContext without consulting the request scope."""
+    if not isinstance(tenant, Tenant):
+        queryset = Tenant.objects.all()
+        if not get_cache_ttl():
+            queryset = queryset.select_related('active_subscription__plan')
+        tenant = queryset.get(pk=tenant)
+    subscription = _load_subscription(tenant)
+    if subscription is not None:
+        # Keep the tenant's own relation in step so code reading
+        # tenant.active_subscription directly doesn't query again
+        tenant.active_subscription = subscription
+    return TenantContext(tenant, subscription)
+
+
+def get_tenant_context(tenant=None) -> Optional[TenantContext]:
+    """
+    Return the TenantContext for a tenant, loading it at most once per request.
+
+    Args:
+        tenant: Tenant instance or id; defaults to the current tenant
+
+    Returns:
+        TenantContext, or None when no tenant is given or current
+    """
+    if tenant is None:
+        tenant = get_current_tenant()
+        if tenant is None:
+            return None
+
+    request_cache = get_request_cache()
+    if request_cache is None:
+        return load_tenant_context(tenant)
+
+    tenant_id = tenant.pk if isinstance(tenant, Tenant) else tenant
+    contexts: Dict[Any, TenantContext] = request_cache.setdefault(CACHE_PREFIX, {})
+    context = contexts.get(str(tenant_id))
+    if context is None:
+        context = load_tenant_context(tenant)
+        contexts[str(tenant_id)] = context
+    return context
+
+
+def invalidate_tenant_context(tenant_id) -> None:
+    """Drop a tenant's cached context from the shared cache and this request."""
+    cache.delete(_cache_key(tenant_id))
+    request_cache = get_request_cache()
+    if request_cache is not None:
+        request_cache.get(CACHE_PREFIX, {}).pop(str(tenant_id), None)
+
+
+def invalidate_subscription(subscription) -> None:
+    """Invalidate the context of every tenant using a subscription."""
+    tenant_ids = Tenant.objects.filter(active_subscription=subscription).values_list('pk', flat=True)
+    for tenant_id in tenant_ids:
+        invalidate_tenant_context(tenant_id)
+
+
+def tenant_task(tenant_arg: str = 'tenant_id') -> Callable:
+    """
+    Run a task function inside the scope of the tenant named by one of its
+    arguments, so TenantAwareManager querysets are filtered to that tenant.
+
+    The scope is unwound when the task returns, so nothing leaks into the
+    next task on the same worker. Apply it below @shared_task:
+
+        @shared_task
+        @tenant_task()
+        def sync_contacts(tenant_id): ...
+
+    Args:
+        tenant_arg: Name of the argument holding the tenant id
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tenant_id = signature.bind_partial(*args, **kwargs).arguments.get(tenant_arg)
+            tenant = Tenant.objects.filter(pk=tenant_id).first() if tenant_id else None
+            if tenant_id and tenant is None:
+                logger.warning(f"Tenant {tenant_id} not found for task {func.__name__}")
+            with tenant_scope(tenant):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
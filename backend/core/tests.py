@@ -1,3 +1,426 @@
-from django.test import TestCase
+import uuid
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from .models import Tenant, Contact, AutomationWorkflow, AutomationExecution, EmailTemplate, SearchDocument
+from .scheduler import CLAIM_LEASE, claim_due_executions, run_execution
+from .conditions import compile_condition, evaluate_many, filter_matching
+from .token_utils import consume_tokens_for_email_sends
+from marketing_templates.models import TemplateCategory
+from subscription_billing.models import Customer, Subscription, SubscriptionPlan
+from .triggers import create_executions_for_events, get_trigger_routes
+from . import metering, search
+from .pagination import KeysetPagination
+from .middleware import get_current_tenant, tenant_scope
+from .tenant_context import get_tenant_context, invalidate_subscription, tenant_task
+from subscription_billing.utils import check_feature_access, get_subscription_summary
 
-# Create your tests here.
+
+class WorkflowSchedulerTest(TestCase):
+    """Test durable scheduling of workflow executions."""
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Scheduler Tenant")
+        self.workflow = AutomationWorkflow.objects.create(
+            tenant=self.tenant,
+            name="Nurture",
+            is_active=True,
+            steps_config={'steps': [
+                {'type': 'wait', 'config': {'duration': 10}},
+                {'type': 'wait', 'config': {'duration': 0}},
+            ]}
+        )
+        self.execution = AutomationExecution.objects.all_tenants().create(
+            tenant=self.tenant,
+            workflow=self.workflow,
+        )
+
+    def test_wait_step_is_persisted_and_resumed(self):
+        """A wait step records next_run_at and the scheduler resumes it when due."""
+        execution_id = str(self.execution.id)
+        run_execution(execution_id)
+
+        self.execution.refresh_from_db()
+        self.assertEqual(self.execution.status, 'active')
+        self.assertEqual(self.execution.current_step_index, 1)
+        self.assertGreater(self.execution.next_run_at, timezone.now() + timedelta(minutes=9))
+
+        # Not due yet
+        self.assertEqual(claim_due_executions(), [])
+
+        claimed = claim_due_executions(now=timezone.now() + timedelta(minutes=11))
+        self.assertEqual(claimed, [execution_id])
+        # Claimed rows are leased and not handed out twice
+        self.assertEqual(claim_due_executions(now=timezone.now() + timedelta(minutes=11)), [])
+
+        run_execution(execution_id)
+        self.execution.refresh_from_db()
+        self.assertEqual(self.execution.status, 'completed')
+        self.assertIsNone(self.execution.next_run_at)
+
+    def test_stale_claim_does_not_run_steps(self):
+        """A worker whose lease expired and was re-claimed stops before running a step."""
+        AutomationExecution.objects.all_tenants().filter(id=self.execution.id).update(next_run_at=timezone.now())
+        execution_id = str(self.execution.id)
+        stale_token, fresh_token = uuid.uuid4(), uuid.uuid4()
+        self.assertEqual(claim_due_executions(claim_token=stale_token), [execution_id])
+        later = timezone.now() + CLAIM_LEASE + timedelta(seconds=1)
+        self.assertEqual(claim_due_executions(now=later, claim_token=fresh_token), [execution_id])
+
+        result = run_execution(execution_id, claim_token=stale_token)
+        self.assertTrue(result['lease_lost'])
+        self.execution.refresh_from_db()
+        self.assertEqual(self.execution.current_step_index, 0)
+        self.assertEqual(self.execution.claim_token, fresh_token)
+
+        run_execution(execution_id, claim_token=fresh_token)
+        self.execution.refresh_from_db()
+        self.assertEqual(self.execution.current_step_index, 1)
+        self.assertIsNone(self.execution.claim_token)
+
+    def test_steps_run_in_the_execution_tenant_scope(self):
+        """Scheduler-run steps see tenant-scoped rows such as email templates."""
+        contact = Contact.objects.all_tenants().create(tenant=self.tenant, first_name="Ada", email="ada@example.com")
+        template = EmailTemplate.objects.all_tenants().create(tenant=self.tenant, name="Welcome", subject="Hi", body_html="<p>Hi</p>")
+        self.workflow.steps_config = {'steps': [{'type': 'send_email', 'config': {'template_id': template.id}}]}
+        self.workflow.save()
+        execution = AutomationExecution.objects.all_tenants().create(tenant=self.tenant, workflow=self.workflow, contact=contact)
+
+        self.assertIsNone(get_current_tenant())
+        result = run_execution(str(execution.id))
+
+        self.assertTrue(result['success'], result['message'])
+        execution.refresh_from_db()
+        self.assertEqual(execution.status, 'completed')
+        self.assertEqual(execution.context_data['emails_sent'][0]['subject'], "Hi")
+
+
+class TriggerRoutingTest(TestCase):
+    """Test indexed routing of events to workflows."""
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Routing Tenant")
+        self.contact = Contact.objects.all_tenants().create(
+            tenant=self.tenant,
+            email="routed@example.com",
+            first_name="Routed",
+            last_name="Contact"
+        )
+        self.workflow = AutomationWorkflow.objects.create(
+            tenant=self.tenant,
+            name="Opened newsletter",
+            is_active=True,
+            trigger_config={
+                'event_type': 'email_opened',
+                'conditions': [{'field': 'template', 'operator': 'equals', 'value': 'newsletter'}],
+            },
+            steps_config={'steps': []}
+        )
+
+    def test_trigger_event_type_is_denormalized(self):
+        self.assertEqual(self.workflow.trigger_event_type, 'email_opened')
+
+    def test_batch_creates_executions_for_matching_events(self):
+        executions = create_executions_for_events(self.tenant.id, [
+            ('email_opened', {'template': 'newsletter', 'contact_id': self.contact.id}),
+            ('email_opened', {'template': 'promo', 'contact_id': self.contact.id}),
+            ('email_clicked', {'template': 'newsletter', 'contact_id': self.contact.id}),
+        ])
+        self.assertEqual(len(executions), 1)
+        execution = AutomationExecution.objects.all_tenants().get()
+        self.assertEqual(execution.contact_id, self.contact.id)
+        self.assertIsNotNone(execution.next_run_at)
+
+    def test_routes_are_invalidated_on_save(self):
+        self.assertIn('email_opened', get_trigger_routes(self.tenant.id))
+        self.workflow.is_active = False
+        self.workflow.save()
+        self.assertEqual(get_trigger_routes(self.tenant.id), {})
+
+
+class ConditionCompilerTest(TestCase):
+    """Test the shared condition compiler."""
+
+    def test_grouped_conditions(self):
+        spec = {'logic': 'or', 'conditions': [
+            {'field': 'score', 'operator': 'greater_than', 'value': '50'},
+            [
+                {'field': 'source', 'operator': 'equals', 'value': 'webinar'},
+                {'field': 'email', 'operator': 'is_not_empty'},
+            ],
+        ]}
+        records = [
+            {'score': 75},
+            {'score': 'n/a', 'source': 'webinar', 'email': 'a@example.com'},
+            {'score': 10, 'source': 'webinar', 'email': ''},
+        ]
+        self.assertEqual(evaluate_many(spec, records), [True, True, False])
+        self.assertEqual(filter_matching(compile_condition(spec), records), records[:2])
+
+    def test_compiled_predicates_are_cached(self):
+        spec = [{'field': 'status', 'operator': 'equals', 'value': 'open'}]
+        self.assertIs(compile_condition(spec), compile_condition(list(spec)))
+
+
+class TokenMeteringTest(TestCase):
+    """Test atomic token consumption."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            username="metering",
+            email="metering@example.com",
+            password="testpass123"
+        )
+        plan = SubscriptionPlan.objects.create(name="Metered", monthly_cost=10, monthly_tokens=100)
+        subscription = Subscription.objects.create(
+            customer=Customer.objects.create(user=user),
+            plan=plan,
+            user=user,
+            current_period_start=timezone.now(),
+            current_period_end=timezone.now() + timedelta(days=30)
+        )
+        self.tenant = Tenant.objects.create(name="Metered Tenant", active_subscription=subscription)
+
+    def test_use_tokens_respects_limit(self):
+        stale = Tenant.objects.get(pk=self.tenant.pk)
+        self.assertTrue(self.tenant.use_tokens(60))
+        # A stale instance can't overwrite or overspend the counter
+        self.assertFalse(stale.use_tokens(60))
+        self.assertTrue(stale.use_tokens(40))
+        self.tenant.refresh_from_db()
+        self.assertEqual(self.tenant.tokens_used_current_period, 100)
+
+    def test_purchased_tokens_extend_limit(self):
+        self.tenant.purchase_additional_tokens(50)
+        self.assertTrue(self.tenant.use_tokens(150))
+        self.assertFalse(self.tenant.use_tokens(1))
+
+    def test_batch_email_consumption(self):
+        results = consume_tokens_for_email_sends({self.tenant.pk: 20, Tenant.objects.create(name="No Plan").pk: 1})
+        self.assertEqual(sorted(results.values()), [False, True])
+        self.tenant.refresh_from_db()
+        self.assertEqual(self.tenant.tokens_used_current_period, 100)
+
+    def test_failed_flush_restores_reservations(self):
+        client = mock.Mock()
+        client.scan_iter.return_value = [f'tokens:{self.tenant.pk}:pending'.encode()]
+        client.eval.return_value = 30
+        with mock.patch.object(metering, 'get_redis_client', return_value=client), \
+                mock.patch.object(metering.Tenant.objects, 'filter', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                metering.flush_reservations()
+        # Drained into the flushing counter, then moved back to pending
+        scripts = [call.args[0] for call in client.eval.call_args_list]
+        self.assertEqual(scripts, [metering._DRAIN_SCRIPT, metering._RESTORE_SCRIPT])
+
+    def test_flush_persists_before_settling(self):
+        client = mock.Mock()
+        client.scan_iter.return_value = [f'tokens:{self.tenant.pk}:pending']
+        client.eval.return_value = 30
+        with mock.patch.object(metering, 'get_redis_client', return_value=client):
+            self.assertEqual(metering.flush_reservations(), 30)
+        settle = client.eval.call_args_list[-1].args
+        self.assertEqual(settle[0], metering._SETTLE_SCRIPT)
+        # The cached base is raised to the persisted usage
+        self.assertEqual(settle[4:6], (30, 30))
+
+
+@override_settings(TENANT_CONTEXT_CACHE_TTL=60)
+class TenantContextTest(TestCase):
+    """Test request-scoped tenant subscription context."""
+
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(
+            username="context",
+            email="context@example.com",
+            password="testpass123"
+        )
+        plan = SubscriptionPlan.objects.create(
+            name="Context", monthly_cost=10, contact_limit=500, includes_white_label=False
+        )
+        self.subscription = Subscription.objects.create(
+            customer=Customer.objects.create(user=user),
+            plan=plan,
+            user=user,
+            status='active',
+            current_period_start=timezone.now(),
+            current_period_end=timezone.now() + timedelta(days=30)
+        )
+        self.tenant = Tenant.objects.create(name="Context Tenant", active_subscription=self.subscription)
+
+    def test_subscription_loaded_once_per_request(self):
+        self.enterContext(tenant_scope(self.tenant))
+        tenant = Tenant.objects.get(pk=self.tenant.pk)
+        with self.assertNumQueries(1):
+            summary = get_subscription_summary(tenant)
+            self.assertTrue(check_feature_access(tenant, 'analytics'))
+            self.assertFalse(check_feature_access(tenant, 'white_label'))
+            self.assertTrue(tenant.can_add_contact())
+        self.assertEqual(summary['limits']['contact_limit'], 500)
+
+    def test_shared_cache_is_invalidated_by_subscription_changes(self):
+        self.assertTrue(get_tenant_context(self.tenant.pk).is_subscription_active)
+        with self.assertNumQueries(1):
+            # Only the tenant row is read; the subscription comes from the cache
+            get_tenant_context(self.tenant.pk)
+
+        self.subscription.status = 'canceled'
+        self.subscription.save()
+        invalidate_subscription(self.subscription)
+        self.assertIsNone(get_tenant_context(self.tenant.pk).active_subscription)
+
+
+class TenantScopeTest(TestCase):
+    """Test context-local tenant scoping."""
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Scoped Tenant")
+        self.other = Tenant.objects.create(name="Other Tenant")
+        for tenant in (self.tenant, self.other):
+            Contact.objects.all_tenants().create(tenant=tenant, first_name="Ann", email=f"ann@{tenant.pk}.example.com")
+
+    def test_scopes_nest_and_unwind(self):
+        with tenant_scope(self.tenant):
+            with tenant_scope(self.other):
+                self.assertEqual(Contact.objects.get().tenant_id, self.other.pk)
+            self.assertEqual(Contact.objects.get().tenant_id, self.tenant.pk)
+        self.assertIsNone(get_current_tenant())
+        self.assertFalse(Contact.objects.exists())
+
+    def test_tenant_task_scopes_and_resets(self):
+        @tenant_task()
+        def count_contacts(label, tenant_id=None):
+            return get_current_tenant().pk, Contact.objects.count()
+
+        self.assertEqual(count_contacts('a', tenant_id=str(self.other.pk)), (self.other.pk, 1))
+        with self.assertRaises(AttributeError):
+            count_contacts('b')
+        self.assertIsNone(get_current_tenant())
+
+
+class SearchIndexTest(TestCase):
+    """Test the full-text search index and search action."""
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Search Tenant", subdomain="search")
+        other = Tenant.objects.create(name="Other Tenant", subdomain="other")
+        self.ada = Contact.objects.create(tenant=self.tenant, first_name="Ada", last_name="Lovelace", company="Analytical Engines")
+        self.noted = Contact.objects.create(tenant=self.tenant, first_name="Charles", last_name="Babbage", notes="Met Ada at the analytical society")
+        Contact.objects.create(tenant=other, first_name="Ada", last_name="Other")
+
+    def test_prefix_ranked_and_tenant_scoped(self):
+        hits = search.search(Contact, "ada analyt", tenant=self.tenant)
+        # Title matches outrank matches in the notes
+        self.assertEqual([hit.object_id for hit in hits], [str(self.ada.pk), str(self.noted.pk)])
+        self.assertEqual(len(search.search(Contact, "ada")), 3)
+
+        page = search.search(Contact, "ada analyt", tenant=self.tenant, limit=1, after=(hits[0].rank, hits[0].document_id))
+        self.assertEqual([hit.object_id for hit in page], [str(self.noted.pk)])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.ada.last_name = "King"
+        self.ada.save()
+        self.assertEqual(len(search.search(Contact, "lovelace", tenant=self.tenant)), 0)
+        self.assertEqual(len(search.search(Contact, "king", tenant=self.tenant)), 1)
+        self.ada.delete()
+        self.assertEqual(len(search.search(Contact, "king", tenant=self.tenant)), 0)
+
+        # Queryset deletes, as in contact merges, skip Model.delete()
+        Contact.objects.all_tenants().filter(pk=self.noted.pk).delete()
+        self.assertEqual(len(search.search(Contact, "babbage", tenant=self.tenant)), 0)
+        self.assertFalse(SearchDocument.objects.all_tenants().filter(object_id=str(self.noted.pk)).exists())
+
+        EmailTemplate.objects.create(tenant=self.tenant, name="Welcome", subject="Hello", body_html="<p>Thanks for joining</p>")
+        self.assertEqual(len(search.search(EmailTemplate, "join", tenant=self.tenant)), 1)
+
+    def test_search_action_paginates_with_cursor(self):
+        user = get_user_model().objects.create_user(
+            username='searcher', email='searcher@example.com', password='testpass123', is_superuser=True
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/core/contacts/search/', {'q': 'ada', 'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        response = client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next'])
+
+
+class KeysetPaginationTest(TestCase):
+    """Test default keyset pagination and ?fields= projection on list endpoints."""
+
+    def setUp(self):
+        tenant = Tenant.objects.create(name="Paging Tenant", subdomain="paging")
+        created_at = timezone.now()
+        self.contacts = [
+            Contact.objects.create(tenant=tenant, first_name=f"Contact{i}", last_name="Page", email=f"page{i}@example.com")
+            for i in range(5)
+        ]
+        # Two contacts share a created_at, so the id breaks the tie
+        Contact.objects.all_tenants().filter(pk__in=[c.pk for c in self.contacts[:2]]).update(created_at=created_at)
+        user = get_user_model().objects.create_user(
+            username='pager', email='pager@example.com', password='testpass123', is_superuser=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def test_pages_cover_every_row_once(self):
+        seen = []
+        response = self.client.get('/api/core/contacts/', {'page_size': 2})
+        while True:
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen += [row['id'] for row in response.data['results']]
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(sorted(seen), sorted(c.id for c in self.contacts))
+        self.assertEqual(len(seen), len(set(seen)))
+
+        response = self.client.get('/api/core/contacts/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_explicit_ordering_is_kept(self):
+        for name, cost in [("Pro", 99), ("Starter", 9), ("Team", 49)]:
+            SubscriptionPlan.objects.create(name=name, monthly_cost=cost)
+        response = self.client.get('/api/subscription-billing/plans/', {'page_size': 2})
+        names = [row['name'] for row in response.data['results']]
+        response = self.client.get(response.data['next'])
+        names += [row['name'] for row in response.data['results']]
+        self.assertEqual(names, ["Starter", "Team", "Pro"])
+        self.assertIsNone(response.data['next'])
+
+        response = self.client.get('/api/subscription-billing/plans/', {'ordering': '-monthly_cost'})
+        self.assertEqual([row['name'] for row in response.data['results']], ["Pro", "Team", "Starter"])
+
+    def test_meta_ordering_is_kept(self):
+        for name in ("Social", "Email", "Print"):
+            TemplateCategory.objects.create(name=name)
+        paginator = KeysetPagination()
+        request = Request(APIRequestFactory().get('/', {'page_size': 2}))
+        page = paginator.paginate_queryset(TemplateCategory.objects.all_tenants(), request)
+        request = Request(APIRequestFactory().get('/', {'page_size': 2, 'cursor': paginator.next_cursor}))
+        page += paginator.paginate_queryset(TemplateCategory.objects.all_tenants(), request)
+        self.assertEqual([category.name for category in page], ["Email", "Print", "Social"])
+
+    def test_fields_projection(self):
+        response = self.client.get('/api/core/contacts/by_status/', {'fields': 'id,email', 'page_size': 10})
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'email'})
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/core/contacts/', {'fields': 'id,email'})
+        contact_selects = [q['sql'] for q in queries.captured_queries if 'FROM "contacts"' in q['sql']]
+        self.assertTrue(contact_selects)
+        self.assertNotIn('"notes"', contact_selects[-1])
+
+        # Fields backed by properties load the whole row
+        response = self.client.get('/api/core/contacts/', {'fields': 'full_name'})
+        self.assertEqual(response.data['results'][0]['full_name'], 'Contact4 Page')
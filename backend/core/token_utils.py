@@ -6,8 +6,9 @@ Token costs are designed to be predictable and fair for users while covering ope
 """
 
 import logging
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
 from core.models import Tenant, CustomUser
+from core import metering
 
 logger = logging.getLogger(__name__)
 
@@ -290,4 +291,45 @@ def can_perform_operation(tenant: Tenant, operation: str, user: Optional[CustomU
         return True
     
     estimated_cost = get_token_cost_estimate(operation, **kwargs)
-    return tenant.can_use_tokens(estimated_cost) 
\ No newline at end of file
+    return tenant.can_use_tokens(estimated_cost) 
+
+
+def consume_tokens_for_operations(tenant: Tenant, operations: List[Tuple[str, Dict[str, Any]]], user: Optional[CustomUser] = None) -> bool:
+    """
+    Consume tokens for several operations in one atomic update.
+    
+    Either all operations are paid for or none are.
+    
+    Args:
+        tenant: The tenant consuming tokens
+        operations: List of (operation, kwargs) pairs as accepted by get_token_cost_estimate
+        user: Optional user for superuser bypass
+        
+    Returns:
+        bool: True if tokens were successfully consumed, False otherwise
+    """
+    # Superuser bypass for testing
+    if is_superuser_bypass_enabled(user):
+        logger.info(f"Superuser bypass: {len(operations)} operations")
+        return True
+    
+    token_cost = sum(get_token_cost_estimate(operation, **kwargs) for operation, kwargs in operations)
+    return metering.use_tokens(tenant, token_cost)
+
+
+def consume_tokens_for_email_sends(email_counts: Dict[Any, int], tenants: Optional[List[Tenant]] = None) -> Dict[Any, bool]:
+    """
+    Consume email send tokens for many tenants, e.g. from a bulk send job.
+    
+    Args:
+        email_counts: Mapping of tenant id -> number of emails sent
+        tenants: Optional Tenant instances whose in-memory counters should be updated
+        
+    Returns:
+        Dict mapping tenant id -> True if that tenant's tokens were consumed
+    """
+    costs = {
+        tenant_id: TokenConsumption.EMAIL_SEND * email_count
+        for tenant_id, email_count in email_counts.items()
+    }
+    return metering.use_tokens_many(costs, tenants)
@@ -0,0 +1,143 @@
+"""
+Event trigger routing for automation workflows.
+Active workflows are indexed by tenant and trigger_event_type, and their
+trigger conditions are compiled into predicates that are cached in-process
+until a workflow in the tenant changes.
+"""
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from django.core.cache import cache
+from django.utils import timezone
+from .conditions import EVENT_FIELDS, compile_condition, filter_matching
+from .models import AutomationExecution, AutomationWorkflow, Contact
+
+logger = logging.getLogger(__name__)
+
+# Routes are rebuilt at least this often even without an invalidation, as a
+# safety net for bulk updates that bypass AutomationWorkflow.save()
+ROUTE_CACHE_TTL = 300
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+
+class TriggerRoute(NamedTuple):
+    workflow_id: int
+    predicate: Predicate
+
+
+# tenant_id -> (version, loaded_at, {event_type: [TriggerRoute, ...]})
+_route_cache: Dict[str, Tuple[int, float, Dict[str, List[TriggerRoute]]]] = {}
+
+
+def compile_conditions(conditions: Optional[List[Dict[str, Any]]]) -> Predicate:
+    """Compile trigger conditions (all must match) into a predicate over event data."""
+    return compile_condition(conditions, EVENT_FIELDS)
+
+
+def _version_key(tenant_id) -> str:
+    return f"workflow_trigger_routes_version_{tenant_id}"
+
+
+def invalidate_trigger_routes(tenant_id) -> None:
+    """Mark a tenant's cached trigger routes as stale in every process."""
+    key = _version_key(tenant_id)
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+    _route_cache.pop(str(tenant_id), None)
+
+
+def get_trigger_routes(tenant_id) -> Dict[str, List[TriggerRoute]]:
+    """Return compiled trigger routes for a tenant, keyed by event type."""
+    tenant_key = str(tenant_id)
+    version = cache.get(_version_key(tenant_id), 0)
+    cached = _route_cache.get(tenant_key)
+    if cached and cached[0] == version and time.monotonic() - cached[1] < ROUTE_CACHE_TTL:
+        return cached[2]
+
+    routes: Dict[str, List[TriggerRoute]] = {}
+    workflows = AutomationWorkflow.objects.all_tenants().filter(
+        tenant_id=tenant_id,
+        is_active=True,
+    ).exclude(trigger_event_type='').values_list('id', 'trigger_event_type', 'trigger_config')
+    for workflow_id, event_type, trigger_config in workflows:
+        predicate = compile_conditions((trigger_config or {}).get('conditions'))
+        routes.setdefault(event_type, []).append(TriggerRoute(workflow_id, predicate))
+
+    _route_cache[tenant_key] = (version, time.monotonic(), routes)
+    return routes
+
+
+def create_executions_for_events(tenant_id, events: Iterable[Tuple[str, Dict[str, Any]]]) -> List[AutomationExecution]:
+    """
+    Route a batch of events to matching workflows and create their executions.
+
+    Executions are inserted with one bulk_create and are due immediately, so
+    the workflow scheduler picks them up on its next run.
+
+    Args:
+        tenant_id: UUID of the tenant the events belong to
+        events: Iterable of (event_type, event_data) pairs
+
+    Returns:
+        List of created AutomationExecution instances
+    """
+    routes = get_trigger_routes(tenant_id)
+    if not routes:
+        return []
+
+    # Each route's predicate runs once over all the batch's events of its type
+    events_by_type: Dict[str, List[Dict[str, Any]]] = {}
+    for event_type, event_data in events:
+        if event_type in routes:
+            events_by_type.setdefault(event_type, []).append(event_data)
+
+    triggered_at = timezone.now()
+    matches = []
+    for event_type, batch in events_by_type.items():
+        for route in routes[event_type]:
+            for event_data in filter_matching(route.predicate, batch):
+                matches.append((route.workflow_id, event_type, event_data))
+    if not matches:
+        return []
+
+    contact_ids = {_parse_contact_id(event_data.get('contact_id')) for _, _, event_data in matches}
+    contact_ids.discard(None)
+    valid_contact_ids = set(
+        Contact.objects.all_tenants().filter(
+            tenant_id=tenant_id,
+            id__in=contact_ids,
+        ).values_list('id', flat=True)
+    ) if contact_ids else set()
+
+    executions = []
+    for workflow_id, event_type, event_data in matches:
+        contact_id = None
+        if event_data.get('contact_id'):
+            contact_id = _parse_contact_id(event_data.get('contact_id'))
+            if contact_id not in valid_contact_ids:
+                logger.error(f"Contact {event_data.get('contact_id')} not found")
+                continue
+        executions.append(AutomationExecution(
+            tenant_id=tenant_id,
+            workflow_id=workflow_id,
+            contact_id=contact_id,
+            context_data={
+                'event_type': event_type,
+                'event_data': event_data,
+                'triggered_at': triggered_at.isoformat(),
+            },
+            next_run_at=triggered_at,
+        ))
+
+    return AutomationExecution.objects.bulk_create(executions, batch_size=500)
+
+
+def _parse_contact_id(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
@@ -7,6 +7,7 @@ from typing import Dict, Any, Optional
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from .models import AutomationExecution, Contact, EmailTemplate
+from . import conditions
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +23,7 @@ def execute_workflow_step(execution_id: str) -> Dict[str, Any]:
         Dict containing execution result and next action
     """
     try:
-        execution = AutomationExecution.objects.get(id=execution_id)
+        execution = AutomationExecution.objects.all_tenants().get(id=execution_id)
         
         if not execution.can_proceed:
             logger.warning(f"Execution {execution_id} cannot proceed. Status: {execution.status}")
@@ -82,7 +83,7 @@ def execute_workflow_step(execution_id: str) -> Dict[str, Any]:
     except Exception as e:
         logger.error(f"Error executing workflow step {execution_id}: {str(e)}")
         try:
-            execution = AutomationExecution.objects.get(id=execution_id)
+            execution = AutomationExecution.objects.all_tenants().get(id=execution_id)
             execution.mark_failed(str(e))
         except:
             pass
@@ -219,7 +220,6 @@ def wait_action(config: Dict[str, Any], execution: AutomationExecution) -> Dict[
 def evaluate_condition(config: Dict[str, Any], execution: AutomationExecution) -> Dict[str, Any]:
     """Execute condition step."""
     try:
-        condition_type = config.get('type', 'simple')
         field = config.get('field')
         operator = config.get('operator', 'equals')
         value = config.get('value')
@@ -230,20 +230,12 @@ def evaluate_condition(config: Dict[str, Any], execution: AutomationExecution) -
                 'message': 'No contact associated with execution'
             }
         
-        # Get the field value from contact or context
-        if field.startswith('contact.'):
-            # Contact field
-            contact_field = field.split('.')[1]
-            field_value = getattr(execution.contact, contact_field, None)
-        elif field.startswith('context.'):
-            # Context data field
-            context_field = field.split('.')[1]
-            field_value = execution.context_data.get(context_field)
-        else:
-            field_value = execution.context_data.get(field)
-        
-        # Evaluate condition
-        condition_met = evaluate_operator(field_value, operator, value)
+        # Grouped conditions ({'logic': 'and'|'or', 'conditions': [...]}) or a single field check
+        spec = {key: config[key] for key in ('logic', 'conditions') if key in config} or {
+            'field': field, 'operator': operator, 'value': value
+        }
+        condition_met = conditions.compile_condition(spec, conditions.EXECUTION_FIELDS)(execution)
+        field_value = conditions.field_getter(field, conditions.EXECUTION_FIELDS)(execution) if field else None
         
         # Update context with condition result
         execution.context_data['last_condition'] = {
@@ -407,30 +399,7 @@ def webhook_action(config: Dict[str, Any], execution: AutomationExecution) -> Di
 
 def evaluate_operator(field_value: Any, operator: str, expected_value: Any) -> bool:
     """Evaluate a condition operator."""
-    if operator == 'equals':
-        return field_value == expected_value
-    elif operator == 'not_equals':
-        return field_value != expected_value
-    elif operator == 'contains':
-        return str(expected_value) in str(field_value)
-    elif operator == 'not_contains':
-        return str(expected_value) not in str(field_value)
-    elif operator == 'greater_than':
-        try:
-            return float(field_value) > float(expected_value)
-        except (ValueError, TypeError):
-            return False
-    elif operator == 'less_than':
-        try:
-            return float(field_value) < float(expected_value)
-        except (ValueError, TypeError):
-            return False
-    elif operator == 'is_empty':
-        return not field_value or str(field_value).strip() == ''
-    elif operator == 'is_not_empty':
-        return field_value and str(field_value).strip() != ''
-    else:
-        return False
+    return conditions.evaluate_operator(field_value, operator, expected_value)
 
 
 def determine_next_action(execution: AutomationExecution, step_result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -23,6 +23,8 @@ from .serializers import (
 )
 from .admin_access import is_digisol_admin
 from .tasks import start_workflow_execution, trigger_workflow_by_event
+from .pagination import SparseFieldsetMixin
+from .search import SearchActionMixin
 from ai_services.models import AIProfile, AIRecommendation
 from ai_services.tasks import generate_campaign_insights_task
 from django.db import models
@@ -227,10 +229,10 @@ class TenantViewSet(viewsets.ModelViewSet):
         return Tenant.objects.filter(id=self.request.user.tenant.id)
 
 
-class ContactViewSet(viewsets.ModelViewSet):
+class ContactViewSet(SparseFieldsetMixin, SearchActionMixin, viewsets.ModelViewSet):
     """
     ViewSet for Contact model.
-    Provides CRUD operations for contact management.
+    Provides CRUD operations and full-text search for contact management.
     """
     queryset = Contact.objects.all()
     serializer_class = ContactSerializer
@@ -261,25 +263,6 @@ class ContactViewSet(viewsets.ModelViewSet):
                 )
             serializer.save(tenant=self.request.user.tenant)
     
-    @action(detail=False, methods=['get'])
-    def search(self, request):
-        """Search contacts by name, email, or company."""
-        query = request.query_params.get('q', '')
-        if query:
-            queryset = self.get_queryset().filter(
-                models.Q(first_name__icontains=query) |
-                models.Q(last_name__icontains=query) |
-                models.Q(email__icontains=query) |
-                models.Q(company__icontains=query) |
-                models.Q(job_title__icontains=query) |
-                models.Q(notes__icontains=query)
-            )
-        else:
-            queryset = self.get_queryset()
-        
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
-    
     @action(detail=True, methods=['post'])
     def mark_contacted(self, request, pk=None):
         """Mark a contact as contacted."""
@@ -360,8 +343,9 @@ class ContactViewSet(viewsets.ModelViewSet):
         if status_filter:
             queryset = queryset.filter(lead_status=status_filter)
         
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def by_priority(self, request):
@@ -372,11 +356,12 @@ class ContactViewSet(viewsets.ModelViewSet):
         if priority_filter:
             queryset = queryset.filter(priority=priority_filter)
         
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
-class CampaignViewSet(viewsets.ModelViewSet):
+class CampaignViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     ViewSet for Campaign model.
     Provides CRUD operations for campaign management.
@@ -388,10 +373,10 @@ class CampaignViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """Override to filter campaigns by user's tenant."""
         if self.request.user.is_superuser:
-            return Campaign.objects.all_tenants()
+            return Campaign.objects.all_tenants().select_related('created_by')
         # For regular users, filter by their tenant
         if self.request.user.tenant:
-            return Campaign.objects.filter(tenant=self.request.user.tenant)
+            return Campaign.objects.filter(tenant=self.request.user.tenant).select_related('created_by')
         # If user has no tenant, return empty queryset
         return Campaign.objects.none()
     
@@ -528,10 +513,10 @@ class CampaignViewSet(viewsets.ModelViewSet):
             )
 
 
-class EmailTemplateViewSet(viewsets.ModelViewSet):
+class EmailTemplateViewSet(SparseFieldsetMixin, SearchActionMixin, viewsets.ModelViewSet):
     """
     ViewSet for EmailTemplate model.
-    Provides CRUD operations for email template management.
+    Provides CRUD operations and full-text search for email template management.
     """
     queryset = EmailTemplate.objects.all()
     serializer_class = EmailTemplateSerializer
@@ -562,20 +547,9 @@ class EmailTemplateViewSet(viewsets.ModelViewSet):
                 )
             serializer.save(tenant=self.request.user.tenant)
     
-    @action(detail=False, methods=['get'])
-    def search(self, request):
-        """Search templates by name."""
-        query = request.query_params.get('q', '')
-        if query:
-            queryset = self.get_queryset().filter(name__icontains=query)
-        else:
-            queryset = self.get_queryset()
-        
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
 
 
-class AutomationWorkflowViewSet(viewsets.ModelViewSet):
+class AutomationWorkflowViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     ViewSet for AutomationWorkflow model.
     Provides CRUD operations for automation workflow management.
@@ -688,7 +662,7 @@ class AutomationWorkflowViewSet(viewsets.ModelViewSet):
         })
 
 
-class AutomationExecutionViewSet(viewsets.ModelViewSet):
+class AutomationExecutionViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     ViewSet for AutomationExecution model.
     Provides CRUD operations for automation execution management.
@@ -922,10 +896,10 @@ class BrandProfileViewSet(viewsets.ModelViewSet):
             )
 
 
-class BrandAssetViewSet(viewsets.ModelViewSet):
+class BrandAssetViewSet(SparseFieldsetMixin, SearchActionMixin, viewsets.ModelViewSet):
     """
     ViewSet for BrandAsset model.
-    Provides CRUD operations for brand asset management.
+    Provides CRUD operations and full-text search for brand asset management.
     """
     queryset = BrandAsset.objects.all()
     serializer_class = BrandAssetSerializer
@@ -985,8 +959,9 @@ class BrandAssetViewSet(viewsets.ModelViewSet):
         Get only AI-generated assets.
         """
         queryset = self.get_queryset().filter(original_image_request__isnull=False)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def by_type(self, request):
@@ -999,8 +974,9 @@ class BrandAssetViewSet(viewsets.ModelViewSet):
         else:
             queryset = self.get_queryset()
         
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def shared_with_clients(self, request):
@@ -1008,8 +984,9 @@ class BrandAssetViewSet(viewsets.ModelViewSet):
         Get assets that are shared with clients.
         """
         queryset = self.get_queryset().filter(is_shared_with_clients=True)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['post'])
     def toggle_share(self, request, pk=None):
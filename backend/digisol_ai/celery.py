@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from celery.signals import task_prerun
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'digisol_ai.settings')
@@ -14,6 +15,14 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
 
 
+@task_prerun.connect
+def reset_tenant_scope(**kwargs):
+    """Start every task without a tenant, whatever earlier tasks on this worker set."""
+    from core.middleware import clear_current_tenant, clear_request_cache
+    clear_current_tenant()
+    clear_request_cache()
+
+
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
     print(f'Request: {self.request!r}') 
\ No newline at end of file
@@ -200,6 +200,95 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'America/Denver'
+CELERY_BEAT_SCHEDULE = {
+    # Resume workflow executions whose wait step has elapsed
+    'run-due-workflow-executions': {
+        'task': 'core.tasks.run_due_workflow_executions',
+        'schedule': 30.0,
+    },
+    # Persist Redis token reservations (no-op unless TOKEN_METERING_REDIS_URL is set)
+    'flush-token-reservations': {
+        'task': 'core.tasks.flush_token_reservations',
+        'schedule': 15.0,
+    },
+    # Write events buffered by the ingest endpoints (no-op unless EVENT_INGEST_REDIS_URL is set)
+    'flush-event-ingest-buffers': {
+        'task': 'analytics.tasks.flush_event_ingest_buffers',
+        'schedule': 5.0,
+    },
+    # Snapshot the last completed days of lead funnel events for long report windows
+    'refresh-lead-funnel-snapshots': {
+        'task': 'analytics.tasks.refresh_lead_funnel_snapshots',
+        'schedule': 86400.0,
+    },
+    # Keep monthly event partitions created ahead (no-op unless events is partitioned)
+    'ensure-event-partitions': {
+        'task': 'analytics.tasks.ensure_event_partitions',
+        'schedule': 86400.0,
+    },
+    # Roll up and drop events older than EVENT_RETENTION_MONTHS
+    'apply-event-retention': {
+        'task': 'analytics.tasks.apply_event_retention',
+        'schedule': 86400.0,
+    },
+    # Delete background contact exports older than CONTACT_EXPORT_RETENTION_HOURS
+    'delete-old-contact-exports': {
+        'task': 'accounts.tasks.delete_old_contact_exports',
+        'schedule': 3600.0,
+    },
+    # Recount project task totals so overdue counts follow the calendar
+    'refresh-project-task-totals': {
+        'task': 'project_management.tasks.refresh_project_task_totals',
+        'schedule': 86400.0,
+    },
+    # Re-analyze the health of projects changed since their last Promana analysis
+    'run-promana-batch-analysis': {
+        'task': 'ai_services.tasks.run_promana_batch_analysis',
+        'schedule': 86400.0,
+    },
+}
+
+# Token metering: reserve token consumption in Redis and flush it to the
+# database periodically instead of updating the tenant row on every call
+TOKEN_METERING_REDIS_URL = os.environ.get('TOKEN_METERING_REDIS_URL')
+
+# Seconds a tenant's subscription and plan are shared between requests
+# through the cache (core.tenant_context); 0 loads them once per request
+TENANT_CONTEXT_CACHE_TTL = int(os.environ.get('TENANT_CONTEXT_CACHE_TTL', 0))
+
+# Contacts fetched per database round trip by the CSV export (accounts.exports)
+CONTACT_EXPORT_CHUNK_SIZE = int(os.environ.get('CONTACT_EXPORT_CHUNK_SIZE', 2000))
+
+# Hours background contact exports are kept for download before deletion
+CONTACT_EXPORT_RETENTION_HOURS = int(os.environ.get('CONTACT_EXPORT_RETENTION_HOURS', 24))
+
+# Contacts written per bulk upsert by the contact import (accounts.imports)
+CONTACT_IMPORT_CHUNK_SIZE = int(os.environ.get('CONTACT_IMPORT_CHUNK_SIZE', 1000))
+
+# Event ingestion (analytics.ingest): events written per bulk insert, the
+# largest NDJSON body accepted, and, when EVENT_INGEST_REDIS_URL is set,
+# how many buffered events are allowed before requests get 429 and how many
+# chunks each flush run writes per stream
+EVENT_INGEST_REDIS_URL = os.environ.get('EVENT_INGEST_REDIS_URL')
+EVENT_INGEST_CHUNK_SIZE = int(os.environ.get('EVENT_INGEST_CHUNK_SIZE', 500))
+EVENT_INGEST_MAX_BYTES = int(os.environ.get('EVENT_INGEST_MAX_BYTES', 20 * 1024 * 1024))
+EVENT_INGEST_MAX_BUFFERED = int(os.environ.get('EVENT_INGEST_MAX_BUFFERED', 1000000))
+EVENT_INGEST_FLUSH_MAX_CHUNKS = int(os.environ.get('EVENT_INGEST_FLUSH_MAX_CHUNKS', 20))
+
+# Whole months of raw analytics events kept besides the current one; older
+# events are folded into the campaign rollups and removed (analytics.partitions)
+EVENT_RETENTION_MONTHS = int(os.environ.get('EVENT_RETENTION_MONTHS', 13))
+
+# Seconds a project's critical path schedule is cached; the cache key
+# changes whenever its tasks or dependencies do (project_management.scheduling)
+PROJECT_SCHEDULE_CACHE_TTL = int(os.environ.get('PROJECT_SCHEDULE_CACHE_TTL', 3600))
+
+# Nightly Promana analysis (ai_services.promana): projects per batch, Gemini
+# requests in flight at once, and whether to ask Gemini at all rather than
+# score projects by rules (off by default to protect the API quota)
+PROMANA_BATCH_SIZE = int(os.environ.get('PROMANA_BATCH_SIZE', 200))
+PROMANA_BATCH_CONCURRENCY = int(os.environ.get('PROMANA_BATCH_CONCURRENCY', 4))
+PROMANA_BATCH_USE_GEMINI = os.environ.get('PROMANA_BATCH_USE_GEMINI', 'False').lower() == 'true'
 
 # CORS Headers Settings
 CORS_ALLOWED_ORIGINS = [
@@ -244,6 +333,29 @@ CORS_URLS_REGEX = r'^api/.*$'
 # AI/LLM API Keys (OpenAI not used)
 GOOGLE_GEMINI_API_KEY = os.environ.get('GOOGLE_GEMINI_API_KEY')
 
+# Gemini rate limits (sliding window, shared through the cache, which should
+# be shared between processes outside DEBUG); -1 disables a tier
+GEMINI_RATE_LIMITS = {
+    'burst_per_second': int(os.environ.get('GEMINI_BURST_PER_SECOND', 5)),
+    'global_per_minute': int(os.environ.get('GEMINI_REQUESTS_PER_MINUTE', 60)),
+    'global_per_day': int(os.environ.get('GEMINI_REQUESTS_PER_DAY', 10000)),
+    'tenant_per_minute': int(os.environ.get('GEMINI_TENANT_REQUESTS_PER_MINUTE', 20)),
+}
+# Fail the system check, rather than warn, when that cache is process-local;
+# enabled by the production and Render settings
+GEMINI_RATE_LIMITER_REQUIRE_SHARED_CACHE = False
+# Seconds call_gemini_api waits for capacity before failing; Celery tasks pass a longer wait
+GEMINI_RATE_LIMIT_TIMEOUT = float(os.environ.get('GEMINI_RATE_LIMIT_TIMEOUT', 0))
+GEMINI_TASK_RATE_LIMIT_TIMEOUT = float(os.environ.get('GEMINI_TASK_RATE_LIMIT_TIMEOUT', 120))
+# Opt-in cache for identical Gemini requests (call_gemini_api(use_cache=True));
+# off unless GEMINI_RESPONSE_CACHE_ENABLED is set
+GEMINI_RESPONSE_CACHE = {
+    'enabled': os.environ.get('GEMINI_RESPONSE_CACHE_ENABLED', 'False').lower() == 'true',
+    'ttl': int(os.environ.get('GEMINI_RESPONSE_CACHE_TTL', 3600)),
+    'max_entries': int(os.environ.get('GEMINI_RESPONSE_CACHE_MAX_ENTRIES', 512)),
+    'max_temperature': float(os.environ.get('GEMINI_RESPONSE_CACHE_MAX_TEMPERATURE', 0.7)),
+}
+
 # AWS S3/Google Cloud Storage
 AWS_STORAGE_BUCKET_NAME = os.environ.get('AWS_STORAGE_BUCKET_NAME')
 AWS_ACCESS_KEY_ID = os.environ.get('AWS_ACCESS_KEY_ID')
@@ -260,6 +372,8 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'core.authentication.JWTAuthenticationWithDigiSolBypass',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', '50')),
 }
 
 SIMPLE_JWT = {
@@ -143,13 +143,15 @@ AUTHENTICATION_BACKENDS = [
 # Logging configuration
 from .logging_config import LOGGING
 
-# Cache configuration - Use local memory cache for simplicity
+# Cache configuration - shared through Redis, since the Gemini rate limiter
+# keeps its counters in the cache and must see every worker's requests
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
     }
 }
+GEMINI_RATE_LIMITER_REQUIRE_SHARED_CACHE = True
 
 # Required environment variables (temporarily disabled for testing)
 # REQUIRED_ENV_VARS = [
@@ -229,9 +229,17 @@ if REDIS_URL:
     CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
     CELERY_WORKER_PREFETCH_MULTIPLIER = 1
     CELERY_WORKER_MAX_TASKS_PER_CHILD = 1000
+    # Shared cache, so the Gemini rate limits hold across web and Celery workers
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
 else:
     CELERY_BROKER_URL = 'memory://'
     CELERY_RESULT_BACKEND = 'rpc://'
+GEMINI_RATE_LIMITER_REQUIRE_SHARED_CACHE = True
 
 # Google Analytics Settings
 GOOGLE_ANALYTICS_ID = os.environ.get('GOOGLE_ANALYTICS_ID')
@@ -338,8 +346,9 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-# REST Framework settings
+# REST Framework settings, keeping the inherited pagination defaults
 REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'core.authentication.JWTAuthenticationWithDigiSolBypass',
     ),
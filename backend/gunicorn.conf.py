@@ -11,7 +11,9 @@ backlog = 2048
 
 # Worker processes (optimized for Render free tier)
 workers = 1  # Use only 1 worker for free tier to save memory
-worker_class = 'sync'
+# ASGI worker so the async streaming views don't hold the worker while
+# waiting on Gemini; sync views still run in Django's thread pool
+worker_class = 'uvicorn.workers.UvicornWorker'
 worker_connections = 50  # Reduced for memory efficiency
 max_requests = 100  # Restart workers more frequently
 max_requests_jitter = 10
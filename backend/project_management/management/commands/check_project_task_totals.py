@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Tenant
+from project_management.models import Project
+from project_management.queries import refresh_task_totals, stale_task_totals
+
+
+class Command(BaseCommand):
+    help = 'Compare the task total columns on projects with their tasks, optionally fixing differences'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=str, help='Only check projects of this tenant id')
+        parser.add_argument('--fix', action='store_true', help='Recompute the totals of projects that differ')
+        parser.add_argument('--batch-size', type=int, default=500, help='Projects checked per query')
+
+    def handle(self, *args, **options):
+        projects = Project.objects.all_tenants().order_by('pk')
+        if options['tenant']:
+            try:
+                projects = projects.filter(tenant=Tenant.objects.get(id=options['tenant']))
+            except (Tenant.DoesNotExist, ValueError):
+                raise CommandError(f"Tenant {options['tenant']} not found")
+
+        project_ids = list(projects.values_list('pk', flat=True))
+        stale = []
+        for offset in range(0, len(project_ids), options['batch_size']):
+            batch = project_ids[offset:offset + options['batch_size']]
+            stale.extend(stale_task_totals(Project.objects.all_tenants().filter(pk__in=batch)))
+
+        for project_id, differences in stale:
+            details = ', '.join(f"{name} {stored} != {actual}" for name, (stored, actual) in differences.items())
+            self.stdout.write(f"Project {project_id}: {details}")
+
+        if not stale:
+            self.stdout.write(self.style.SUCCESS(f'All {len(project_ids)} projects have consistent task totals'))
+        elif options['fix']:
+            fixed = refresh_task_totals([project_id for project_id, _ in stale])
+            self.stdout.write(self.style.SUCCESS(f'Successfully recomputed task totals for {fixed} projects'))
+        else:
+            raise CommandError(f'{len(stale)} of {len(project_ids)} projects have stale task totals (rerun with --fix)')
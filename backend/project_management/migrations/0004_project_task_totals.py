@@ -0,0 +1,81 @@
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+
+def fill_task_totals(apps, schema_editor):
+    Project = apps.get_model('project_management', 'Project')
+    ProjectTask = apps.get_model('project_management', 'ProjectTask')
+    today = timezone.localdate()
+    rows = ProjectTask.objects.order_by().values('project').annotate(
+        tasks_total=Count('id'),
+        tasks_pending=Count('id', filter=Q(status='pending')),
+        tasks_in_progress=Count('id', filter=Q(status='in_progress')),
+        tasks_completed=Count('id', filter=Q(status='completed')),
+        tasks_blocked=Count('id', filter=Q(status='blocked')),
+        tasks_overdue=Count('id', filter=Q(end_date__lt=today, status__in=['pending', 'in_progress'])),
+        tasks_estimated_hours=Sum('estimated_hours'),
+        tasks_actual_hours=Sum('actual_hours'),
+    )
+    now = timezone.now()
+    for row in rows.iterator():
+        project_id = row.pop('project')
+        Project.objects.filter(pk=project_id).update(
+            task_totals_updated_at=now, **{name: value or 0 for name, value in row.items()}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project_management', '0003_project_baseline_data_project_client_contact_info_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='tasks_total',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='tasks_pending',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='tasks_in_progress',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='tasks_completed',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='tasks_blocked',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='tasks_overdue',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='tasks_estimated_hours',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='tasks_actual_hours',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='task_totals_updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_task_totals, migrations.RunPython.noop),
+    ]
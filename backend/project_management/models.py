@@ -1,6 +1,6 @@
 import uuid
 from decimal import Decimal
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 from core.models import Tenant
@@ -97,6 +97,18 @@ class Project(models.Model):
     predicted_completion_date = models.DateField(null=True, blank=True)
     last_promana_analysis = models.DateTimeField(null=True, blank=True)
     
+    # Task Totals, kept current by ProjectTask.save/delete (queries.refresh_task_totals);
+    # tasks_overdue is also refreshed daily as tasks pass their end date
+    tasks_total = models.PositiveIntegerField(default=0, editable=False)
+    tasks_pending = models.PositiveIntegerField(default=0, editable=False)
+    tasks_in_progress = models.PositiveIntegerField(default=0, editable=False)
+    tasks_completed = models.PositiveIntegerField(default=0, editable=False)
+    tasks_blocked = models.PositiveIntegerField(default=0, editable=False)
+    tasks_overdue = models.PositiveIntegerField(default=0, editable=False)
+    tasks_estimated_hours = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+    tasks_actual_hours = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+    task_totals_updated_at = models.DateTimeField(null=True, blank=True, editable=False)
+    
     # Client Portal Fields
     client_name = models.CharField(max_length=255, blank=True, null=True)
     client_email = models.EmailField(blank=True, null=True)
@@ -133,9 +145,22 @@ class Project(models.Model):
     def __str__(self):
         return f"{self.name} ({self.get_status_display()})"
     
+    # Columns written only by queries.refresh_task_totals
+    TASK_TOTAL_FIELDS = (
+        'tasks_total', 'tasks_pending', 'tasks_in_progress', 'tasks_completed',
+        'tasks_blocked', 'tasks_overdue', 'tasks_estimated_hours', 'tasks_actual_hours',
+    )
+    
     def save(self, *args, **kwargs):
         if not self.project_code:
             self.project_code = f"PRJ-{str(self.id)[:8].upper()}"
+        if not self._state.adding and not args and kwargs.get('update_fields') is None:
+            # Don't write back task totals loaded before a concurrent task change
+            skipped = {*self.TASK_TOTAL_FIELDS, 'task_totals_updated_at', *self.get_deferred_fields()}
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skipped
+            ]
         super().save(*args, **kwargs)
     
     @property
@@ -143,14 +168,28 @@ class Project(models.Model):
         """Calculate project duration in days."""
         return (self.end_date - self.start_date).days
     
+    def get_task_totals(self):
+        """Task counts and hour sums for the project, from the task total columns."""
+        return {
+            'tasks_total': self.tasks_total,
+            'tasks_completed': self.tasks_completed,
+            'tasks_estimated_hours': self.tasks_estimated_hours,
+            'tasks_actual_hours': self.tasks_actual_hours,
+        }
+    
+    def refresh_task_totals(self):
+        """Recompute the task total columns from the project's tasks."""
+        from .queries import refresh_task_totals
+        refresh_task_totals([self.pk])
+        self.refresh_from_db(fields=[*self.TASK_TOTAL_FIELDS, 'task_totals_updated_at'])
+    
     @property
     def progress_percentage(self):
         """Calculate project progress based on completed tasks."""
-        total_tasks = self.tasks.count()
-        if total_tasks == 0:
+        totals = self.get_task_totals()
+        if not totals['tasks_total']:
             return 0
-        completed_tasks = self.tasks.filter(status='completed').count()
-        return round((completed_tasks / total_tasks) * 100, 2)
+        return round((totals['tasks_completed'] / totals['tasks_total']) * 100, 2)
     
     @property
     def is_overdue(self):
@@ -160,23 +199,21 @@ class Project(models.Model):
     @property
     def total_estimated_hours(self):
         """Calculate total estimated hours for all tasks."""
-        return self.tasks.aggregate(
-            total=models.Sum('estimated_hours')
-        )['total'] or 0
+        return self.get_task_totals()['tasks_estimated_hours'] or 0
     
     @property
     def total_actual_hours(self):
         """Calculate total actual hours for all tasks."""
-        return self.tasks.aggregate(
-            total=models.Sum('actual_hours')
-        )['total'] or 0
+        return self.get_task_totals()['tasks_actual_hours'] or 0
     
     @property
     def completion_rate(self):
         """Calculate completion rate based on hours."""
-        if self.total_estimated_hours == 0:
+        totals = self.get_task_totals()
+        estimated = totals['tasks_estimated_hours'] or 0
+        if estimated == 0:
             return 0
-        return min(round((self.total_actual_hours / self.total_estimated_hours) * 100, 2), 100)
+        return min(round(((totals['tasks_actual_hours'] or 0) / estimated) * 100, 2), 100)
     
     @property
     def budget_utilization(self):
@@ -353,6 +390,33 @@ class ProjectTask(models.Model):
     def __str__(self):
         return f"{self.name} - {self.project.name}"
     
+    # Fields the project task total columns are computed from
+    TOTALS_FIELDS = {'project', 'project_id', 'status', 'end_date', 'estimated_hours', 'actual_hours'}
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        task = super().from_db(db, field_names, values)
+        task._loaded_project_id = task.__dict__.get('project_id')
+        return task
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if update_fields is None or self.TOTALS_FIELDS.intersection(update_fields):
+                from .queries import refresh_task_totals
+                # A task moved to another project changes the totals of both
+                refresh_task_totals({self.project_id, getattr(self, '_loaded_project_id', None)} - {None})
+                self._loaded_project_id = self.project_id
+    
+    def delete(self, *args, **kwargs):
+        project_id = self.project_id
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            from .queries import refresh_task_totals
+            refresh_task_totals([project_id])
+        return result
+    
     @property
     def duration_days(self):
         """Calculate task duration in days."""
@@ -366,8 +430,7 @@ class ProjectTask(models.Model):
     @property
     def can_start(self):
         """Check if task can start based on dependencies."""
-        if not self.dependencies.exists():
-            return True
+        # Uses prefetched dependencies when available
         return all(dep.status == 'completed' for dep in self.dependencies.all())
     
     @property
@@ -393,25 +456,16 @@ class ProjectTask(models.Model):
     
     @property
     def is_critical_path(self):
-        """Check if task is on critical path."""
+        """
+        Quick per-task criticality flag from priority and risk. The Gantt
+        view uses the real critical path from scheduling.get_project_schedule.
+        """
         return self.priority == 'critical' or self.promana_risk_score > 70
     
     def get_dependency_chain(self):
         """Get the full dependency chain for this task."""
-        chain = []
-        visited = set()
-        
-        def traverse(task):
-            if task.id in visited:
-                return
-            visited.add(task.id)
-            
-            for dep in task.dependencies.all():
-                traverse(dep)
-            chain.append(task)
-        
-        traverse(self)
-        return chain
+        from .scheduling import dependency_chain
+        return dependency_chain(self)
 
 
 class ProjectMilestone(models.Model):
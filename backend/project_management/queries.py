@@ -0,0 +1,159 @@
+"""
+Queryset helpers for serializing projects and tasks, and the project task
+total columns.
+Nested relations are prefetched, so serializing a page of projects costs a
+fixed number of queries instead of several per project and task. Task
+counts and hour sums are stored on the project and recounted in one
+grouped query whenever a task is saved or deleted.
+"""
+from decimal import Decimal
+from typing import Any, Dict, List, Tuple
+from django.db import transaction
+from django.db.models import Count, Prefetch, Q, Sum
+from django.utils import timezone
+from .models import (
+    Project, ProjectTask, ProjectMilestone, ProjectFile, ProjectComment,
+    ProjectTeamMember, ProjectRisk, ProjectReport, PromanaInsight, TimeEntry
+)
+
+# Levels of sub-tasks prefetched below each task; deeper levels are
+# loaded on demand by the serializer
+SUB_TASK_PREFETCH_DEPTH = 2
+
+RECENT_INSIGHTS_LIMIT = 5
+
+
+TASK_TOTAL_FIELDS = Project.TASK_TOTAL_FIELDS
+
+# Projects whose totals are written per statement
+REFRESH_BATCH_SIZE = 500
+
+
+def compute_task_totals(project_ids) -> Dict[Any, Dict[str, Any]]:
+    """Task total column values for each given project, in one grouped query."""
+    today = timezone.localdate()
+    rows = ProjectTask.objects.all_tenants().filter(project__in=project_ids).order_by().values('project').annotate(
+        tasks_total=Count('id'),
+        tasks_pending=Count('id', filter=Q(status='pending')),
+        tasks_in_progress=Count('id', filter=Q(status='in_progress')),
+        tasks_completed=Count('id', filter=Q(status='completed')),
+        tasks_blocked=Count('id', filter=Q(status='blocked')),
+        tasks_overdue=Count('id', filter=Q(end_date__lt=today, status__in=['pending', 'in_progress'])),
+        tasks_estimated_hours=Sum('estimated_hours'),
+        tasks_actual_hours=Sum('actual_hours'),
+    )
+    found = {row.pop('project'): row for row in rows}
+    totals = {}
+    for project_id in project_ids:
+        row = found.get(project_id, {})
+        totals[project_id] = {name: row.get(name) or 0 for name in TASK_TOTAL_FIELDS}
+    return totals
+
+
+def refresh_task_totals(project_ids, batch_size: int = REFRESH_BATCH_SIZE) -> int:
+    """
+    Recompute the task total columns of the given projects. Each batch
+    locks its project rows first, so concurrent task saves on one project
+    apply their recounts one after the other.
+
+    Returns:
+        Number of projects refreshed
+    """
+    project_ids = sorted(project_ids, key=str)
+    refreshed = 0
+    for offset in range(0, len(project_ids), batch_size):
+        batch = project_ids[offset:offset + batch_size]
+        with transaction.atomic():
+            locked = list(
+                Project.objects.all_tenants().select_for_update().filter(pk__in=batch)
+                .order_by('pk').values_list('pk', flat=True)
+            )
+            totals = compute_task_totals(locked)
+            now = timezone.now()
+            Project.objects.all_tenants().bulk_update(
+                [Project(pk=pk, task_totals_updated_at=now, **totals[pk]) for pk in locked],
+                [*TASK_TOTAL_FIELDS, 'task_totals_updated_at'],
+            )
+        refreshed += len(locked)
+    return refreshed
+
+
+def stale_task_totals(projects) -> List[Tuple[Any, Dict[str, Tuple[Any, Any]]]]:
+    """
+    Projects whose stored task totals differ from their tasks, with
+    {field: (stored, actual)} for each differing column.
+    """
+    projects = list(projects.values('pk', *TASK_TOTAL_FIELDS))
+    actual = compute_task_totals([project['pk'] for project in projects])
+    stale = []
+    for project in projects:
+        expected = actual[project['pk']]
+        differences = {
+            name: (project[name], expected[name])
+            for name in TASK_TOTAL_FIELDS
+            if Decimal(project[name]) != Decimal(expected[name])
+        }
+        if differences:
+            stale.append((project['pk'], differences))
+    return stale
+
+
+def comment_queryset():
+    """Top-level comments with authors and two levels of replies."""
+    replies = ProjectComment.objects.select_related('author').prefetch_related(
+        Prefetch('replies', queryset=ProjectComment.objects.select_related('author'))
+    )
+    return ProjectComment.objects.filter(parent_comment__isnull=True).select_related(
+        'author'
+    ).prefetch_related(Prefetch('replies', queryset=replies))
+
+
+def task_prefetches(depth=SUB_TASK_PREFETCH_DEPTH):
+    """Prefetch lookups for everything ProjectTaskSerializer reads."""
+    lookups = [
+        'dependencies',
+        Prefetch('comments', queryset=comment_queryset(), to_attr='root_comments'),
+        Prefetch('files', queryset=ProjectFile.objects.select_related('uploaded_by')),
+        Prefetch('time_entry_records', queryset=TimeEntry.objects.select_related('user')),
+    ]
+    if depth > 0:
+        lookups.append(Prefetch('sub_tasks', queryset=task_queryset(depth - 1)))
+    return lookups
+
+
+def task_queryset(depth=SUB_TASK_PREFETCH_DEPTH):
+    """Tasks with their users selected and relations prefetched."""
+    return prefetch_tasks(ProjectTask.objects.all(), depth)
+
+
+def prefetch_tasks(queryset, depth=SUB_TASK_PREFETCH_DEPTH):
+    """Select and prefetch the relations ProjectTaskSerializer reads."""
+    return queryset.select_related(
+        'assigned_to', 'promana_suggested_assignee'
+    ).prefetch_related(*task_prefetches(depth))
+
+
+def project_prefetches():
+    """Prefetch lookups for everything ProjectSerializer reads."""
+    return [
+        Prefetch('team_memberships', queryset=ProjectTeamMember.objects.select_related('user')),
+        Prefetch('tasks', queryset=task_queryset()),
+        Prefetch('milestones', queryset=ProjectMilestone.objects.select_related('completed_by').prefetch_related(
+            Prefetch('related_tasks', queryset=task_queryset())
+        )),
+        Prefetch('files', queryset=ProjectFile.objects.select_related('uploaded_by')),
+        Prefetch('comments', queryset=comment_queryset(), to_attr='root_comments'),
+        Prefetch('risks', queryset=ProjectRisk.objects.select_related('assigned_to')),
+        Prefetch('reports', queryset=ProjectReport.objects.select_related('generated_by')),
+        'client_portal',
+        Prefetch(
+            'promana_insights',
+            queryset=PromanaInsight.objects.select_related('action_taken_by')[:RECENT_INSIGHTS_LIMIT],
+            to_attr='recent_promana_insights',
+        ),
+    ]
+
+
+def prefetch_projects(queryset):
+    """Prefetch the relations ProjectSerializer reads."""
+    return queryset.select_related('manager').prefetch_related(*project_prefetches())
@@ -0,0 +1,240 @@
+"""
+Critical path (CPM) scheduling for project tasks.
+A project's tasks and dependency edges are loaded in two queries and
+scheduled with one topological pass forwards (earliest start/finish) and
+one backwards (latest start/finish), so the whole computation is O(V + E).
+Tasks with no slack form the critical path. Dependency cycles are reported
+instead of scheduled.
+
+Durations are whole calendar days, counting both the start and end date.
+A task never starts before its planned start_date, nor before every task
+it depends on has finished.
+
+Schedules are cached under a version taken from the project's task and
+dependency tables, so any task save, delete or dependency change computes
+a fresh schedule.
+"""
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from .models import ProjectTask
+
+CACHE_PREFIX = 'project_schedule'
+CACHE_TTL = 3600
+
+TASK_FIELDS = (
+    'id', 'name', 'start_date', 'end_date', 'status', 'priority',
+    'estimated_hours', 'actual_hours', 'assigned_to__email',
+)
+
+Dependency = ProjectTask.dependencies.through
+
+
+@dataclass(frozen=True)
+class TaskTiming:
+    earliest_start: date
+    earliest_finish: date
+    latest_start: date
+    latest_finish: date
+    slack_days: int
+
+    @property
+    def is_critical(self) -> bool:
+        return self.slack_days == 0
+
+
+@dataclass
+class ProjectSchedule:
+    # Task rows with TASK_FIELDS, in the tasks' default ordering
+    tasks: List[Dict[str, Any]]
+    # (predecessor id, successor id) pairs within the project
+    edges: List[Tuple[Any, Any]]
+    timings: Dict[Any, TaskTiming] = field(default_factory=dict)
+    # Critical task ids in dependency order
+    critical_path: List[Any] = field(default_factory=list)
+    finish_date: Optional[date] = None
+    # Task ids forming a dependency cycle; nothing is scheduled when set
+    cycle: List[Any] = field(default_factory=list)
+
+
+def duration_days(start_date: date, end_date: date) -> int:
+    return max((end_date - start_date).days, 0) + 1
+
+
+def _topological_order(task_ids: List, successors: Dict, in_degree: Dict) -> List:
+    """Kahn's algorithm; returns fewer ids than given when there is a cycle."""
+    in_degree = dict(in_degree)
+    ready = deque(task_id for task_id in task_ids if not in_degree[task_id])
+    order = []
+    while ready:
+        task_id = ready.popleft()
+        order.append(task_id)
+        for successor in successors[task_id]:
+            in_degree[successor] -= 1
+            if not in_degree[successor]:
+                ready.append(successor)
+    return order
+
+
+def _find_cycle(unordered: set, predecessors: Dict) -> List:
+    """
+    One cycle among the tasks a topological sort couldn't order. Each of
+    them has an unordered predecessor, so walking predecessors must repeat.
+    """
+    path, position = [], {}
+    task_id = next(iter(unordered))
+    while task_id not in position:
+        position[task_id] = len(path)
+        path.append(task_id)
+        task_id = next(p for p in predecessors[task_id] if p in unordered)
+    cycle = path[position[task_id]:]
+    cycle.reverse()
+    return cycle
+
+
+def compute_schedule(tasks: List[Dict[str, Any]], edges: List[Tuple[Any, Any]], anchor: Optional[date] = None) -> ProjectSchedule:
+    """
+    Run CPM over task rows and (predecessor, successor) edges.
+
+    Args:
+        tasks: Rows with at least id, start_date and end_date
+        edges: Dependency pairs; pairs naming unknown tasks are ignored
+        anchor: Day 0 of the schedule (default: the earliest start_date)
+    """
+    schedule = ProjectSchedule(tasks=tasks, edges=[])
+    if not tasks:
+        return schedule
+    rows = {task['id']: task for task in tasks}
+    task_ids = list(rows)
+    successors = {task_id: [] for task_id in task_ids}
+    predecessors = {task_id: [] for task_id in task_ids}
+    in_degree = dict.fromkeys(task_ids, 0)
+    for predecessor, successor in dict.fromkeys(edges):
+        if predecessor in rows and successor in rows:
+            successors[predecessor].append(successor)
+            predecessors[successor].append(predecessor)
+            in_degree[successor] += 1
+            schedule.edges.append((predecessor, successor))
+
+    order = _topological_order(task_ids, successors, in_degree)
+    if len(order) < len(task_ids):
+        schedule.cycle = _find_cycle(set(task_ids) - set(order), predecessors)
+        return schedule
+
+    anchor = anchor or min(task['start_date'] for task in tasks)
+    duration = {task_id: duration_days(rows[task_id]['start_date'], rows[task_id]['end_date']) for task_id in task_ids}
+
+    # Forward pass: earliest start/finish as day offsets from the anchor
+    earliest_start, earliest_finish = {}, {}
+    for task_id in order:
+        start = max((rows[task_id]['start_date'] - anchor).days, 0)
+        for predecessor in predecessors[task_id]:
+            start = max(start, earliest_finish[predecessor])
+        earliest_start[task_id] = start
+        earliest_finish[task_id] = start + duration[task_id]
+    project_finish = max(earliest_finish.values())
+
+    # Backward pass: latest finish/start without delaying the project
+    latest_start, latest_finish = {}, {}
+    for task_id in reversed(order):
+        finish = min((latest_start[successor] for successor in successors[task_id]), default=project_finish)
+        latest_finish[task_id] = finish
+        latest_start[task_id] = finish - duration[task_id]
+
+    def day(offset):
+        return anchor + timedelta(days=offset)
+
+    for task_id in order:
+        schedule.timings[task_id] = TaskTiming(
+            earliest_start=day(earliest_start[task_id]),
+            earliest_finish=day(earliest_finish[task_id] - 1),
+            latest_start=day(latest_start[task_id]),
+            latest_finish=day(latest_finish[task_id] - 1),
+            slack_days=latest_start[task_id] - earliest_start[task_id],
+        )
+    schedule.critical_path = [task_id for task_id in order if schedule.timings[task_id].is_critical]
+    schedule.finish_date = day(project_finish - 1)
+    return schedule
+
+
+def load_task_graph(project) -> Tuple[List[Dict[str, Any]], List[Tuple[Any, Any]]]:
+    """A project's task rows and (predecessor, successor) edges, in two queries."""
+    tasks = list(ProjectTask.objects.all_tenants().filter(project=project).values(*TASK_FIELDS))
+    # A task's `dependencies` are the tasks it waits for
+    edges = [
+        (dependency_id, task_id)
+        for task_id, dependency_id in Dependency.objects.filter(
+            from_projecttask__project=project, to_projecttask__project=project
+        ).values_list('from_projecttask_id', 'to_projecttask_id')
+    ]
+    return tasks, edges
+
+
+def schedule_version(project) -> str:
+    """Changes whenever a task of the project is saved or deleted or its dependencies change."""
+    tasks = ProjectTask.objects.all_tenants().filter(project=project).aggregate(
+        count=Count('id'), updated=Max('updated_at')
+    )
+    # Dependency rows have increasing ids, so any add shows up in the max
+    dependencies = Dependency.objects.filter(from_projecttask__project=project).aggregate(
+        count=Count('id'), latest=Max('id')
+    )
+    updated = tasks['updated'].isoformat() if tasks['updated'] else ''
+    return f"{tasks['count']}:{updated}:{dependencies['count']}:{dependencies['latest']}"
+
+
+def get_project_schedule(project, use_cache: bool = True) -> ProjectSchedule:
+    """The project's CPM schedule, from cache while its tasks are unchanged."""
+    key = f"{CACHE_PREFIX}:{project.pk}:{schedule_version(project)}"
+    if use_cache:
+        schedule = cache.get(key)
+        if schedule is not None:
+            return schedule
+    tasks, edges = load_task_graph(project)
+    schedule = compute_schedule(tasks, edges)
+    cache.set(key, schedule, getattr(settings, 'PROJECT_SCHEDULE_CACHE_TTL', CACHE_TTL))
+    return schedule
+
+
+def dependency_chain(task) -> List[ProjectTask]:
+    """
+    Every task `task` transitively depends on, each after its own
+    dependencies, ending with `task`. Costs one query per dependency level
+    plus one to load the tasks.
+    """
+    depends_on: Dict[Any, List] = {}
+    frontier = {task.pk}
+    while frontier:
+        for task_id in frontier:
+            depends_on[task_id] = []
+        rows = Dependency.objects.filter(from_projecttask_id__in=frontier).values_list('from_projecttask_id', 'to_projecttask_id')
+        next_frontier = set()
+        for task_id, dependency_id in rows:
+            depends_on[task_id].append(dependency_id)
+            if dependency_id not in depends_on:
+                next_frontier.add(dependency_id)
+        frontier = next_frontier
+
+    tasks = ProjectTask.objects.all_tenants().in_bulk(list(depends_on))
+    tasks[task.pk] = task
+
+    # Iterative post-order DFS; visited tasks are skipped, which also stops cycles
+    chain, visited = [], set()
+    stack = [(task.pk, iter(depends_on[task.pk]))]
+    visited.add(task.pk)
+    while stack:
+        task_id, dependencies = stack[-1]
+        for dependency_id in dependencies:
+            if dependency_id not in visited:
+                visited.add(dependency_id)
+                stack.append((dependency_id, iter(depends_on[dependency_id])))
+                break
+        else:
+            stack.pop()
+            if task_id in tasks:
+                chain.append(tasks[task_id])
+    return chain
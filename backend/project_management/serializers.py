@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from django.db.models import Sum, Count, Avg
+from django.db import models
+from django.db.models import Sum, Count, Avg, prefetch_related_objects
 from django.utils import timezone
 from datetime import datetime, timedelta
 import json
@@ -10,6 +11,7 @@ from .models import (
     ProjectAutomationRule, ProjectRisk, ProjectReport, ClientPortal, TimeEntry
 )
 from accounts.serializers import CustomUserSerializer
+from .queries import project_prefetches, task_prefetches
 
 
 class ProjectTeamMemberSerializer(serializers.ModelSerializer):
@@ -137,7 +139,7 @@ class ProjectCommentSerializer(serializers.ModelSerializer):
     
     def get_replies(self, obj):
         """Get nested replies."""
-        replies = ProjectComment.objects.filter(parent_comment=obj).order_by('created_at')
+        replies = obj.replies.all()
         return ProjectCommentSerializer(replies, many=True, read_only=True).data
 
 
@@ -166,6 +168,19 @@ class ProjectMilestoneSerializer(serializers.ModelSerializer):
         return ProjectTaskSerializer(tasks, many=True, read_only=True).data
 
 
+class ProjectTaskListSerializer(serializers.ListSerializer):
+    """
+    List serializer that prefetches task relations for the whole list when
+    the caller didn't, instead of querying them per task.
+    """
+
+    def to_representation(self, data):
+        tasks = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        if tasks and not hasattr(tasks[0], 'root_comments'):
+            prefetch_related_objects(tasks, *task_prefetches())
+        return super().to_representation(tasks)
+
+
 class ProjectTaskSerializer(serializers.ModelSerializer):
     """Enhanced serializer for project tasks."""
     
@@ -207,6 +222,10 @@ class ProjectTaskSerializer(serializers.ModelSerializer):
             'can_start', 'progress_percentage', 'remaining_hours', 'efficiency_ratio',
             'is_critical_path'
         ]
+        list_serializer_class = ProjectTaskListSerializer
+    
+    # Related objects are read through .all() or the to_attr lists set by
+    # queries.task_prefetches, so prefetched data is used when present.
     
     def get_dependencies(self, obj):
         """Get task dependencies."""
@@ -220,7 +239,9 @@ class ProjectTaskSerializer(serializers.ModelSerializer):
     
     def get_comments(self, obj):
         """Get task comments."""
-        comments = obj.comments.filter(parent_comment__isnull=True).order_by('created_at')
+        comments = getattr(obj, 'root_comments', None)
+        if comments is None:
+            comments = obj.comments.filter(parent_comment__isnull=True).order_by('created_at')
         return ProjectCommentSerializer(comments, many=True, read_only=True).data
     
     def get_files(self, obj):
@@ -230,16 +251,30 @@ class ProjectTaskSerializer(serializers.ModelSerializer):
     
     def get_time_entries(self, obj):
         """Get task time entries."""
-        time_entries = obj.time_entries.all()
+        time_entries = obj.time_entry_records.all()
         return TimeEntrySerializer(time_entries, many=True, read_only=True).data
 
 
+class ProjectListSerializer(serializers.ListSerializer):
+    """
+    List serializer for projects. Querysets from ProjectViewSet arrive
+    annotated and prefetched by queries.prefetch_projects; anything else is
+    prefetched here for the whole list.
+    """
+
+    def to_representation(self, data):
+        projects = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        if projects and not hasattr(projects[0], 'recent_promana_insights'):
+            prefetch_related_objects(projects, 'manager', *project_prefetches())
+        return super().to_representation(projects)
+
+
 class ProjectSerializer(serializers.ModelSerializer):
     """Enhanced serializer for projects."""
     
     manager = CustomUserSerializer(read_only=True)
     manager_id = serializers.UUIDField(write_only=True, required=False, allow_null=True)
-    team_members = ProjectTeamMemberSerializer(many=True, read_only=True)
+    team_members = ProjectTeamMemberSerializer(source='team_memberships', many=True, read_only=True)
     tasks = serializers.SerializerMethodField()
     milestones = serializers.SerializerMethodField()
     files = serializers.SerializerMethodField()
@@ -282,7 +317,8 @@ class ProjectSerializer(serializers.ModelSerializer):
             'duration_days', 'progress_percentage', 'is_overdue',
             'total_estimated_hours', 'total_actual_hours', 'completion_rate',
             'budget_utilization', 'days_remaining', 'is_at_risk',
-            'created_at', 'updated_at'
+            'tasks_total', 'tasks_pending', 'tasks_in_progress', 'tasks_completed',
+            'tasks_blocked', 'tasks_overdue', 'created_at', 'updated_at'
         ]
         read_only_fields = [
             'id', 'project_code', 'created_at', 'updated_at', 'duration_days',
@@ -290,6 +326,10 @@ class ProjectSerializer(serializers.ModelSerializer):
             'total_actual_hours', 'completion_rate', 'budget_utilization',
             'days_remaining', 'is_at_risk'
         ]
+        list_serializer_class = ProjectListSerializer
+    
+    # Computed totals read the task total columns kept on Project by
+    # queries.refresh_task_totals.
     
     def get_tasks(self, obj):
         """Get project tasks."""
@@ -308,7 +348,9 @@ class ProjectSerializer(serializers.ModelSerializer):
     
     def get_comments(self, obj):
         """Get project comments."""
-        comments = obj.comments.filter(parent_comment__isnull=True).order_by('created_at')
+        comments = getattr(obj, 'root_comments', None)
+        if comments is None:
+            comments = obj.comments.filter(parent_comment__isnull=True).order_by('created_at')
         return ProjectCommentSerializer(comments, many=True, read_only=True).data
     
     def get_risks(self, obj):
@@ -323,15 +365,16 @@ class ProjectSerializer(serializers.ModelSerializer):
     
     def get_client_portal(self, obj):
         """Get client portal info."""
-        try:
-            client_portal = obj.client_portal
-            return ClientPortalSerializer(client_portal, read_only=True).data
-        except:
+        client_portal = next(iter(obj.client_portal.all()), None)
+        if client_portal is None:
             return None
+        return ClientPortalSerializer(client_portal, read_only=True).data
     
     def get_promana_insights(self, obj):
         """Get Promana insights."""
-        insights = obj.promana_insights.all()[:5]  # Limit to 5 most recent
+        insights = getattr(obj, 'recent_promana_insights', None)
+        if insights is None:
+            insights = obj.promana_insights.all()[:5]  # Limit to 5 most recent
         return PromanaInsightSerializer(insights, many=True, read_only=True).data
 
 
@@ -424,6 +467,8 @@ class ProjectGanttDataSerializer(serializers.Serializer):
     dependencies = serializers.ListField()
     critical_path = serializers.ListField()
     resource_allocation = serializers.DictField()
+    projected_finish_date = serializers.DateField(allow_null=True)
+    dependency_cycle = serializers.ListField()
 
 
 class PromanaQuerySerializer(serializers.Serializer):
@@ -0,0 +1,17 @@
+from celery import shared_task
+from .models import Project
+from .queries import refresh_task_totals
+
+
+@shared_task
+def refresh_project_task_totals():
+    """
+    Recompute every project's task total columns, picking up tasks that
+    became overdue and any update made without ProjectTask.save.
+    """
+    project_ids = list(Project.objects.all_tenants().values_list('pk', flat=True))
+    refreshed = refresh_task_totals(project_ids)
+    return {
+        'success': True,
+        'refreshed_projects': refreshed
+    }
@@ -1,10 +1,19 @@
+from io import StringIO
+from django.core.management import CommandError, call_command
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from decimal import Decimal
 from datetime import date, timedelta
+from core.middleware import set_current_tenant, clear_current_tenant
 from core.models import Tenant
-from .models import Project, ProjectTask
+from .models import Project, ProjectTask, ProjectComment, ProjectTeamMember
+from .queries import prefetch_projects, stale_task_totals
+from .scheduling import compute_schedule, get_project_schedule
+from . import workload
+from .serializers import ProjectSerializer
 
 User = get_user_model()
 
@@ -192,3 +201,256 @@ class ProjectTaskModelTest(TestCase):
         overdue_task.status = "completed"
         overdue_task.save()
         self.assertFalse(overdue_task.is_overdue)
+
+
+class ProjectSerializerQueryTest(TestCase):
+    """Test that serializing projects uses a fixed number of queries."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.tenant = Tenant.objects.create(name="Query Tenant")
+        set_current_tenant(self.tenant)
+        self.addCleanup(clear_current_tenant)
+        self.user = User.objects.create_user(
+            username="queryuser",
+            email="query@example.com",
+            password="testpass123"
+        )
+    
+    def _create_project(self, name):
+        project = Project.objects.create(
+            tenant=self.tenant,
+            name=name,
+            manager=self.user,
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=30)
+        )
+        for index, status in enumerate(['completed', 'in_progress', 'pending']):
+            task = ProjectTask.objects.create(
+                tenant=self.tenant,
+                project=project,
+                name=f"{name} task {index}",
+                start_date=date.today(),
+                end_date=date.today() + timedelta(days=5),
+                status=status,
+                estimated_hours=Decimal('10.00'),
+                actual_hours=Decimal('4.00'),
+                assigned_to=self.user
+            )
+            ProjectComment.objects.create(
+                tenant=self.tenant, project=project, task=task, author=self.user, content="Looks good"
+            )
+        return project
+    
+    def _count_queries(self, queryset):
+        with CaptureQueriesContext(connection) as context:
+            data = ProjectSerializer(queryset, many=True).data
+        return len(context), data
+    
+    def test_query_count_is_independent_of_project_count(self):
+        self._create_project("First")
+        single, _ = self._count_queries(prefetch_projects(Project.objects.all()))
+        
+        self._create_project("Second")
+        self._create_project("Third")
+        several, data = self._count_queries(prefetch_projects(Project.objects.all()))
+        
+        self.assertEqual(single, several)
+        self.assertEqual(len(data), 3)
+        self.assertEqual(len(data[0]['tasks'][0]['comments']), 1)
+    
+    def test_task_totals_are_kept_on_the_project(self):
+        project = self._create_project("Totals")
+        stored = Project.objects.get(pk=project.pk)
+        
+        self.assertEqual(stored.tasks_total, 3)
+        self.assertEqual((stored.tasks_completed, stored.tasks_in_progress, stored.tasks_pending), (1, 1, 1))
+        self.assertEqual(stored.tasks_estimated_hours, Decimal('30.00'))
+        with self.assertNumQueries(0):
+            self.assertEqual(stored.progress_percentage, 33.33)
+            self.assertEqual(stored.completion_rate, 40)
+        
+        task = stored.tasks.get(status='pending')
+        task.status = 'completed'
+        task.end_date = date.today() - timedelta(days=1)
+        task.save(update_fields=['status', 'end_date'])
+        task.delete()
+        # Saving the stale in-memory project leaves the totals alone
+        stored.save()
+        stored.refresh_from_db()
+        self.assertEqual((stored.tasks_total, stored.tasks_completed, stored.tasks_pending), (2, 1, 0))
+        self.assertEqual(stored.tasks_actual_hours, Decimal('8.00'))
+    
+    def test_stale_task_totals_are_found_and_fixed(self):
+        project = self._create_project("Stale")
+        # Updates that bypass ProjectTask.save leave the totals behind
+        ProjectTask.objects.filter(project=project).update(end_date=date.today() - timedelta(days=2), status='in_progress')
+        # Blocked tasks past their end date are not counted as overdue
+        ProjectTask.objects.filter(project=project, name="Stale task 0").update(status='blocked')
+        
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('check_project_task_totals', stdout=out)
+        self.assertIn('tasks_overdue 0 != 2', out.getvalue())
+        
+        call_command('check_project_task_totals', '--fix', stdout=out)
+        project.refresh_from_db()
+        self.assertEqual((project.tasks_blocked, project.tasks_overdue, project.tasks_completed), (1, 2, 0))
+        self.assertEqual(stale_task_totals(Project.objects.all()), [])
+    
+    def test_plain_querysets_are_prefetched_by_list_serializer(self):
+        for name in ("One", "Two", "Three"):
+            self._create_project(name)
+        plain, data = self._count_queries(Project.objects.all())
+        prefetched, _ = self._count_queries(prefetch_projects(Project.objects.all()))
+        
+        # Managers take one extra query
+        self.assertEqual(plain, prefetched + 1)
+        self.assertEqual(data[0]['progress_percentage'], '33.33')
+
+
+class CriticalPathScheduleTest(TestCase):
+    """Test CPM scheduling of project tasks."""
+    
+    def _task(self, task_id, start, days):
+        start_date = date(2025, 1, 1) + timedelta(days=start)
+        return {'id': task_id, 'start_date': start_date, 'end_date': start_date + timedelta(days=days - 1)}
+    
+    def test_critical_path_and_slack(self):
+        # a (3d) -> b (5d) -> d (2d); a -> c (1d) -> d
+        tasks = [self._task('a', 0, 3), self._task('b', 0, 5), self._task('c', 0, 1), self._task('d', 0, 2)]
+        edges = [('a', 'b'), ('a', 'c'), ('b', 'd'), ('c', 'd')]
+        schedule = compute_schedule(tasks, edges)
+        
+        self.assertEqual(schedule.critical_path, ['a', 'b', 'd'])
+        self.assertEqual(schedule.timings['c'].slack_days, 4)
+        self.assertEqual(schedule.timings['b'].earliest_start, date(2025, 1, 4))
+        self.assertEqual(schedule.finish_date, date(2025, 1, 10))
+        self.assertEqual(schedule.cycle, [])
+    
+    def test_planned_start_date_delays_a_task(self):
+        tasks = [self._task('a', 0, 2), self._task('b', 5, 2)]
+        schedule = compute_schedule(tasks, [('a', 'b')])
+        
+        self.assertEqual(schedule.timings['b'].earliest_start, date(2025, 1, 6))
+        self.assertEqual(schedule.timings['a'].slack_days, 3)
+        self.assertEqual(schedule.critical_path, ['b'])
+    
+    def test_cycle_is_reported(self):
+        tasks = [self._task('a', 0, 1), self._task('b', 0, 1), self._task('c', 0, 1)]
+        schedule = compute_schedule(tasks, [('a', 'b'), ('b', 'c'), ('c', 'b')])
+        
+        self.assertEqual(sorted(schedule.cycle), ['b', 'c'])
+        self.assertEqual(schedule.timings, {})
+    
+    def test_project_schedule_follows_task_dependencies(self):
+        tenant = Tenant.objects.create(name="Schedule Tenant")
+        set_current_tenant(tenant)
+        self.addCleanup(clear_current_tenant)
+        user = User.objects.create_user(username="scheduler", email="scheduler@example.com", password="testpass123")
+        project = Project.objects.create(
+            tenant=tenant, name="Launch", manager=user,
+            start_date=date.today(), end_date=date.today() + timedelta(days=30)
+        )
+        design, build, review = [
+            ProjectTask.objects.create(
+                tenant=tenant, project=project, name=name,
+                start_date=date.today(), end_date=date.today() + timedelta(days=days - 1)
+            )
+            for name, days in (("Design", 3), ("Build", 5), ("Review", 1))
+        ]
+        build.dependencies.add(design)
+        review.dependencies.add(design)
+        
+        schedule = get_project_schedule(project, use_cache=False)
+        self.assertEqual(schedule.critical_path, [design.id, build.id])
+        self.assertEqual(schedule.timings[review.id].slack_days, 4)
+        self.assertEqual(build.get_dependency_chain(), [design, build])
+        
+        # Adding a dependency changes the cache key
+        review.dependencies.add(build)
+        self.assertEqual(get_project_schedule(project).critical_path, [design.id, build.id, review.id])
+
+
+class WorkloadTest(TestCase):
+    """Test the cross-project workload calendar and leveling."""
+    
+    # A Monday
+    MONDAY = date(2025, 1, 6)
+    
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Workload Tenant")
+        set_current_tenant(self.tenant)
+        self.addCleanup(clear_current_tenant)
+        self.user = User.objects.create_user(username="busy", email="busy@example.com", password="testpass123")
+        self.projects = [
+            Project.objects.create(
+                tenant=self.tenant, name=name, manager=self.user,
+                start_date=self.MONDAY, end_date=self.MONDAY + timedelta(days=60)
+            )
+            for name in ("Alpha", "Beta")
+        ]
+        for project, capacity in zip(self.projects, (Decimal('40.00'), Decimal('30.00'))):
+            ProjectTeamMember.objects.create(project=project, user=self.user, capacity_hours=capacity)
+    
+    def _task(self, project, name, start, days, hours, status='pending', priority='medium'):
+        return ProjectTask.objects.create(
+            tenant=self.tenant, project=project, name=name, status=status, priority=priority,
+            start_date=self.MONDAY + timedelta(days=start),
+            end_date=self.MONDAY + timedelta(days=start + days - 1),
+            estimated_hours=Decimal(hours), assigned_to=self.user
+        )
+    
+    def test_calendar_spreads_hours_over_working_days(self):
+        # Monday to the next Monday: six working days
+        self._task(self.projects[0], "Copy", 0, 8, '12.00')
+        self._task(self.projects[1], "Design", 0, 1, '4.00', status='in_progress')
+        self._task(self.projects[1], "Done", 0, 1, '50.00', status='completed')
+        
+        with self.assertNumQueries(1):
+            calendar = workload.build_calendar(workload.open_tasks(tenant=self.tenant), self.MONDAY, self.MONDAY + timedelta(days=13))
+        
+        self.assertEqual(len(calendar.days), 10)
+        self.assertEqual(list(calendar.hours[self.user.id][:6]), [6.0, 2.0, 2.0, 2.0, 2.0, 2.0])
+        self.assertAlmostEqual(calendar.total(self.user.id), 16.0)
+    
+    def test_over_allocation_and_leveling(self):
+        self._task(self.projects[0], "Launch", 0, 1, '8.00', priority='high')
+        self._task(self.projects[1], "Blog post", 0, 1, '6.00', priority='low')
+        tasks = workload.open_tasks(tenant=self.tenant)
+        
+        capacity = workload.daily_capacity(workload.weekly_capacity(ProjectTeamMember.objects.all()))
+        self.assertEqual(capacity, {self.user.id: 8.0})
+        calendar = workload.build_calendar(tasks, self.MONDAY, self.MONDAY + timedelta(days=13))
+        overloaded = workload.over_allocations(calendar, capacity)
+        self.assertEqual([(item.day, item.hours) for item in overloaded], [(self.MONDAY, 14.0)])
+        
+        suggestions = workload.suggest_leveling(calendar, capacity, tasks)
+        self.assertEqual(len(suggestions), 1)
+        self.assertEqual(ProjectTask.objects.get(id=suggestions[0].task_id).name, "Blog post")
+        self.assertEqual(suggestions[0].suggested_start_date, self.MONDAY + timedelta(days=1))
+        # The caller's calendar is left as it was
+        self.assertEqual(len(workload.over_allocations(calendar, capacity)), 1)
+    
+    def test_leveling_stays_within_calendar(self):
+        self._task(self.projects[0], "Launch", 4, 1, '8.00', priority='high')
+        self._task(self.projects[1], "Blog post", 4, 1, '6.00', priority='low')
+        tasks = workload.open_tasks(tenant=self.tenant)
+        capacity = {self.user.id: 8.0}
+        
+        # Friday is the last day of the window, so the next free day isn't in it
+        calendar = workload.build_calendar(tasks, self.MONDAY, self.MONDAY + timedelta(days=4))
+        self.assertEqual(workload.suggest_leveling(calendar, capacity, tasks), [])
+        
+        calendar = workload.build_calendar(tasks, self.MONDAY, self.MONDAY + timedelta(days=13))
+        suggestions = workload.suggest_leveling(calendar, capacity, tasks)
+        self.assertEqual([item.suggested_start_date for item in suggestions], [self.MONDAY + timedelta(days=7)])
+    
+    def test_hours_by_user_is_one_query(self):
+        self._task(self.projects[0], "Open", 0, 1, '5.00')
+        done = self._task(self.projects[0], "Closed", 0, 1, '3.00', status='completed')
+        ProjectTask.objects.filter(id=done.id).update(actual_hours=Decimal('2.50'))
+        
+        with self.assertNumQueries(1):
+            hours = workload.hours_by_user(ProjectTask.objects.all_tenants().filter(project=self.projects[0]))
+        self.assertEqual(hours, {self.user.id: {'assigned_hours': 8.0, 'completed_hours': 2.5}})
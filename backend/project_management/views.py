@@ -29,6 +29,13 @@ from .serializers import (
     ProjectTemplateCreateSerializer, ProjectRiskSerializer, ClientPortalSerializer
 )
 from accounts.permissions import IsTenantUser
+from .queries import prefetch_projects, prefetch_tasks
+from .scheduling import get_project_schedule
+from .workload import (
+    build_calendar, daily_capacity, hours_by_user, open_tasks, over_allocations,
+    suggest_leveling, utilization, weekly_capacity
+)
+from accounts.models import CustomUser
 
 
 class ProjectViewSet(viewsets.ModelViewSet):
@@ -46,6 +53,10 @@ class ProjectViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """Filter queryset by tenant and apply additional filters."""
         queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            # Annotate task totals and prefetch nested relations so the
+            # serializer doesn't query per project
+            queryset = prefetch_projects(queryset)
         
         # Apply custom filters
         status_filter = self.request.query_params.getlist('status')
@@ -172,19 +183,17 @@ class ProjectViewSet(viewsets.ModelViewSet):
             })
         
         # Team workload
-        team_workload = {}
         team_members = ProjectTeamMember.objects.filter(project__tenant=tenant, is_active=True)
-        for member in team_members:
-            assigned_hours = member.user.assigned_tasks.filter(
-                project__tenant=tenant,
-                status__in=['pending', 'in_progress']
-            ).aggregate(total=Sum('estimated_hours'))['total'] or 0
-            
-            team_workload[member.user.email] = {
-                'name': f"{member.user.first_name} {member.user.last_name}",
-                'assigned_hours': float(assigned_hours),
-                'capacity_hours': float(member.capacity_hours),
-                'utilization': round((assigned_hours / member.capacity_hours) * 100, 2) if member.capacity_hours > 0 else 0
+        capacity = weekly_capacity(team_members)
+        assigned = hours_by_user(open_tasks(tenant=tenant, users=list(capacity)))
+        team_workload = {}
+        for user in CustomUser.objects.filter(id__in=list(capacity)).only('email', 'first_name', 'last_name'):
+            assigned_hours = assigned.get(user.id, {}).get('assigned_hours', 0.0)
+            team_workload[user.email] = {
+                'name': f"{user.first_name} {user.last_name}",
+                'assigned_hours': assigned_hours,
+                'capacity_hours': capacity[user.id],
+                'utilization': utilization(assigned_hours, capacity[user.id])
             }
         
         dashboard_data = {
@@ -272,57 +281,51 @@ class ProjectViewSet(viewsets.ModelViewSet):
     def gantt_data(self, request, pk=None):
         """Get Gantt chart data for the project."""
         project = self.get_object()
+        schedule = get_project_schedule(project)
         
-        # Get all tasks
-        tasks = project.tasks.all()
         task_data = []
-        
-        for task in tasks:
+        resource_allocation = {}
+        for task in schedule.tasks:
+            timing = schedule.timings.get(task['id'])
+            progress = ProjectTask(
+                status=task['status'],
+                estimated_hours=task['estimated_hours'],
+                actual_hours=task['actual_hours'],
+            ).progress_percentage
             task_data.append({
-                'id': task.id,
-                'name': task.name,
-                'start_date': task.start_date,
-                'end_date': task.end_date,
-                'progress': task.progress_percentage,
-                'status': task.status,
-                'priority': task.priority,
-                'assigned_to': task.assigned_to.email if task.assigned_to else None,
-                'is_critical_path': task.is_critical_path
+                'id': task['id'],
+                'name': task['name'],
+                'start_date': task['start_date'],
+                'end_date': task['end_date'],
+                'progress': progress,
+                'status': task['status'],
+                'priority': task['priority'],
+                'assigned_to': task['assigned_to__email'],
+                'is_critical_path': bool(timing and timing.is_critical),
+                'earliest_start': timing.earliest_start if timing else None,
+                'earliest_finish': timing.earliest_finish if timing else None,
+                'latest_start': timing.latest_start if timing else None,
+                'latest_finish': timing.latest_finish if timing else None,
+                'slack_days': timing.slack_days if timing else None,
             })
-        
-        # Get dependencies
-        dependencies = []
-        for task in tasks:
-            for dep in task.dependencies.all():
-                dependencies.append({
-                    'from': dep.id,
-                    'to': task.id
-                })
-        
-        # Critical path
-        critical_path = [task.id for task in tasks if task.is_critical_path]
-        
-        # Resource allocation
-        resource_allocation = {}
-        for task in tasks:
-            if task.assigned_to:
-                user_email = task.assigned_to.email
-                if user_email not in resource_allocation:
-                    resource_allocation[user_email] = []
-                
-                resource_allocation[user_email].append({
-                    'task_id': task.id,
-                    'task_name': task.name,
-                    'start_date': task.start_date,
-                    'end_date': task.end_date,
-                    'hours': float(task.estimated_hours) if task.estimated_hours else 0
+            
+            # Resource allocation
+            if task['assigned_to__email']:
+                resource_allocation.setdefault(task['assigned_to__email'], []).append({
+                    'task_id': task['id'],
+                    'task_name': task['name'],
+                    'start_date': task['start_date'],
+                    'end_date': task['end_date'],
+                    'hours': float(task['estimated_hours']) if task['estimated_hours'] else 0
                 })
         
         gantt_data = {
             'tasks': task_data,
-            'dependencies': dependencies,
-            'critical_path': critical_path,
-            'resource_allocation': resource_allocation
+            'dependencies': [{'from': predecessor, 'to': successor} for predecessor, successor in schedule.edges],
+            'critical_path': schedule.critical_path,
+            'resource_allocation': resource_allocation,
+            'projected_finish_date': schedule.finish_date,
+            'dependency_cycle': schedule.cycle,
         }
         
         serializer = ProjectGanttDataSerializer(gantt_data)
@@ -442,18 +445,13 @@ class ProjectViewSet(viewsets.ModelViewSet):
         project = self.get_object()
         
         # Team capacity and workload
-        team_members = project.team_memberships.filter(is_active=True)
+        team_members = project.team_memberships.filter(is_active=True).select_related('user')
+        hours = hours_by_user(ProjectTask.objects.all_tenants().filter(project=project))
         resource_data = []
         
         for member in team_members:
-            assigned_tasks = member.user.assigned_tasks.filter(project=project)
-            total_assigned_hours = assigned_tasks.aggregate(
-                total=Sum('estimated_hours')
-            )['total'] or 0
-            
-            completed_hours = assigned_tasks.filter(status='completed').aggregate(
-                total=Sum('actual_hours')
-            )['total'] or 0
+            member_hours = hours.get(member.user_id, {})
+            total_assigned_hours = member_hours.get('assigned_hours', 0.0)
             
             resource_data.append({
                 'user_id': member.user.id,
@@ -461,9 +459,9 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 'email': member.user.email,
                 'role': member.role,
                 'capacity_hours': float(member.capacity_hours),
-                'assigned_hours': float(total_assigned_hours),
-                'completed_hours': float(completed_hours),
-                'utilization_percentage': round((total_assigned_hours / member.capacity_hours) * 100, 2) if member.capacity_hours > 0 else 0,
+                'assigned_hours': total_assigned_hours,
+                'completed_hours': member_hours.get('completed_hours', 0.0),
+                'utilization_percentage': utilization(total_assigned_hours, member.capacity_hours),
                 'skills': member.skills,
                 'hourly_rate': float(member.hourly_rate) if member.hourly_rate else 0
             })
@@ -474,6 +472,36 @@ class ProjectViewSet(viewsets.ModelViewSet):
             'resources': resource_data
         })
     
+    @action(detail=False, methods=['get'])
+    def workload(self, request):
+        """
+        Daily allocated hours per team member across all the tenant's
+        projects, with over-allocated days and leveling suggestions.
+        Query parameters: start (YYYY-MM-DD, default today), days (default 28).
+        """
+        tenant = request.user.tenant
+        try:
+            start = datetime.strptime(request.query_params['start'], '%Y-%m-%d').date() if 'start' in request.query_params else timezone.now().date()
+            days = min(max(int(request.query_params.get('days', 28)), 1), 180)
+        except ValueError:
+            return Response({'error': 'Invalid start or days'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        capacity = daily_capacity(weekly_capacity(ProjectTeamMember.objects.filter(project__tenant=tenant)))
+        tasks = open_tasks(tenant=tenant, users=list(capacity))
+        calendar = build_calendar(tasks, start, start + timedelta(days=days - 1))
+        overloaded = over_allocations(calendar, capacity)
+        suggestions = suggest_leveling(calendar, capacity, tasks) if overloaded else []
+        
+        return Response({
+            **calendar.as_dict(),
+            'daily_capacity': {str(user_id): round(hours, 2) for user_id, hours in capacity.items()},
+            'over_allocations': [
+                {'user_id': item.user_id, 'day': item.day, 'hours': item.hours, 'capacity': item.capacity}
+                for item in overloaded
+            ],
+            'leveling_suggestions': [suggestion.as_dict() for suggestion in suggestions]
+        })
+    
     @action(detail=True, methods=['get'])
     def client_portal_data(self, request, pk=None):
         """Get client portal data for the project."""
@@ -663,7 +691,10 @@ class ProjectTaskViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Filter queryset by tenant."""
-        return super().get_queryset().filter(tenant=self.request.user.tenant)
+        queryset = super().get_queryset().filter(tenant=self.request.user.tenant)
+        if self.action in ('list', 'retrieve', 'my_tasks', 'overdue'):
+            queryset = prefetch_tasks(queryset)
+        return queryset
     
     @action(detail=True, methods=['post'])
     def start(self, request, pk=None):
@@ -0,0 +1,280 @@
+"""
+Workload and resource leveling across projects.
+Open task estimates are summed per assignee with one grouped query and
+spread evenly over each task's working days (Monday to Friday) into a
+calendar: one compact row of daily hours per user. Comparing the rows with
+each user's daily capacity gives over-allocated days, and a greedy pass
+suggests later start dates for movable tasks that would clear them.
+
+Team members can belong to several projects; a user's weekly capacity is
+the largest capacity_hours of their active memberships, not the sum.
+"""
+from array import array
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+from django.db.models import Max, Q, Sum
+from .models import ProjectTask
+
+# Statuses whose estimated hours still load an assignee
+OPEN_STATUSES = ('pending', 'in_progress')
+
+WORKING_DAYS_PER_WEEK = 5
+
+DEFAULT_HORIZON_DAYS = 28
+
+# Furthest a leveling suggestion moves a task, in working days
+MAX_SHIFT_DAYS = 10
+
+# Tasks tried first when leveling
+_PRIORITY_RANK = {'low': 0, 'medium': 1, 'high': 2, 'critical': 3}
+
+
+def is_working_day(day: date) -> bool:
+    return day.weekday() < WORKING_DAYS_PER_WEEK
+
+
+def working_days(start: date, end: date) -> List[date]:
+    """Working days from start to end inclusive."""
+    days = []
+    day = start
+    while day <= end:
+        if is_working_day(day):
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def open_tasks(tenant=None, project=None, users=None):
+    """Assigned tasks with open status and an estimate, across tenants unless one is given."""
+    tasks = ProjectTask.objects.all_tenants().filter(
+        status__in=OPEN_STATUSES, assigned_to__isnull=False, estimated_hours__gt=0
+    )
+    if tenant is not None:
+        tasks = tasks.filter(project__tenant=tenant)
+    if project is not None:
+        tasks = tasks.filter(project=project)
+    if users is not None:
+        tasks = tasks.filter(assigned_to__in=users)
+    return tasks
+
+
+def hours_by_user(tasks) -> Dict[Any, Dict[str, float]]:
+    """
+    Estimated hours, and actual hours of completed tasks, per assignee of
+    the given tasks, in one query.
+    """
+    rows = tasks.filter(assigned_to__isnull=False).order_by().values('assigned_to').annotate(
+        estimated=Sum('estimated_hours'),
+        completed=Sum('actual_hours', filter=Q(status='completed')),
+    )
+    return {
+        row['assigned_to']: {
+            'assigned_hours': float(row['estimated'] or 0),
+            'completed_hours': float(row['completed'] or 0),
+        }
+        for row in rows
+    }
+
+
+def weekly_capacity(memberships) -> Dict[Any, float]:
+    """Weekly capacity per user of the given team memberships, in one query."""
+    rows = memberships.filter(is_active=True).order_by().values('user').annotate(capacity=Max('capacity_hours'))
+    return {row['user']: float(row['capacity']) for row in rows}
+
+
+def utilization(assigned_hours, capacity_hours) -> float:
+    return round(float(assigned_hours) / float(capacity_hours) * 100, 2) if capacity_hours else 0
+
+
+@dataclass
+class WorkloadCalendar:
+    """Allocated hours per user and working day from start to end."""
+    start: date
+    end: date
+    days: List[date]
+    hours: Dict[Any, array]
+
+    def __post_init__(self):
+        self._positions = {day: position for position, day in enumerate(self.days)}
+
+    def row(self, user_id) -> array:
+        if user_id not in self.hours:
+            self.hours[user_id] = array('d', bytes(8 * len(self.days)))
+        return self.hours[user_id]
+
+    def spread(self, user_id, start_date: date, end_date: date, hours, sign: int = 1) -> None:
+        """Add (or with sign=-1 remove) hours spread evenly over a span's working days."""
+        span = working_days(start_date, end_date) or [start_date]
+        per_day = float(hours) / len(span) * sign
+        row = self.row(user_id)
+        for day in span:
+            position = self._positions.get(day)
+            if position is not None:
+                row[position] += per_day
+
+    def copy(self) -> 'WorkloadCalendar':
+        return WorkloadCalendar(self.start, self.end, self.days, {user_id: array('d', row) for user_id, row in self.hours.items()})
+
+    def total(self, user_id) -> float:
+        return sum(self.hours.get(user_id, ()))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'days': [day.isoformat() for day in self.days],
+            'hours': {str(user_id): [round(value, 2) for value in row] for user_id, row in self.hours.items()},
+        }
+
+
+def build_calendar(tasks, start: Optional[date] = None, end: Optional[date] = None) -> WorkloadCalendar:
+    """
+    Spread the estimates of the given tasks over a window of working days.
+    Tasks are grouped by assignee and span in the database, so one query
+    covers any number of tasks.
+    """
+    start = start or date.today()
+    end = end or start + timedelta(days=DEFAULT_HORIZON_DAYS - 1)
+    calendar = WorkloadCalendar(start, end, working_days(start, end), {})
+    rows = tasks.filter(start_date__lte=end, end_date__gte=start).order_by().values(
+        'assigned_to', 'start_date', 'end_date'
+    ).annotate(hours=Sum('estimated_hours'))
+    for row in rows:
+        calendar.spread(row['assigned_to'], row['start_date'], row['end_date'], row['hours'] or 0)
+    return calendar
+
+
+@dataclass(frozen=True)
+class OverAllocation:
+    user_id: Any
+    day: date
+    hours: float
+    capacity: float
+
+    @property
+    def excess(self) -> float:
+        return self.hours - self.capacity
+
+
+def daily_capacity(weekly: Dict[Any, float]) -> Dict[Any, float]:
+    return {user_id: hours / WORKING_DAYS_PER_WEEK for user_id, hours in weekly.items()}
+
+
+def over_allocations(calendar: WorkloadCalendar, capacity: Dict[Any, float], tolerance: float = 0.01) -> List[OverAllocation]:
+    """
+    Days on which a user's allocated hours exceed their daily capacity.
+    Users with no known capacity are skipped.
+    """
+    found = []
+    for user_id, row in calendar.hours.items():
+        limit = capacity.get(user_id)
+        if limit is None:
+            continue
+        for position, hours in enumerate(row):
+            if hours > limit + tolerance:
+                found.append(OverAllocation(user_id, calendar.days[position], round(hours, 2), round(limit, 2)))
+    return found
+
+
+@dataclass(frozen=True)
+class LevelingSuggestion:
+    task_id: Any
+    user_id: Any
+    start_date: date
+    end_date: date
+    suggested_start_date: date
+    suggested_end_date: date
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'task_id': str(self.task_id),
+            'user_id': self.user_id,
+            'start_date': self.start_date,
+            'end_date': self.end_date,
+            'suggested_start_date': self.suggested_start_date,
+            'suggested_end_date': self.suggested_end_date,
+        }
+
+
+def _shift(day: date, working_day_count: int) -> date:
+    """The date working_day_count working days after day (weekends are skipped)."""
+    while working_day_count:
+        day += timedelta(days=1)
+        if is_working_day(day):
+            working_day_count -= 1
+    return day
+
+
+def _fits(calendar: WorkloadCalendar, user_id, start_date: date, end_date: date, limit: float, tolerance: float) -> bool:
+    # Load past the window isn't known, so a span reaching beyond it can't be checked
+    if end_date > calendar.end:
+        return False
+    row = calendar.row(user_id)
+    for position, day in enumerate(calendar.days):
+        if start_date <= day <= end_date and row[position] > limit + tolerance:
+            return False
+    return True
+
+
+def suggest_leveling(calendar: WorkloadCalendar, capacity: Dict[Any, float], tasks,
+                     max_shift_days: int = MAX_SHIFT_DAYS, tolerance: float = 0.01) -> List[LevelingSuggestion]:
+    """
+    Greedy leveling: for each over-allocated user, pending tasks touching
+    an over-allocated day are tried lowest priority first and moved to the
+    earliest later start (up to max_shift_days working days) at which the
+    task's span stays within capacity. Moves are applied to a copy of the
+    calendar, so each suggestion accounts for the ones before it; tasks
+    that fit nowhere, or only past the calendar's end, are left in place.
+    Dependencies are not checked.
+
+    Returns:
+        List of LevelingSuggestion; nothing is saved
+    """
+    overloaded = {}
+    for allocation in over_allocations(calendar, capacity, tolerance):
+        overloaded.setdefault(allocation.user_id, set()).add(allocation.day)
+    if not overloaded:
+        return []
+
+    calendar = calendar.copy()
+    movable = defaultdict(list)
+    rows = tasks.filter(
+        status='pending', assigned_to__in=list(overloaded),
+        start_date__lte=calendar.end, end_date__gte=calendar.start
+    ).values('id', 'assigned_to', 'start_date', 'end_date', 'estimated_hours', 'priority')
+    for row in rows:
+        movable[row['assigned_to']].append(row)
+
+    suggestions = []
+    for user_id, days in overloaded.items():
+        limit = capacity[user_id]
+        candidates = sorted(
+            movable[user_id],
+            key=lambda task: (_PRIORITY_RANK.get(task['priority'], 1), -task['end_date'].toordinal())
+        )
+        for task in candidates:
+            if not any(task['start_date'] <= day <= task['end_date'] for day in days):
+                continue
+            hours = task['estimated_hours'] or Decimal('0')
+            calendar.spread(user_id, task['start_date'], task['end_date'], hours, sign=-1)
+            length = (task['end_date'] - task['start_date']).days
+            placed = None
+            for shift in range(1, max_shift_days + 1):
+                start_date = _shift(task['start_date'], shift)
+                end_date = start_date + timedelta(days=length)
+                calendar.spread(user_id, start_date, end_date, hours)
+                if _fits(calendar, user_id, start_date, end_date, limit, tolerance):
+                    placed = (start_date, end_date)
+                    break
+                calendar.spread(user_id, start_date, end_date, hours, sign=-1)
+            if placed is None:
+                calendar.spread(user_id, task['start_date'], task['end_date'], hours)
+                continue
+            suggestions.append(LevelingSuggestion(
+                task['id'], user_id, task['start_date'], task['end_date'], *placed
+            ))
+            days = {day for day in days if not _fits(calendar, user_id, day, day, limit, tolerance)}
+            if not days:
+                break
+    return suggestions
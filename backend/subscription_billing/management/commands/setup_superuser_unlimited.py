@@ -2,6 +2,7 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from accounts.models import CustomUser
 from core.models import Tenant
+from core.metering import clear_reservations
 from subscription_billing.models import SubscriptionPlan, Subscription, Customer
 from datetime import timedelta
 
@@ -139,6 +140,7 @@ class Command(BaseCommand):
         tenant.ai_image_credits_used_current_period = 0
         tenant.ai_planning_requests_used_current_period = 0
         tenant.save()
+        clear_reservations(tenant.id)
 
         self.stdout.write(
             self.style.SUCCESS(f'✅ Successfully set up {email} with unlimited access')
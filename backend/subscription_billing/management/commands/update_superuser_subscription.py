@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from accounts.models import CustomUser
 from core.models import Tenant
+from core.metering import clear_reservations
 from subscription_billing.models import SubscriptionPlan, Subscription, Customer
 from django.utils import timezone
 from datetime import timedelta
@@ -97,6 +98,7 @@ class Command(BaseCommand):
         tenant.tokens_used_current_period = 0
         tenant.tokens_purchased_additional = 0
         tenant.save()
+        clear_reservations(tenant.id)
 
         self.stdout.write(
             self.style.SUCCESS(f'Successfully updated {email} to Enterprise plan')
@@ -1,15 +1,16 @@
 from datetime import datetime, timedelta
 from django.utils import timezone
-from .models import Subscription, Customer, SubscriptionPlan
+from core.tenant_context import get_tenant_context
+from .models import Customer, SubscriptionPlan
 
 def get_active_subscription(tenant):
     """
     Get the active subscription for a tenant
+    
+    Read from the request's TenantContext, so repeated calls while handling
+    one request don't re-query the subscription.
     """
-    return Subscription.objects.filter(
-        tenant=tenant,
-        status__in=['active', 'trialing']
-    ).first()
+    return get_tenant_context(tenant).active_subscription
 
 def get_subscription_limits(tenant):
     """
@@ -35,24 +36,17 @@ def check_feature_access(tenant, feature_name):
     """
     Check if a tenant has access to a specific feature
     """
-    subscription = get_active_subscription(tenant)
+    context = get_tenant_context(tenant)
+    subscription = context.active_subscription
     if not subscription:
         return False
     
-    plan = subscription.plan
-    
-    # Check if subscription is active
-    if subscription.status not in ['active', 'trialing']:
-        return False
-    
     # Check if subscription is not canceled
     if subscription.cancel_at_period_end:
         return False
     
     # Feature-specific checks
-
-    
-    return True
+    return context.has_feature(feature_name)
 
 def get_usage_period_dates(tenant):
     """
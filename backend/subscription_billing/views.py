@@ -17,6 +17,7 @@ from .serializers import (
     PaymentTransactionSerializer, CurrentPlanSerializer
 )
 from accounts.models import CustomUser
+from core.tenant_context import invalidate_subscription
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
@@ -247,6 +248,7 @@ class StripeWebhookViewSet(viewsets.ViewSet):
             subscription.current_period_end = datetime.fromtimestamp(event_data['current_period_end'])
             subscription.cancel_at_period_end = event_data.get('cancel_at_period_end', False)
             subscription.save()
+            invalidate_subscription(subscription)
         except Subscription.DoesNotExist:
             pass
 
@@ -256,6 +258,7 @@ class StripeWebhookViewSet(viewsets.ViewSet):
             subscription = Subscription.objects.get(stripe_subscription_id=event_data['id'])
             subscription.status = 'canceled'
             subscription.save()
+            invalidate_subscription(subscription)
         except Subscription.DoesNotExist:
             pass
 
@@ -370,6 +373,7 @@ class SubscriptionManagementViewSet(viewsets.ViewSet):
             
             subscription.cancel_at_period_end = True
             subscription.save()
+            invalidate_subscription(subscription)
             
             return Response({"detail": "Subscription will be canceled at the end of the current period."}, status=status.HTTP_200_OK)
             
@@ -114,8 +114,9 @@ export const AITutorialAgent: React.FC<AITutorialAgentProps> = ({
     setError(null);
     try {
       const res = await api.get('/ai-services/profiles/?specialization=learning_guidance&is_global=true');
-      if (res.data && res.data.length > 0) {
-        setAgent(res.data[0]);
+      const agents = res.data.results || res.data;
+      if (agents && agents.length > 0) {
+        setAgent(agents[0]);
       } else {
         // Fallback to default tutorial agent
         setAgent({
@@ -145,7 +146,7 @@ export const AITutorialAgent: React.FC<AITutorialAgentProps> = ({
   const fetchSuggestedTutorials = async () => {
     try {
       const res = await api.get(`/learning/tutorials/?page_path=${currentPage || ''}&is_published=true`);
-      setSuggestedTutorials(res.data || []);
+      setSuggestedTutorials(res.data.results || res.data || []);
     } catch (err) {
       console.error("Failed to fetch suggested tutorials:", err);
       // Fallback tutorials
@@ -59,7 +59,8 @@ export default function AIAgentDirectoryPage() {
     setError(null);
     try {
       const res = await api.get("/ai-services/profiles/");
-      setAgents(Array.isArray(res.data) ? res.data : []);
+      const fetchedAgents = res.data.results || res.data;
+      setAgents(Array.isArray(fetchedAgents) ? fetchedAgents : []);
     } catch (err: unknown) {
       console.error("API error:", err);
       setError(err.response?.data?.detail || err.message || "Failed to load AI agents.");
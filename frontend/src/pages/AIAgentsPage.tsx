@@ -53,8 +53,9 @@ export default function AIAgentsPage() {
     try {
       console.log("🔄 Fetching AI agents...");
       const res = await api.get("/ai-services/profiles/");
-      console.log(`✅ Loaded ${res.data.length} AI agents:`, res.data);
-      setAgents(res.data);
+      const fetchedAgents = res.data.results || res.data;
+      console.log(`✅ Loaded ${fetchedAgents.length} AI agents:`, fetchedAgents);
+      setAgents(fetchedAgents);
     } catch (err: unknown) {
       console.error("❌ Failed to fetch AI agents:", err);
       const errorMessage = err instanceof Error ? err.message : "Failed to load AI agents";
@@ -60,7 +60,7 @@ export default function AIChatPage() {
       setError(null);
       
       const response = await api.get('/ai-services/profiles/');
-      const fetchedAgents = response.data;
+      const fetchedAgents = response.data.results || response.data;
       
       // Transform fetched agents to include UI configuration
       const configuredAgents: AIAgent[] = fetchedAgents.map((agent: AIProfile) => {
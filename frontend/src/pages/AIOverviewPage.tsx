@@ -196,8 +196,9 @@ export default function AIOverviewPage() {
   async function fetchAIProfiles() {
     try {
       const res = await api.get("/ai-services/profiles/");
-      setAiProfiles(res.data);
-      console.log(`✅ Loaded ${res.data.length} AI agents`);
+      const profiles = res.data.results || res.data;
+      setAiProfiles(profiles);
+      console.log(`✅ Loaded ${profiles.length} AI agents`);
     } catch (err: unknown) {
       console.error("Failed to fetch AI profiles:", err);
       throw err;
@@ -207,7 +208,7 @@ export default function AIOverviewPage() {
   async function fetchAITasks() {
     try {
       const res = await api.get("/ai-services/tasks/");
-      setAiTasks(res.data);
+      setAiTasks(res.data.results || res.data);
     } catch (err: unknown) {
       console.error("Failed to fetch AI tasks:", err);
       throw err;
@@ -217,7 +218,7 @@ export default function AIOverviewPage() {
   async function fetchRecommendations() {
     try {
       const res = await api.get("/ai-services/recommendations/");
-      const allRecommendations = res.data;
+      const allRecommendations = res.data.results || res.data;
       setActiveRecommendations(allRecommendations.filter((rec: AIRecommendation) => !rec.is_dismissed));
     } catch (err: unknown) {
       console.error("Failed to fetch recommendations:", err);
@@ -228,7 +229,8 @@ export default function AIOverviewPage() {
   async function fetchStructuraAgent() {
     try {
       const res = await api.get('/ai-services/profiles/?specialization=general_orchestration&is_global=true');
-      if (res.data && res.data.length > 0) {
+      const agents = res.data.results || res.data;
+      if (agents && agents.length > 0) {
         console.log("✅ Loaded Structura agent");
       } else {
         console.log("⚠️ No Structura agent found, using fallback");
@@ -241,7 +243,7 @@ export default function AIOverviewPage() {
   async function fetchStructuraInsights() {
     try {
       const res = await api.get("/ai-services/structura-insights/");
-      setStructuraInsights(res.data);
+      setStructuraInsights(res.data.results || res.data);
     } catch (err: unknown) {
       console.error("Failed to fetch Structura insights:", err);
       // Fallback to mock data if API fails
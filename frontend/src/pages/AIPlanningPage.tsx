@@ -162,8 +162,9 @@ export default function AIPlanningPage() {
       setIsLoadingAgents(true);
       setError(null);
       const res = await api.get("/ai-services/profiles/");
-      setAiProfiles(res.data);
-      console.log(`✅ Loaded ${res.data.length} AI agents`);
+      const profiles = res.data.results || res.data;
+      setAiProfiles(profiles);
+      console.log(`✅ Loaded ${profiles.length} AI agents`);
     } catch (err: unknown) {
       console.error("Failed to fetch AI profiles:", err);
       const errorMessage = err instanceof Error ? err.message : "Failed to load AI agents";
@@ -185,7 +186,7 @@ export default function AIPlanningPage() {
   async function fetchAITasks() {
     try {
       const res = await api.get("/ai-services/tasks/");
-      setAiTasks(res.data);
+      setAiTasks(res.data.results || res.data);
     } catch (err: unknown) {
       console.error("Failed to fetch AI tasks:", err);
     }
@@ -194,7 +195,7 @@ export default function AIPlanningPage() {
   async function fetchRecommendations() {
     try {
       const res = await api.get("/ai-services/recommendations/");
-      const allRecommendations = res.data;
+      const allRecommendations = res.data.results || res.data;
       setActiveRecommendations(allRecommendations.filter((rec: AIRecommendation) => !rec.is_dismissed));
       setDismissedRecommendations(allRecommendations.filter((rec: AIRecommendation) => rec.is_dismissed));
     } catch (err: unknown) {
@@ -207,8 +208,9 @@ export default function AIPlanningPage() {
     setAgentError(null);
     try {
       const res = await api.get('/ai-services/profiles/?specialization=organizational_planning&is_global=true');
-      if (res.data && res.data.length > 0) {
-        setAiAgent(res.data[0]);
+      const agents = res.data.results || res.data;
+      if (agents && agents.length > 0) {
+        setAiAgent(agents[0]);
       } else {
         // Fallback to default agent
         setAiAgent({
@@ -75,7 +75,7 @@ export default function AIPlanningStudioPage() {
     setError(null);
     try {
       const res = await api.get("/ai-services/tasks/");
-      setTasks(res.data);
+      setTasks(res.data.results || res.data);
     } catch (err: unknown) {
       const errorMessage = err instanceof Error ? err.message : "Failed to load AI tasks";
       setError(errorMessage);
@@ -94,7 +94,7 @@ export default function AIPlanningStudioPage() {
   async function fetchAIProfiles() {
     try {
       const res = await api.get("/ai-services/profiles/");
-      setAiProfiles(res.data);
+      setAiProfiles(res.data.results || res.data);
     } catch (err: unknown) {
       console.error("Failed to fetch AI profiles:", err);
     }
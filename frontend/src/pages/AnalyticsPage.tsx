@@ -169,8 +169,9 @@ function AnalyticsPage() {
     setAgentError(null);
     try {
       const res = await api.get('/ai-services/profiles/?specialization=advanced_analytics&is_global=true');
-      if (res.data && res.data.length > 0) {
-        setMetrikaAgent(res.data[0]);
+      const agents = res.data.results || res.data;
+      if (agents && agents.length > 0) {
+        setMetrikaAgent(agents[0]);
       } else {
         // Fallback to default agent
         setMetrikaAgent({
@@ -41,12 +41,13 @@ export default function AutomationsPage() {
       try {
         console.log("🔍 Fetching Automatix agent...");
         const res = await api.get('/ai-services/profiles/?specialization=automation_design&is_global=true');
+        const agents = res.data.results || res.data;
         console.log("📡 API Response:", res.data);
-        console.log("📊 Response length:", res.data?.length);
+        console.log("📊 Response length:", agents?.length);
         
-        if (res.data && res.data.length > 0) {
-          console.log("✅ Setting Automatix agent:", res.data[0]);
-          setAutomatixAgent(res.data[0]);
+        if (agents && agents.length > 0) {
+          console.log("✅ Setting Automatix agent:", agents[0]);
+          setAutomatixAgent(agents[0]);
         } else {
           console.log("❌ No Automatix agent found in response");
           setAgentError("No AI assistant found");
@@ -81,7 +82,7 @@ export default function AutomationsPage() {
     setWorkflowsLoading(true);
     try {
       const response = await api.get('/core/automation-workflows/');
-      setWorkflows(response.data);
+      setWorkflows(response.data.results || response.data);
     } catch (err: unknown) {
       const error = err as { response?: { data?: unknown } };
       console.error('Failed to fetch workflows:', error.response?.data);
@@ -95,7 +96,7 @@ export default function AutomationsPage() {
     setExecutionsLoading(true);
     try {
       const response = await api.get('/core/automation-executions/');
-      setExecutions(response.data);
+      setExecutions(response.data.results || response.data);
     } catch (err: unknown) {
       const error = err as { response?: { data?: unknown } };
       console.error('Failed to fetch executions:', error.response?.data);
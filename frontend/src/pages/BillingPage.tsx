@@ -104,7 +104,7 @@ const BillingPage: React.FC = () => {
 
         // Fetch available plans
         const plansResponse = await api.get('/billing/plans/');
-        setAvailablePlans(plansResponse.data);
+        setAvailablePlans(plansResponse.data.results || plansResponse.data);
       } catch (err: unknown) {
         console.error('Failed to fetch billing data:', err);
         setError(err.response?.data?.detail || 'Failed to load billing information');
@@ -204,8 +204,9 @@ export default function BrandHubPage() {
     setAgentError(null);
     try {
       const res = await api.get('/ai-services/profiles/?specialization=brand_identity&is_global=true');
-      if (res.data && res.data.length > 0) {
-        setIconaAgent(res.data[0]);
+      const agents = res.data.results || res.data;
+      if (agents && agents.length > 0) {
+        setIconaAgent(agents[0]);
       } else {
         setIconaAgent({
           id: "icona",
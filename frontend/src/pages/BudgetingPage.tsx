@@ -148,9 +148,9 @@ export default function BudgetingPage() {
         api.get('/budgeting/expenses/'),
       ]);
 
-      setBudgets(budgetsRes.data || []);
-      setCategories(categoriesRes.data || []);
-      setExpenses(expensesRes.data || []);
+      setBudgets(budgetsRes.data.results || budgetsRes.data || []);
+      setCategories(categoriesRes.data.results || categoriesRes.data || []);
+      setExpenses(expensesRes.data.results || expensesRes.data || []);
     } catch (err: unknown) {
       console.error('Error fetching data:', err);
       setError(err.response?.data?.detail || 'Failed to load budgeting data');
@@ -164,8 +164,9 @@ export default function BudgetingPage() {
     setAgentError(null);
     try {
       const res = await api.get('/ai-services/profiles/?specialization=budget_analysis&is_global=true');
-      if (res.data && res.data.length > 0) {
-        setAiAgent(res.data[0]);
+      const agents = res.data.results || res.data;
+      if (agents && agents.length > 0) {
+        setAiAgent(agents[0]);
       } else {
         // Fallback to default agent
         setAiAgent({
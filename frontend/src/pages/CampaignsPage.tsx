@@ -155,8 +155,9 @@ export default function CampaignsPage() {
     setAgentError(null);
     try {
       const res = await api.get('/ai-services/profiles/?specialization=campaign_optimization&is_global=true');
-      if (res.data && res.data.length > 0) {
-        setOptimizerAgent(res.data[0]);
+      const agents = res.data.results || res.data;
+      if (agents && agents.length > 0) {
+        setOptimizerAgent(agents[0]);
       } else {
         const optimizerConfig = getAgentConfig('Optimizer');
         setOptimizerAgent({
@@ -152,8 +152,9 @@ export default function ContactsPage() {
     setAgentError(null);
     try {
       const res = await api.get('/ai-services/profiles/?specialization=lead_nurturing&is_global=true');
-      if (res.data && res.data.length > 0) {
-        setProsperoAgent(res.data[0]);
+      const agents = res.data.results || res.data;
+      if (agents && agents.length > 0) {
+        setProsperoAgent(agents[0]);
       } else {
         setProsperoAgent({
           id: "prospero",
@@ -70,7 +70,7 @@ export default function DesignStudioPage() {
     setError(null);
     try {
       const res = await api.get("/ai-services/image-generation-requests/");
-      setImageRequests(res.data);
+      setImageRequests(res.data.results || res.data);
     } catch (err: unknown) {
       setError(err.response?.data?.detail || err.message || "Failed to load image requests.");
       // Placeholder data if API fails
@@ -102,8 +102,9 @@ export default function DesignStudioPage() {
     setAgentError(null);
     try {
       const res = await api.get('/ai-services/profiles/?specialization=content_creation&is_global=true');
-      if (res.data && res.data.length > 0) {
-        setAiAgent(res.data[0]);
+      const agents = res.data.results || res.data;
+      if (agents && agents.length > 0) {
+        setAiAgent(agents[0]);
       } else {
         setAiAgent({
           id: '1',
@@ -324,8 +324,9 @@ export default function EnhancedBudgetingPage() {
     setAgentError(null);
     try {
       const res = await api.get('/ai-services/profiles/?specialization=budget_analysis&is_global=true');
-      if (res.data && res.data.length > 0) {
-        setAiAgent(res.data[0]);
+      const agents = res.data.results || res.data;
+      if (agents && agents.length > 0) {
+        setAiAgent(agents[0]);
       } else {
         setAiAgent({
           id: "pecunia",
@@ -150,9 +150,9 @@ export default function InfoCenterPage() {
         api.get('/learning/user-stats/'),
       ]);
 
-      setBadges(badgesRes.data || []);
-      setAchievements(achievementsRes.data || []);
-      setResources(resourcesRes.data || []);
+      setBadges(badgesRes.data.results || badgesRes.data || []);
+      setAchievements(achievementsRes.data.results || achievementsRes.data || []);
+      setResources(resourcesRes.data.results || resourcesRes.data || []);
       setUserStats(statsRes.data || {
         total_badges: 0,
         total_achievements: 0,
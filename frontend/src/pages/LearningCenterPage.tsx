@@ -175,8 +175,9 @@ export default function LearningCenterPage() {
     setAgentError(null);
     try {
       const res = await api.get('/ai-services/profiles/?specialization=learning_guidance&is_global=true');
-      if (res.data && res.data.length > 0) {
-        setMentorAgent(res.data[0]);
+      const agents = res.data.results || res.data;
+      if (agents && agents.length > 0) {
+        setMentorAgent(agents[0]);
       } else {
         // Fallback to default agent
         setMentorAgent({
@@ -228,11 +229,11 @@ export default function LearningCenterPage() {
         api.get('/learning/user-stats/'),
       ]);
 
-      setCourses(coursesRes.data || []);
-      setTutorials(tutorialsRes.data || []);
-      setBadges(badgesRes.data || []);
-      setAchievements(achievementsRes.data || []);
-      setResources(resourcesRes.data || []);
+      setCourses(coursesRes.data.results || coursesRes.data || []);
+      setTutorials(tutorialsRes.data.results || tutorialsRes.data || []);
+      setBadges(badgesRes.data.results || badgesRes.data || []);
+      setAchievements(achievementsRes.data.results || achievementsRes.data || []);
+      setResources(resourcesRes.data.results || resourcesRes.data || []);
       setUserStats(statsRes.data || null);
     } catch (err: unknown) {
       console.error('Error fetching learning data:', err);
@@ -86,8 +86,9 @@ export default function LearningPage() {
     setAgentError(null);
     try {
       const res = await api.get('/ai-services/profiles/?specialization=learning_guidance&is_global=true');
-      if (res.data && res.data.length > 0) {
-        setMentorAgent(res.data[0]);
+      const agents = res.data.results || res.data;
+      if (agents && agents.length > 0) {
+        setMentorAgent(agents[0]);
       } else {
         // Fallback to default agent
         setMentorAgent({
@@ -127,8 +128,8 @@ export default function LearningPage() {
         api.get("/learning/courses/"),
         api.get("/learning/tutorials/"),
       ]);
-      setCourses(coursesRes.data || []);
-      setTutorials(tutorialsRes.data || []);
+      setCourses(coursesRes.data.results || coursesRes.data || []);
+      setTutorials(tutorialsRes.data.results || tutorialsRes.data || []);
     } catch (err: unknown) {
       const errorMessage = err instanceof Error ? err.message : "Failed to load learning data.";
       setError(errorMessage);
@@ -121,8 +121,9 @@ export const MarketingTemplatesPage: React.FC = () => {
     setAgentError(null);
     try {
       const res = await api.get('/ai-services/profiles/?specialization=template_curation&is_global=true');
-      if (res.data && res.data.length > 0) {
-        setFormaAgent(res.data[0]);
+      const agents = res.data.results || res.data;
+      if (agents && agents.length > 0) {
+        setFormaAgent(agents[0]);
       } else {
         // Fallback to default agent
         setFormaAgent({
@@ -166,11 +167,11 @@ export const MarketingTemplatesPage: React.FC = () => {
 
       // Fetch categories
       const categoriesResponse = await api.get('/marketing-templates/categories/');
-      setCategories(categoriesResponse.data);
+      setCategories(categoriesResponse.data.results || categoriesResponse.data);
 
       // Fetch templates
       const templatesResponse = await api.get('/marketing-templates/templates/');
-      setTemplates(templatesResponse.data);
+      setTemplates(templatesResponse.data.results || templatesResponse.data);
     } catch (err: unknown) {
       setError(err.response?.data?.detail || 'Failed to fetch data');
       toast({
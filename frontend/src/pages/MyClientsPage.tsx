@@ -206,7 +206,7 @@ const MyClientsPage: React.FC = () => {
   const fetchClients = async () => {
     try {
       const response = await api.get('/core/client-portals/');
-      setClients(response.data);
+      setClients(response.data.results || response.data);
     } catch (error) {
       console.error('Error fetching clients:', error);
       toast({
@@ -224,7 +224,7 @@ const MyClientsPage: React.FC = () => {
   const fetchStats = async () => {
     try {
       const response = await api.get('/core/client-portals/');
-      const clientsData = response.data;
+      const clientsData = response.data.results || response.data;
       
       setStats({
         totalClients: clientsData.length,
@@ -247,9 +247,9 @@ const MyClientsPage: React.FC = () => {
         api.get(`/core/client-billing/?client_portal=${clientId}`),
       ]);
       
-      setClientUsers(usersResponse.data);
-      setClientActivities(activitiesResponse.data);
-      setClientBilling(billingResponse.data);
+      setClientUsers(usersResponse.data.results || usersResponse.data);
+      setClientActivities(activitiesResponse.data.results || activitiesResponse.data);
+      setClientBilling(billingResponse.data.results || billingResponse.data);
     } catch (error) {
       console.error('Error fetching client details:', error);
     }
@@ -150,8 +150,9 @@ export default function ReportsPage() {
     setAgentError(null);
     try {
       const res = await api.get('/ai-services/profiles/?specialization=reporting_insights&is_global=true');
-      if (res.data && res.data.length > 0) {
-        setQuantiaAgent(res.data[0]);
+      const agents = res.data.results || res.data;
+      if (agents && agents.length > 0) {
+        setQuantiaAgent(agents[0]);
       } else {
         // Fallback to default agent
         setQuantiaAgent({
@@ -225,7 +226,7 @@ export default function ReportsPage() {
   async function fetchReportTemplates() {
     try {
       const res = await api.get('/analytics/report-templates/');
-      setReportTemplates(res.data);
+      setReportTemplates(res.data.results || res.data);
     } catch (error) {
       console.error('Failed to fetch report templates:', error);
     }
@@ -234,7 +235,7 @@ export default function ReportsPage() {
   async function fetchSavedReports() {
     try {
       const res = await api.get('/analytics/saved-reports/');
-      setSavedReports(res.data);
+      setSavedReports(res.data.results || res.data);
     } catch (error) {
       console.error('Failed to fetch saved reports:', error);
     }
@@ -243,7 +244,7 @@ export default function ReportsPage() {
   async function fetchRecentExecutions() {
     try {
       const res = await api.get('/analytics/report-executions/');
-      setRecentExecutions(res.data.slice(0, 5)); // Get last 5 executions
+      setRecentExecutions((res.data.results || res.data).slice(0, 5)); // Get last 5 executions
     } catch (error) {
       console.error('Failed to fetch recent executions:', error);
     }
@@ -206,7 +206,7 @@ class IntegrationService {
     search?: string;
   }): Promise<IntegrationProvider[]> {
     const response = await api.get('/integrations/providers/', { params });
-    return response.data;
+    return response.data.results || response.data;
   }
 
   async getProvider(id: string): Promise<IntegrationProvider> {
@@ -227,7 +227,7 @@ class IntegrationService {
   // Integrations
   async getIntegrations(): Promise<Integration[]> {
     const response = await api.get('/integrations/integrations/');
-    return response.data;
+    return response.data.results || response.data;
   }
 
   async getIntegration(id: string): Promise<Integration> {
@@ -282,7 +282,7 @@ class IntegrationService {
   // Data Flows
   async getDataFlows(): Promise<DataFlow[]> {
     const response = await api.get('/integrations/data-flows/');
-    return response.data;
+    return response.data.results || response.data;
   }
 
   async getDataFlow(id: string): Promise<DataFlow> {
@@ -312,7 +312,7 @@ class IntegrationService {
   // Workflow Automations
   async getWorkflows(): Promise<WorkflowAutomation[]> {
     const response = await api.get('/integrations/workflows/');
-    return response.data;
+    return response.data.results || response.data;
   }
 
   async getWorkflow(id: string): Promise<WorkflowAutomation> {
@@ -342,7 +342,7 @@ class IntegrationService {
   // Connectus AI
   async getConnectusInsights(): Promise<ConnectusInsight[]> {
     const response = await api.get('/integrations/connectus/');
-    return response.data;
+    return response.data.results || response.data;
   }
 
   async getConnectusInsight(id: string): Promise<ConnectusInsight> {
@@ -383,7 +383,7 @@ class IntegrationService {
     end_date?: string;
   }): Promise<HealthLog[]> {
     const response = await api.get('/integrations/health-logs/', { params });
-    return response.data;
+    return response.data.results || response.data;
   }
 
   async getHealthLog(id: string): Promise<HealthLog> {